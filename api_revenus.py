@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+# api_revenus.py — Service HTTP local du moteur de revenus (ASGI, sans interface)
+#
+# Mêmes règles que la page "Dossier client" (moteur_revenus + table de règles),
+# pour le CRM. À lancer à côté de `streamlit run app.py` :
+#   python api_revenus.py --port 8600 --workers 2
+#   uvicorn api_revenus:app --port 8600          # équivalent
+#
+# Routes (JSON en entrée et en sortie) :
+#   GET  /sante         -> {"ok": true, "version_regles": ...}
+#   POST /revenu        dossier (mêmes champs que la page, cf. DEFAUTS) -> résultat
+#   POST /revenus/lot   {"dossiers": [...]} ou [...]                   -> {"resultats": [...]}
+# Le résultat reprend ce qu'affiche la page : revenus, `message` (st.caption),
+# `info` (st.info), `alerte` / `niveau_alerte`, `erreur`.
+#
+# L'application ASGI est écrite à la main (pas de routeur) : une requête =
+# lecture du corps, un accès dict au moteur, une sérialisation.
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+from moteur_revenus import Resultat, evaluer_dossier, evaluer_lot
+from regles import table_courante
+
+try:  # sérialisation plus rapide si disponible (dépendance de streamlit)
+    import orjson
+
+    def _dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+    _loads = orjson.loads
+    _ErreurJSON: Tuple[type, ...] = (orjson.JSONDecodeError,)
+except ImportError:  # pragma: no cover
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    _loads = json.loads
+    _ErreurJSON = (json.JSONDecodeError, UnicodeDecodeError)
+
+TAILLE_MAX_CORPS = 16 * 1024 * 1024
+TAILLE_MAX_LOT = 100_000
+SEUIL_LOT_NUMPY = 64  # en dessous, la boucle scalaire bat la mise en colonnes NumPy (résultats identiques)
+
+# erreurs d'une saisie, rattachées à son dossier : statut inconnu ou non textuel, champ non numérique,
+# négatif ou non fini (nommé dans le message) ; les autres ne devraient plus survenir, mais restent sur leur ligne
+_ERREURS_SAISIE = (ArithmeticError, TypeError, ValueError)
+
+_ENTETES_JSON = [(b"content-type", b"application/json; charset=utf-8")]
+
+
+class ErreurRequete(Exception):
+    def __init__(self, statut_http: int, message: str):
+        super().__init__(message)
+        self.statut_http = statut_http
+
+
+def resultat_json(res: Resultat) -> Dict[str, Any]:
+    return {
+        "statut": res.statut,
+        "revenu_eligible": res.revenu_eligible,
+        "revenu_total": res.revenu_total,
+        "eligible": res.eligible,
+        "message": res.message,
+        "info": res.info,
+        "alerte": res.alerte,
+        "niveau_alerte": res.niveau_alerte if res.alerte else None,
+        "erreur": res.erreur,
+    }
+
+
+def _erreur_dossier(texte: str) -> Dict[str, Any]:
+    return {"statut": None, "revenu_eligible": 0.0, "revenu_total": 0.0, "eligible": False, "message": "",
+            "info": "", "alerte": None, "niveau_alerte": None, "erreur": texte}
+
+
+def _motif(e: Exception) -> str:
+    return str(e) if isinstance(e, ValueError) else f"Saisie invalide ({type(e).__name__} : {e})"
+
+
+def evaluer_un(dossier: Any) -> Dict[str, Any]:
+    if not isinstance(dossier, dict):
+        raise ErreurRequete(400, "Le dossier doit être un objet JSON.")
+    try:
+        return resultat_json(evaluer_dossier(dossier))
+    except _ERREURS_SAISIE as e:
+        raise ErreurRequete(422, _motif(e))
+
+
+def evaluer_plusieurs(dossiers: List[Any]) -> List[Dict[str, Any]]:
+    """Un résultat par dossier, dans l'ordre ; une saisie invalide n'échoue que sur sa ligne."""
+    valides = [i for i, d in enumerate(dossiers) if isinstance(d, dict)]
+    sortie: List[Dict[str, Any]] = [_erreur_dossier("Le dossier doit être un objet JSON.")] * len(dossiers)
+    if len(valides) >= SEUIL_LOT_NUMPY:
+        try:
+            lot = evaluer_lot(dossiers[i] for i in valides)
+        except _ERREURS_SAISIE:
+            lot = None  # une saisie refusée : on repasse ligne à ligne, l'erreur reste sur sa ligne
+        if lot is not None:
+            for k, i in enumerate(valides):
+                sortie[i] = resultat_json(lot.resultat(k))
+            return sortie
+    for i in valides:
+        try:
+            sortie[i] = resultat_json(evaluer_dossier(dossiers[i]))
+        except _ERREURS_SAISIE as e:
+            sortie[i] = _erreur_dossier(_motif(e))
+    return sortie
+
+
+def _traiter(methode: str, chemin: str, corps: bytes) -> Tuple[int, Any]:
+    if chemin == "/sante":
+        return 200, {"ok": True, "version_regles": table_courante().version}
+    if chemin not in ("/revenu", "/revenus/lot"):
+        raise ErreurRequete(404, f"Route inconnue : {chemin}")
+    if methode != "POST":
+        raise ErreurRequete(405, "Méthode attendue : POST.")
+    try:
+        donnees = _loads(corps)
+    except _ErreurJSON:
+        raise ErreurRequete(400, "Corps JSON invalide.")
+    if chemin == "/revenu":
+        return 200, evaluer_un(donnees)
+    dossiers = donnees.get("dossiers") if isinstance(donnees, dict) else donnees
+    if not isinstance(dossiers, list):
+        raise ErreurRequete(400, 'Attendu : {"dossiers": [...]} ou une liste de dossiers.')
+    if len(dossiers) > TAILLE_MAX_LOT:
+        raise ErreurRequete(413, f"Lot limité à {TAILLE_MAX_LOT} dossiers.")
+    return 200, {"version_regles": table_courante().version, "resultats": evaluer_plusieurs(dossiers)}
+
+
+async def _lire_corps(receive) -> bytes:
+    morceaux: List[bytes] = []
+    taille = 0
+    while True:
+        message = await receive()
+        morceau = message.get("body", b"")
+        taille += len(morceau)
+        if taille > TAILLE_MAX_CORPS:
+            raise ErreurRequete(413, "Corps de requête trop volumineux.")
+        morceaux.append(morceau)
+        if not message.get("more_body"):
+            return morceaux[0] if len(morceaux) == 1 else b"".join(morceaux)
+
+
+async def app(scope, receive, send) -> None:
+    """Application ASGI 3."""
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                table_courante()  # charge la table avant la première requête
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+
+    try:
+        corps = await _lire_corps(receive)
+        statut_http, reponse = _traiter(scope["method"], scope["path"], corps)
+    except ErreurRequete as e:
+        statut_http, reponse = e.statut_http, {"erreur": str(e)}
+    donnees = _dumps(reponse)
+    await send({"type": "http.response.start", "status": statut_http,
+                "headers": _ENTETES_JSON + [(b"content-length", str(len(donnees)).encode("ascii"))]})
+    await send({"type": "http.response.body", "body": donnees})
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Service HTTP local du moteur de revenus (pour le CRM).")
+    p.add_argument("--hote", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8600)
+    p.add_argument("--workers", type=int, default=1, help="Processus uvicorn (≈ un par cœur)")
+    args = p.parse_args(argv)
+
+    import uvicorn
+    uvicorn.run("api_revenus:app", host=args.hote, port=args.port, workers=args.workers,
+                log_level="warning", access_log=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
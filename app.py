@@ -11,113 +11,15 @@ st.set_page_config(page_title="Coach Pret Immo", page_icon="🏠", layout="wide"
 # -----------------------------
 # Données communes
 # -----------------------------
-STATUTS = [
-    "CDI", "CDD", "CDIC", "Intérim", "Intermittent", "Saisonnier",
-    "Militaire", "Stagiaire FP", "Assistante maternelle", "Apprenti",
-    "Pompier volontaire", "Élu", "Multi-contrats", "Famille d'accueil",
-]
-
-DOCS_PAR_STATUT = {
-    "CDI": [
-        "Contrat de travail en CDI",
-        "3 derniers bulletins de salaire",
-        "Dernier avis d'imposition",
-        "Pièce d'identité",
-        "Relevés bancaires (3 mois)",
-    ],
-    "CDD": [
-        "Dernier avis d'imposition",
-        "Tous les contrats CDD",
-        "3 derniers bulletins de salaire par employeur",
-        "Pièce d'identité",
-        "Relevés bancaires (3 mois)",
-    ],
-    "CDIC": [
-        "Dernier avis d'imposition",
-        "Contrat CDIC (CDI de chantier) avec date de fin",
-        "3 derniers bulletins de salaire",
-        "Pièce d'identité",
-        "Relevés bancaires (3 mois)",
-    ],
-    "Intérim": [
-        "3 derniers avis d'imposition",
-        "3 derniers bulletins de salaire",
-        "Dernier contrat de mission",
-        "Pièce d'identité",
-        "Relevés bancaires (3 mois)",
-    ],
-    "Intermittent": [
-        "3 derniers avis d'imposition",
-        "Justificatifs d'activité sur 3 ans",
-        "Pièce d'identité",
-        "Relevés bancaires (3 mois)",
-    ],
-    "Saisonnier": [
-        "3 derniers avis d'imposition",
-        "3 derniers bulletins de salaire",
-        "Dernier contrat de travail",
-        "Preuve de 2 saisons sur 3 ans",
-        "Pièce d'identité",
-        "Relevés bancaires (3 mois)",
-    ],
-    "Militaire": [
-        "3 derniers avis d'imposition",
-        "3 derniers bulletins de salaire",
-        "Dernier contrat d'engagement",
-        "Pièce d'identité",
-        "Relevés bancaires (3 mois)",
-    ],
-    "Stagiaire FP": [
-        "Dernier avis d'imposition",
-        "Contrat de stage (fonction publique)",
-        "3 derniers bulletins de salaire",
-        "Pièce d'identité",
-        "Relevés bancaires (3 mois)",
-    ],
-    "Assistante maternelle": [
-        "Dernier avis d'imposition",
-        "Contrats de garde (CDI ou CDD) par employeur",
-        "Agréments en cours de validité",
-        "Contrats futurs (si déjà signés) — optionnel",
-        "Pièce d'identité",
-        "Relevés bancaires (3 mois)",
-    ],
-    "Apprenti": [
-        "Dernier avis d'imposition de l'apprenti (ou parents si rattaché)",
-        "Contrat d'apprentissage",
-        "3 derniers bulletins de salaire",
-        "Pièce d'identité",
-        "Relevés bancaires (3 mois)",
-    ],
-    "Pompier volontaire": [
-        "2 derniers avis d'imposition",
-        "3 derniers bulletins de salaire",
-        "Justificatifs d'activité (≥ 24 mois passés)",
-        "Pièce d'identité",
-        "Relevés bancaires (3 mois)",
-    ],
-    "Élu": [
-        "Dernier avis d'imposition",
-        "Justificatif de mandat d'élu",
-        "3 derniers bulletins de salaire",
-        "Pièce d'identité",
-        "Relevés bancaires (3 mois)",
-    ],
-    "Multi-contrats": [
-        "Dernier avis d'imposition",
-        "3 derniers bulletins de salaire pour chaque employeur",
-        "Contrats de travail (CDI/CDD) par employeur",
-        "Pièce d'identité",
-        "Relevés bancaires (3 mois)",
-    ],
-    "Famille d'accueil": [
-        "Dernier avis d'imposition",
-        "Contrat de garde",
-        "Agrément (5 ans, renouvelable)",
-        "Pièce d'identité",
-        "Relevés bancaires (3 mois)",
-    ],
-}
+# Tables statiques construites une fois par processus (module importé une seule
+# fois, puis servi depuis sys.modules à chaque rerun). Les modules propres à une
+# page (moteur, fpdf, export groupé) sont importés dans la page elle-même : le
+# démarrage ne charge que streamlit + le référentiel.
+from referentiel import AIDE_AUTRES_REVENUS, DOCS_PAR_STATUT, ONGLETS_AUTRES_REVENUS, PAGES, STATUT_MENAGE, STATUTS
+from metriques import REGISTRE, demarrer_depuis_env, etiqueter_statut, mesurer_rerun, rerun_en_cours
+from memoire_sessions import SESSIONS
+
+demarrer_depuis_env()
 
 # -----------------------------
 # Aides: petits utilitaires
@@ -128,31 +30,277 @@ def eur(x: float) -> str:
 # -----------------------------
 # Page: Dossier client
 # -----------------------------
+# Saisies de la page : une clé de session par champ du moteur (préfixe "dc_"),
+# pour pouvoir recharger un dossier enregistré dans les widgets.
+# Mode ménage : les saisies du co-emprunteur ont le préfixe "dc_e2_".
+CO_EMPRUNTEUR = "e2_"
+
+def _cle(champ):
+    return f"dc_{champ}"
+
+def _nombre(champ, label, value=0.0, **kwargs):
+    cle = _cle(champ)
+    if cle in st.session_state:  # valeur chargée depuis le dépôt : ne pas la doubler d'un défaut
+        return st.number_input(label, key=cle, **kwargs)
+    return st.number_input(label, value=value, key=cle, **kwargs)
+
+def _case(champ, label, value=False):
+    cle = _cle(champ)
+    if cle in st.session_state:
+        return st.checkbox(label, key=cle)
+    return st.checkbox(label, value=value, key=cle)
+
+def _ouvrir_dossier(id_dossier):
+    """Recharge un dossier du dépôt dans les widgets de la page (avant leur création)."""
+    from depot_dossiers import depot
+    d = depot().charger(int(id_dossier))
+    if d is None:
+        st.session_state.pop("dossier_id", None)
+        st.query_params.pop("dossier", None)
+        return
+    _nouveau_dossier()
+    _charger_saisies(d.saisies)
+    st.session_state["dossier_id"] = d.id
+    st.session_state["dossier_empreinte"] = _empreinte(d.saisies)
+    st.query_params["dossier"] = str(d.id)
+
+def _charger_saisies(saisies, pre=""):
+    from moteur_revenus import DEFAUTS
+    for champ, valeur in saisies.items():
+        if champ == "co_emprunteur" and valeur:
+            st.session_state[_cle("menage")] = True
+            _charger_saisies(valeur, pre=CO_EMPRUNTEUR)
+        elif champ == "rni_employeurs":
+            valeurs = [float(v) for v in valeur or [0.0]]
+            st.session_state[_cle(pre + "nb_employeurs")] = len(valeurs)
+            for i, v in enumerate(valeurs):
+                st.session_state[_cle(f"{pre}mc_{i}")] = v
+        elif champ in DEFAUTS and valeur is not None:
+            # type du widget (int / float / bool / str) = type de la valeur par défaut
+            st.session_state[_cle(pre + champ)] = type(DEFAUTS[champ])(valeur)
+
+def _nouveau_dossier():
+    for cle in [c for c in st.session_state if c.startswith("dc_") or c.startswith("dossier_")]:
+        del st.session_state[cle]
+    st.query_params.pop("dossier", None)
+
+def _empreinte(saisies):
+    # condensé plutôt que le JSON lui-même : c'est tout ce que la session garde du dossier
+    import hashlib
+    import json
+    return hashlib.blake2b(json.dumps(saisies, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"),
+                           digest_size=16).hexdigest()
+
+def _enregistrer_auto(dossier, res):
+    """Enregistre le dossier dès qu'il a un nom, puis à chaque modification (l'URL garde son id)."""
+    from depot_dossiers import depot
+    from regles import table_courante
+    if not (dossier.get("nom") or "").strip():
+        return
+    empreinte = _empreinte(dossier)
+    if st.session_state.get("dossier_empreinte") == empreinte:
+        return
+    id_dossier = depot().enregistrer(dossier, res, st.session_state.get("dossier_id"), table_courante().version)
+    st.session_state["dossier_id"] = id_dossier
+    st.session_state["dossier_empreinte"] = empreinte
+    st.query_params["dossier"] = str(id_dossier)
+
+def _auditer(dossier, res, table, emprunteur=1):
+    """Trace d'audit (journal_audit) de chaque calcul nouveau de la session : mêmes saisies et même table = déjà consigné."""
+    from journal_audit import journal
+    audit = journal()
+    if audit is None:
+        return
+    cle = f"audit_empreinte_{emprunteur}"
+    empreinte = _empreinte([dossier, audit.empreinte(table)])
+    if st.session_state.get(cle) == empreinte:
+        return
+    audit.consigner(dossier, res, table, dossier_id=st.session_state.get("dossier_id"), emprunteur=emprunteur)
+    st.session_state[cle] = empreinte
+
+def _choisir_dossier(cle, libelle_vide):
+    """Recherche (index en mémoire) + liste des derniers dossiers modifiés ; renvoie un ApercuDossier ou None."""
+    from depot_dossiers import depot
+    from index_dossiers import index_dossiers
+    c1, c2 = st.columns([1, 2])
+    with c1:
+        recherche = st.text_input("Rechercher (nom, statut)", key=f"{cle}_recherche")
+    apercus = index_dossiers().chercher(recherche, limite=30) if recherche.strip() else depot().lister(limite=30)
+    with c2:
+        return st.selectbox("Dossier enregistré", [None] + apercus, key=f"{cle}_choix",
+                            format_func=lambda a: libelle_vide if a is None else a.libelle())
+
+def _barre_dossiers():
+    """Ouvrir / créer un dossier ; ?dossier=<id> dans l'URL rouvre le dossier après un rafraîchissement."""
+    id_url = st.query_params.get("dossier")
+    if id_url and id_url.isdigit() and str(st.session_state.get("dossier_id")) != id_url:
+        _ouvrir_dossier(id_url)
+    with st.expander("Dossiers enregistrés", expanded=False):
+        apercu = _choisir_dossier("ouvrir", "— choisir —")
+        b1, b2 = st.columns(2)
+        b1.button("Ouvrir", disabled=apercu is None, on_click=lambda: _ouvrir_dossier(apercu.id))
+        b2.button("Nouveau dossier", on_click=_nouveau_dossier)
+    if st.session_state.get("dossier_id"):
+        st.caption(f"Dossier n° {st.session_state['dossier_id']} — enregistré automatiquement.")
+    else:
+        st.caption("Le dossier est enregistré automatiquement dès que le nom est renseigné.")
+
 def render_dossier_client():
     st.subheader("Dossier client — Tous statuts")
+    _barre_dossiers()
+    if st.toggle("Ménage : deux emprunteurs (co-emprunteur)", key=_cle("menage")):
+        etiqueter_statut(STATUT_MENAGE)
+        _section_menage()
+        return
 
+    dossier = _saisies_communes()
+    etiqueter_statut(dossier["statut"])
+    st.divider()
+
+    _section_statut(dossier)
+
+
+def _saisies_communes(pre=""):
+    """Identité, statut et revenus communs d'un emprunteur ; renvoie le début de son dossier."""
     # --------- Identité & statut ---------
     c0, c1 = st.columns(2)
     with c0:
-        nom = st.text_input("Nom et prénom")
+        nom = st.text_input("Nom et prénom", key=_cle(pre + "nom"))
     with c1:
-        statut = st.selectbox("Statut professionnel", [
-            "CDI", "CDD", "CDIC", "Intérim", "Intermittent", "Saisonnier",
-            "Militaire", "Stagiaire FP", "Assistante maternelle", "Apprenti",
-            "Pompier volontaire", "Élu", "Multi-contrats", "Famille d'accueil"
-        ], index=0)
+        statut = st.selectbox("Statut professionnel", STATUTS, index=0, key=_cle(pre + "statut"))
 
     # --------- Revenus communs ----------
     c2, c3 = st.columns(2)
     with c2:
-        salaire_fixe = st.number_input("Salaire fixe mensuel (€)", min_value=0.0, value=2500.0, step=50.0)
+        salaire_fixe = _nombre(pre + "salaire_fixe", "Salaire fixe mensuel (€)", min_value=0.0, value=2500.0, step=50.0)
     with c3:
-        autres_revenus = st.number_input("Autres revenus stables (€)", min_value=0.0, value=0.0, step=50.0)
+        autres_revenus = _nombre(pre + "autres_revenus", "Autres revenus stables (€)", min_value=0.0, value=0.0, step=50.0)
 
-    def eur(x: float) -> str:
-        return f"{x:,.2f} €".replace(",", " ")
+    return {"nom": nom, "statut": statut, "salaire_fixe": salaire_fixe, "autres_revenus": autres_revenus}
 
-    st.divider()
+
+def _fragment(nom_page):
+    """st.fragment mesuré : une saisie dans la section ne relance qu'elle.
+
+    Pendant un rerun complet, la section est mesurée avec la page ; relancée
+    seule, elle a sa propre ligne dans les métriques (nom_page).
+    """
+    import functools
+
+    def deco(fn):
+        @st.fragment
+        @functools.wraps(fn)
+        def section(*args, **kwargs):
+            if rerun_en_cours():
+                fn(*args, **kwargs)
+            else:
+                _safe_render(lambda: fn(*args, **kwargs), nom_page)
+        return section
+    return deco
+
+
+@_fragment("Dossier client (section statut)")
+def _section_statut(base):
+    """Saisies propres au statut, résultat et capacité d'emprunt."""
+    from moteur_revenus import evaluer_dossier
+    from regles import table_courante
+    dossier = dict(base)
+    etiqueter_statut(dossier["statut"])
+    _saisies_statut(dossier)
+
+    table = table_courante()
+    res = evaluer_dossier(dossier, table)
+    _enregistrer_auto(dossier, res)
+    _auditer(dossier, res, table)
+    _afficher_resultat(res)
+    if not res.erreur:
+        _afficher_capacite(res.revenu_total, dossier)
+
+
+@_fragment("Dossier client (ménage)")
+def _section_menage():
+    """Deux emprunteurs, chacun avec la règle de son statut ; revenus additionnés, check-list fusionnée.
+
+    Les résultats individuels sont mémorisés (menage.py) : une saisie du
+    co-emprunteur ne recalcule que lui.
+    """
+    from menage import dossier_menage, evaluer_menage
+    from referentiel import docs_menage
+    from regles import table_courante
+    dossiers = []
+    for n, onglet in enumerate(st.tabs(["Emprunteur 1", "Emprunteur 2"])):
+        pre = CO_EMPRUNTEUR if n else ""
+        with onglet:
+            dossier = _saisies_communes(pre)
+            st.divider()
+            _saisies_statut(dossier, pre)
+            dossiers.append(dossier)
+
+    table = table_courante()
+    menage = evaluer_menage(dossiers, table)
+    _enregistrer_auto(dossier_menage(dossiers), menage.resultat())
+    for n, (d, res) in enumerate(zip(dossiers, menage.emprunteurs), start=1):
+        _auditer(d, res, table, emprunteur=n)
+
+    st.markdown("### Revenus du ménage")
+    colonnes = st.columns(len(dossiers) + 1)
+    for n, (col, d, res) in enumerate(zip(colonnes, dossiers, menage.emprunteurs), start=1):
+        with col:
+            st.metric(f"Emprunteur {n} — {d['nom'] or res.statut}", eur(res.revenu_total))
+            if res.erreur:
+                st.error(res.erreur)
+            else:
+                if res.alerte:
+                    (st.error if res.niveau_alerte == "error" else st.warning)(res.alerte)
+                st.caption(res.message)
+    colonnes[-1].metric("Revenu total retenu (ménage)", eur(menage.revenu_total))
+
+    with st.expander("Check-list du ménage (pièces fusionnées)"):
+        for i, (doc, qui) in enumerate(docs_menage([d["statut"] for d in dossiers]), start=1):
+            pour = "les deux emprunteurs" if len(qui) == len(dossiers) else f"emprunteur {qui[0]}"
+            st.write(f"{i}. {doc} — *{pour}*")
+
+    if not menage.erreur:
+        _afficher_capacite(menage.revenu_total)
+
+
+def _pre_remplir(statut, pre=""):
+    """Lit les pièces déposées et reporte les montants dans les saisies du statut (avant création des widgets)."""
+    from ingestion_pieces import analyser_pieces, champs_dossier, ligne_piece
+    fichiers = st.session_state.get(_cle(pre + "pieces")) or []
+    pieces = list(analyser_pieces([(f.name, f.getvalue()) for f in fichiers]))
+    champs = champs_dossier(pieces, statut)
+    for champ, valeur in champs.items():
+        st.session_state[_cle(pre + champ)] = float(valeur)
+    st.session_state[_cle(pre + "pieces_lues")] = (statut, [ligne_piece(p) for p in pieces], list(champs))
+
+def _import_pieces(statut, pre=""):
+    """Bulletins de paie et avis d'imposition (PDF texte ou .txt) -> saisies du statut (ingestion_pieces)."""
+    from ingestion_pieces import LIBELLES_CHAMPS, champs_cibles
+    cibles = champs_cibles(statut)
+    if not cibles:
+        return
+    with st.expander("Pré-remplir depuis les pièces (bulletins de paie, avis d'imposition)"):
+        st.caption("Champs remplis : " + ", ".join(LIBELLES_CHAMPS[c] for c in cibles)
+                   + ". Lecture sur le serveur, sans envoi extérieur ; un document scanné reste à saisir.")
+        fichiers = st.file_uploader("Pièces", type=["pdf", "txt"], accept_multiple_files=True, key=_cle(pre + "pieces"))
+        st.button("Pré-remplir", key=f"{pre}pre_remplir", disabled=not fichiers, on_click=_pre_remplir, args=(statut, pre))
+        lues = st.session_state.get(_cle(pre + "pieces_lues"))
+        if lues and lues[0] == statut:  # résultat d'une lecture faite pour un autre statut : plus affiché
+            _, lignes, champs = lues
+            st.dataframe(lignes, hide_index=True)
+            if champs:
+                st.success("Pré-rempli : " + ", ".join(LIBELLES_CHAMPS[c] for c in champs) + " — à vérifier ci-dessous.")
+                if any(c.startswith("b_m") for c in champs):
+                    st.caption("Bulletins M-1 à M-3 : pris en compte si « Changement de situation » est coché.")
+            else:
+                st.warning("Aucun montant reporté : pièces non reconnues ou périodes incomplètes.")
+
+def _saisies_statut(dossier, pre=""):
+    """Widgets propres au statut de `dossier`, qu'ils complètent ; `pre` : préfixe des clés (co-emprunteur)."""
+    from regles import table_courante
+    statut = dossier["statut"]
+    _import_pieces(statut, pre)
 
     # ===== CDD / CDIC =====
     if statut in ["CDD", "CDIC"]:
@@ -160,263 +308,225 @@ def render_dossier_client():
         with st.expander("Revenus & contrôles", expanded=True):
             c1x, c2x = st.columns(2)
             with c1x:
-                cdd_rni_12m = st.number_input("RNI (hors Pôle Emploi) — 12 mois (annuel €)", min_value=0.0, value=0.0, step=500.0)
+                dossier["cdd_rni_12m"] = _nombre(pre + "cdd_rni_12m", "RNI (hors Pôle Emploi) — 12 mois (annuel €)", min_value=0.0, value=0.0, step=500.0)
             with c2x:
-                cdd_mois_restants = st.number_input("Mois restants sur contrat", min_value=0, max_value=36, value=3, step=1)
-            deductions = st.number_input("Déductions annuelles (primes exceptionnelles, HS ponctuelles) (€)", min_value=0.0, value=0.0, step=100.0)
-
-        if cdd_rni_12m <= 0:
-            st.error("⚠️ Renseigne le RNI 12 mois hors Pôle Emploi.")
-            st.metric("Revenu mensuel (minimal)", eur(salaire_fixe + autres_revenus))
-            return
-
-        revenu_cdd = round((cdd_rni_12m - deductions) / 12.0, 2)
-        msg = f"{statut} : RNI 12m hors Pôle Emploi / 12."
-        if deductions > 0:
-            msg += f" Primes/HS déduites ({deductions:.0f} €/an)."
-        if cdd_mois_restants < 3:
-            msg += " ⚠️ Moins de 3 mois restants sur le contrat."
-        st.metric("Revenu éligible (mensuel)", eur(revenu_cdd))
-        st.caption(msg)
-
-        revenu_total = round(revenu_cdd + autres_revenus, 2)
-        st.metric("Revenu total retenu (avec autres revenus)", eur(revenu_total))
-        st.info("Docs : dernier avis IR + tous les contrats CDD/CDIC + 3 derniers bulletins de salaire / employeur.")
-        return
+                dossier["cdd_mois_restants"] = _nombre(pre + "cdd_mois_restants", "Mois restants sur contrat", min_value=0, max_value=36, value=3, step=1)
+            dossier["deductions"] = _nombre(pre + "deductions", "Déductions annuelles (primes exceptionnelles, HS ponctuelles) (€)", min_value=0.0, value=0.0, step=100.0)
 
     # ===== Intérim / Intermittent / Saisonnier =====
-    if statut in ["Intérim", "Intermittent", "Saisonnier"]:
+    elif statut in ["Intérim", "Intermittent", "Saisonnier"]:
         st.markdown(f"### Paramètres spécifiques — {statut}")
         with st.expander("Revenus nets imposables (inclure Pôle Emploi)", expanded=True):
             cN, cN1, cN2 = st.columns(3)
             with cN:
-                rni_N  = st.number_input("Année N (annuel €)",  min_value=0.0, value=0.0, step=500.0, key=f"{statut}_rniN")
+                dossier["rni_N"]  = _nombre(pre + "rni_N", "Année N (annuel €)",  min_value=0.0, value=0.0, step=500.0)
             with cN1:
-                rni_N1 = st.number_input("Année N-1 (annuel €)",min_value=0.0, value=0.0, step=500.0, key=f"{statut}_rniN1")
+                dossier["rni_N1"] = _nombre(pre + "rni_N1", "Année N-1 (annuel €)",min_value=0.0, value=0.0, step=500.0)
             with cN2:
-                rni_N2 = st.number_input("Année N-2 (annuel €)",min_value=0.0, value=0.0, step=500.0, key=f"{statut}_rniN2")
-
-        eligible = True
-        contraintes = []
+                dossier["rni_N2"] = _nombre(pre + "rni_N2", "Année N-2 (annuel €)",min_value=0.0, value=0.0, step=500.0)
 
         if statut == "Intérim":
-            mois_activite = st.number_input("Mois d’activité (24 derniers mois)", min_value=0, max_value=24, value=18, step=1)
-            if mois_activite < 18:
-                eligible = False
-                contraintes.append("❌ Intérim : ≥ 18 mois d’activité sur 24.")
+            dossier["mois_activite"] = _nombre(pre + "mois_activite", "Mois d’activité (24 derniers mois)", min_value=0, max_value=24, value=18, step=1)
         if statut == "Intermittent":
-            annees = st.number_input("Années d’activité justifiées", min_value=0, value=3, step=1)
-            if annees < 3:
-                eligible = False
-                contraintes.append("❌ Intermittent : au moins 3 ans.")
+            dossier["annees_activite"] = _nombre(pre + "annees_activite", "Années d’activité justifiées", min_value=0, value=3, step=1)
         if statut == "Saisonnier":
-            saisons = st.number_input("Saisons réalisées (3 dernières années)", min_value=0, value=2, step=1)
-            if saisons < 2:
-                eligible = False
-                contraintes.append("❌ Saisonnier : ≥ 2 saisons sur 3 ans.")
-
-        valeurs = [v for v in [rni_N, rni_N1, rni_N2] if v > 0]
-        if not valeurs:
-            st.error("⚠️ Renseigne au moins un revenu annuel.")
-            st.metric("Revenu mensuel (minimal)", eur(salaire_fixe + autres_revenus))
-            return
-
-        revenu_mensuel = round(sum(valeurs) / len(valeurs) / 12.0, 2)
-
-        if not eligible:
-            st.warning(" / ".join(contraintes))
-            st.metric("Revenu éligible (mensuel)", eur(0.0))
-            st.caption(f"{statut} : conditions d’antériorité non remplies → revenu non retenu.")
-            st.info({
-                "Intérim": "Docs : 3 avis IR + 3 bulletins + dernier contrat de mission.",
-                "Intermittent": "Docs : 3 avis IR + preuve d’activité sur 3 ans (vérifier régularité).",
-                "Saisonnier": "Docs : 3 avis IR + 3 bulletins + dernier contrat + preuve d’au moins 2 saisons/3 ans.",
-            }[statut])
-            return
-
-        st.metric("Revenu éligible (mensuel)", eur(revenu_mensuel))
-        revenu_total = round(revenu_mensuel + autres_revenus, 2)
-        st.metric("Revenu total retenu (avec autres revenus)", eur(revenu_total))
-        st.info({
-            "Intérim": "Docs : 3 avis IR + 3 bulletins + dernier contrat de mission. Condition : 18 mois/24.",
-            "Intermittent": "Docs : 3 avis IR + activité ≥ 3 ans. Vérifier régularité.",
-            "Saisonnier": "Docs : 3 avis IR + 3 bulletins + dernier contrat. Condition : ≥ 2 saisons / 3 ans.",
-        }[statut])
-        return
+            dossier["saisons"] = _nombre(pre + "saisons", "Saisons réalisées (3 dernières années)", min_value=0, value=2, step=1)
 
     # ===== Militaire =====
-    if statut == "Militaire":
+    elif statut == "Militaire":
         st.markdown("### Paramètres spécifiques — Militaire")
-        rni_N  = st.number_input("RNI Année N (€)",   min_value=0.0, value=0.0, step=500.0)
-        rni_N1 = st.number_input("RNI Année N-1 (€)", min_value=0.0, value=0.0, step=500.0)
-        rni_N2 = st.number_input("RNI Année N-2 (€)", min_value=0.0, value=0.0, step=500.0)
-        revenu = round(((rni_N + rni_N1 + rni_N2) / 3.0) / 12.0, 2)
-        st.metric("Revenu éligible (mensuel)", eur(revenu))
-        st.info("Docs : 3 avis IR + 3 bulletins de solde + dernier contrat d’engagement.")
-        return
+        dossier["rni_N"]  = _nombre(pre + "rni_N", "RNI Année N (€)",   min_value=0.0, value=0.0, step=500.0)
+        dossier["rni_N1"] = _nombre(pre + "rni_N1", "RNI Année N-1 (€)", min_value=0.0, value=0.0, step=500.0)
+        dossier["rni_N2"] = _nombre(pre + "rni_N2", "RNI Année N-2 (€)", min_value=0.0, value=0.0, step=500.0)
 
     # ===== Stagiaire FP =====
-    if statut == "Stagiaire FP":
+    elif statut == "Stagiaire FP":
         st.markdown("### Paramètres spécifiques — Stagiaire Fonction publique")
-        rni = st.number_input("RNI annuel (€)", min_value=0.0, value=0.0, step=500.0)
-        revenu = round(rni / 12.0, 2)
-        st.metric("Revenu éligible (mensuel)", eur(revenu))
-        st.info("Docs : dernier avis IR + contrat de stage + 3 bulletins de salaire.")
-        return
+        dossier["rni"] = _nombre(pre + "rni", "RNI annuel (€)", min_value=0.0, value=0.0, step=500.0)
 
     # ===== Assistante maternelle =====
-    if statut == "Assistante maternelle":
+    elif statut == "Assistante maternelle":
         st.markdown("### Paramètres spécifiques — Assistante maternelle")
-        cumul_paje = st.number_input("Cumul annuel des revenus PAJE (€)", min_value=0.0, value=0.0, step=500.0)
-        revenu = round(cumul_paje / 12.0, 2)
-        st.metric("Revenu éligible (mensuel)", eur(revenu))
-        st.info("Docs : avis IR + contrats de garde + agréments (vérifier pérennité).")
-        return
+        dossier["cumul_paje"] = _nombre(pre + "cumul_paje", "Cumul annuel des revenus PAJE (€)", min_value=0.0, value=0.0, step=500.0)
 
     # ===== Apprenti =====
-    if statut == "Apprenti":
+    elif statut == "Apprenti":
         st.markdown("### Paramètres spécifiques — Apprenti")
-        rni = st.number_input("RNI annuel (€)", min_value=0.0, value=0.0, step=500.0)
-        duree = st.number_input("Durée restante du contrat (mois)", min_value=0, value=24, step=1)
-        if duree <= 0:
-            st.warning("⚠️ Contrat expiré → non éligible.")
-            revenu = 0.0
-        else:
-            revenu = round(rni / 12.0, 2)
-        st.metric("Revenu éligible (mensuel)", eur(revenu))
-        st.info("Docs : avis IR de l’apprenti (ou parents si rattaché) + contrat d’apprentissage.")
-        return
+        dossier["rni"] = _nombre(pre + "rni", "RNI annuel (€)", min_value=0.0, value=0.0, step=500.0)
+        dossier["duree_restante_mois"] = _nombre(pre + "duree_restante_mois", "Durée restante du contrat (mois)", min_value=0, value=24, step=1)
 
     # ===== Pompier volontaire =====
-    if statut == "Pompier volontaire":
+    elif statut == "Pompier volontaire":
         st.markdown("### Paramètres spécifiques — Pompier volontaire")
-        rni_N  = st.number_input("RNI Année N (€)",   min_value=0.0, value=0.0, step=500.0)
-        rni_N1 = st.number_input("RNI Année N-1 (€)", min_value=0.0, value=0.0, step=500.0)
-        revenu = round(((rni_N + rni_N1) / 2.0) / 12.0, 2)
-        st.metric("Revenu éligible (mensuel)", eur(revenu))
-        st.info("Docs : 2 avis IR + 3 bulletins. Pérennité ≥ 24 mois.")
-        return
+        dossier["rni_N"]  = _nombre(pre + "rni_N", "RNI Année N (€)",   min_value=0.0, value=0.0, step=500.0)
+        dossier["rni_N1"] = _nombre(pre + "rni_N1", "RNI Année N-1 (€)", min_value=0.0, value=0.0, step=500.0)
 
     # ===== Élu =====
-    if statut == "Élu":
+    elif statut == "Élu":
         st.markdown("### Paramètres spécifiques — Élu")
-        revenus_mandat = st.number_input("Revenus de mandat (annuel €)", min_value=0.0, value=0.0, step=500.0)
-        autres = st.number_input("Autres revenus (annuel €)", min_value=0.0, value=0.0, step=500.0)
-        revenu = round((revenus_mandat + autres) / 12.0, 2)
-        st.metric("Revenu éligible (mensuel)", eur(revenu))
-        st.info("Docs : avis IR + justificatif de mandat + 3 bulletins. Vérifier adéquation durée prêt/mandat.")
-        return
+        dossier["revenus_mandat"] = _nombre(pre + "revenus_mandat", "Revenus de mandat (annuel €)", min_value=0.0, value=0.0, step=500.0)
+        dossier["autres_annuels"] = _nombre(pre + "autres_annuels", "Autres revenus (annuel €)", min_value=0.0, value=0.0, step=500.0)
 
     # ===== Multi-contrats =====
-    if statut == "Multi-contrats":
+    elif statut == "Multi-contrats":
         st.markdown("### Paramètres spécifiques — Multi-contrats")
-        nb = st.number_input("Nombre d’employeurs", min_value=1, value=2, step=1)
-        total = 0.0
-        for i in range(nb):
-            total += st.number_input(f"RNI annuel employeur {i+1} (€)", min_value=0.0, value=0.0, step=500.0, key=f"mc_{i}")
-        revenu = round(total / 12.0, 2)
-        st.metric("Revenu éligible (mensuel)", eur(revenu))
-        st.info("Docs : avis IR + 3 bulletins + contrats par employeur. Si mix CDI/CDD → vérifier 18 mois sur 24 pour les CDD.")
-        return
+        nb = _nombre(pre + "nb_employeurs", "Nombre d’employeurs", min_value=1, value=2, step=1)
+        # une saisie par employeur : formulaire, un seul recalcul au clic
+        with st.form(f"{pre}mc_employeurs", border=False):
+            dossier["rni_employeurs"] = [
+                _nombre(f"{pre}mc_{i}", f"RNI annuel employeur {i+1} (€)", min_value=0.0, value=0.0, step=500.0)
+                for i in range(nb)
+            ]
+            st.form_submit_button("Calculer")
 
     # ===== Famille d’accueil =====
-    if statut == "Famille d'accueil":
+    elif statut == "Famille d'accueil":
         st.markdown("### Paramètres spécifiques — Famille d’accueil")
-        revenus_annuels = st.number_input("Revenus annuels (hors compléments pensionnaires) (€)", min_value=0.0, value=0.0, step=500.0)
-        revenu = round(revenus_annuels / 12.0, 2)
-        st.metric("Revenu éligible (mensuel)", eur(revenu))
-        st.info("Docs : avis IR + contrat de garde + agrément (5 ans, renouvelable). Vérifier pérennité.")
-        return
+        dossier["revenus_annuels"] = _nombre(pre + "revenus_annuels", "Revenus annuels (hors compléments pensionnaires) (€)", min_value=0.0, value=0.0, step=500.0)
 
     # ===== CDI (à la fin) =====
-    st.markdown("### Paramètres spécifiques — CDI")
-    b1, b2, b3 = st.columns(3)
-    with b1:
-        cdi_anciennete_mois = st.number_input("Ancienneté CDI (mois)", min_value=0, value=12, step=1)
-        cdi_periode_essai_terminee = st.checkbox("Période d'essai terminée ?", value=True)
-    with b2:
-        cdi_statut_cadre = st.checkbox("Statut cadre ?", value=False)
-        cdi_salaire_brut_annuel_contrat = st.number_input("Salaire brut annuel du contrat (€)", min_value=0.0, value=30000.0, step=500.0)
-    with b3:
-        cdi_primes_contractuelles_annuelles = st.number_input("Primes contractuelles annuelles (€)", min_value=0.0, value=0.0, step=100.0)
-
-    st.caption("Primes non contractuelles (annuelles) — moyenne sur 3 années (×2/3 si ancienneté < 36 mois).")
-    p1, p2, p3 = st.columns(3)
-    with p1:
-        pnc1 = st.number_input("PNC Année N-1 (€)", min_value=0.0, value=0.0, step=100.0)
-    with p2:
-        pnc2 = st.number_input("PNC Année N-2 (€)", min_value=0.0, value=0.0, step=100.0)
-    with p3:
-        pnc3 = st.number_input("PNC Année N-3 (€)", min_value=0.0, value=0.0, step=100.0)
-
-    st.markdown("#### Données fiscales (annuelles, avant abattement)")
-    f1, f2 = st.columns(2)
-    with f1:
-        cdi_cni = st.number_input("Cumul net imposable (Déc N-1) — annuel (€)", min_value=0.0, value=0.0, step=500.0)
-    with f2:
-        cdi_rni = st.number_input("Revenu net imposable (dernier avis IRPP) — annuel (€)", min_value=0.0, value=0.0, step=500.0)
-    st.caption("Si ancienneté ≥ 12 mois : retenir le **moins favorable** entre CNI N-1 et RNI IRPP, puis /12.")
-
-    st.markdown("#### Changement de situation")
-    cdi_chgt = st.checkbox("Changement de situation ? (moyenne des 3 derniers bulletins)", value=False)
-    if cdi_chgt:
-        s1, s2, s3 = st.columns(3)
-        with s1:
-            b_m1 = st.number_input("Bulletin M-1 — net à payer (€)", min_value=0.0, value=0.0, step=50.0)
-        with s2:
-            b_m2 = st.number_input("Bulletin M-2 — net à payer (€)", min_value=0.0, value=0.0, step=50.0)
-        with s3:
-            b_m3 = st.number_input("Bulletin M-3 — net à payer (€)", min_value=0.0, value=0.0, step=50.0)
-        salaires_3_mois = [b_m1, b_m2, b_m3]
     else:
-        salaires_3_mois = None
+        st.markdown("### Paramètres spécifiques — CDI")
+        regle_cdi = table_courante()["CDI"]
+        b1, b2, b3 = st.columns(3)
+        with b1:
+            dossier["cdi_anciennete_mois"] = _nombre(pre + "cdi_anciennete_mois", "Ancienneté CDI (mois)", min_value=0, value=12, step=1)
+            dossier["cdi_periode_essai_terminee"] = _case(pre + "cdi_periode_essai_terminee", "Période d'essai terminée ?", value=True)
+        with b2:
+            dossier["cdi_statut_cadre"] = _case(pre + "cdi_statut_cadre", "Statut cadre ?", value=False)
+            dossier["cdi_salaire_brut_annuel_contrat"] = _nombre(pre + "cdi_salaire_brut_annuel_contrat", "Salaire brut annuel du contrat (€)", min_value=0.0, value=30000.0, step=500.0)
+        with b3:
+            dossier["cdi_primes_contractuelles_annuelles"] = _nombre(pre + "cdi_primes_contractuelles_annuelles", "Primes contractuelles annuelles (€)", min_value=0.0, value=0.0, step=100.0)
+
+        st.caption(regle_cdi.texte("aide_pnc"))
+        p1, p2, p3 = st.columns(3)
+        with p1:
+            dossier["pnc1"] = _nombre(pre + "pnc1", "PNC Année N-1 (€)", min_value=0.0, value=0.0, step=100.0)
+        with p2:
+            dossier["pnc2"] = _nombre(pre + "pnc2", "PNC Année N-2 (€)", min_value=0.0, value=0.0, step=100.0)
+        with p3:
+            dossier["pnc3"] = _nombre(pre + "pnc3", "PNC Année N-3 (€)", min_value=0.0, value=0.0, step=100.0)
+
+        st.markdown("#### Données fiscales (annuelles, avant abattement)")
+        f1, f2 = st.columns(2)
+        with f1:
+            dossier["cdi_cni"] = _nombre(pre + "cdi_cni", "Cumul net imposable (Déc N-1) — annuel (€)", min_value=0.0, value=0.0, step=500.0)
+        with f2:
+            dossier["cdi_rni"] = _nombre(pre + "cdi_rni", "Revenu net imposable (dernier avis IRPP) — annuel (€)", min_value=0.0, value=0.0, step=500.0)
+        st.caption(regle_cdi.texte("aide_fiscale"))
+
+        st.markdown("#### Changement de situation")
+        dossier["cdi_chgt"] = _case(pre + "cdi_chgt", "Changement de situation ? (moyenne des 3 derniers bulletins)", value=False)
+        if dossier["cdi_chgt"]:
+            s1, s2, s3 = st.columns(3)
+            with s1:
+                dossier["b_m1"] = _nombre(pre + "b_m1", "Bulletin M-1 — net à payer (€)", min_value=0.0, value=0.0, step=50.0)
+            with s2:
+                dossier["b_m2"] = _nombre(pre + "b_m2", "Bulletin M-2 — net à payer (€)", min_value=0.0, value=0.0, step=50.0)
+            with s3:
+                dossier["b_m3"] = _nombre(pre + "b_m3", "Bulletin M-3 — net à payer (€)", min_value=0.0, value=0.0, step=50.0)
+
+        st.divider()
+
+
+def _afficher_resultat(res):
+    """Affiche un Resultat du moteur (mêmes widgets que l'ancienne page)."""
+    if res.erreur:
+        st.error(res.erreur)
+        st.metric("Revenu mensuel (minimal)", eur(res.revenu_total))
+        return
+    if res.alerte:
+        (st.error if res.niveau_alerte == "error" else st.warning)(res.alerte)
+    label = "Revenu éligible CDI (mensuel)" if res.statut == "CDI" else "Revenu éligible (mensuel)"
+    st.metric(label, eur(res.revenu_eligible))
+    st.caption(res.message)
+    st.metric("Revenu total retenu (avec autres revenus)", eur(res.revenu_total))
+    st.info(res.info)
+
+@_fragment("Dossier client (capacité)")
+def _afficher_capacite(revenu_total, dossier=None):
+    """Capacité d'emprunt : la grille taux × durée est en cache par revenu, les curseurs ne font qu'y lire."""
+    from capacite import DUREES_GRILLE, TAUX_ENDETTEMENT, TAUX_GRILLE, grille_capacite, tableau_amortissement
 
     st.divider()
-
-    def pnc_mensuelles(p1, p2, p3, anciennete_mois):
-        vals = [v for v in [p1, p2, p3] if v is not None]
-        if not vals:
-            return 0.0
-        moy_ann = sum(vals) / len(vals)
-        mens = moy_ann / 12.0
-        coef = (2.0 / 3.0) if anciennete_mois < 36 else 1.0
-        return mens * coef
-
-    if cdi_chgt and salaires_3_mois and any(salaires_3_mois):
-        moy3 = sum(salaires_3_mois) / len([x for x in salaires_3_mois if x is not None and x > 0])
-        revenu_cdi = max(0.0, round(moy3, 2))
-        message = "CDI (changement) : moyenne des 3 derniers bulletins retenue."
-    else:
-        pc_m = (cdi_primes_contractuelles_annuelles / 12.0) if cdi_primes_contractuelles_annuelles else 0.0
-        pnc_m = pnc_mensuelles(pnc1, pnc2, pnc3, cdi_anciennete_mois)
-
-        if cdi_anciennete_mois < 12:
-            if not cdi_periode_essai_terminee:
-                st.error("CDI < 12 mois : période d'essai non terminée → non éligible.")
-                revenu_cdi = 0.0
-                message = "CDI < 12 mois : période d'essai non terminée."
-            else:
-                coef = 0.75 if cdi_statut_cadre else 0.78
-                base_m = (cdi_salaire_brut_annuel_contrat * coef) / 12.0
-                revenu_cdi = max(0.0, round(base_m + pc_m + pnc_m, 2))
-                message = f"CDI < 12 mois : (brut annuel×{coef})/12 + primes (contractuelles 100%/12 ; PNC moy.3a/12 ×{'2/3' if cdi_anciennete_mois < 36 else '1'})."
-        else:
-            candidats = [x for x in [cdi_cni, cdi_rni] if x and x > 0]
-            if candidats:
-                base_m = min(candidats) / 12.0
-                revenu_cdi = max(0.0, round(base_m, 2))  # les primes sont déjà incluses dans ces bases fiscales
-                message = "CDI ≥ 12 mois : base fiscale = min(CNI N-1 ; RNI IRPP) / 12."
-            else:
-                revenu_cdi = max(0.0, round(salaire_fixe + pc_m + pnc_m, 2))
-                message = "CDI ≥ 12 mois (fallback) : fixe + primes (contractuelles 100%/12 ; PNC moy.3a/12 × (2/3 si <36m))."
-
-    st.metric("Revenu éligible CDI (mensuel)", eur(revenu_cdi))
-    st.caption(message)
-    revenu_total = round(revenu_cdi + autres_revenus, 2)
-    st.metric("Revenu total retenu (avec autres revenus)", eur(revenu_total))
-    st.info("Rappel primes CDI : contractuelles = 100% ; non contractuelles = moyenne 3 ans /12, ×2/3 si ancienneté < 36 mois. "
-            "Si ancienneté ≥ 12 mois et CNI/RNI fournis : retenir le moins favorable /12 (sans ajouter de primes).")
-    return
+    st.markdown("### Capacité d'emprunt")
+    k1, k2, k3 = st.columns(3)
+    with k1:
+        charges = st.number_input("Crédits en cours (mensualités, €)", min_value=0.0, value=0.0, step=50.0)
+    with k2:
+        taux = st.select_slider("Taux nominal (%)", options=TAUX_GRILLE, value=3.5)
+    with k3:
+        duree = st.select_slider("Durée (ans)", options=DUREES_GRILLE, value=20)
+
+    g = grille_capacite(revenu_total, charges=charges)
+    i, j = g.indice(taux, duree)
+    m1, m2, m3 = st.columns(3)
+    m1.metric(f"Mensualité max ({TAUX_ENDETTEMENT:.0%} d'endettement)", eur(g.mensualite_max))
+    m2.metric("Capital empruntable", eur(g.capital_max[i, j]))
+    m3.metric("Coût total des intérêts", eur(g.cout_interets[i, j]))
+    _afficher_usure(g.capital_max[i, j], taux, duree)
+
+    with st.expander(f"Capital empruntable selon le taux — {duree} ans"):
+        st.line_chart({"Taux (%)": g.taux, "Capital (€)": g.capital_max[:, j]}, x="Taux (%)", y="Capital (€)")
+
+    if dossier is not None:
+        _afficher_besoin(dossier, taux, duree, charges)
+
+    with st.expander("Tableau d'amortissement (synthèse annuelle)"):
+        tab = tableau_amortissement(g.capital_max[i, j], taux, duree)
+        par_an = lambda a: a.reshape(duree, 12).sum(axis=1).round(2)
+        st.dataframe({
+            "Année": list(range(1, duree + 1)),
+            "Échéances (€)": par_an(tab["echeance"]),
+            "Intérêts (€)": par_an(tab["interets"]),
+            "Capital amorti (€)": par_an(tab["amortissement"]),
+            "Capital restant dû (€)": tab["capital_restant"][11::12].round(2),
+        }, hide_index=True)
+
+def _afficher_usure(capital, taux, duree):
+    """TAEG estimé de l'offre (capital max au taux et à la durée choisis) face au taux d'usure en vigueur (taux_reference)."""
+    from taux_reference import CATEGORIES, controler
+    if capital <= 0:
+        return
+    with st.expander("Taux d'usure et taux du marché"):
+        a1, a2, a3 = st.columns(3)
+        with a1:
+            assurance = st.number_input("Assurance emprunteur (% du capital / an)", min_value=0.0, max_value=3.0,
+                                        value=0.30, step=0.05, key="usure_assurance")
+        with a2:
+            frais = st.number_input("Frais (dossier, garantie, courtage) (€)", min_value=0.0, value=2500.0,
+                                    step=100.0, key="usure_frais")
+        with a3:
+            categorie = st.selectbox("Type de prêt", list(CATEGORIES), format_func=CATEGORIES.get, key="usure_categorie")
+        c = controler(capital, taux, duree, assurance, frais, categorie=categorie)
+        u1, u2, u3 = st.columns(3)
+        u1.metric("TAEG estimé", f"{c.taeg:.2f} %")
+        u2.metric("Taux d'usure", "—" if c.usure is None else f"{c.usure.taux:.2f} %")
+        u3.metric("Taux moyen du marché (nominal)", "—" if c.marche is None else f"{c.marche.taux:.2f} %")
+        if c.usure is not None:
+            st.caption(f"Taux d'usure en vigueur depuis le {c.usure.date_effet:%d/%m/%Y} ({c.usure.tranche})."
+                       + (f" Taux du marché au {c.marche.date_effet:%d/%m/%Y} ({c.marche.tranche})." if c.marche else ""))
+        if c.perimee:
+            st.warning("Grille de taux plus ancienne qu'un trimestre : mettre à jour taux_reference.csv.")
+    if c.usure is None:
+        st.caption("Taux d'usure inconnu pour cette date et ce type de prêt : offre non contrôlée.")
+    elif c.au_dessus:
+        st.error(f"TAEG estimé {c.taeg:.2f} % au-dessus du taux d'usure ({c.usure.taux:.2f} %) : "
+                 "offre non finançable en l'état (taux, assurance ou frais à revoir).")
+
+def _afficher_besoin(dossier, taux, duree, charges):
+    """Question inverse : saisie minimale du statut pour emprunter un montant visé (solveur_revenus)."""
+    from solveur_revenus import besoin
+    with st.expander("Revenus nécessaires pour un montant visé"):
+        montant = st.number_input("Montant visé (€)", min_value=10_000.0, value=250_000.0, step=5_000.0,
+                                  key="besoin_montant")
+        inverse, valeur, total = besoin(dossier, montant, taux, duree, charges)
+        if valeur is None:
+            st.warning(f"Montant inatteignable dans cette situation : {inverse.motif}")
+            return
+        st.metric(f"{inverse.libelle} ({inverse.unite})", eur(valeur))
+        st.caption(f"Soit un revenu total retenu de {eur(total)} / mois pour {eur(montant)} sur {duree} ans à "
+                   f"{taux:g} % ; les autres saisies du dossier sont conservées.")
 
 # -----------------------------
 # Page: Check-lists
@@ -424,6 +534,12 @@ def render_dossier_client():
 def render_checklists():
     st.subheader("Check-lists par statut")
     statut = st.selectbox("Choisir un statut", STATUTS, index=0, key="cl_statut")
+    co_statut = st.selectbox("Co-emprunteur (check-list fusionnée du ménage)", [None] + STATUTS, key="cl_co_statut",
+                             format_func=lambda s: "— aucun —" if s is None else s)
+    if co_statut is not None:
+        _checklist_menage(statut, co_statut)
+        return
+    etiqueter_statut(statut)
     docs = DOCS_PAR_STATUT.get(statut, [])
     if not docs:
         st.warning("Aucune check-list prédéfinie pour ce statut.")
@@ -433,56 +549,24 @@ def render_checklists():
         st.checkbox(f"{i}. {d}", key=f"doc_{statut}_{i}")
     st.caption("Astuce : capture d’écran ou copier/coller pour l’envoyer au client.")
 
+def _checklist_menage(statut, co_statut):
+    from referentiel import docs_menage
+    etiqueter_statut(STATUT_MENAGE)
+    st.write(f"Documents à demander — emprunteur 1 ({statut}), emprunteur 2 ({co_statut}) :")
+    for i, (doc, qui) in enumerate(docs_menage([statut, co_statut]), start=1):
+        pour = "les deux emprunteurs" if len(qui) == 2 else f"emprunteur {qui[0]}"
+        st.checkbox(f"{i}. {doc} — {pour}", key=f"doc_menage_{statut}_{co_statut}_{i}")
+    st.caption("Une pièce commune aux deux statuts n'apparaît qu'une fois : la demander à chaque emprunteur concerné.")
+
 # -----------------------------
 # Page: Autres revenus (aide)
 # -----------------------------
 def render_autres_revenus_aide():
     st.subheader("Autres revenus (aide / pense-bête)")
     st.info("Cette page est un mémo. Elle n’affecte pas les calculs automatiquement.")
-    tabs = st.tabs([
-        "Retraites",
-        "Allocations familiales & aides sociales",
-        "Aide au logement & IJ",
-        "Revenus fonciers / loc. saisonnière",
-        "Autres revenus sous conditions",
-        "Exclusions",
-    ])
-
-    with tabs[0]:
-        st.markdown(
-            "**Principe :** régime général + complémentaire. Si proche retraite, demander estimation prévisionnelle (caisse / simulateur).  \n"
-            "**Justificatifs :** dernier avis IRPP ou relevé annuel de pension."
-        )
-    with tabs[1]:
-        st.markdown(
-            "**Allocations familiales / AAH / APA / Prime d’activité :** retenir si pérennes sur la durée du prêt.  \n"
-            "**Justificatifs :** décompte CAF, documents organismes sociaux."
-        )
-    with tabs[2]:
-        st.markdown(
-            "**Aide au logement :** retenir uniquement si versée sur le compte du client.  \n"
-            "**Indemnités journalières :** prudence (temporaire)."
-        )
-    with tabs[3]:
-        st.markdown(
-            "**Revenus fonciers :** saisir 100% (pondération gérée côté banque). Revenus attendus OK si baux/estimations (≈3.5% neuf, 4% ancien, 4.5% meublé) "
-            "et DPE A–E ou travaux de performance budgétisés.  \n"
-            "**Justificatifs :** 2072/2042/2031/2044, baux récents, 3 relevés bancaires.  \n"
-            "**Location saisonnière :** moyenne pluriannuelle ou attestation gestionnaire si historique insuffisant."
-        )
-    with tabs[4]:
-        st.markdown(
-            "**Pensions alimentaires :** seulement si jugement + versement effectif (relevés).  \n"
-            "**Invalidité cat.2 / rente AT :** si durée compatible.  \n"
-            "**Obligations / coupons :** récurrents et réguliers.  \n"
-            "**Dividendes :** stables sur 3 ans et déclarés, vérifier capacité de distribution (bilan).  \n"
-            "**Photovoltaïque :** moyenne 2 ans (justif EDF / BIC)."
-        )
-    with tabs[5]:
-        st.markdown(
-            "**Exclus :** remboursements de frais professionnels (IK, repas), indemnités de déplacement chauffeurs.  \n"
-            "Toujours saisir des revenus pérennes, réguliers et traçables."
-        )
+    for onglet, (_, memo) in zip(st.tabs(ONGLETS_AUTRES_REVENUS), AIDE_AUTRES_REVENUS):
+        with onglet:
+            st.markdown(memo)
 
 # -----------------------------
 # Pages: Exports & Aide
@@ -490,117 +574,63 @@ def render_autres_revenus_aide():
 def render_exports():
     import io
     from datetime import datetime
+    from file_exports import file_exports, travail_pdf, travail_zip
     st.subheader("Exports PDF")
 
     # Tentative d'import de fpdf2
     try:
-        from fpdf import FPDF
-    except Exception:
+        from exports_pdf import (cle_checklist, cle_resume, nom_fichier_checklist, nom_fichier_resume, pdf_checklist,
+                                 pdf_resume)
+    except ImportError:
         st.error("La librairie 'fpdf2' n'est pas installée.")
         st.code("pip install fpdf2", language="bash")
         st.caption("Après installation, relance l'app : streamlit run app.py")
         return
 
-    # --- Helpers PDF ---
-    def eur(x: float) -> str:
-        try:
-            return f"{float(x):,.2f} €".replace(",", " ")
-        except Exception:
-            return f"{x} €"
-
-    def safe(txt: str) -> str:
-        """
-        Nettoie tout texte pour la police core Helvetica (Latin-1) :
-        - remplace les tirets longs par '-'
-        - supprime les caractères hors Latin-1 pour éviter FPDFUnicodeEncodingException
-        """
-        if txt is None:
-            txt = ""
-        txt = txt.replace("—", "-").replace("–", "-")
-        # supprime/ignore tout hors latin-1
-        return txt.encode("latin-1", "ignore").decode("latin-1")
-
-    mode = st.radio("Type d'export", ["Résumé 1 page", "Check-list par statut"], horizontal=True)
+    mode = st.radio("Type d'export", ["Résumé 1 page", "Check-list par statut", "Export groupé (tous les dossiers)",
+                                      "Tableur du portefeuille (CSV / XLSX)"], horizontal=True)
 
     if mode == "Résumé 1 page":
         st.markdown("### Contenu du résumé")
-        col1, col2 = st.columns(2)
-        with col1:
-            nom = st.text_input("Nom et prénom", "")
-            statut = st.selectbox("Statut professionnel", STATUTS, index=0)
-        with col2:
-            revenu_elig = st.number_input("Revenu éligible (mensuel, €)", min_value=0.0, value=0.0, step=50.0)
-            revenu_total = st.number_input("Revenu total retenu (mensuel, €)", min_value=0.0, value=0.0, step=50.0)
+        stocke = _dossier_a_exporter()
+        if stocke is not None:
+            # valeurs calculées et enregistrées par la page Dossier client
+            nom, statut = stocke.nom, stocke.statut
+            revenu_elig, revenu_total = stocke.resultat.revenu_eligible, stocke.resultat.revenu_total
+            etiqueter_statut(statut)
+            c1, c2, c3 = st.columns(3)
+            c1.metric("Statut", statut)
+            c2.metric("Revenu éligible (mensuel)", eur(revenu_elig))
+            c3.metric("Revenu total retenu", eur(revenu_total))
+        else:
+            col1, col2 = st.columns(2)
+            with col1:
+                nom = st.text_input("Nom et prénom", "")
+                statut = st.selectbox("Statut professionnel", STATUTS, index=0)
+                etiqueter_statut(statut)
+            with col2:
+                revenu_elig = st.number_input("Revenu éligible (mensuel, €)", min_value=0.0, value=0.0, step=50.0)
+                revenu_total = st.number_input("Revenu total retenu (mensuel, €)", min_value=0.0, value=0.0, step=50.0)
 
         notes = st.text_area("Notes (facultatif)", placeholder="Observations, hypotheses, points de vigilance...")
 
         if st.button("Générer le PDF (Résumé)"):
-            class PDF(FPDF):
-                def header(self):
-                    self.set_font("Helvetica", "B", 14)
-                    self.cell(0, 10, safe("Coach Pret Immo - Resume dossier"), ln=1, align="C")
-                    self.set_font("Helvetica", "", 9)
-                    self.cell(0, 6, safe(datetime.now().strftime("Genere le %d/%m/%Y a %H:%M")), ln=1, align="C")
-                    self.ln(2)
-                    self.set_draw_color(200, 200, 200)
-                    y = self.get_y()
-                    self.line(10, y, 200, y)
-                    self.ln(5)
-
-                def footer(self):
-                    self.set_y(-15)
-                    self.set_font("Helvetica", "I", 8)
-                    self.cell(0, 10, safe(f"Page {self.page_no()}"), align="C")
-
-            pdf = PDF()
-            pdf.set_auto_page_break(auto=True, margin=15)
-            pdf.add_page()
-            pdf.set_font("Helvetica", "", 11)
-
-            # Identité
-            pdf.set_font("Helvetica", "B", 12)
-            pdf.cell(0, 8, safe("Identite & Statut"), ln=1)
-            pdf.set_font("Helvetica", "", 11)
-            pdf.cell(60, 8, safe("Nom et prenom :"), border=0)
-            pdf.cell(0, 8, safe(nom or "-"), ln=1)
-            pdf.cell(60, 8, safe("Statut professionnel :"), border=0)
-            pdf.cell(0, 8, safe(statut), ln=1)
-            pdf.ln(4)
-
-            # Chiffres
-            pdf.set_font("Helvetica", "B", 12)
-            pdf.cell(0, 8, safe("Synthese revenus mensuels"), ln=1)
-            pdf.set_font("Helvetica", "", 11)
-            pdf.cell(60, 8, safe("Revenu eligibile :"), border=0)
-            pdf.cell(0, 8, safe(eur(revenu_elig)), ln=1)
-            pdf.cell(60, 8, safe("Revenu total retenu :"), border=0)
-            pdf.cell(0, 8, safe(eur(revenu_total)), ln=1)
-            pdf.ln(4)
-
-            # Notes
-            pdf.set_font("Helvetica", "B", 12)
-            pdf.cell(0, 8, safe("Notes"), ln=1)
-            pdf.set_font("Helvetica", "", 11)
-            if notes.strip():
-                pdf.multi_cell(0, 6, safe(notes))
-            else:
-                pdf.set_text_color(120, 120, 120)
-                pdf.cell(0, 6, safe("(aucune)"), ln=1)
-                pdf.set_text_color(0, 0, 0)
-
-            # Export
-            pdf_bytes = bytes(pdf.output(dest="S"))
-            st.download_button(
-                label="Télécharger le PDF (Résumé)",
-                data=pdf_bytes,
-                file_name=f"resume_dossier_{(nom or 'client').replace(' ', '_')}.pdf",
-                mime="application/pdf",
-            )
-            st.success("PDF (Résumé) généré.")
-
-    else:
+            genere_le = datetime.now()  # même horodatage pour la clé de cache et le PDF rendu
+            _suivre_job(file_exports().soumettre(
+                "resume", f"Résumé — {nom or 'client'}", nom_fichier_resume(nom), "application/pdf",
+                travail_pdf(pdf_resume, nom, statut, revenu_elig, revenu_total, notes, genere_le,
+                            cle=cle_resume(nom, statut, revenu_elig, revenu_total, notes, genere_le)),
+            ))
+
+    elif mode == "Check-list par statut":
         st.markdown("### Check-list par statut")
-        statut = st.selectbox("Choisir un statut", STATUTS, index=0, key="export_statut")
+        stocke = _dossier_a_exporter()
+        if stocke is not None:
+            statut = stocke.statut
+            st.write(f"Statut du dossier : **{statut}**")
+        else:
+            statut = st.selectbox("Choisir un statut", STATUTS, index=0, key="export_statut")
+        etiqueter_statut(statut)
         docs = DOCS_PAR_STATUT.get(statut, [])
 
         if not docs:
@@ -619,56 +649,219 @@ def render_exports():
         remarque = st.text_area("Notes / remarques (facultatif)", "")
 
         if st.button("Générer le PDF (Check-list)"):
-            class PDF(FPDF):
-                def header(self):
-                    self.set_font("Helvetica", "B", 14)
-                    self.cell(0, 10, safe("Coach Pret Immo - Checklist documents"), ln=1, align="C")
-                    self.set_font("Helvetica", "", 9)
-                    self.cell(0, 6, safe(datetime.now().strftime("Genere le %d/%m/%Y a %H:%M")), ln=1, align="C")
-                    self.ln(2)
-                    self.set_draw_color(200, 200, 200)
-                    y = self.get_y()
-                    self.line(10, y, 200, y)
-                    self.ln(5)
-
-                def footer(self):
-                    self.set_y(-15)
-                    self.set_font("Helvetica", "I", 8)
-                    self.cell(0, 10, safe(f"Page {self.page_no()}"), align="C")
-
-            pdf = PDF()
-            pdf.set_auto_page_break(auto=True, margin=15)
-            pdf.add_page()
-            pdf.set_font("Helvetica", "", 11)
-
-            pdf.set_font("Helvetica", "B", 12)
-            pdf.cell(0, 8, safe(f"Statut : {statut}"), ln=1)
-            pdf.ln(2)
-            pdf.set_font("Helvetica", "", 11)
-
-            for doc, ok in checked:
-                prefix = "[x] " if ok else "[ ] "
-                pdf.multi_cell(0, 6, safe(prefix + doc))
-
-            pdf.ln(4)
-            pdf.set_font("Helvetica", "B", 12)
-            pdf.cell(0, 8, safe("Notes"), ln=1)
-            pdf.set_font("Helvetica", "", 11)
-            if remarque.strip():
-                pdf.multi_cell(0, 6, safe(remarque))
-            else:
-                pdf.set_text_color(120, 120, 120)
-                pdf.cell(0, 6, safe("(aucune)"), ln=1)
-                pdf.set_text_color(0, 0, 0)
-
-            pdf_bytes = pdf.output(dest="S").encode("latin-1", "ignore")
-            st.download_button(
-                label="Télécharger le PDF (Check-list)",
-                data=pdf_bytes,
-                file_name=f"checklist_{statut.replace(' ', '_')}.pdf",
-                mime="application/pdf",
-            )
-            st.success("PDF (Check-list) généré.")
+            genere_le = datetime.now()  # même horodatage pour la clé de cache et le PDF rendu
+            _suivre_job(file_exports().soumettre(
+                "checklist", f"Check-list — {statut}", nom_fichier_checklist(statut), "application/pdf",
+                travail_pdf(pdf_checklist, statut, checked, remarque, genere_le,
+                            cle=cle_checklist(statut, checked, remarque, genere_le)),
+            ))
+
+    elif mode == "Tableur du portefeuille (CSV / XLSX)":
+        _export_tableur()
+
+    else:
+        from score_portefeuille import lire_flux
+
+        st.markdown("### Export groupé — résumé + check-list par dossier actif")
+        source = st.radio("Source", ["Dossiers enregistrés", "Fichier CSV / JSONL"], horizontal=True)
+        if source == "Dossiers enregistrés":
+            from depot_dossiers import depot
+            filtre = st.selectbox("Statut", [None] + STATUTS + [STATUT_MENAGE],
+                                  format_func=lambda s: "Tous les statuts" if s is None else s)
+            nb = depot().compter(filtre)
+            st.caption(f"{nb} dossier(s) enregistré(s).")
+            if nb and st.button("Générer l'archive ZIP"):
+                _suivre_job(file_exports().soumettre(
+                    "zip", f"Export groupé — {nb} dossier(s) enregistré(s)", "exports_dossiers.zip", "application/zip",
+                    travail_zip(depot().saisies(filtre), total=2 * nb),
+                ))
+            _afficher_jobs()
+            return
+        fichier = st.file_uploader("Fichier de dossiers (CSV ou JSONL)", type=["csv", "jsonl"])
+        if fichier is None:
+            st.caption("Colonnes : celles de la page Dossier client (nom, statut, revenus…), plus actif / notes / docs_recus.")
+        elif st.button("Générer l'archive ZIP"):
+            fmt = "jsonl" if fichier.name.lower().endswith(".jsonl") else "csv"
+            lignes = list(lire_flux(io.TextIOWrapper(fichier, encoding="utf-8", newline=""), fmt))
+            _suivre_job(file_exports().soumettre(
+                "zip", f"Export groupé — {fichier.name}", "exports_dossiers.zip", "application/zip",
+                travail_zip(lignes),
+            ))
+
+    _afficher_jobs()
+
+def _export_tableur():
+    """Une ligne par dossier (statut, revenus retenus, règle, alerte d'antériorité), écrite en flux sur disque."""
+    import io
+    from export_tableur import FORMATS
+    from file_exports import file_exports, travail_tableur
+    from score_portefeuille import lire_flux
+
+    st.markdown("### Tableur du portefeuille — résultats de la page Dossier client, un dossier par ligne")
+    fmt = st.radio("Format", list(FORMATS), horizontal=True, key="tableur_format",
+                   format_func=lambda f: {"xlsx": "Excel (XLSX)", "csv": "CSV"}[f])
+    source = st.radio("Source", ["Dossiers enregistrés", "Fichier CSV / JSONL"], horizontal=True, key="tableur_source")
+    if source == "Dossiers enregistrés":
+        from depot_dossiers import depot
+        filtre = st.selectbox("Statut", [None] + STATUTS + [STATUT_MENAGE], key="tableur_statut",
+                              format_func=lambda s: "Tous les statuts" if s is None else s)
+        nb = depot().compter(filtre)
+        st.caption(f"{nb} dossier(s) enregistré(s).")
+        if nb and st.button("Générer le tableur"):
+            _suivre_job(file_exports().soumettre(
+                "tableur", f"Tableur — {nb} dossier(s) enregistré(s)", f"portefeuille.{fmt}", FORMATS[fmt],
+                travail_tableur(depot().saisies(filtre), fmt, total=nb),
+            ))
+        return
+    fichier = st.file_uploader("Fichier de dossiers (CSV ou JSONL)", type=["csv", "jsonl"], key="tableur_fichier")
+    if fichier is None:
+        st.caption("Colonnes : celles de la page Dossier client (nom, statut, revenus…).")
+    elif st.button("Générer le tableur"):
+        entree = "jsonl" if fichier.name.lower().endswith(".jsonl") else "csv"
+        # copie des octets téléversés : le job lit le flux après la fin du script
+        flux = io.TextIOWrapper(io.BytesIO(fichier.getvalue()), encoding="utf-8", newline="")
+        _suivre_job(file_exports().soumettre(
+            "tableur", f"Tableur — {fichier.name}", f"portefeuille.{fmt}", FORMATS[fmt],
+            travail_tableur(lire_flux(flux, entree), fmt),
+        ))
+
+def _dossier_a_exporter():
+    """Dossier du dépôt choisi pour l'export (None = saisie manuelle)."""
+    from depot_dossiers import depot
+    apercu = _choisir_dossier("export", "— saisie manuelle —")
+    if apercu is None:
+        return None
+    stocke = depot().charger(apercu.id)
+    if stocke is None or stocke.resultat is None or stocke.resultat.erreur:
+        st.warning("Ce dossier n'a pas de résultat calculé complet : ouvre-le dans Dossier client pour le compléter.")
+        return None
+    return stocke
+
+def _suivre_job(job_id):
+    st.session_state.setdefault("jobs_export", []).append(job_id)
+    st.toast(f"Export mis en file (job {job_id}).")
+
+def _afficher_jobs():
+    """Jobs d'export de la session ; tant qu'un job n'est pas terminé, la liste se rafraîchit seule."""
+    from file_exports import file_exports
+    ids = st.session_state.get("jobs_export", [])
+    jobs = file_exports().jobs(ids)
+    if len(jobs) != len(ids):  # jobs purgés de la file (rétention) : la session n'en garde plus trace
+        st.session_state["jobs_export"] = [j.id for j in jobs]
+    if not jobs:
+        return
+    st.divider()
+    st.markdown("### Mes exports")
+    if all(j.termine for j in jobs):
+        _liste_jobs(jobs)
+    else:
+        _liste_jobs_en_cours()
+
+@st.fragment(run_every="1s")
+def _liste_jobs_en_cours():
+    from file_exports import file_exports
+    jobs = file_exports().jobs(st.session_state.get("jobs_export", []))
+    _liste_jobs(jobs)
+    if all(j.termine for j in jobs):
+        st.rerun()  # rerun complet : la liste redevient statique, le rafraîchissement s'arrête
+
+def _liste_jobs(jobs):
+    from exports_pdf import CACHE_PDF
+    from file_exports import ERREUR, TERMINE, file_exports
+    for job in reversed(jobs):
+        c1, c2 = st.columns([3, 2])
+        with c1:
+            st.write(f"**{job.libelle}** — {job.etat}")
+            if job.etat == TERMINE:
+                st.caption(f"Attente {job.attente_s * 1000:.0f} ms, rendu {job.duree_s * 1000:.0f} ms.")
+            elif job.etat == ERREUR:
+                st.error(job.erreur)
+            elif job.total > 1:
+                st.progress(min(1.0, job.fait / job.total), text=f"{job.fait} / {job.total}")
+        with c2:
+            if job.etat == TERMINE:
+                # résultat sur disque : lu seulement au clic (téléchargement différé)
+                st.download_button(f"Télécharger {job.nom_fichier}", data=job.donnees if job.chemin is None else job.lire,
+                                   file_name=job.nom_fichier, mime=job.mime, key=f"dl_{job.id}", on_click="ignore")
+    s = file_exports().stats()
+    st.caption(f"File d'exports : {s['en attente']} en attente, {s['en cours']} en cours "
+               f"({s['threads']} thread(s), {s['processus']} processus de rendu).")
+    _caption_cache_pdf(CACHE_PDF)  # PDF seuls : cache de ce processus, y compris en mode processus
+
+def _caption_cache_pdf(cache):
+    s = cache.stats()
+    st.caption(f"Cache PDF : {s['hits']} hit(s) / {s['misses']} miss — "
+               f"{s['octets'] // 1024} Ko sur {s['budget_octets'] // 1024} Ko, {s['evictions']} éviction(s).")
+
+# -----------------------------
+# Page: Portefeuille
+# -----------------------------
+def render_portefeuille():
+    import numpy as np
+    from rapport_portefeuille import GRAPHES, Portefeuille, graphe, pdf_rapport
+    st.subheader("Portefeuille")
+    p = Portefeuille.depuis_depot()
+    if not len(p):
+        st.info("Aucun dossier calculé dans le dépôt : ils apparaissent ici dès leur premier enregistrement.")
+        return
+    empreinte = p.empreinte()
+    rejets = int(p.rejet_anteriorite.sum())
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Dossiers", f"{len(p)}")
+    c2.metric("Éligibles", f"{int(p.eligible.sum())}")
+    c3.metric("Refus antériorité", f"{rejets}", f"{100 * rejets / len(p):.1f} %", delta_color="off")
+    c4.metric("Revenu médian (éligibles)", eur(float(np.median(p.revenu_total[p.eligible])) if p.eligible.any() else 0))
+    for nom in GRAPHES:
+        st.image(graphe(nom, p, empreinte=empreinte))
+    st.dataframe(p.synthese(), hide_index=True)
+    st.download_button("Télécharger le rapport (PDF)", data=lambda: pdf_rapport(p),
+                       file_name="rapport_portefeuille.pdf", mime="application/pdf", on_click="ignore")
+    st.caption("Graphiques en cache tant que les résultats du portefeuille ne changent pas.")
+
+def render_admin():
+    # Page cachée (?admin=<COACH_ADMIN_JETON>) : dimensionnement des workers Streamlit par nœud
+    st.subheader("Admin — temps de rendu (processus courant)")
+    lignes = REGISTRE.resume()
+    if not lignes:
+        st.info("Aucun rerun mesuré depuis le démarrage du processus.")
+    else:
+        st.dataframe(lignes, hide_index=True)
+        total = sum(l["reruns"] for l in lignes)
+        st.caption(f"{total} rerun(s) mesuré(s), {sum(l['exceptions'] for l in lignes)} exception(s). "
+                   "Quantiles estimés sur les seaux de l'histogramme.")
+    jobs = REGISTRE.resume_jobs()
+    if jobs:
+        st.markdown("#### Jobs d'export")
+        st.dataframe(jobs, hide_index=True)
+    jauges = REGISTRE.jauges_courantes()
+    if jauges:
+        st.caption(" — ".join(f"{nom} : {valeur:g}" for nom, valeur in jauges.items()))
+    _admin_memoire()
+    with st.expander("Exposition Prometheus"):
+        st.code(REGISTRE.prometheus(), language="text")
+    if st.button("Remettre les compteurs à zéro"):
+        REGISTRE.vider()
+        st.rerun()
+
+def _admin_memoire():
+    from memoire_sessions import memoire_noeud, rss_octets
+    st.markdown("#### Mémoire des sessions")
+    r = SESSIONS.resume()
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("RSS du processus", f"{rss_octets() / 2**20:.0f} Mo")
+    c2.metric("Sessions actives", r["sessions"])
+    c3.metric("État moyen / session", f"{r['moyenne_octets'] / 1024:.0f} Ko")
+    c4.metric("Hors budget", r["hors_budget"], help=f"Budget : {SESSIONS.budget // 1024} Ko par session")
+    noeud = memoire_noeud()
+    capacite = SESSIONS.capacite(noeud) if noeud else None
+    if capacite is not None:
+        st.caption(f"Capacité estimée : {capacite} session(s) simultanée(s) dans {noeud / 2**30:.1f} Go "
+                   f"(état moyen + {SESSIONS.surcout // 1024} Ko de surcoût Streamlit par session).")
+    else:
+        st.caption("Définir COACH_MEMOIRE_NOEUD (octets) pour estimer le nombre de sessions par nœud.")
+    lignes = SESSIONS.lignes()
+    if lignes:
+        st.dataframe(lignes, hide_index=True)
 
 def render_aide():
     st.subheader("Aide")
@@ -678,28 +871,71 @@ def render_aide():
 # -----------------------------
 # Navigation + router robuste
 # -----------------------------
-page = st.sidebar.radio(
-    "Navigation",
-    ["Dossier client", "Check-lists", "Autres revenus (aide)", "Exports", "Aide"],
-)
+page = st.sidebar.radio("Navigation", PAGES, key="navigation")
+
+def _ouvrir_depuis_recherche(id_dossier):
+    st.session_state["navigation"] = "Dossier client"
+    _ouvrir_dossier(id_dossier)
+
+def _recherche_dossiers():
+    """Recherche instantanée dans la barre latérale ; un clic ouvre le dossier dans "Dossier client"."""
+    from index_dossiers import NON_CALCULE, TRANCHES_REVENU
+    texte = st.sidebar.text_input("Rechercher un dossier", key="recherche_dossiers",
+                                  placeholder="Nom, statut… (Elu = Élu)")
+    with st.sidebar.expander("Filtres"):
+        statut = st.selectbox("Statut", [None] + STATUTS + [STATUT_MENAGE], key="recherche_statut",
+                              format_func=lambda s: "Tous" if s is None else s)
+        tranche = st.selectbox("Revenu mensuel", [None] + [t for _, t in TRANCHES_REVENU] + [NON_CALCULE],
+                               key="recherche_tranche", format_func=lambda t: "Tous" if t is None else t)
+    if not (texte.strip() or statut or tranche):
+        return
+    from index_dossiers import index_dossiers
+    apercus = index_dossiers().chercher(texte, statut, tranche, limite=10)
+    if not apercus:
+        st.sidebar.caption("Aucun dossier trouvé.")
+    for a in apercus:
+        st.sidebar.button(a.libelle(), key=f"recherche_{a.id}", on_click=_ouvrir_depuis_recherche, args=(a.id,),
+                          width="stretch")
+
+_recherche_dossiers()
 
-def _safe_render(fn):
+def _safe_render(fn, nom_page):
     import traceback
-    try:
-        fn()
-    except Exception as e:
-        st.error("Une erreur est survenue dans cette page.")
-        st.exception(e)
-        st.code(traceback.format_exc())
-
-if page == "Dossier client":
-    _safe_render(render_dossier_client)
+    with mesurer_rerun(nom_page) as mesure:
+        try:
+            fn()
+        except Exception as e:
+            mesure.exception = True
+            st.error("Une erreur est survenue dans cette page.")
+            st.exception(e)
+            st.code(traceback.format_exc())
+    _mesurer_session()
+
+def _mesurer_session():
+    # état propre à la session seulement : le référentiel et les caches de module sont partagés
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    SESSIONS.mesurer(ctx.session_id if ctx is not None else "locale", st.session_state.to_dict())
+
+def _page_admin_demandee():
+    # pas de jeton par défaut : sans COACH_ADMIN_JETON, la page d'admin n'est pas servie
+    import hmac
+    import os
+    jeton = os.environ.get("COACH_ADMIN_JETON", "")
+    demande = st.query_params.get("admin", "")
+    return bool(jeton) and hmac.compare_digest(demande.encode("utf-8"), jeton.encode("utf-8"))
+
+if _page_admin_demandee():
+    _safe_render(render_admin, "Admin")
+elif page == "Dossier client":
+    _safe_render(render_dossier_client, page)
 elif page == "Check-lists":
-    _safe_render(render_checklists)
+    _safe_render(render_checklists, page)
 elif page == "Autres revenus (aide)":
-    _safe_render(render_autres_revenus_aide)
+    _safe_render(render_autres_revenus_aide, page)
 elif page == "Exports":
-    _safe_render(render_exports)
+    _safe_render(render_exports, page)
+elif page == "Portefeuille":
+    _safe_render(render_portefeuille, page)
 elif page == "Aide":
-    _safe_render(render_aide)
-
+    _safe_render(render_aide, page)
@@ -0,0 +1,524 @@
+# -*- coding: utf-8 -*-
+# archive_dossiers.py — Archive binaire compacte des dossiers (instantanés + résultats)
+#
+# Usage :
+#   python archive_dossiers.py archiver archive_2026.arc            # tout le dépôt (COACH_DB)
+#   python archive_dossiers.py archiver cdd.arc --statut CDD
+#   python archive_dossiers.py lire archive_2026.arc --statut Intérim --limite 20
+#
+# En mémoire, un dossier archivé est un Dossier (__slots__) : statut = index
+# dans STATUTS_ARCHIVE (statut enregistré au dépôt, « Ménage » pour un dossier
+# à co-emprunteur), montants en centimes (entiers), dates en secondes, saisies
+# réduites aux valeurs différentes du défaut (le moteur relit DEFAUTS).
+#
+# Fichier (petit-boutiste, sections alignées sur 8 octets) :
+#   en-tête      magie, version du format, tailles et positions des sections ;
+#   champs       nom et type de chaque saisie (lecture par nom : une archive
+#                reste lisible quand DEFAUTS change) ;
+#   statuts      libellés des codes de statut de l'archive ;
+#   fiches       une fiche de taille fixe par dossier (fiche i = décalage
+#                fixe) : id, statut, drapeaux, dates, revenus, références ;
+#   index        par statut, numéros des fiches (uint32 croissants) ;
+#   tas          textes et saisies de taille variable, référencés par numéro
+#                (0 = absent) ; les textes répétés (version, messages) une fois.
+# ArchiveDossiers lit le fichier par mmap : ouvrir coûte l'en-tête, compter ou
+# filtrer un statut lit son index, seule une fiche demandée est décodée.
+
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+
+from menage import statut_enregistre
+from moteur_revenus import DEFAUTS, Resultat
+from referentiel import STATUT_MENAGE, STATUTS
+
+MAGIE = b"COACHARC"
+VERSION_FORMAT = 1
+STATUTS_ARCHIVE = STATUTS + [STATUT_MENAGE]  # codes de statut : un ménage est indexé sous « Ménage »
+
+# Types de saisie : montant (centimes), entier, booléen, liste de montants
+MONTANT, ENTIER, BOOLEEN, LISTE = "m", "e", "b", "l"
+
+
+def _type_champ(defaut: Any) -> str:
+    if isinstance(defaut, bool):
+        return BOOLEEN
+    if isinstance(defaut, int):
+        return ENTIER
+    if isinstance(defaut, list):
+        return LISTE
+    return MONTANT
+
+
+CHAMPS: List[Tuple[str, str]] = [(c, _type_champ(v)) for c, v in DEFAUTS.items() if c not in ("nom", "statut")]
+_TYPES = dict(CHAMPS)
+_RANGS = {c: i for i, (c, _) in enumerate(CHAMPS)}
+
+# magie, version, taille d'une fiche, nb champs, nb statuts, nb fiches, positions fiches / index / tas
+_ENTETE = struct.Struct("<8sHHIIQQQQ")
+# id, code statut, drapeaux, créé le, modifié le (s), revenu éligible, revenu total (centimes),
+# références au tas : nom, saisies, extra, version des règles, message, info, alerte, erreur
+_FICHE = struct.Struct("<qbBIIqq8I")
+_VALEUR = struct.Struct("<Bq")
+_LISTE = struct.Struct("<BB")
+_Q = struct.Struct("<Q")
+_QQ = struct.Struct("<QQ")
+
+A_RESULTAT, ELIGIBLE, NIVEAU_ERREUR = 1, 2, 4
+_EPOQUE = datetime(1970, 1, 1)
+
+Valeur = Union[int, Tuple[int, ...]]
+
+
+def centimes(montant: Any) -> int:
+    return round(float(montant) * 100)
+
+
+def entier(valeur: Any) -> int:
+    """Entier ou booléen de saisie ; ValueError pour une valeur non entière (12.5 n'est pas tronqué en 12)."""
+    if isinstance(valeur, float) and not valeur.is_integer():
+        raise ValueError(valeur)
+    return int(valeur)
+
+
+def _secondes(iso: Optional[str]) -> int:
+    return int((datetime.fromisoformat(iso) - _EPOQUE).total_seconds()) if iso else 0
+
+
+def _iso(secondes: int) -> str:
+    return (_EPOQUE + timedelta(seconds=secondes)).isoformat(timespec="seconds")
+
+
+def _aligner(n: int) -> int:
+    return -n % 8
+
+
+# -----------------------------
+# Dossier compact
+# -----------------------------
+class Dossier:
+    """Dossier archivé : saisies en entiers (centimes), statut en code, dernier résultat à plat."""
+
+    __slots__ = ("id", "statut", "nom", "valeurs", "extra", "revenu_eligible", "revenu_total", "eligible",
+                 "message", "info", "alerte", "niveau_alerte", "erreur", "version_regles", "cree_le", "maj_le")
+
+    def __init__(self, id: int, statut: int, nom: str, valeurs: Dict[str, Valeur], extra: Optional[str] = None,
+                 revenu_eligible: Optional[int] = None, revenu_total: Optional[int] = None, eligible: bool = False,
+                 message: Optional[str] = None, info: Optional[str] = None, alerte: Optional[str] = None,
+                 niveau_alerte: str = "warning", erreur: Optional[str] = None, version_regles: Optional[str] = None,
+                 cree_le: int = 0, maj_le: int = 0):
+        self.id = id
+        self.statut = statut            # index dans STATUTS_ARCHIVE, -1 si inconnu (libellé dans extra)
+        self.nom = nom
+        self.valeurs = valeurs          # champ -> centimes / entier / 0-1 / tuple de centimes
+        self.extra = extra              # JSON des saisies hors CHAMPS (co-emprunteur, texte libre…)
+        self.revenu_eligible = revenu_eligible  # centimes ; None = pas de résultat
+        self.revenu_total = revenu_total
+        self.eligible = eligible
+        self.message = message
+        self.info = info
+        self.alerte = alerte
+        self.niveau_alerte = niveau_alerte
+        self.erreur = erreur
+        self.version_regles = version_regles
+        self.cree_le = cree_le          # secondes depuis 1970 (heure locale, comme le dépôt)
+        self.maj_le = maj_le
+
+    def __repr__(self) -> str:
+        return f"Dossier(id={self.id}, statut={self.libelle_statut!r}, nom={self.nom!r})"
+
+    @classmethod
+    def depuis_saisies(cls, saisies: Mapping[str, Any], resultat: Optional[Resultat] = None, id: int = 0,
+                       version_regles: Optional[str] = None, cree_le: Optional[str] = None,
+                       maj_le: Optional[str] = None) -> "Dossier":
+        statut = str(statut_enregistre(saisies) or (resultat.statut if resultat else "") or "CDI")
+        valeurs: Dict[str, Valeur] = {}
+        extra: Dict[str, Any] = {}
+        for champ, v in saisies.items():
+            if champ in ("nom", "statut"):
+                continue
+            type_ = _TYPES.get(champ)
+            try:
+                if type_ is None:
+                    raise ValueError(champ)
+                if type_ == LISTE:
+                    code: Valeur = tuple(centimes(x) for x in v)
+                    if len(code) > 255:
+                        raise ValueError(champ)
+                elif type_ == MONTANT:
+                    code = centimes(v)
+                else:
+                    code = entier(v)
+            except (TypeError, ValueError, OverflowError):
+                # champ inconnu, saisie non numérique ou non entière (12.5 jours) : gardée telle quelle
+                extra[champ] = v
+                continue
+            if code != _CODES_DEFAUT[champ]:
+                valeurs[champ] = code
+        code_statut = STATUTS_ARCHIVE.index(statut) if statut in STATUTS_ARCHIVE else -1
+        if code_statut < 0:
+            extra["statut"] = statut
+        elif statut == STATUT_MENAGE:
+            extra["statut"] = saisies.get("statut") or DEFAUTS["statut"]  # emprunteur 1, rendu par saisies()
+        d = cls(id, code_statut, str(saisies.get("nom") or ""), valeurs,
+                json.dumps(extra, ensure_ascii=False, separators=(",", ":"), default=str) if extra else None,
+                version_regles=version_regles, cree_le=_secondes(cree_le), maj_le=_secondes(maj_le))
+        if resultat is not None:
+            d.revenu_eligible = centimes(resultat.revenu_eligible)
+            d.revenu_total = centimes(resultat.revenu_total)
+            d.eligible = resultat.eligible
+            d.message, d.info, d.alerte, d.erreur = resultat.message, resultat.info, resultat.alerte, resultat.erreur
+            d.niveau_alerte = resultat.niveau_alerte
+        return d
+
+    @classmethod
+    def depuis_stocke(cls, stocke: Any) -> "Dossier":
+        """Depuis un depot_dossiers.DossierStocke."""
+        return cls.depuis_saisies(stocke.saisies, stocke.resultat, stocke.id, stocke.version_regles,
+                                  stocke.cree_le, stocke.maj_le)
+
+    @property
+    def libelle_statut(self) -> str:
+        if self.statut >= 0:
+            return STATUTS_ARCHIVE[self.statut]
+        return json.loads(self.extra or "{}").get("statut", "")
+
+    def saisies(self) -> Dict[str, Any]:
+        """Saisies au format de la page (montants en euros) ; les valeurs par défaut sont omises."""
+        s: Dict[str, Any] = {"nom": self.nom, "statut": self.libelle_statut}
+        for champ, code in self.valeurs.items():
+            type_ = _TYPES.get(champ, MONTANT)
+            if type_ == LISTE:
+                s[champ] = [c / 100 for c in code]  # type: ignore[union-attr]
+            elif type_ == MONTANT:
+                s[champ] = code / 100  # type: ignore[operator]
+            elif type_ == BOOLEEN:
+                s[champ] = bool(code)
+            else:
+                s[champ] = code
+        if self.extra:
+            s.update(json.loads(self.extra))  # "statut" : libellé hors STATUTS_ARCHIVE ou emprunteur 1 d'un ménage
+        return s
+
+    def resultat(self) -> Optional[Resultat]:
+        if self.revenu_total is None:
+            return None
+        return Resultat(
+            statut=self.libelle_statut, revenu_eligible=self.revenu_eligible / 100,
+            revenu_total=self.revenu_total / 100, message=self.message or "", info=self.info or "",
+            eligible=self.eligible, alerte=self.alerte, niveau_alerte=self.niveau_alerte, erreur=self.erreur,
+        )
+
+
+def _code_defaut(champ: str, type_: str) -> Valeur:
+    defaut = DEFAUTS[champ]
+    if type_ == LISTE:
+        return tuple(centimes(x) for x in defaut)
+    return centimes(defaut) if type_ == MONTANT else int(defaut)
+
+
+_CODES_DEFAUT = {c: _code_defaut(c, t) for c, t in CHAMPS}
+
+
+# -----------------------------
+# Écriture (en flux : fiches écrites au fil de l'eau, tas dans un fichier temporaire)
+# -----------------------------
+def _preambule() -> bytes:
+    parties = []
+    for champ, type_ in CHAMPS:
+        nom = champ.encode("utf-8")
+        parties.append(type_.encode("ascii") + bytes([len(nom)]) + nom)
+    for statut in STATUTS_ARCHIVE:
+        nom = statut.encode("utf-8")
+        parties.append(bytes([len(nom)]) + nom)
+    brut = b"".join(parties)
+    return brut + b"\0" * _aligner(_ENTETE.size + len(brut))
+
+
+class EcrivainArchive:
+    """Écrit une archive ; le fichier n'apparaît (remplacement atomique) qu'à fermer()."""
+
+    def __init__(self, chemin: str):
+        self.chemin = chemin
+        self._temp = f"{chemin}.tmp"
+        self._f = open(self._temp, "wb")
+        self._f.write(b"\0" * _ENTETE.size + _preambule())
+        self._debut_fiches = self._f.tell()
+        self._tas = tempfile.TemporaryFile()
+        self._fins = array("Q")  # fin de chaque élément du tas (élément k = numéro k + 1)
+        self._partages: Dict[bytes, int] = {}
+        self._index = [array("I") for _ in STATUTS_ARCHIVE]
+        self._nombre = 0
+
+    def __enter__(self) -> "EcrivainArchive":
+        return self
+
+    def __len__(self) -> int:
+        return self._nombre
+
+    def __exit__(self, type_, *_) -> None:
+        if type_ is None:
+            self.fermer()
+        else:
+            self._f.close()
+            self._tas.close()
+            os.remove(self._temp)
+
+    def _ref(self, texte: Optional[Union[str, bytes]], partage: bool = False) -> int:
+        if texte is None:
+            return 0
+        octets = texte.encode("utf-8") if isinstance(texte, str) else texte
+        if partage and octets in self._partages:
+            return self._partages[octets]
+        self._tas.write(octets)
+        self._fins.append((self._fins[-1] if self._fins else 0) + len(octets))
+        ref = len(self._fins)
+        if partage:
+            self._partages[octets] = ref
+        return ref
+
+    def _valeurs(self, valeurs: Mapping[str, Valeur]) -> bytes:
+        parties = []
+        for champ, code in valeurs.items():
+            if isinstance(code, tuple):
+                parties.append(_LISTE.pack(_RANGS[champ], len(code)) + struct.pack(f"<{len(code)}q", *code))
+            else:
+                parties.append(_VALEUR.pack(_RANGS[champ], code))
+        return b"".join(parties)
+
+    def ajouter(self, d: Dossier) -> None:
+        if self._nombre >= 2 ** 32 - 1:
+            raise ValueError("Archive pleine (2^32 - 1 fiches).")
+        drapeaux = ((A_RESULTAT if d.revenu_total is not None else 0) | (ELIGIBLE if d.eligible else 0)
+                    | (NIVEAU_ERREUR if d.niveau_alerte == "error" else 0))
+        self._f.write(_FICHE.pack(
+            d.id, d.statut, drapeaux, d.cree_le, d.maj_le, d.revenu_eligible or 0, d.revenu_total or 0,
+            self._ref(d.nom), self._ref(self._valeurs(d.valeurs)) if d.valeurs else 0, self._ref(d.extra),
+            self._ref(d.version_regles, True), self._ref(d.message, True), self._ref(d.info, True),
+            self._ref(d.alerte, True), self._ref(d.erreur, True),
+        ))
+        if d.statut >= 0:
+            self._index[d.statut].append(self._nombre)
+        self._nombre += 1
+
+    def fermer(self) -> None:
+        f = self._f
+        f.write(b"\0" * _aligner(f.tell()))
+        debut_index = f.tell()
+        position = debut_index + _QQ.size * len(self._index)
+        for ids in self._index:
+            f.write(_QQ.pack(position, len(ids)))
+            position += ids.itemsize * len(ids) + _aligner(ids.itemsize * len(ids))
+        for ids in self._index:
+            brut = ids.tobytes()
+            f.write(brut + b"\0" * _aligner(len(brut)))
+        debut_tas = f.tell()
+        f.write(_Q.pack(len(self._fins)))
+        f.write(self._fins.tobytes())
+        self._tas.seek(0)
+        while True:
+            bloc = self._tas.read(1 << 20)
+            if not bloc:
+                break
+            f.write(bloc)
+        self._tas.close()
+        f.seek(0)
+        f.write(_ENTETE.pack(MAGIE, VERSION_FORMAT, _FICHE.size, len(CHAMPS), len(STATUTS_ARCHIVE), self._nombre,
+                             self._debut_fiches, debut_index, debut_tas))
+        f.flush()
+        os.fsync(f.fileno())
+        f.close()
+        os.replace(self._temp, self.chemin)
+
+
+def ecrire_archive(chemin: str, dossiers: Iterable[Dossier]) -> int:
+    """Écrit `dossiers` dans `chemin` ; renvoie le nombre de fiches."""
+    with EcrivainArchive(chemin) as ecrivain:
+        for d in dossiers:
+            ecrivain.ajouter(d)
+    return len(ecrivain)
+
+
+# -----------------------------
+# Lecture (mmap)
+# -----------------------------
+class ArchiveDossiers:
+    """Archive ouverte en lecture seule ; les fiches ne sont décodées qu'à la demande.
+
+    Les vues rendues par indices() et tableau() pointent dans le fichier : à
+    relâcher avant fermer().
+    """
+
+    def __init__(self, chemin: str):
+        self.chemin = chemin
+        with open(chemin, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._lire_entete()
+        except Exception:
+            self._mm.close()
+            raise
+
+    def _lire_entete(self) -> None:
+        mm = self._mm
+        if len(mm) < _ENTETE.size:
+            raise ValueError(f"{self.chemin} : archive tronquée.")
+        (magie, version, taille_fiche, nb_champs, nb_statuts, self._nombre, self._fiches, debut_index,
+         debut_tas) = _ENTETE.unpack_from(mm, 0)
+        if magie != MAGIE:
+            raise ValueError(f"{self.chemin} : ce n'est pas une archive de dossiers.")
+        if version > VERSION_FORMAT or taille_fiche != _FICHE.size:
+            raise ValueError(f"{self.chemin} : format v{version} non pris en charge (v{VERSION_FORMAT} au plus).")
+        pos = _ENTETE.size
+        self.champs: List[Tuple[str, str]] = []
+        for _ in range(nb_champs):
+            type_, n = chr(mm[pos]), mm[pos + 1]
+            self.champs.append((mm[pos + 2:pos + 2 + n].decode("utf-8"), type_))
+            pos += 2 + n
+        self.statuts: List[str] = []
+        for _ in range(nb_statuts):
+            n = mm[pos]
+            self.statuts.append(mm[pos + 1:pos + 1 + n].decode("utf-8"))
+            pos += 1 + n
+        # code de l'archive -> code courant (STATUTS a pu changer depuis l'écriture)
+        self._codes = [STATUTS_ARCHIVE.index(s) if s in STATUTS_ARCHIVE else -1 for s in self.statuts]
+        self._index = {s: _QQ.unpack_from(mm, debut_index + i * _QQ.size) for i, s in enumerate(self.statuts)}
+        nb_tas = _Q.unpack_from(mm, debut_tas)[0]
+        self._vue = memoryview(mm)
+        self._fins = self._vue[debut_tas + 8:debut_tas + 8 + 8 * nb_tas].cast("Q")
+        self._tas = debut_tas + 8 + 8 * nb_tas
+
+    def __enter__(self) -> "ArchiveDossiers":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.fermer()
+
+    def __len__(self) -> int:
+        return self._nombre
+
+    def __iter__(self) -> Iterator[Dossier]:
+        for i in range(self._nombre):
+            yield self.fiche(i)
+
+    def fermer(self) -> None:
+        self._fins.release()
+        self._vue.release()
+        self._mm.close()
+
+    def _texte(self, ref: int) -> Optional[str]:
+        brut = self._brut(ref)
+        return None if brut is None else str(brut, "utf-8")
+
+    def _brut(self, ref: int) -> Optional[memoryview]:
+        if ref == 0:
+            return None
+        debut = self._fins[ref - 2] if ref > 1 else 0
+        return self._vue[self._tas + debut:self._tas + self._fins[ref - 1]]
+
+    def _valeurs(self, ref: int) -> Dict[str, Valeur]:
+        brut = self._brut(ref)
+        valeurs: Dict[str, Valeur] = {}
+        pos = 0
+        while brut is not None and pos < len(brut):
+            champ, type_ = self.champs[brut[pos]]
+            if type_ == LISTE:
+                n = brut[pos + 1]
+                valeurs[champ] = struct.unpack_from(f"<{n}q", brut, pos + 2)
+                pos += 2 + 8 * n
+            else:
+                valeurs[champ] = _VALEUR.unpack_from(brut, pos)[1]
+                pos += _VALEUR.size
+        return valeurs
+
+    def fiche(self, i: int) -> Dossier:
+        if not 0 <= i < self._nombre:
+            raise IndexError(i)
+        (id_, code, drapeaux, cree_le, maj_le, elig, total, nom, valeurs, extra, version, message, info, alerte,
+         erreur) = _FICHE.unpack_from(self._mm, self._fiches + i * _FICHE.size)
+        statut = self._codes[code] if code >= 0 else -1
+        texte_extra = self._texte(extra)
+        if statut < 0 <= code:  # statut retiré de STATUTS depuis l'archivage : libellé gardé dans extra
+            texte_extra = json.dumps({**json.loads(texte_extra or "{}"), "statut": self.statuts[code]},
+                                     ensure_ascii=False, separators=(",", ":"))
+        a_resultat = bool(drapeaux & A_RESULTAT)
+        return Dossier(
+            id_, statut, self._texte(nom) or "", self._valeurs(valeurs), texte_extra,
+            elig if a_resultat else None, total if a_resultat else None, bool(drapeaux & ELIGIBLE),
+            self._texte(message), self._texte(info), self._texte(alerte),
+            "error" if drapeaux & NIVEAU_ERREUR else "warning", self._texte(erreur), self._texte(version),
+            cree_le, maj_le,
+        )
+
+    def indices(self, statut: str) -> memoryview:
+        """Numéros (croissants) des fiches d'un statut, lus dans le fichier sans copie."""
+        position, nombre = self._index.get(statut, (0, 0))
+        return self._vue[position:position + 4 * nombre].cast("I")
+
+    def compter(self, statut: Optional[str] = None) -> int:
+        return self._nombre if statut is None else self._index.get(statut, (0, 0))[1]
+
+    def filtrer(self, statut: str) -> Iterator[Dossier]:
+        ids = self.indices(statut)
+        try:
+            for i in ids:
+                yield self.fiche(i)
+        finally:
+            ids.release()
+
+    def tableau(self) -> Any:
+        """Fiches en tableau NumPy structuré (sans copie) : calculs en colonnes sur toute l'archive."""
+        import numpy as np
+        type_fiche = np.dtype([
+            ("id", "<i8"), ("statut", "i1"), ("drapeaux", "u1"), ("cree_le", "<u4"), ("maj_le", "<u4"),
+            ("revenu_eligible", "<i8"), ("revenu_total", "<i8"), ("refs", "<u4", (8,)),
+        ])
+        return np.frombuffer(self._mm, dtype=type_fiche, count=self._nombre, offset=self._fiches)
+
+
+# -----------------------------
+# CLI
+# -----------------------------
+def archiver(chemin: str, statut: Optional[str] = None) -> int:
+    from depot_dossiers import depot
+    return ecrire_archive(chemin, (Dossier.depuis_stocke(s) for s in depot().dossiers(statut)))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Archive binaire des dossiers du dépôt.")
+    sous = p.add_subparsers(dest="commande", required=True)
+    a = sous.add_parser("archiver", help="Écrire le dépôt (COACH_DB) dans une archive")
+    a.add_argument("archive")
+    a.add_argument("--statut", help="Seulement ce statut")
+    lire = sous.add_parser("lire", help="Compter et lister les dossiers d'une archive")
+    lire.add_argument("archive")
+    lire.add_argument("--statut", help="Filtrer sur ce statut")
+    lire.add_argument("--limite", type=int, default=10, help="Dossiers affichés (défaut : 10)")
+    args = p.parse_args(argv)
+
+    if args.commande == "archiver":
+        n = archiver(args.archive, args.statut)
+        print(f"{n} dossier(s) archivé(s) dans {args.archive} ({os.path.getsize(args.archive)} octets).",
+              file=sys.stderr)
+        return 0
+    with ArchiveDossiers(args.archive) as archive:
+        print(f"{archive.compter(args.statut)} dossier(s)" + (f" {args.statut}" if args.statut else ""))
+        dossiers = archive.filtrer(args.statut) if args.statut else iter(archive)
+        for _, d in zip(range(args.limite), dossiers):
+            total = "-" if d.revenu_total is None else f"{d.revenu_total / 100:.2f} €"
+            print(f"{d.id}\t{d.libelle_statut}\t{d.nom}\t{total}\t{_iso(d.maj_le)}")
+        dossiers.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+# bench_archive.py — Archive binaire (archive_dossiers) vs JSON Lines
+#
+# Usage :
+#   python benchmarks/bench_archive.py                     # 1 000 000 dossiers
+#   python benchmarks/bench_archive.py --nombre 3000000 --repertoire /data/tmp
+#
+# Mêmes dossiers écrits des deux façons (saisies + dernier résultat, comme le
+# dépôt) : un dossier type par statut (bench_suite.DOSSIERS_TYPE), montants
+# et noms variés. Mesures : taille, écriture, puis pour relire
+#   - compter un statut ;
+#   - charger les dossiers d'un statut (objets complets) ;
+#   - sommer le revenu total d'un statut.
+# JSON Lines doit tout relire et tout décoder ; l'archive lit son index
+# (mmap) et ne décode que les fiches demandées, ou les lit en colonnes (NumPy).
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, Iterator, Tuple
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from archive_dossiers import ArchiveDossiers, Dossier, ecrire_archive  # noqa: E402
+from bench_suite import DOSSIERS_TYPE  # noqa: E402
+from moteur_revenus import evaluer_dossier  # noqa: E402
+from referentiel import STATUTS  # noqa: E402
+
+STATUT_FILTRE = "Intérim"
+
+
+def _dossiers(nombre: int) -> Iterator[Tuple[Dict[str, Any], Any]]:
+    resultats = {s: evaluer_dossier({"statut": s, **DOSSIERS_TYPE[s]}) for s in STATUTS}
+    for i in range(nombre):
+        statut = STATUTS[i % len(STATUTS)]
+        saisies = {"nom": f"Client {i:07d}", "statut": statut,
+                   **{k: (v + i % 97 * 10 if isinstance(v, float) else v) for k, v in DOSSIERS_TYPE[statut].items()}}
+        yield saisies, resultats[statut]
+
+
+def _chrono(fonction: Callable[[], Any]) -> Tuple[float, Any]:
+    t0 = time.perf_counter()
+    valeur = fonction()
+    return time.perf_counter() - t0, valeur
+
+
+def _ecrire_jsonl(chemin: str, nombre: int) -> None:
+    with open(chemin, "w", encoding="utf-8") as f:
+        for saisies, res in _dossiers(nombre):
+            f.write(json.dumps({"saisies": saisies, "revenu_total": res.revenu_total,
+                                "revenu_eligible": res.revenu_eligible, "eligible": res.eligible,
+                                "message": res.message, "version_regles": "bench"},
+                               ensure_ascii=False, separators=(",", ":")) + "\n")
+
+
+def _lire_jsonl(chemin: str, statut: str):
+    with open(chemin, encoding="utf-8") as f:
+        for ligne in f:
+            d = json.loads(ligne)
+            if d["saisies"]["statut"] == statut:
+                yield d
+
+
+def mesurer(nombre: int, repertoire: str) -> None:
+    jsonl = os.path.join(repertoire, "bench_archive.jsonl")
+    arc = os.path.join(repertoire, "bench_archive.arc")
+    try:
+        t_json, _ = _chrono(lambda: _ecrire_jsonl(jsonl, nombre))
+        t_arc, _ = _chrono(lambda: ecrire_archive(
+            arc, (Dossier.depuis_saisies(s, r, i + 1, "bench") for i, (s, r) in enumerate(_dossiers(nombre)))))
+        print(f"{nombre} dossiers")
+        print(f"{'':<34}{'JSON Lines':>14}{'archive':>14}")
+        print(f"{'taille (Mo)':<34}{os.path.getsize(jsonl) / 1e6:>14.1f}{os.path.getsize(arc) / 1e6:>14.1f}")
+        print(f"{'écriture (s)':<34}{t_json:>14.2f}{t_arc:>14.2f}")
+
+        t_ouvrir, archive = _chrono(lambda: ArchiveDossiers(arc))
+        print(f"{'ouverture (ms)':<34}{'-':>14}{t_ouvrir * 1e3:>14.3f}")
+        tj, nj = _chrono(lambda: sum(1 for _ in _lire_jsonl(jsonl, STATUT_FILTRE)))
+        ta, na = _chrono(lambda: archive.compter(STATUT_FILTRE))
+        assert nj == na
+        print(f"{'compter ' + STATUT_FILTRE + ' (ms)':<34}{tj * 1e3:>14.1f}{ta * 1e3:>14.3f}")
+        tj, _ = _chrono(lambda: [Dossier.depuis_saisies(d["saisies"]) for d in _lire_jsonl(jsonl, STATUT_FILTRE)])
+        ta, _ = _chrono(lambda: list(archive.filtrer(STATUT_FILTRE)))
+        print(f"{'charger ' + STATUT_FILTRE + ' (ms)':<34}{tj * 1e3:>14.1f}{ta * 1e3:>14.1f}")
+        tj, sj = _chrono(lambda: sum(d["revenu_total"] for d in _lire_jsonl(jsonl, STATUT_FILTRE)))
+
+        def somme_colonnes() -> float:
+            t = archive.tableau()
+            ids = archive.indices(STATUT_FILTRE)
+            try:
+                return int(t["revenu_total"][ids].sum()) / 100
+            finally:
+                ids.release()
+                del t
+
+        ta, sa = _chrono(somme_colonnes)
+        assert abs(sj - sa) < 0.01 * nj, (sj, sa)
+        print(f"{'somme revenu total (ms)':<34}{tj * 1e3:>14.1f}{ta * 1e3:>14.1f}")
+        archive.fermer()
+    finally:
+        for chemin in (jsonl, arc):
+            if os.path.exists(chemin):
+                os.remove(chemin)
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Archive binaire vs JSON Lines.")
+    p.add_argument("--nombre", type=int, default=1_000_000)
+    p.add_argument("--repertoire", default=os.path.join(RACINE, "benchmarks"))
+    args = p.parse_args()
+    mesurer(args.nombre, args.repertoire)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+# bench_demarrage.py — Budget de démarrage : temps d'import par module et
+# temps jusqu'au premier rendu de chaque page du routeur.
+#
+# Usage :
+#   python benchmarks/bench_demarrage.py
+#   python benchmarks/bench_demarrage.py --repetitions 7 --json demarrage.json
+#
+# Chaque mesure tourne dans un interpréteur neuf (aucun module en cache), et
+# on retient la médiane des répétitions pour que les chiffres soient comparables
+# d'une machine / d'une version à l'autre.
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from referentiel import PAGES  # noqa: E402
+
+APP = os.path.join(RACINE, "app.py")
+
+MODULES = [
+    "streamlit", "numpy", "fpdf", "matplotlib",
+    "referentiel", "moteur_revenus", "moteur_lot", "exports_pdf",
+]
+# modules lourds dont on vérifie qu'ils ne sont chargés que par la page qui en a besoin
+LOURDS = ["numpy", "fpdf", "matplotlib"]
+
+_PREMIER_RENDU = """
+import json, sys, time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+t1 = time.perf_counter()
+at = AppTest.from_file({app!r}, default_timeout=120)
+at.session_state["navigation"] = {page!r}
+at.run()
+t2 = time.perf_counter()
+at.run()
+t3 = time.perf_counter()
+print(json.dumps({{
+    "import_streamlit_s": t1 - t0,
+    "premier_rendu_s": t2 - t1,
+    "rerun_s": t3 - t2,
+    "exception": bool(at.exception),
+    "modules": {{m: m in sys.modules for m in {lourds!r}}},
+}}))
+"""
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = RACINE + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def temps_import(module: str) -> float:
+    """Temps d'import cumulé (s) d'un module dans un interpréteur neuf (-X importtime)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=RACINE, env=_env(), capture_output=True, text=True, check=True,
+    )
+    for ligne in proc.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        parts = ligne.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1]) / 1e6
+    raise RuntimeError(f"import de {module} non trouvé dans la sortie -X importtime")
+
+
+def premier_rendu(page: str) -> Dict[str, Any]:
+    code = _PREMIER_RENDU.format(app=APP, page=page, lourds=LOURDS)
+    proc = subprocess.run([sys.executable, "-c", code], cwd=RACINE, env=_env(),
+                          capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def mesurer(repetitions: int = 5) -> Dict[str, Any]:
+    imports = {}
+    for m in MODULES:
+        try:
+            imports[m] = statistics.median(temps_import(m) for _ in range(repetitions))
+        except (subprocess.CalledProcessError, RuntimeError):
+            imports[m] = None  # module absent de l'environnement
+
+    pages = {}
+    for page in PAGES:
+        essais = [premier_rendu(page) for _ in range(repetitions)]
+        pages[page] = {
+            "premier_rendu_s": statistics.median(e["premier_rendu_s"] for e in essais),
+            "rerun_s": statistics.median(e["rerun_s"] for e in essais),
+            "import_streamlit_s": statistics.median(e["import_streamlit_s"] for e in essais),
+            "exception": any(e["exception"] for e in essais),
+            "modules_lourds_charges": sorted(m for m, charge in essais[-1]["modules"].items() if charge),
+        }
+    return {"python": sys.version.split()[0], "repetitions": repetitions, "imports_s": imports, "pages": pages}
+
+
+def afficher(resultats: Dict[str, Any]) -> None:
+    print(f"Python {resultats['python']} — médiane sur {resultats['repetitions']} interpréteurs neufs\n")
+    print(f"{'Module':<16}{'import (ms)':>12}")
+    for m, t in resultats["imports_s"].items():
+        print(f"{m:<16}{'absent' if t is None else f'{t * 1000:.1f}':>12}")
+    print()
+    print(f"{'Page':<24}{'1er rendu (ms)':>16}{'rerun (ms)':>12}  modules lourds chargés")
+    for page, r in resultats["pages"].items():
+        lourds = ", ".join(r["modules_lourds_charges"]) or "-"
+        erreur = "  [EXCEPTION]" if r["exception"] else ""
+        print(f"{page:<24}{r['premier_rendu_s'] * 1000:>16.1f}{r['rerun_s'] * 1000:>12.1f}  {lourds}{erreur}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Mesure du démarrage à froid de l'app (imports, premier rendu par page).")
+    p.add_argument("--repetitions", type=int, default=5)
+    p.add_argument("--json", help="Écrire aussi les résultats dans ce fichier")
+    args = p.parse_args(argv)
+
+    resultats = mesurer(args.repetitions)
+    afficher(resultats)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultats, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+# bench_depot.py — Dépôt SQLite des dossiers : ouverture et listes à N dossiers.
+#
+# Usage :
+#   python benchmarks/bench_depot.py                     # 100 000 dossiers, base temporaire
+#   python benchmarks/bench_depot.py --nombre 20000 --base /tmp/dossiers.sqlite3
+#
+# Remplit une base avec des dossiers types de tous statuts (résultat calculé),
+# puis mesure : ouverture d'un dossier au hasard, liste des derniers modifiés,
+# recherche par début de nom, liste par statut, enregistrement d'une modification ;
+# puis la recherche de la barre latérale (index_dossiers, en mémoire) : construction
+# de l'index et requêtes (début de mot, accents, faute de frappe, filtres).
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, List, Optional
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_suite import DOSSIERS_TYPE  # noqa: E402
+from depot_dossiers import DepotDossiers  # noqa: E402
+from index_dossiers import IndexDossiers  # noqa: E402
+from moteur_revenus import evaluer_dossier  # noqa: E402
+
+NOMS = ["Martin", "Bernard", "Dubois", "Thomas", "Robert", "Richard", "Petit", "Durand", "Leroy", "Moreau",
+        "Simon", "Laurent", "Lefèvre", "Michel", "Garcia", "Élie", "Öztürk", "N'Diaye"]
+
+
+def _ms(fonction: Callable[[], object], n: int) -> List[float]:
+    durees = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fonction()
+        durees.append((time.perf_counter() - t0) * 1000.0)
+    return durees
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Temps d'accès au dépôt SQLite des dossiers.")
+    p.add_argument("--nombre", type=int, default=100_000)
+    p.add_argument("--base", help="Fichier SQLite (défaut : fichier temporaire supprimé à la fin)")
+    p.add_argument("--mesures", type=int, default=2000)
+    args = p.parse_args(argv)
+
+    rnd = random.Random(7)
+    tmp = None
+    if not args.base:
+        tmp = tempfile.TemporaryDirectory()
+        args.base = os.path.join(tmp.name, "dossiers.sqlite3")
+    depot = DepotDossiers(args.base)
+
+    deja = depot.compter()
+    if deja < args.nombre:
+        statuts = list(DOSSIERS_TYPE)
+        t0 = time.perf_counter()
+        nouveaux = []
+        for i in range(deja, args.nombre):
+            s = rnd.choice(statuts)
+            d = {"nom": f"{rnd.choice(NOMS)} {rnd.choice(NOMS)} {i}", "statut": s, **DOSSIERS_TYPE[s]}
+            nouveaux.append((d, evaluer_dossier(d)))
+        depot.enregistrer_lot(nouveaux)
+        print(f"Remplissage : {args.nombre - deja} dossiers en {time.perf_counter() - t0:.1f} s")
+
+    total = depot.compter()
+    ids = [rnd.randint(1, total) for _ in range(args.mesures)]
+    it = iter(ids)
+    cas = {
+        "ouvrir un dossier": lambda: depot.charger(next(it)),
+        "20 derniers modifiés": lambda: depot.lister(limite=20),
+        "recherche 'dur' (préfixe)": lambda: depot.lister("dur", limite=20),
+        "liste statut CDD": lambda: depot.lister(statut="CDD", limite=20),
+    }
+    print(f"\n{total} dossiers — {args.mesures} mesures par cas")
+    print(f"{'Cas':<30}{'p50 (ms)':>10}{'p99 (ms)':>10}")
+    for nom, f in cas.items():
+        d = sorted(_ms(f, args.mesures))
+        print(f"{nom:<30}{statistics.median(d):>10.3f}{d[int(0.99 * len(d))]:>10.3f}")
+
+    stocke = depot.charger(ids[0])
+    d = sorted(_ms(lambda: depot.enregistrer(stocke.saisies, stocke.resultat, stocke.id), min(args.mesures, 500)))
+    print(f"{'enregistrer (UPDATE)':<30}{statistics.median(d):>10.3f}{d[int(0.99 * len(d))]:>10.3f}")
+
+    t0 = time.perf_counter()
+    index = IndexDossiers(depot.apercus())
+    print(f"\nIndex en mémoire : construit en {time.perf_counter() - t0:.2f} s ({len(index)} dossiers)")
+    recherches = {
+        "'d' (1 lettre)": ("d", {}),
+        "'dur'": ("dur", {}),
+        "'elie' (Élie)": ("elie", {}),
+        "'interim' (statut Intérim)": ("interim", {}),
+        "'moraeu' (faute)": ("moraeu", {}),
+        "'dubois mar'": ("dubois mar", {}),
+        "'mar' + statut CDI": ("mar", {"statut": "CDI"}),
+    }
+    for nom, (texte, filtres) in recherches.items():
+        d = sorted(_ms(lambda: index.chercher(texte, limite=10, **filtres), args.mesures))
+        print(f"{nom:<30}{statistics.median(d):>10.3f}{d[int(0.99 * len(d))]:>10.3f}")
+
+    depot.fermer()
+    if tmp is not None:
+        tmp.cleanup()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# bench_export_tableur.py — Tableur du portefeuille : écriture en flux vs classeur en mémoire
+#
+# Usage :
+#   python benchmarks/bench_export_tableur.py                      # 50 000 puis 500 000 dossiers
+#   python benchmarks/bench_export_tableur.py --nombres 100000 1000000 --formats xlsx
+#
+# Portefeuille synthétique produit à la demande (bench_suite.DOSSIERS_TYPE,
+# montants et antériorités variés, 1 dossier sur 50 invalide), puis pour
+# chaque taille et chaque format, dans un processus neuf (pic de mémoire
+# propre à la mesure) :
+#   - flux    : export_tableur.exporter, paquet par paquet dans le fichier ;
+#   - mémoire : toutes les lignes scorées d'abord, classeur écrit dans un
+#               BytesIO puis sur disque (ce que ferait un export "tout en un").
+# Le pic du flux doit rester le même quelle que soit la taille du portefeuille.
+
+from __future__ import annotations
+
+import argparse
+import io
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, Iterator, Tuple
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from bench_suite import DOSSIERS_TYPE  # noqa: E402
+from referentiel import STATUTS  # noqa: E402
+
+
+def portefeuille(nombre: int) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    alea = random.Random(1)
+    for i in range(nombre):
+        statut = STATUTS[i % len(STATUTS)]
+        d = {k: v * alea.uniform(0.5, 1.8) if isinstance(v, float) else v for k, v in DOSSIERS_TYPE[statut].items()}
+        d["nom"] = f"Client {i:07d}"
+        d["statut"] = statut
+        d["mois_activite"] = alea.randint(6, 40)
+        d["saisons"] = alea.randint(1, 4)
+        d["annees_activite"] = alea.randint(1, 5)
+        if i % 50 == 49:
+            d["salaire_fixe"] = "n/c"
+        yield i + 1, d
+
+
+def mesure(fmt: str, nombre: int, approche: str, chemin: str) -> None:
+    """Une mesure, dans ce processus : affiche secondes, pic de mémoire (Mo) et taille du fichier (Mo)."""
+    from export_tableur import ecrire_csv, ecrire_xlsx, exporter, lignes_scorees
+
+    t0 = time.perf_counter()
+    if approche == "flux":
+        with open(chemin, "wb") as f:
+            n = exporter(portefeuille(nombre), f, fmt)
+    else:
+        lignes = [ligne for paquet in lignes_scorees(portefeuille(nombre)) for ligne in paquet]
+        tampon = io.BytesIO()
+        n = (ecrire_xlsx if fmt == "xlsx" else ecrire_csv)([lignes], tampon)
+        with open(chemin, "wb") as f:
+            f.write(tampon.getvalue())
+    ecoule = time.perf_counter() - t0
+    assert n == nombre, (n, nombre)
+    pic = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Ko sous Linux
+    print(f"{ecoule:.3f} {pic:.0f} {os.path.getsize(chemin) / 1e6:.1f}")
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Tableur du portefeuille : écriture en flux vs classeur en mémoire.")
+    p.add_argument("--nombres", type=int, nargs="+", default=[50_000, 500_000])
+    p.add_argument("--formats", nargs="+", choices=["xlsx", "csv"], default=["xlsx", "csv"])
+    p.add_argument("--mesure", nargs=3, metavar=("FORMAT", "NOMBRE", "APPROCHE"), help=argparse.SUPPRESS)
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory() as rep:
+        if args.mesure:
+            fmt, nombre, approche = args.mesure
+            mesure(fmt, int(nombre), approche, os.path.join(rep, f"portefeuille.{fmt}"))
+            return
+        print(f"{'format':<8}{'dossiers':>10}  {'approche':<9}{'secondes':>9}{'lignes/s':>10}{'pic Mo':>8}{'fichier Mo':>11}")
+        for fmt in args.formats:
+            for nombre in args.nombres:
+                for approche in ("flux", "mémoire"):
+                    sortie = subprocess.run([sys.executable, __file__, "--mesure", fmt, str(nombre), approche],
+                                            check=True, capture_output=True, text=True).stdout.split()
+                    secondes, pic, taille = float(sortie[0]), sortie[1], sortie[2]
+                    print(f"{fmt:<8}{nombre:>10}  {approche:<9}{secondes:9.2f}{nombre / secondes:10.0f}{pic:>8}{taille:>11}")
+
+
+if __name__ == "__main__":
+    main()
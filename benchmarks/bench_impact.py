@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+# bench_impact.py — Rejeu "what-if" d'un changement de règles sur le dépôt
+#
+# Usage :
+#   python benchmarks/bench_impact.py                    # 200 000 dossiers
+#   python benchmarks/bench_impact.py --nombre 1000000 --workers 8
+#
+# Dépôt SQLite temporaire (portefeuille de bench_rapport, CDI d'ancienneté
+# variée pour que le coefficient s'applique), puis pour CDI.coef_non_cadre
+# 0.78 -> 0.75 :
+#   - naïf   : tous les dossiers relus, evaluer_dossier avec les deux tables ;
+#   - ciblé  : impact_regles.rejouer, statut CDI seul, un processus ;
+#   - ciblé ∥ : idem sur --workers processus.
+# Les trois doivent trouver les mêmes dossiers modifiés.
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from bench_rapport import portefeuille  # noqa: E402
+from depot_dossiers import DepotDossiers  # noqa: E402
+from impact_regles import changer, rejouer  # noqa: E402
+from moteur_revenus import evaluer_dossier  # noqa: E402
+from regles import compiler_table, table_courante  # noqa: E402
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Rejeu what-if : naïf vs statuts touchés, séquentiel vs parallèle.")
+    p.add_argument("--nombre", type=int, default=200_000)
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = p.parse_args()
+
+    alea = random.Random(2)
+    dossiers = portefeuille(args.nombre)
+    for i, d in enumerate(dossiers):
+        d["nom"] = f"Client {i:07d}"
+        if d["statut"] == "CDI":
+            d.update(cdi_anciennete_mois=alea.randint(2, 60), cdi_periode_essai_terminee=True,
+                     cdi_salaire_brut_annuel_contrat=alea.uniform(22_000, 60_000))
+
+    avant = table_courante()
+    apres = compiler_table(changer(avant.brut, ["CDI.coef_non_cadre=0.75"]))
+    with tempfile.TemporaryDirectory() as rep:
+        chemin = os.path.join(rep, "bench_impact.sqlite3")
+        depot = DepotDossiers(chemin, 1)
+        depot.enregistrer_lot(((d, None) for d in dossiers), avant.version)
+
+        t0 = time.perf_counter()
+        naif = sum(1 for _, d in depot.saisies()
+                   if evaluer_dossier(d, avant).revenu_eligible != evaluer_dossier(d, apres).revenu_eligible)
+        print(f"{'naïf (tous, 1 processus)':<30}{time.perf_counter() - t0:8.2f} s  {naif} modifiés")
+        depot.fermer()
+
+        for libelle, workers in (("ciblé (1 processus)", 1), (f"ciblé ({args.workers} processus)", args.workers)):
+            t0 = time.perf_counter()
+            resume, ecarts = rejouer(avant, apres, chemin, workers)
+            evalues = sum(r["evalues"] for r in resume.values())
+            print(f"{libelle:<30}{time.perf_counter() - t0:8.2f} s  {len(ecarts)} modifiés ({evalues} relus)")
+            assert len(ecarts) == naif
+
+
+if __name__ == "__main__":
+    main()
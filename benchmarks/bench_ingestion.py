@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+# bench_ingestion.py — Débit de lecture des bulletins et avis d'imposition (pièces/s)
+#
+# Usage :
+#   python benchmarks/bench_ingestion.py                  # 500 pièces
+#   python benchmarks/bench_ingestion.py --pieces 2000 --workers 8
+#
+# Lot synthétique dans un répertoire temporaire : pour chaque client, des
+# bulletins mensuels et un avis d'imposition, en trois formats répartis à
+# parts égales :
+#   - PDF Helvetica (fpdf2, police core, flux compressés, montants "2 345,67 EUR") ;
+#   - PDF DejaVu (police CID + CMap ToUnicode, espaces fines insécables, "€") ;
+#   - texte brut UTF-8 (libellé et montant parfois sur deux lignes).
+# Puis ingestion_pieces.analyser_pieces sur les chemins, en 1 processus et en
+# --workers processus ; chaque montant relu doit être celui qui a été écrit.
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from fpdf import FPDF  # noqa: E402
+
+import polices  # noqa: E402
+from ingestion_pieces import analyser_pieces, champs_dossier  # noqa: E402
+
+MOIS_NOMS = ["janvier", "février", "mars", "avril", "mai", "juin", "juillet", "août", "septembre", "octobre",
+             "novembre", "décembre"]
+
+
+def _fr(x: float, sep: str = " ") -> str:
+    return f"{x:,.2f}".replace(",", "§").replace(".", ",").replace("§", sep)
+
+
+def bulletin(client: int, annee: int, mois: int, net: float, cumul: float, sep: str) -> List[Tuple[str, str]]:
+    brut = round(net / 0.78, 2)
+    return [
+        ("BULLETIN DE PAIE", ""),
+        (f"Employeur : SARL Exemple {client % 97}", "SIRET 123 456 789 00012"),
+        (f"Salarié : Client {client:05d}", f"{MOIS_NOMS[mois - 1].capitalize()} {annee}"),
+        (f"Période du 01/{mois:02d}/{annee} au 28/{mois:02d}/{annee}", ""),
+        ("Salaire de base 151,67 h", _fr(brut, sep)),
+        ("Cotisations salariales", "-" + _fr(brut - net, sep)),
+        ("Net à payer avant impôt sur le revenu", _fr(net, sep)),
+        ("Impôt sur le revenu prélevé à la source — taux 4,5 %", _fr(net * 0.045, sep)),
+        ("Net à payer au salarié", _fr(net * 0.955, sep)),
+        ("Net imposable", _fr(net + 80, sep)),
+        ("Cumul net imposable", _fr(cumul, sep)),
+    ]
+
+
+def avis(client: int, annee: int, rni: float, sep: str) -> List[Tuple[str, str]]:
+    return [
+        (f"AVIS D'IMPÔT {annee + 1}", ""),
+        (f"IMPÔT SUR LES REVENUS DE L'ANNÉE {annee}", ""),
+        (f"Client {client:05d} — numéro fiscal 12 34 567 890 123", ""),
+        ("Revenu brut global", _fr(rni / 0.9, sep)),
+        ("Revenu imposable", _fr(rni, sep)),
+        ("Revenu fiscal de référence", _fr(rni + 312, sep)),
+    ]
+
+
+def _pdf(lignes: List[Tuple[str, str]], unicode: bool) -> bytes:
+    pdf = FPDF()
+    pdf.add_page()
+    if unicode and polices.ajouter_polices(pdf):
+        pdf.set_font(polices.FAMILLE, size=10)
+        euro = " €"
+    else:
+        pdf.set_font("helvetica", size=10)
+        lignes = [(a.replace("—", "-"), b) for a, b in lignes]
+        euro = " EUR"
+    for libelle, valeur in lignes:
+        pdf.cell(120, 7, libelle)
+        pdf.cell(60, 7, valeur + (euro if valeur and "," in valeur else ""), align="R",
+                 new_x="LMARGIN", new_y="NEXT")
+    return bytes(pdf.output())
+
+
+def _txt(lignes: List[Tuple[str, str]], alea: random.Random) -> bytes:
+    sortie = []
+    for libelle, valeur in lignes:
+        if valeur and alea.random() < 0.3:
+            sortie += [libelle, valeur]  # montant sous le libellé
+        else:
+            sortie.append(f"{libelle}\t{valeur}".rstrip())
+    return "\n".join(sortie).encode("utf-8")
+
+
+def lot(repertoire: str, nombre: int) -> Dict[str, Dict[str, float]]:
+    """Écrit `nombre` pièces ; renvoie les montants attendus par fichier."""
+    alea = random.Random(7)
+    attendus: Dict[str, Dict[str, float]] = {}
+    client = 0
+    while len(attendus) < nombre:
+        net = round(alea.uniform(1400, 4200), 2)
+        cumul = 0.0
+        for mois in range(1, 13):
+            cumul = round(cumul + net + 80, 2)
+            attendus[f"c{client:05d}_bulletin_{mois:02d}"] = {
+                "net_a_payer": net, "net_imposable": round(net + 80, 2), "cumul_net_imposable": cumul}
+            if len(attendus) >= nombre - 1 or mois == 3 and client % 2:
+                break
+        attendus[f"c{client:05d}_avis"] = {"rni": round(cumul * 0.9, 0)}
+        client += 1
+    for i, nom in enumerate(list(attendus)):
+        sep = "\u202f" if i % 3 == 1 else " "  # DejaVu : espace fine insécable
+        c = int(nom[1:6])
+        if "avis" in nom:
+            lignes = avis(c, 2024, attendus[nom]["rni"], sep)
+        else:
+            m = int(nom[-2:])
+            lignes = bulletin(c, 2024, m, attendus[nom]["net_a_payer"], attendus[nom]["cumul_net_imposable"], sep)
+        ext = ".txt" if i % 3 == 2 else ".pdf"
+        contenu = _txt(lignes, alea) if ext == ".txt" else _pdf(lignes, unicode=i % 3 == 1)
+        with open(os.path.join(repertoire, nom + ext), "wb") as f:
+            f.write(contenu)
+        attendus[nom + ext] = attendus.pop(nom)
+    return attendus
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Débit d'ingestion des pièces (bulletins, avis) : 1 processus vs pool.")
+    p.add_argument("--pieces", type=int, default=500)
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory() as rep:
+        t0 = time.perf_counter()
+        attendus = lot(rep, args.pieces)
+        print(f"{len(attendus)} pièces générées en {time.perf_counter() - t0:.1f} s")
+        chemins = sorted(os.path.join(rep, n) for n in attendus)
+
+        for libelle, workers in (("1 processus", 1), (f"{args.workers} processus", args.workers)):
+            t0 = time.perf_counter()
+            pieces = list(analyser_pieces(chemins, workers))
+            ecoule = time.perf_counter() - t0
+            for piece in pieces:
+                assert not piece.motif, (piece.nom, piece.motif)
+                assert piece.montants == attendus[piece.nom], (piece.nom, piece.montants, attendus[piece.nom])
+            print(f"{libelle:<16}{ecoule:8.2f} s  {len(pieces) / ecoule:8.0f} pièces/s")
+
+        client = [piece for piece in pieces if piece.nom.startswith("c00000_")]
+        print("Saisies CDI du client 0 :", champs_dossier(client, "CDI"))
+        print("Saisies CDD du client 0 :", champs_dossier(client, "CDD"))
+
+
+if __name__ == "__main__":
+    main()
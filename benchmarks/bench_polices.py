@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+# bench_polices.py — Coût de la police Unicode dans les PDF de la page Exports
+#
+# Usage :
+#   python benchmarks/bench_polices.py
+#   python benchmarks/bench_polices.py --repetitions 10
+#
+# Trois variantes, mêmes documents que bench_suite (résumé et check-list,
+# notes courtes et très longues, noms accentués) :
+#   - helvetica : police core, textes passés par safe() (comportement historique) ;
+#   - dejavu naïf : add_font() des trois styles à chaque PDF (analyse du TTF
+#     puis sous-ensemble recalculé à chaque output()) ;
+#   - dejavu cache : polices.py (modèles analysés une fois, sous-ensembles en
+#     cache LRU par jeu de glyphes).
+# Rendu direct (_rendre_*), le cache CACHE_PDF est contourné. Affiche la
+# meilleure durée par PDF (ms) et la taille du fichier.
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import timeit
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, Tuple
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+import exports_pdf  # noqa: E402
+import polices  # noqa: E402
+from referentiel import DOCS_PAR_STATUT  # noqa: E402
+
+NOM = "Zoé Öztürk — Lefèvre"
+NOTES_COURTES = "Dossier complet, apport 10 % — « prêt relais » possible."
+NOTES_LONGUES = ("Historique bancaire sain, épargne régulière, aucun découvert sur 12 mois ; "
+                 "projet de résidence principale avec travaux, devis joints (≈ 25 000 €). ") * 120
+
+
+def _meilleur(fonction: Callable[[], Any], repetitions: int) -> float:
+    minuteur = timeit.Timer(fonction)
+    nombre, _ = minuteur.autorange()
+    return min(minuteur.repeat(repeat=repetitions, number=nombre)) / nombre
+
+
+def _ajouter_naif(pdf) -> bool:
+    dossier = polices.dossier_polices()
+    for style, fichier in polices.FICHIERS.items():
+        pdf.add_font(polices.FAMILLE, style, os.path.join(dossier, fichier))
+    return True
+
+
+@contextmanager
+def variante(nom: str) -> Iterator[None]:
+    unicode_avant, ajouter_avant = exports_pdf.POLICE_UNICODE, polices.ajouter_polices
+    exports_pdf.POLICE_UNICODE = nom != "helvetica"
+    if nom == "dejavu naïf":
+        polices.ajouter_polices = _ajouter_naif
+    try:
+        yield
+    finally:
+        exports_pdf.POLICE_UNICODE, polices.ajouter_polices = unicode_avant, ajouter_avant
+
+
+def cas_pdf() -> Dict[str, Callable[[], bytes]]:
+    genere_le = datetime(2026, 1, 1, 9, 0)
+    docs = [(doc, i % 2 == 0) for i, doc in enumerate(DOCS_PAR_STATUT["Intérim"])]
+    rendre_resume, rendre_checklist = exports_pdf._rendre_resume, exports_pdf._rendre_checklist
+    return {
+        "resume_notes_courtes": lambda: rendre_resume(NOM, "Intérim", 2750.0, 2900.0, NOTES_COURTES, genere_le),
+        "resume_notes_longues": lambda: rendre_resume(NOM, "Intérim", 2750.0, 2900.0, NOTES_LONGUES, genere_le),
+        "checklist_notes_courtes": lambda: rendre_checklist("Intérim", docs, NOTES_COURTES, genere_le),
+        "checklist_notes_longues": lambda: rendre_checklist("Intérim", docs, NOTES_LONGUES, genere_le),
+    }
+
+
+def mesurer(repetitions: int) -> Dict[Tuple[str, str], Tuple[float, int]]:
+    if not polices.disponible():
+        raise SystemExit("DejaVu Sans introuvable (polices/, COACH_POLICES ou matplotlib).")
+    resultats = {}
+    for nom in ("helvetica", "dejavu naïf", "dejavu cache"):
+        with variante(nom):
+            for cas, rendre in cas_pdf().items():
+                taille = len(rendre())  # premier rendu : remplit le cache de sous-ensembles
+                resultats[(nom, cas)] = (_meilleur(rendre, repetitions) * 1e3, taille)
+    return resultats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repetitions", type=int, default=5)
+    args = parser.parse_args()
+
+    resultats = mesurer(args.repetitions)
+    print(f"{'cas':<26}{'variante':<15}{'ms/PDF':>9}{'octets':>10}")
+    for (nom, cas), (ms, taille) in sorted(resultats.items(), key=lambda kv: (kv[0][1], kv[0][0])):
+        print(f"{cas:<26}{nom:<15}{ms:>9.2f}{taille:>10}")
+    print("cache de sous-ensembles :", polices.SOUS_ENSEMBLES.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+# bench_rapport.py — Rapport de portefeuille : premier rendu vs réouverture
+#
+# Usage :
+#   python benchmarks/bench_rapport.py                 # 50 000 dossiers
+#   python benchmarks/bench_rapport.py --nombre 200000
+#
+# Portefeuille synthétique (bench_suite.DOSSIERS_TYPE, montants et
+# antériorités variés) évalué par evaluer_lot, puis :
+#   - premier rendu : trois graphiques + PDF multi-pages (caches vides) ;
+#   - réouverture   : mêmes données (empreinte + caches) ;
+#   - données modifiées : un revenu retenu change, tout est redessiné (hors
+#     coûts de premier usage de matplotlib : polices, caches de texte).
+# L'import de matplotlib est mesuré à part (payé une fois par processus).
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, List
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from bench_suite import DOSSIERS_TYPE  # noqa: E402
+from referentiel import STATUTS  # noqa: E402
+
+
+def portefeuille(nombre: int) -> List[Dict[str, Any]]:
+    alea = random.Random(1)
+    dossiers = []
+    for i in range(nombre):
+        statut = STATUTS[i % len(STATUTS)]
+        d = {k: v * alea.uniform(0.5, 1.8) if isinstance(v, float) else v for k, v in DOSSIERS_TYPE[statut].items()}
+        d["statut"] = statut
+        d["mois_activite"] = alea.randint(6, 40)
+        d["saisons"] = alea.randint(1, 4)
+        d["annees_activite"] = alea.randint(1, 5)
+        dossiers.append(d)
+    return dossiers
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Rapport de portefeuille : premier rendu vs réouverture.")
+    p.add_argument("--nombre", type=int, default=50_000)
+    args = p.parse_args()
+
+    t0 = time.perf_counter()
+    for module in ("matplotlib.figure", "matplotlib.backends.backend_agg"):
+        importlib.import_module(module)
+    print(f"import matplotlib          {(time.perf_counter() - t0) * 1e3:9.1f} ms")
+
+    from moteur_revenus import evaluer_lot
+    from rapport_portefeuille import Portefeuille, pdf_rapport
+    dossiers = portefeuille(args.nombre)
+    t0 = time.perf_counter()
+    pf = Portefeuille.depuis_lot(evaluer_lot(dossiers))
+    print(f"évaluation ({args.nombre} dossiers) {(time.perf_counter() - t0) * 1e3:9.1f} ms")
+
+    for etape in ("premier rendu", "réouverture"):
+        t0 = time.perf_counter()
+        taille = len(pdf_rapport(pf))
+        print(f"{etape:<26}{(time.perf_counter() - t0) * 1e3:9.1f} ms  ({taille // 1024} Ko)")
+
+    dossiers[STATUTS.index("Intérim")]["rni_N"] = 99_999.0  # change le revenu retenu : nouvelle empreinte
+    pf = Portefeuille.depuis_lot(evaluer_lot(dossiers))
+    t0 = time.perf_counter()
+    pdf_rapport(pf)
+    print(f"{'données modifiées':<26}{(time.perf_counter() - t0) * 1e3:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+# bench_sessions.py — Coût mémoire d'une session de l'app (dimensionnement d'un nœud)
+#
+# Usage :
+#   python benchmarks/bench_sessions.py                 # 20 sessions
+#   python benchmarks/bench_sessions.py --sessions 60 --memoire-noeud 4294967296
+#
+# Ouvre N sessions de app.py dans ce processus (streamlit.testing AppTest),
+# chacune avec un parcours type : dossier CDI saisi, passage en Intérim,
+# check-list, aide et export. Toutes les sessions restent ouvertes ; la
+# mémoire allouée (tracemalloc) est relevée après la première session (coûts
+# du processus : imports, table de règles, caches partagés) puis après la
+# dernière. Pente = coût marginal d'une session ; c'est un majorant, AppTest
+# gardant aussi côté test l'arbre des éléments affichés.
+# Comparé à l'état mesuré par memoire_sessions (st.session_state seul), il
+# donne la valeur de COACH_SESSION_SURCOUT.
+
+from __future__ import annotations
+
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+
+def session():
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(os.path.join(RACINE, "app.py"), default_timeout=60).run()
+    at.text_input(key="dc_nom").set_value("Client bench").run()
+    at.selectbox(key="dc_statut").set_value("Intérim").run()
+    for page in ("Check-lists", "Autres revenus (aide)", "Exports", "Dossier client"):
+        at.sidebar.radio[0].set_value(page).run()
+    assert not at.exception, at.exception
+    return at
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Coût mémoire marginal d'une session Streamlit de l'app.")
+    p.add_argument("--sessions", type=int, default=20)
+    p.add_argument("--memoire-noeud", type=int, help="Octets disponibles pour le processus (estimation de capacité)")
+    args = p.parse_args()
+
+    rep = tempfile.mkdtemp()
+    os.environ.setdefault("COACH_DB", os.path.join(rep, "bench_sessions.sqlite3"))
+    os.environ.setdefault("COACH_AUDIT_DIR", os.path.join(rep, "audit"))
+    os.environ["COACH_SESSION_MESURE_S"] = "0"
+
+    tracemalloc.start()
+    ouvertes = [session()]
+    gc.collect()
+    base, _ = tracemalloc.get_traced_memory()
+    for _ in range(args.sessions - 1):
+        ouvertes.append(session())
+    gc.collect()
+    fin, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    from memoire_sessions import SESSIONS
+    par_session = (fin - base) / max(1, args.sessions - 1)
+    etat = SESSIONS.resume()["moyenne_octets"]
+    print(f"{args.sessions} sessions ouvertes")
+    print(f"{'processus (1re session comprise)':<38}{base / 2**20:10.1f} Mo")
+    print(f"{'coût marginal d’une session':<38}{par_session / 1024:10.1f} Ko")
+    print(f"{'dont st.session_state (mesuré)':<38}{etat / 1024:10.1f} Ko")
+    print(f"{'surcoût Streamlit + AppTest':<38}{(par_session - etat) / 1024:10.1f} Ko")
+    if args.memoire_noeud:
+        print(f"{'sessions tenues par le nœud':<38}{int((args.memoire_noeud - base) // par_session):10d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+# bench_solveur.py — Solveur inverse : formes fermées vs dichotomie
+#
+# Usage :
+#   python benchmarks/bench_solveur.py                   # 14 statuts × 96 montants
+#   python benchmarks/bench_solveur.py --pas 1000
+#
+# Table complète "saisie minimale par statut" pour des capitaux de 50 k€ à
+# 1 M€ (25 ans, 3,5 %), calculée trois fois :
+#   - formes fermées      : solveur_revenus.besoins ;
+#   - dichotomie vectorisée : même résolution par moteur_lot (une évaluation
+#     groupée par itération et par statut) ;
+#   - dichotomie scalaire  : evaluer_dossier, une case après l'autre.
+# Les trois tables doivent concorder au centime près (2 centimes : pas de la
+# dichotomie).
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from moteur_revenus import DEFAUTS, evaluer_dossier  # noqa: E402
+from referentiel import STATUTS  # noqa: E402
+from regles import table_courante  # noqa: E402
+from solveur_revenus import _dichotomie, besoins, dossier_resolu, inverse, revenu_total_requis  # noqa: E402
+
+TAUX, DUREE = 3.5, 25
+
+
+def _scalaire(statut: str, champs, cible: float) -> float:
+    bas, haut = 0.0, 1e4
+    while evaluer_dossier(dossier_resolu(DEFAUTS, statut, champs, haut)).revenu_eligible < cible:
+        haut *= 2.0
+    while haut - bas > 0.01:
+        milieu = (bas + haut) / 2.0
+        if evaluer_dossier(dossier_resolu(DEFAUTS, statut, champs, milieu)).revenu_eligible >= cible:
+            haut = milieu
+        else:
+            bas = milieu
+    return haut
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Solveur inverse : formes fermées vs dichotomie.")
+    p.add_argument("--pas", type=float, default=10_000.0, help="Pas de la grille de montants (€)")
+    args = p.parse_args()
+    montants = np.arange(50_000.0, 1_000_000.0 + 1, args.pas)
+    table = table_courante()
+    besoins(montants[:2], TAUX, DUREE)  # imports et compilation hors mesure
+
+    t0 = time.perf_counter()
+    fermees = besoins(montants, TAUX, DUREE).saisies
+    t_fermees = time.perf_counter() - t0
+
+    _, total = revenu_total_requis(montants, TAUX, DUREE)
+    t0 = time.perf_counter()
+    vecto = np.stack([_dichotomie(table[s], {**DEFAUTS, "statut": s}, table, inverse(s).champs).saisie(total)
+                      for s in STATUTS])
+    t_vecto = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    scal = np.array([[_scalaire(s, inverse(s).champs, e) for e in total] for s in STATUTS])
+    t_scal = time.perf_counter() - t0
+
+    assert np.allclose(fermees, vecto, atol=0.02) and np.allclose(fermees, scal, atol=0.02)
+    print(f"{len(STATUTS)} statuts × {len(montants)} montants")
+    for libelle, t in (("formes fermées", t_fermees), ("dichotomie vectorisée", t_vecto),
+                       ("dichotomie scalaire", t_scal)):
+        print(f"{libelle:<24}{t * 1e3:10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+# bench_suite.py — Suite de benchmarks (moteur de revenus, PDF, reruns de pages)
+# avec historique JSON et détection de régressions.
+#
+# Usage :
+#   python benchmarks/bench_suite.py mesurer                  # ajoute une entrée à l'historique
+#   python benchmarks/bench_suite.py mesurer --etiquette "streamlit 1.50"
+#   python benchmarks/bench_suite.py comparer                 # dernière entrée vs la précédente
+#   python benchmarks/bench_suite.py comparer --base 0 --cible -1 --seuil 10
+#   python benchmarks/bench_suite.py historique
+#
+# Trois familles de mesures :
+#   - revenus/<statut>  : un evaluer_dossier sur un dossier type de chaque statut (µs) ;
+#   - pdf/<cas>         : rendu fpdf2 des PDF de la page Exports, résumé et
+#                         check-list, notes courtes et très longues (ms ; le
+#                         cache CACHE_PDF est contourné, on mesure le rendu) ;
+#   - pages/<page>      : rerun complet du script app.py en headless (AppTest)
+#                         avec la page présélectionnée (ms).
+# Les deux premières gardent la meilleure de plusieurs séries timeit (le bruit
+# de la machine ne fait qu'ajouter du temps) ; les reruns, la médiane.
+# `comparer` sort avec le code 1 si une mesure dépasse la base de plus de
+# --seuil %, pour bloquer une montée de version de streamlit / fpdf2.
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from referentiel import PAGES, STATUTS  # noqa: E402
+
+APP = os.path.join(RACINE, "app.py")
+HISTORIQUE = os.path.join(RACINE, "benchmarks", "historique.json")
+DEPENDANCES = ["streamlit", "fpdf2", "numpy", "matplotlib"]
+
+# Un dossier type par statut, qui passe par la branche principale de la règle
+DOSSIERS_TYPE: Dict[str, Dict[str, Any]] = {
+    "CDI": {"cdi_anciennete_mois": 48, "cdi_cni": 34000.0, "cdi_rni": 33000.0, "pnc1": 1200.0, "pnc2": 900.0},
+    "CDD": {"cdd_rni_12m": 26000.0, "deductions": 1200.0, "cdd_mois_restants": 2},
+    "CDIC": {"cdd_rni_12m": 31000.0},
+    "Intérim": {"rni_N": 21000.0, "rni_N1": 19000.0, "rni_N2": 23000.0, "mois_activite": 24},
+    "Intermittent": {"rni_N": 28000.0, "rni_N1": 25000.0, "rni_N2": 0.0, "annees_activite": 4},
+    "Saisonnier": {"rni_N": 14000.0, "rni_N1": 15000.0, "saisons": 3},
+    "Militaire": {"rni_N": 27000.0, "rni_N1": 26000.0},
+    "Stagiaire FP": {"rni": 22000.0},
+    "Assistante maternelle": {"cumul_paje": 18000.0},
+    "Apprenti": {"rni": 11000.0, "duree_restante_mois": 14},
+    "Pompier volontaire": {"rni_N": 24000.0, "rni_N1": 23500.0},
+    "Élu": {"revenus_mandat": 9000.0, "autres_annuels": 21000.0},
+    "Multi-contrats": {"rni_employeurs": [12000.0, 9000.0, 4000.0]},
+    "Famille d'accueil": {"revenus_annuels": 19000.0},
+}
+
+NOTES_COURTES = "Dossier complet, apport 10 %."
+NOTES_LONGUES = ("Historique bancaire sain, épargne régulière, aucun découvert sur 12 mois ; "
+                 "projet de résidence principale avec travaux, devis joints. ") * 120
+
+
+# -----------------------------
+# Mesures
+# -----------------------------
+def _meilleur(fonction: Callable[[], Any], repetitions: int) -> float:
+    """Durée (s) d'un appel : meilleure de `repetitions` séries, chacune calibrée sur ~0,2 s."""
+    minuteur = timeit.Timer(fonction)
+    nombre, _ = minuteur.autorange()
+    return min(minuteur.repeat(repeat=repetitions, number=nombre)) / nombre
+
+
+def mesurer_revenus(repetitions: int) -> Dict[str, float]:
+    from moteur_revenus import evaluer_dossier
+    resultats = {}
+    for statut in STATUTS:
+        dossier = {"nom": "Bench", "statut": statut, **DOSSIERS_TYPE[statut]}
+        resultats[statut] = _meilleur(lambda: evaluer_dossier(dossier), repetitions) * 1e6
+    return resultats
+
+
+def mesurer_pdf(repetitions: int) -> Dict[str, float]:
+    from exports_pdf import _rendre_checklist, _rendre_resume
+    from referentiel import DOCS_PAR_STATUT
+
+    genere_le = datetime(2026, 1, 1, 9, 0)
+    docs = [(doc, i % 2 == 0) for i, doc in enumerate(DOCS_PAR_STATUT["CDI"])]
+    cas = {
+        "resume_notes_courtes": lambda: _rendre_resume("Jean Dupont", "CDI", 2750.0, 2900.0, NOTES_COURTES, genere_le),
+        "resume_notes_longues": lambda: _rendre_resume("Jean Dupont", "CDI", 2750.0, 2900.0, NOTES_LONGUES, genere_le),
+        "checklist_notes_courtes": lambda: _rendre_checklist("CDI", docs, NOTES_COURTES, genere_le),
+        "checklist_notes_longues": lambda: _rendre_checklist("CDI", docs, NOTES_LONGUES, genere_le),
+    }
+    return {nom: _meilleur(f, repetitions) * 1e3 for nom, f in cas.items()}
+
+
+def mesurer_pages(repetitions: int) -> Dict[str, float]:
+    from streamlit.testing.v1 import AppTest
+
+    resultats = {}
+    for page in PAGES:
+        at = AppTest.from_file(APP, default_timeout=120)
+        at.session_state["navigation"] = page
+        at.run()  # premier rendu : imports et caches de la page
+        if at.exception:
+            raise RuntimeError(f"Page {page!r} : exception au rendu ({at.exception[0].message})")
+        durees = []
+        for _ in range(repetitions):
+            t0 = time.perf_counter()
+            at.run()
+            durees.append(time.perf_counter() - t0)
+        resultats[page] = statistics.median(durees) * 1e3
+    return resultats
+
+
+def _version(distribution: str) -> Optional[str]:
+    from importlib.metadata import PackageNotFoundError, version
+    try:
+        return version(distribution)
+    except PackageNotFoundError:
+        return None
+
+
+def _commit() -> Optional[str]:
+    try:
+        proc = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RACINE,
+                              capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return proc.stdout.strip() or None
+
+
+def mesurer(repetitions: int = 5, familles: Optional[List[str]] = None, etiquette: str = "") -> Dict[str, Any]:
+    """Une entrée d'historique : contexte (versions, commit) et mesures à plat ("famille/nom" -> valeur)."""
+    familles = familles or list(FAMILLES)
+    mesures: Dict[str, float] = {}
+    for famille in familles:
+        for nom, valeur in FAMILLES[famille][0](repetitions).items():
+            mesures[f"{famille}/{nom}"] = round(valeur, 3)
+    return {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "etiquette": etiquette,
+        "commit": _commit(),
+        "python": sys.version.split()[0],
+        "plateforme": platform.platform(),
+        "versions": {d: _version(d) for d in DEPENDANCES},
+        "repetitions": repetitions,
+        "unites": {f: FAMILLES[f][1] for f in familles},
+        "mesures": mesures,
+    }
+
+
+FAMILLES: Dict[str, Any] = {
+    "revenus": (mesurer_revenus, "µs"),
+    "pdf": (mesurer_pdf, "ms"),
+    "pages": (mesurer_pages, "ms"),
+}
+
+
+# -----------------------------
+# Historique et comparaison
+# -----------------------------
+def lire_historique(chemin: str = HISTORIQUE) -> List[Dict[str, Any]]:
+    if not os.path.exists(chemin):
+        return []
+    with open(chemin, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def ajouter(entree: Dict[str, Any], chemin: str = HISTORIQUE) -> int:
+    """Ajoute l'entrée à l'historique (écriture atomique) ; renvoie son indice."""
+    historique = lire_historique(chemin)
+    historique.append(entree)
+    tmp = chemin + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(historique, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, chemin)
+    return len(historique) - 1
+
+
+def comparer(base: Dict[str, Any], cible: Dict[str, Any], seuil_pct: float) -> List[Dict[str, Any]]:
+    """Écarts mesure par mesure (mesures communes aux deux entrées) ; `regression` si > seuil_pct."""
+    lignes = []
+    for nom in sorted(set(base["mesures"]) & set(cible["mesures"])):
+        avant, apres = base["mesures"][nom], cible["mesures"][nom]
+        ecart = (apres - avant) / avant * 100.0 if avant else 0.0
+        lignes.append({"mesure": nom, "base": avant, "cible": apres, "ecart_pct": ecart, "regression": ecart > seuil_pct})
+    return lignes
+
+
+def _titre(entree: Dict[str, Any], indice: int) -> str:
+    versions = ", ".join(f"{d} {v}" for d, v in entree["versions"].items() if v)
+    etiquette = f" « {entree['etiquette']} »" if entree.get("etiquette") else ""
+    return f"#{indice} {entree['date']}{etiquette} ({entree.get('commit') or '-'}) — {versions}"
+
+
+def afficher_comparaison(base: Dict[str, Any], i_base: int, cible: Dict[str, Any], i_cible: int,
+                         lignes: List[Dict[str, Any]], seuil_pct: float) -> None:
+    print(f"Base  : {_titre(base, i_base)}")
+    print(f"Cible : {_titre(cible, i_cible)}\n")
+    unites = {**base.get("unites", {}), **cible.get("unites", {})}
+    print(f"{'Mesure':<42}{'base':>12}{'cible':>12}{'écart':>10}")
+    for l in lignes:
+        unite = unites.get(l["mesure"].split("/", 1)[0], "")
+        drapeau = "  RÉGRESSION" if l["regression"] else ""
+        print(f"{l['mesure']:<42}{l['base']:>10.2f}{unite:>2}{l['cible']:>10.2f}{unite:>2}{l['ecart_pct']:>+9.1f}%{drapeau}")
+    nb = sum(l["regression"] for l in lignes)
+    print(f"\n{nb} régression(s) au-delà de {seuil_pct:g} %." if nb else f"\nAucune régression au-delà de {seuil_pct:g} %.")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Benchmarks de l'app : moteur de revenus, PDF, reruns de pages.")
+    p.add_argument("--historique", default=HISTORIQUE, help="Fichier JSON d'historique (défaut : %(default)s)")
+    sous = p.add_subparsers(dest="commande", required=True)
+
+    m = sous.add_parser("mesurer", help="Mesurer et ajouter une entrée à l'historique")
+    m.add_argument("--repetitions", type=int, default=5)
+    m.add_argument("--famille", action="append", choices=list(FAMILLES),
+                   help="Ne mesurer que cette famille (répétable ; défaut : toutes)")
+    m.add_argument("--etiquette", default="", help="Libellé libre (ex. « fpdf2 2.8.9 »)")
+
+    c = sous.add_parser("comparer", help="Comparer deux entrées de l'historique")
+    c.add_argument("--base", type=int, default=-2, help="Indice de l'entrée de référence (défaut : avant-dernière)")
+    c.add_argument("--cible", type=int, default=-1, help="Indice de l'entrée comparée (défaut : dernière)")
+    c.add_argument("--seuil", type=float, default=15.0, help="Régression au-delà de ce pourcentage (défaut : %(default)s)")
+
+    sous.add_parser("historique", help="Lister les entrées de l'historique")
+    args = p.parse_args(argv)
+
+    if args.commande == "mesurer":
+        entree = mesurer(args.repetitions, args.famille, args.etiquette)
+        indice = ajouter(entree, args.historique)
+        print(_titre(entree, indice))
+        for nom, valeur in entree["mesures"].items():
+            print(f"  {nom:<40}{valeur:>12.2f} {entree['unites'][nom.split('/', 1)[0]]}")
+        return 0
+
+    historique = lire_historique(args.historique)
+    if args.commande == "historique":
+        for i, entree in enumerate(historique):
+            print(_titre(entree, i))
+        return 0
+
+    try:
+        base, cible = historique[args.base], historique[args.cible]
+    except IndexError:
+        print(f"Historique {args.historique} : {len(historique)} entrée(s), indices {args.base} / {args.cible} "
+              "introuvables.", file=sys.stderr)
+        return 2
+    i_base, i_cible = args.base % len(historique), args.cible % len(historique)
+    lignes = comparer(base, cible, args.seuil)
+    afficher_comparaison(base, i_base, cible, i_cible, lignes, args.seuil)
+    return 1 if any(l["regression"] for l in lignes) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
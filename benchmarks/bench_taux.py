@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+# bench_taux.py — Recherche du taux d'usure : parcours de la grille vs fichier mappé + dichotomie
+#
+# Usage :
+#   python benchmarks/bench_taux.py                       # 1 000 000 dossiers
+#   python benchmarks/bench_taux.py --dossiers 200000 --series 50
+#
+# Deux grilles : celle livrée (taux_reference.csv) et une grille synthétique
+# longue (--series séries × 40 ans de dates d'effet mensuelles × 4 tranches).
+# Pour des dossiers de dates et durées aléatoires :
+#   - parcours : liste des lignes du CSV filtrée à chaque dossier (sur un
+#     échantillon, extrapolé) ;
+#   - dichotomie : GrilleTaux.taux, un dossier à la fois ;
+#   - vectorisé : GrilleTaux.taux_lot sur tous les dossiers (scoring par lots).
+# Les trois doivent donner les mêmes taux.
+
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from taux_reference import CSV_DEFAUT, GrilleTaux, _jours, compiler  # noqa: E402
+
+
+def grille_synthetique(chemin: str, series: int) -> None:
+    alea = random.Random(3)
+    with open(chemin, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["serie", "date_effet", "duree_min_ans", "duree_max_ans", "taux"])
+        for s in range(series):
+            for mois in range(40 * 12):
+                effet = date(1990 + mois // 12, mois % 12 + 1, 1).isoformat()
+                base = alea.uniform(2, 9)
+                for mini, maxi in ((0, 10), (10, 15), (15, 20), (20, "")):
+                    w.writerow([f"usure_s{s:03d}", effet, mini, maxi, f"{base + mini / 20:.2f}"])
+
+
+def parcours(lignes, serie: str, jour: int, mois: int):
+    # dernière date d'effet <= jour, puis tranche contenant la durée : toute la liste à chaque dossier
+    effet = max((j for s, j, *_ in lignes if s == serie and j <= jour), default=None)
+    for s, j, mini, maxi, taux in lignes:
+        if s == serie and j == effet and mini <= mois < maxi:
+            return taux
+    return None
+
+
+def mesurer(libelle: str, source: str, dossiers: int, serie: str, debut: date, fin: date) -> None:
+    with tempfile.TemporaryDirectory() as rep:
+        chemin = os.path.join(rep, "taux.bin")
+        n = compiler(source, chemin)
+        grille = GrilleTaux(chemin)
+        print(f"\n{libelle} : {n} taux, {os.path.getsize(chemin) / 1024:.0f} Ko compilés")
+
+        alea = np.random.default_rng(5)
+        jours = alea.integers(_jours(debut), _jours(fin), dossiers)
+        mois = alea.integers(60, 301, dossiers)
+
+        with open(source, encoding="utf-8") as f:
+            lignes = [(r["serie"], _jours(date.fromisoformat(r["date_effet"])),
+                       round(float(r["duree_min_ans"]) * 12),
+                       round(float(r["duree_max_ans"]) * 12) if r["duree_max_ans"] else 4095, float(r["taux"]))
+                      for r in csv.DictReader(ligne for ligne in f if not ligne.startswith("#"))]
+        echantillon = min(dossiers, 2000)
+        t0 = time.perf_counter()
+        attendus = [parcours(lignes, serie, int(j), int(m)) for j, m in zip(jours[:echantillon], mois[:echantillon])]
+        par_dossier = (time.perf_counter() - t0) / echantillon
+        print(f"{'parcours':<14}{par_dossier * dossiers:10.2f} s  (extrapolé de {echantillon} dossiers)")
+
+        t0 = time.perf_counter()
+        origine = date(1970, 1, 1)
+        unitaires = [grille.taux(serie, origine + timedelta(days=int(j)), int(m) / 12)
+                     for j, m in zip(jours[:echantillon * 10], mois[:echantillon * 10])]
+        par_dossier = (time.perf_counter() - t0) / len(unitaires)
+        print(f"{'dichotomie':<14}{par_dossier * dossiers:10.2f} s  (extrapolé de {len(unitaires)} dossiers)")
+
+        t0 = time.perf_counter()
+        taux, _ = grille.taux_lot(serie, jours, mois)
+        print(f"{'vectorisé':<14}{time.perf_counter() - t0:10.2f} s")
+
+        for a, u, v in zip(attendus, unitaires, taux[:echantillon].tolist()):
+            assert (a is None and u is None and v != v) or (a == u.taux == v), (a, u, v)
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Recherche du taux d'usure : parcours vs dichotomie sur fichier mappé.")
+    p.add_argument("--dossiers", type=int, default=1_000_000)
+    p.add_argument("--series", type=int, default=20)
+    args = p.parse_args()
+
+    mesurer("Grille livrée", CSV_DEFAUT, args.dossiers, "usure_fixe", date(2022, 1, 1), date(2026, 12, 31))
+    with tempfile.TemporaryDirectory() as rep:
+        source = os.path.join(rep, "grille.csv")
+        grille_synthetique(source, args.series)
+        mesurer("Grille synthétique", source, args.dossiers, f"usure_s{args.series // 2:03d}",
+                date(1990, 1, 1), date(2030, 1, 1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+# charge_api.py — Test de charge du service api_revenus sur une instance locale.
+#
+# Usage :
+#   python benchmarks/charge_api.py --demarrer                     # lance l'API (1 worker) puis la charge
+#   python benchmarks/charge_api.py --url http://127.0.0.1:8600 --connexions 64 --duree 15
+#   python benchmarks/charge_api.py --demarrer --route lot --taille-lot 500
+#
+# Client HTTP/1.1 minimal en asyncio (connexions keep-alive, une requête en vol
+# par connexion) pour que le client coûte moins cher que le serveur mesuré.
+# Les dossiers sont tirés parmi les dossiers types de bench_suite (tous statuts).
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_suite import DOSSIERS_TYPE  # noqa: E402
+
+
+def _requetes(hote: str, route: str, taille_lot: int, nb: int = 256) -> List[bytes]:
+    """Requêtes HTTP brutes pré-encodées (le client ne sérialise rien pendant la mesure)."""
+    rnd = random.Random(42)
+    statuts = list(DOSSIERS_TYPE)
+    chemin = "/revenu" if route == "un" else "/revenus/lot"
+    brutes = []
+    for _ in range(nb):
+        dossiers = [{"statut": s, **DOSSIERS_TYPE[s]} for s in rnd.choices(statuts, k=1 if route == "un" else taille_lot)]
+        corps = json.dumps(dossiers[0] if route == "un" else {"dossiers": dossiers}).encode("utf-8")
+        brutes.append(
+            f"POST {chemin} HTTP/1.1\r\nHost: {hote}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(corps)}\r\n\r\n".encode("ascii") + corps
+        )
+    return brutes
+
+
+async def _lire_reponse(lecteur: asyncio.StreamReader) -> int:
+    entetes = await lecteur.readuntil(b"\r\n\r\n")
+    statut = int(entetes[9:12])
+    longueur = 0
+    for ligne in entetes.split(b"\r\n"):
+        if ligne[:15].lower() == b"content-length:":
+            longueur = int(ligne[15:])
+            break
+    else:  # uvicorn/h11 : réponse sans Content-Length -> chunked
+        while True:
+            taille = int((await lecteur.readuntil(b"\r\n")).strip(), 16)
+            await lecteur.readexactly(taille + 2)
+            if taille == 0:
+                break
+        return statut
+    await lecteur.readexactly(longueur)
+    return statut
+
+
+async def _connexion(hote: str, port: int, requetes: List[bytes], fin: float,
+                     latences: List[float], erreurs: List[int]) -> None:
+    lecteur, ecrivain = await asyncio.open_connection(hote, port)
+    i = random.randrange(len(requetes))
+    try:
+        while time.perf_counter() < fin:
+            t0 = time.perf_counter()
+            ecrivain.write(requetes[i % len(requetes)])
+            statut = await _lire_reponse(lecteur)
+            latences.append(time.perf_counter() - t0)
+            if statut != 200:
+                erreurs.append(statut)
+            i += 1
+    finally:
+        ecrivain.close()
+
+
+async def charger(url: str, connexions: int, duree_s: float, route: str, taille_lot: int) -> Dict[str, Any]:
+    parties = urlsplit(url)
+    hote, port = parties.hostname or "127.0.0.1", parties.port or 80
+    requetes = _requetes(hote, route, taille_lot)
+    latences: List[float] = []
+    erreurs: List[int] = []
+    # échauffement : une seconde, non comptée
+    await asyncio.gather(*(_connexion(hote, port, requetes, time.perf_counter() + 1.0, [], [])
+                           for _ in range(connexions)))
+    debut = time.perf_counter()
+    await asyncio.gather(*(_connexion(hote, port, requetes, debut + duree_s, latences, erreurs)
+                           for _ in range(connexions)))
+    ecoule = time.perf_counter() - debut
+    latences.sort()
+
+    def q(p: float) -> float:
+        return latences[min(len(latences) - 1, int(p * len(latences)))] * 1000.0
+
+    dossiers_par_req = 1 if route == "un" else taille_lot
+    return {
+        "route": route,
+        "connexions": connexions,
+        "duree_s": round(ecoule, 2),
+        "requetes": len(latences),
+        "erreurs": len(erreurs),
+        "req_s": round(len(latences) / ecoule, 1),
+        "dossiers_s": round(len(latences) * dossiers_par_req / ecoule, 1),
+        "latence_ms": {"p50": round(q(0.5), 2), "p95": round(q(0.95), 2), "p99": round(q(0.99), 2),
+                       "moyenne": round(statistics.fmean(latences) * 1000.0, 2) if latences else None},
+    }
+
+
+def _attendre(url: str, delai_s: float = 20.0) -> None:
+    limite = time.time() + delai_s
+    while True:
+        try:
+            with urllib.request.urlopen(url + "/sante", timeout=1) as r:
+                if r.status == 200:
+                    return
+        except OSError:
+            if time.time() > limite:
+                raise
+            time.sleep(0.1)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Test de charge de l'API revenus (instance locale).")
+    p.add_argument("--url", default="http://127.0.0.1:8600")
+    p.add_argument("--demarrer", action="store_true", help="Lancer api_revenus.py sur le port de --url le temps du test")
+    p.add_argument("--workers", type=int, default=1, help="Processus uvicorn si --demarrer")
+    p.add_argument("--connexions", type=int, default=32)
+    p.add_argument("--duree", type=float, default=10.0)
+    p.add_argument("--route", choices=["un", "lot"], default="un")
+    p.add_argument("--taille-lot", type=int, default=200)
+    p.add_argument("--json", help="Écrire aussi le résultat dans ce fichier")
+    args = p.parse_args(argv)
+
+    serveur: Optional[subprocess.Popen] = None
+    if args.demarrer:
+        port = urlsplit(args.url).port or 8600
+        serveur = subprocess.Popen([sys.executable, os.path.join(RACINE, "api_revenus.py"),
+                                    "--port", str(port), "--workers", str(args.workers)], cwd=RACINE)
+    try:
+        _attendre(args.url)
+        res = asyncio.run(charger(args.url, args.connexions, args.duree, args.route, args.taille_lot))
+    finally:
+        if serveur is not None:
+            serveur.terminate()
+            serveur.wait(timeout=10)
+
+    lat = res["latence_ms"]
+    print(f"{res['requetes']} requêtes en {res['duree_s']} s sur {res['connexions']} connexions "
+          f"({res['erreurs']} erreur(s))")
+    print(f"  {res['req_s']:.0f} req/s — {res['dossiers_s']:.0f} dossiers/s")
+    print(f"  latence p50 {lat['p50']} ms, p95 {lat['p95']} ms, p99 {lat['p99']} ms")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(res, f, ensure_ascii=False, indent=2)
+    return 1 if res["erreurs"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
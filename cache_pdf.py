@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+# cache_pdf.py — Cache LRU des PDF générés, adressé par le contenu
+#
+# La clé est un hash SHA-256 des entrées normalisées (textes passés par safe(),
+# montants formatés, horodatage ramené à un créneau) : deux exports au contenu
+# identique — typiquement la même check-list pour tous les conseillers — ne
+# sont rendus qu'une fois par processus.
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+
+def cle(type_pdf: str, champs: Dict[str, Any]) -> str:
+    """Hash stable d'un type de PDF et de ses champs normalisés (JSON trié)."""
+    brut = json.dumps([type_pdf, champs], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(brut.encode("utf-8")).hexdigest()
+
+
+def creneau(moment: datetime, granularite_s: int) -> str:
+    """Horodatage ramené au début de son créneau de `granularite_s` secondes.
+
+    Avec 60 s (défaut), c'est exactement la précision affichée dans l'en-tête
+    ("Genere le %d/%m/%Y a %H:%M") : un hit ne change donc pas le PDF servi.
+    """
+    ts = int(moment.timestamp())
+    return datetime.fromtimestamp(ts - ts % max(1, granularite_s)).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+class CachePDF:
+    """LRU borné en octets, sûr entre threads (une instance partagée par processus)."""
+
+    def __init__(self, budget_octets: int = 32 * 1024 * 1024, granularite_s: int = 60):
+        self.budget_octets = budget_octets
+        self.granularite_s = granularite_s
+        self._entrees: "OrderedDict[str, bytes]" = OrderedDict()
+        self._octets = 0
+        self._verrou = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def obtenir(self, cle_pdf: str, fabrique: Callable[[], bytes]) -> bytes:
+        """Renvoie le PDF en cache, sinon le construit avec `fabrique()` et le mémorise."""
+        with self._verrou:
+            data = self._entrees.get(cle_pdf)
+            if data is not None:
+                self._entrees.move_to_end(cle_pdf)
+                self.hits += 1
+                return data
+            self.misses += 1
+
+        # rendu hors verrou : deux sessions peuvent rendre le même PDF en parallèle, sans gravité
+        data = fabrique()
+        self.mettre(cle_pdf, data)
+        return data
+
+    def mettre(self, cle_pdf: str, data: bytes) -> None:
+        if len(data) > self.budget_octets:
+            return
+        with self._verrou:
+            ancien = self._entrees.pop(cle_pdf, None)
+            if ancien is not None:
+                self._octets -= len(ancien)
+            self._entrees[cle_pdf] = data
+            self._octets += len(data)
+            while self._octets > self.budget_octets:
+                _, sortant = self._entrees.popitem(last=False)
+                self._octets -= len(sortant)
+                self.evictions += 1
+
+    def vider(self) -> None:
+        with self._verrou:
+            self._entrees.clear()
+            self._octets = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._verrou:
+            total = self.hits + self.misses
+            return {
+                "entrees": len(self._entrees),
+                "octets": self._octets,
+                "budget_octets": self.budget_octets,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "taux_hit": (self.hits / total) if total else 0.0,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entrees)
+
+
+def depuis_env(environ: Optional[Dict[str, str]] = None) -> CachePDF:
+    """Cache configuré par COACH_PDF_CACHE_OCTETS (0 = désactivé) et COACH_PDF_CACHE_CRENEAU_S."""
+    env = os.environ if environ is None else environ
+    return CachePDF(
+        budget_octets=int(env.get("COACH_PDF_CACHE_OCTETS", 32 * 1024 * 1024)),
+        granularite_s=int(env.get("COACH_PDF_CACHE_CRENEAU_S", 60)),
+    )
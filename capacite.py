@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+# capacite.py — Capacité d'emprunt et tableaux d'amortissement (NumPy)
+#
+# Part du "Revenu total retenu" produit par le moteur de revenus :
+#   mensualité max = revenu total × taux d'endettement (35 %) − charges en cours
+#   capital max    = mensualité × (1 − (1 + r)^−n) / r    (r mensuel, n mois)
+# Toute la grille taux × durée est calculée en une passe vectorisée, et mise
+# en cache par revenu : bouger un curseur ne fait qu'indexer la grille.
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Tuple
+
+import numpy as np
+
+TAUX_ENDETTEMENT = 0.35
+
+# Grille par défaut : 2,50 % → 5,00 % par pas de 0,05 ; 10 → 25 ans
+TAUX_GRILLE = tuple(np.round(np.arange(250, 501, 5) / 100.0, 2).tolist())
+DUREES_GRILLE = tuple(range(10, 26))
+
+
+@dataclass(frozen=True)
+class GrilleCapacite:
+    """Capacité sur une grille taux (T) × durées (D). Tableaux en lecture seule."""
+    revenu_total: float
+    mensualite_max: float
+    taux: np.ndarray          # (T,) taux nominal annuel en %
+    durees: np.ndarray        # (D,) années
+    capital_max: np.ndarray   # (T, D) €
+    cout_interets: np.ndarray # (T, D) € sur toute la durée
+
+    def indice(self, taux: float, duree_ans: int) -> Tuple[int, int]:
+        i = int(np.abs(self.taux - taux).argmin())
+        j = int(np.abs(self.durees - duree_ans).argmin())
+        return i, j
+
+    def capital(self, taux: float, duree_ans: int) -> float:
+        return float(self.capital_max[self.indice(taux, duree_ans)])
+
+    def echeanciers(self) -> Dict[str, np.ndarray]:
+        """Échéanciers de toute la grille au capital max : tableaux (T, D, mois)."""
+        return echeanciers(self.capital_max, self.taux[:, None], self.durees[None, :])
+
+
+def mensualite_max(revenu_total: float, taux_endettement: float = TAUX_ENDETTEMENT, charges: float = 0.0) -> float:
+    """Mensualité maximale (€) au taux d'endettement donné, après les charges de crédit en cours."""
+    return max(0.0, round(revenu_total * taux_endettement - charges, 2))
+
+
+def _facteur_annuite(taux_pct: np.ndarray, nb_mois: np.ndarray) -> np.ndarray:
+    """(1 − (1 + r)^−n) / r, avec la limite n quand r = 0 ; diffuse taux × mois."""
+    r = np.asarray(taux_pct, dtype=np.float64) / 100.0 / 12.0
+    n = np.asarray(nb_mois, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        f = -np.expm1(-n * np.log1p(r)) / r
+    return np.where(r == 0, n, f)
+
+
+def capital_empruntable(mensualite: float, taux_pct, durees_ans) -> np.ndarray:
+    """Capital max (€) pour une mensualité donnée ; `taux_pct` (T,) × `durees_ans` (D,) → (T, D)."""
+    t = np.asarray(taux_pct, dtype=np.float64)[:, None]
+    n = np.asarray(durees_ans, dtype=np.float64)[None, :] * 12.0
+    return np.round(mensualite * _facteur_annuite(t, n), 2)
+
+
+def mensualite_pour(capital, taux_pct, durees_ans) -> np.ndarray:
+    """Mensualité (€) d'un prêt amortissable ; diffuse capital, taux et durées."""
+    return np.asarray(capital, dtype=np.float64) / _facteur_annuite(taux_pct, np.asarray(durees_ans) * 12.0)
+
+
+def taeg(capital, taux_pct, durees_ans, assurance_pct=0.0, frais=0.0) -> np.ndarray:
+    """TAEG (%) : taux actuariel annuel qui égalise le capital net des frais et les échéances assurance comprise.
+
+    Assurance en % du capital initial par an, frais (dossier, garantie,
+    courtage) en € payés au départ. Dichotomie vectorisée sur le taux
+    mensuel ; diffuse tous les arguments.
+    """
+    capital, taux, durees, assurance, frais = np.broadcast_arrays(
+        *(np.asarray(a, dtype=np.float64) for a in (capital, taux_pct, durees_ans, assurance_pct, frais)))
+    echeance = mensualite_pour(capital, taux, durees) + capital * assurance / 100.0 / 12.0
+    net = capital - frais
+    n = durees * 12.0
+    bas, haut = np.zeros_like(capital), np.full_like(capital, 0.05)  # 0 à 5 % par mois
+    for _ in range(50):
+        milieu = (bas + haut) / 2.0
+        trop_bas = echeance * _facteur_annuite(milieu * 1200.0, n) > net  # valeur actuelle décroissante en r
+        bas = np.where(trop_bas, milieu, bas)
+        haut = np.where(trop_bas, haut, milieu)
+    return np.round(np.expm1(12.0 * np.log1p((bas + haut) / 2.0)) * 100.0, 4)
+
+
+def _lecture_seule(a: np.ndarray) -> np.ndarray:
+    a.setflags(write=False)
+    return a
+
+
+@lru_cache(maxsize=512)
+def _grille(revenu_total: float, taux_endettement: float, charges: float,
+            taux: Tuple[float, ...], durees: Tuple[int, ...]) -> GrilleCapacite:
+    m = mensualite_max(revenu_total, taux_endettement, charges)
+    t = np.asarray(taux, dtype=np.float64)
+    d = np.asarray(durees, dtype=np.int64)
+    capital = capital_empruntable(m, t, d)
+    cout = np.round(m * d[None, :] * 12.0 - capital, 2)
+    return GrilleCapacite(
+        revenu_total=revenu_total,
+        mensualite_max=m,
+        taux=_lecture_seule(t),
+        durees=_lecture_seule(d),
+        capital_max=_lecture_seule(capital),
+        cout_interets=_lecture_seule(cout),
+    )
+
+
+def grille_capacite(revenu_total: float, taux_endettement: float = TAUX_ENDETTEMENT, charges: float = 0.0,
+                    taux: Tuple[float, ...] = TAUX_GRILLE, durees: Tuple[int, ...] = DUREES_GRILLE) -> GrilleCapacite:
+    """Capacité d'emprunt sur toute la grille taux × durées (cache par revenu, charges et grille)."""
+    return _grille(round(float(revenu_total), 2), float(taux_endettement), round(float(charges), 2),
+                   tuple(float(x) for x in taux), tuple(int(x) for x in durees))
+
+
+def echeanciers(capital, taux_pct, durees_ans) -> Dict[str, np.ndarray]:
+    """Tableaux d'amortissement complets, vectorisés sur une grille.
+
+    `capital`, `taux_pct` et `durees_ans` sont diffusés ensemble (ex. capital
+    (T, D), taux (T, 1), durées (1, D)) ; l'axe des mois est ajouté en dernier
+    et vaut NaN au-delà de la durée de chaque prêt. Renvoie mensualite (...),
+    puis interets, amortissement et capital_restant (..., mois).
+    """
+    capital = np.asarray(capital, dtype=np.float64)
+    taux = np.asarray(taux_pct, dtype=np.float64)
+    durees = np.asarray(durees_ans)
+    capital, taux, durees = np.broadcast_arrays(capital, taux, durees)
+    nb_mois = durees * 12
+    m = mensualite_pour(capital, taux, durees)
+
+    r = (taux / 100.0 / 12.0)[..., None]
+    k = np.arange(1, int(nb_mois.max()) + 1, dtype=np.float64)  # mois 1..N
+    c, mm = capital[..., None], m[..., None]
+    # capital restant dû après k échéances : C(1+r)^k − M((1+r)^k − 1)/r
+    log_croissance = k * np.log1p(r)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        restant = np.where(r == 0, c - mm * k, c * np.exp(log_croissance) - mm * np.expm1(log_croissance) / r)
+    restant = np.maximum(restant, 0.0)
+    avant = np.concatenate([c, restant[..., :-1]], axis=-1)
+    interets = avant * r
+    amortissement = mm - interets
+
+    hors_duree = k > nb_mois[..., None]
+    for a in (interets, amortissement, restant):
+        a[hors_duree] = np.nan
+    return {"mensualite": m, "interets": interets, "amortissement": amortissement, "capital_restant": restant}
+
+
+def tableau_amortissement(capital: float, taux_pct: float, duree_ans: int) -> Dict[str, np.ndarray]:
+    """Échéancier mensuel d'un seul prêt (mois, échéance, intérêts, amortissement, capital restant)."""
+    e = echeanciers(capital, taux_pct, duree_ans)
+    n = int(duree_ans) * 12
+    return {
+        "mois": np.arange(1, n + 1),
+        "echeance": np.full(n, float(e["mensualite"])),
+        "interets": e["interets"][:n],
+        "amortissement": e["amortissement"][:n],
+        "capital_restant": e["capital_restant"][:n],
+    }
@@ -0,0 +1,394 @@
+# -*- coding: utf-8 -*-
+# depot_dossiers.py — Dépôt des dossiers clients (SQLite local, WAL, pool de connexions)
+#
+# Un dossier = les saisies de la page "Dossier client" (dict, cf. DEFAUTS) et
+# le dernier Resultat calculé ; un ménage (co-emprunteur, cf. menage.py) est
+# enregistré avec le statut "Ménage" et le Resultat du ménage. Le fichier est
+# configuré par COACH_DB (défaut : dossiers.sqlite3 à côté de app.py) ;
+# COACH_DB_POOL connexions (4) sont partagées par les sessions du processus.
+#
+# WAL : les lectures (ouverture d'un dossier, listes, exports) ne sont jamais
+# bloquées par l'enregistrement automatique d'une autre session. Index sur le
+# nom (normalisé), le statut et la date de mise à jour : ouvrir un dossier ou
+# lister les derniers modifiés reste en millisecondes à 100k dossiers.
+#
+# Les abonnés (cf. index_dossiers) sont prévenus de chaque écriture, pour tenir
+# à jour une vue en mémoire sans relire la base.
+
+from __future__ import annotations
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+import unicodedata
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from menage import est_menage, statut_enregistre
+from moteur_revenus import DEFAUTS, Resultat
+from referentiel import STATUT_MENAGE
+
+CHEMIN_DEFAUT = os.environ.get(
+    "COACH_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "dossiers.sqlite3")
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dossiers (
+    id              INTEGER PRIMARY KEY,
+    nom             TEXT NOT NULL DEFAULT '',
+    nom_cle         TEXT NOT NULL DEFAULT '',
+    statut          TEXT NOT NULL,
+    saisies         TEXT NOT NULL,
+    revenu_eligible REAL,
+    revenu_total    REAL,
+    eligible        INTEGER,
+    message         TEXT,
+    info            TEXT,
+    alerte          TEXT,
+    niveau_alerte   TEXT,
+    erreur          TEXT,
+    version_regles  TEXT,
+    cree_le         TEXT NOT NULL,
+    maj_le          TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_dossiers_nom_cle ON dossiers (nom_cle);
+CREATE INDEX IF NOT EXISTS ix_dossiers_statut ON dossiers (statut, maj_le);
+CREATE INDEX IF NOT EXISTS ix_dossiers_maj_le ON dossiers (maj_le);
+"""
+
+# PRAGMA user_version : 1 = nom_cle sans accents (cf. cle_nom)
+VERSION_SCHEMA = 2
+
+_COLONNES_RESULTAT = ("revenu_eligible", "revenu_total", "eligible", "message", "info", "alerte",
+                      "niveau_alerte", "erreur")
+
+
+@dataclass(frozen=True)
+class DossierStocke:
+    id: int
+    nom: str
+    statut: str
+    saisies: Dict[str, Any]
+    resultat: Optional[Resultat]
+    version_regles: Optional[str]
+    cree_le: str
+    maj_le: str
+
+
+@dataclass(frozen=True)
+class ApercuDossier:
+    """Ligne de liste : de quoi choisir un dossier sans décoder ses saisies."""
+    id: int
+    nom: str
+    statut: str
+    revenu_total: Optional[float]
+    maj_le: str
+
+    def libelle(self) -> str:
+        return f"{self.nom or '(sans nom)'} — {self.statut} — {self.maj_le[:16].replace('T', ' ')}"
+
+
+def cle_nom(nom: str) -> str:
+    """Forme de comparaison du nom (recherche par préfixe, insensible à la casse et aux accents)."""
+    cle = " ".join((nom or "").split()).casefold()
+    if cle.isascii():
+        return cle
+    return "".join(c for c in unicodedata.normalize("NFKD", cle) if not unicodedata.combining(c))
+
+
+# Abonné : appelé après chaque écriture validée avec (id, aperçu) ; aperçu None =
+# dossier supprimé ; id None = écriture en masse, tout relire.
+Abonne = Callable[[Optional[int], Optional["ApercuDossier"]], None]
+
+
+def _condition_statuts(statuts: Sequence[str]) -> Tuple[str, List[str]]:
+    """Clause WHERE : statut parmi `statuts`, ou ménage dont un emprunteur a l'un d'eux (saisies JSON)."""
+    marques = ",".join("?" * len(statuts))
+    emprunteur = "COALESCE(NULLIF(json_extract(saisies, '$.{}statut'), ''), ?) IN ({})"
+    return (f"(statut IN ({marques}) OR (statut = ? AND ({emprunteur.format('', marques)} "
+            f"OR {emprunteur.format('co_emprunteur.', marques)})))",
+            [*statuts, STATUT_MENAGE, DEFAUTS["statut"], *statuts, DEFAUTS["statut"], *statuts])
+
+
+def _maintenant() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+_COLONNES_DOSSIER = f"id, nom, statut, saisies, {', '.join(_COLONNES_RESULTAT)}, version_regles, cree_le, maj_le"
+
+
+def _dossier_stocke(ligne: Tuple[Any, ...]) -> DossierStocke:
+    id_, nom, statut, brut = ligne[:4]
+    r = ligne[4:4 + len(_COLONNES_RESULTAT)]
+    version, cree_le, maj_le = ligne[4 + len(_COLONNES_RESULTAT):]
+    resultat = None if r[0] is None else Resultat(
+        statut=statut, revenu_eligible=r[0], revenu_total=r[1], eligible=bool(r[2]), message=r[3] or "",
+        info=r[4] or "", alerte=r[5], niveau_alerte=r[6] or "warning", erreur=r[7],
+    )
+    return DossierStocke(id_, nom, statut, json.loads(brut), resultat, version, cree_le, maj_le)
+
+
+def _ligne_resultat(res: Optional[Resultat]) -> Tuple[Any, ...]:
+    if res is None:
+        return (None,) * len(_COLONNES_RESULTAT)
+    return (res.revenu_eligible, res.revenu_total, int(res.eligible), res.message, res.info, res.alerte,
+            res.niveau_alerte, res.erreur)
+
+
+class DepotDossiers:
+    """Dépôt SQLite ; méthodes sûres entre threads (une connexion du pool par appel)."""
+
+    def __init__(self, chemin: str = CHEMIN_DEFAUT, taille_pool: int = 4):
+        self.chemin = chemin
+        self._pool: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._toutes: List[sqlite3.Connection] = []
+        self._verrou = threading.Lock()
+        self._abonnes: List[Abonne] = []
+        for _ in range(max(1, taille_pool)):
+            self._pool.put(self._ouvrir())
+        with self.connexion() as cx:
+            cx.executescript(_SCHEMA)
+        self._migrer()
+
+    def _migrer(self) -> None:
+        with self.transaction() as cx:
+            version = cx.execute("PRAGMA user_version").fetchone()[0]
+            if version < 1:  # nom_cle calculé avant le retrait des accents
+                lignes = cx.execute("SELECT id, nom FROM dossiers").fetchall()
+                cx.executemany("UPDATE dossiers SET nom_cle=? WHERE id=?", ((cle_nom(n), i) for i, n in lignes))
+            if version < 2:  # ménages enregistrés avec le statut de l'emprunteur 1
+                lignes = cx.execute("SELECT id, saisies FROM dossiers WHERE saisies LIKE '%co_emprunteur%'").fetchall()
+                cx.executemany("UPDATE dossiers SET statut=? WHERE id=?",
+                               ((STATUT_MENAGE, i) for i, brut in lignes if est_menage(json.loads(brut))))
+            if version < VERSION_SCHEMA:
+                cx.execute(f"PRAGMA user_version={VERSION_SCHEMA}")
+
+    def _ouvrir(self) -> sqlite3.Connection:
+        # isolation_level=None : transactions explicites (BEGIN IMMEDIATE pour les écritures)
+        cx = sqlite3.connect(self.chemin, timeout=5.0, isolation_level=None, check_same_thread=False)
+        cx.execute("PRAGMA journal_mode=WAL")
+        cx.execute("PRAGMA synchronous=NORMAL")  # WAL : durable au checkpoint, sans fsync par écriture
+        cx.execute("PRAGMA busy_timeout=5000")
+        cx.execute("PRAGMA temp_store=MEMORY")
+        with self._verrou:
+            self._toutes.append(cx)
+        return cx
+
+    @contextmanager
+    def connexion(self) -> Iterator[sqlite3.Connection]:
+        cx = self._pool.get()
+        try:
+            yield cx
+        finally:
+            self._pool.put(cx)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        with self.connexion() as cx:
+            cx.execute("BEGIN IMMEDIATE")
+            try:
+                yield cx
+            except BaseException:
+                cx.execute("ROLLBACK")
+                raise
+            cx.execute("COMMIT")
+
+    def abonner(self, abonne: Abonne) -> None:
+        with self._verrou:
+            self._abonnes.append(abonne)
+
+    def _notifier(self, id_dossier: Optional[int], apercu: Optional[ApercuDossier]) -> None:
+        for abonne in list(self._abonnes):
+            abonne(id_dossier, apercu)
+
+    # -----------------------------
+    # Écriture
+    # -----------------------------
+    def enregistrer(self, saisies: Mapping[str, Any], resultat: Optional[Resultat] = None,
+                    id_dossier: Optional[int] = None, version_regles: Optional[str] = None) -> int:
+        """Crée (id_dossier=None) ou remplace un dossier ; renvoie son id."""
+        nom = str(saisies.get("nom") or "")
+        statut = str(statut_enregistre(saisies) or (resultat.statut if resultat else "") or "CDI")
+        brut = json.dumps(dict(saisies), ensure_ascii=False, separators=(",", ":"))
+        maintenant = _maintenant()
+        cree = None
+        with self.transaction() as cx:
+            if id_dossier is not None:
+                cur = cx.execute(
+                    f"UPDATE dossiers SET nom=?, nom_cle=?, statut=?, saisies=?, "
+                    f"{', '.join(c + '=?' for c in _COLONNES_RESULTAT)}, version_regles=?, maj_le=? WHERE id=?",
+                    (nom, cle_nom(nom), statut, brut, *_ligne_resultat(resultat), version_regles, maintenant,
+                     id_dossier),
+                )
+                if cur.rowcount:
+                    cree = id_dossier
+            if cree is None:
+                cur = cx.execute(
+                    f"INSERT INTO dossiers (id, nom, nom_cle, statut, saisies, {', '.join(_COLONNES_RESULTAT)}, "
+                    f"version_regles, cree_le, maj_le) VALUES (?, ?, ?, ?, ?, {', '.join('?' * len(_COLONNES_RESULTAT))}, ?, ?, ?)",
+                    (id_dossier, nom, cle_nom(nom), statut, brut, *_ligne_resultat(resultat), version_regles,
+                     maintenant, maintenant),
+                )
+                cree = int(cur.lastrowid)
+        self._notifier(cree, ApercuDossier(cree, nom, statut, resultat.revenu_total if resultat else None, maintenant))
+        return cree
+
+    def enregistrer_lot(self, dossiers: Iterable[Tuple[Mapping[str, Any], Optional[Resultat]]],
+                        version_regles: Optional[str] = None) -> int:
+        """Insère des dossiers en une transaction (import, amorçage) ; renvoie le nombre inséré."""
+        maintenant = _maintenant()
+        lignes = (
+            (str(s.get("nom") or ""), cle_nom(str(s.get("nom") or "")), str(statut_enregistre(s) or "CDI"),
+             json.dumps(dict(s), ensure_ascii=False, separators=(",", ":")), *_ligne_resultat(r),
+             version_regles, maintenant, maintenant)
+            for s, r in dossiers
+        )
+        with self.transaction() as cx:
+            avant = cx.total_changes
+            cx.executemany(
+                f"INSERT INTO dossiers (nom, nom_cle, statut, saisies, {', '.join(_COLONNES_RESULTAT)}, "
+                f"version_regles, cree_le, maj_le) VALUES ({', '.join('?' * (len(_COLONNES_RESULTAT) + 7))})",
+                lignes,
+            )
+            nombre = cx.total_changes - avant
+        self._notifier(None, None)
+        return nombre
+
+    def supprimer(self, id_dossier: int) -> bool:
+        with self.transaction() as cx:
+            supprime = cx.execute("DELETE FROM dossiers WHERE id=?", (id_dossier,)).rowcount > 0
+        if supprime:
+            self._notifier(id_dossier, None)
+        return supprime
+
+    # -----------------------------
+    # Lecture
+    # -----------------------------
+    def charger(self, id_dossier: int) -> Optional[DossierStocke]:
+        with self.connexion() as cx:
+            ligne = cx.execute(f"SELECT {_COLONNES_DOSSIER} FROM dossiers WHERE id=?", (id_dossier,)).fetchone()
+        return None if ligne is None else _dossier_stocke(ligne)
+
+    def dossiers(self, statut: Optional[str] = None) -> Iterator[DossierStocke]:
+        """Tous les dossiers complets (archivage), par ordre d'id et par paquets."""
+        dernier = 0
+        while True:
+            with self.connexion() as cx:
+                lignes = cx.execute(
+                    f"SELECT {_COLONNES_DOSSIER} FROM dossiers WHERE id > ?" + (" AND statut = ?" if statut else "")
+                    + " ORDER BY id LIMIT 1000", (dernier, statut) if statut else (dernier,),
+                ).fetchall()
+            if not lignes:
+                return
+            for ligne in lignes:
+                yield _dossier_stocke(ligne)
+            dernier = lignes[-1][0]
+
+    def lister(self, nom_prefixe: str = "", statut: Optional[str] = None, limite: int = 50) -> List[ApercuDossier]:
+        """Derniers dossiers modifiés, filtrés par début de nom et/ou statut (index, pas de scan)."""
+        conditions, params = [], []
+        cle = cle_nom(nom_prefixe)
+        if cle:
+            # intervalle sur l'index plutôt que LIKE (dont l'optimisation dépend de la collation)
+            conditions.append("nom_cle >= ? AND nom_cle < ?")
+            params += [cle, cle + "\U0010ffff"]
+        if statut:
+            conditions.append("statut = ?")
+            params.append(statut)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        ordre = "nom_cle" if cle else "maj_le DESC"
+        with self.connexion() as cx:
+            lignes = cx.execute(
+                f"SELECT id, nom, statut, revenu_total, maj_le FROM dossiers {where} ORDER BY {ordre} LIMIT ?",
+                (*params, limite),
+            ).fetchall()
+        return [ApercuDossier(*l) for l in lignes]
+
+    def saisies(self, statut: Optional[str] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """(id, saisies) de tous les dossiers (export groupé), par paquets pour borner la mémoire."""
+        dernier = 0
+        while True:
+            with self.connexion() as cx:
+                lignes = cx.execute(
+                    "SELECT id, saisies FROM dossiers WHERE id > ?" + (" AND statut = ?" if statut else "")
+                    + " ORDER BY id LIMIT 1000", (dernier, statut) if statut else (dernier,),
+                ).fetchall()
+            if not lignes:
+                return
+            for id_, brut in lignes:
+                yield id_, json.loads(brut)
+            dernier = lignes[-1][0]
+
+    def tranches(self, statuts: Sequence[str], taille: int = 5000) -> List[Tuple[int, int]]:
+        """Intervalles d'ids (premier, dernier) de `taille` dossiers aux statuts donnés, pour un traitement parallèle.
+
+        Un ménage en fait partie dès qu'un de ses emprunteurs a l'un de ces statuts.
+        """
+        if not statuts:
+            return []
+        condition, params = _condition_statuts(statuts)
+        with self.connexion() as cx:
+            ids = [i for i, in cx.execute(f"SELECT id FROM dossiers WHERE {condition} ORDER BY id", params)]
+        return [(ids[k], ids[min(k + taille, len(ids)) - 1]) for k in range(0, len(ids), taille)]
+
+    def saisies_tranche(self, statuts: Sequence[str], premier: int, dernier: int) -> List[Tuple[int, Dict[str, Any]]]:
+        """(id, saisies) des dossiers d'une tranche (cf. tranches)."""
+        condition, params = _condition_statuts(statuts)
+        with self.connexion() as cx:
+            lignes = cx.execute(
+                f"SELECT id, saisies FROM dossiers WHERE id BETWEEN ? AND ? AND {condition} ORDER BY id",
+                (premier, dernier, *params),
+            ).fetchall()
+        return [(id_, json.loads(brut)) for id_, brut in lignes]
+
+    def apercus(self) -> Iterator[ApercuDossier]:
+        """Tous les dossiers en lignes de liste (construction d'un index), par paquets."""
+        dernier = 0
+        while True:
+            with self.connexion() as cx:
+                lignes = cx.execute(
+                    "SELECT id, nom, statut, revenu_total, maj_le FROM dossiers WHERE id > ? ORDER BY id LIMIT 5000",
+                    (dernier,),
+                ).fetchall()
+            if not lignes:
+                return
+            for ligne in lignes:
+                yield ApercuDossier(*ligne)
+            dernier = lignes[-1][0]
+
+    def resultats(self) -> List[Tuple[str, float, float, int, int, Optional[str]]]:
+        """(statut, revenu éligible, revenu total, éligible, en erreur, alerte) des dossiers calculés (rapport de portefeuille)."""
+        with self.connexion() as cx:
+            return cx.execute(
+                "SELECT statut, revenu_eligible, revenu_total, eligible, erreur IS NOT NULL, alerte FROM dossiers "
+                "WHERE revenu_total IS NOT NULL"
+            ).fetchall()
+
+    def compter(self, statut: Optional[str] = None) -> int:
+        with self.connexion() as cx:
+            if statut:
+                return cx.execute("SELECT COUNT(*) FROM dossiers WHERE statut=?", (statut,)).fetchone()[0]
+            return cx.execute("SELECT COUNT(*) FROM dossiers").fetchone()[0]
+
+    def fermer(self) -> None:
+        with self._verrou:
+            for cx in self._toutes:
+                cx.close()
+            self._toutes.clear()
+
+
+_depot: Optional[DepotDossiers] = None
+_verrou_depot = threading.Lock()
+
+
+def depot() -> DepotDossiers:
+    """Dépôt du processus, ouvert au premier usage (COACH_DB, COACH_DB_POOL)."""
+    global _depot
+    with _verrou_depot:
+        if _depot is None:
+            _depot = DepotDossiers(CHEMIN_DEFAUT, int(os.environ.get("COACH_DB_POOL", 4)))
+        return _depot
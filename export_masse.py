@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+# export_masse.py — Export groupé des PDF (résumé + check-list) pour tous les dossiers actifs
+#
+# Usage :
+#   python export_masse.py dossiers.jsonl --zip exports_fin_de_mois.zip
+#   python export_masse.py dossiers.csv --repertoire exports/ --workers 8
+#   python export_masse.py dossiers.csv --zip exports.zip --rejets rejets.csv
+#
+# La génération est répartie sur un pool de processus (fpdf2 est pur Python,
+# donc limité par le GIL en threads) ; les PDF terminés sont écrits au fil de
+# l'eau dans le ZIP ou le répertoire, avec un nombre borné de paquets en vol.
+# Un ménage (co_emprunteur) a un résumé aux revenus additionnés et la
+# check-list fusionnée des deux statuts. Un dossier illisible ou à la saisie
+# refusée n'a pas de PDF : il est listé avec son numéro de ligne et le motif
+# (--rejets, sinon sur la sortie d'erreur ; rejets.csv dans le ZIP de la page).
+
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, wait
+from datetime import datetime
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from exports_pdf import nom_fichier_checklist, nom_fichier_resume, pdf_checklist, pdf_resume, slug
+from menage import emprunteurs, evaluer_saisies
+from moteur_revenus import DEFAUTS
+from referentiel import DOCS_PAR_STATUT, docs_menage
+from score_portefeuille import (COLONNES_REJETS, _Ecrivain, _format, _milliers, _objet, _rejet, lire_dossiers,
+                                par_paquets)
+
+Tache = Tuple[str, str, Dict[str, Any]]  # (chemin dans l'archive, type de PDF, arguments)
+Progression = Callable[[int], None]
+Rejet = Callable[[int, str, Dict[str, Any]], None]  # (numéro de ligne, motif, saisies d'origine)
+
+
+# -----------------------------
+# Préparation des tâches
+# -----------------------------
+def _actif(dossier: Dict[str, Any]) -> bool:
+    v = dossier.get("actif")
+    if v is None or v == "":
+        return True
+    if isinstance(v, str):
+        return v.strip().lower() not in ("0", "false", "faux", "non", "n", "no")
+    return bool(v)
+
+
+def _docs_recus(dossier: Dict[str, Any]) -> set:
+    v = dossier.get("docs_recus") or []
+    if isinstance(v, str):
+        v = [x.strip() for x in v.split(";")]
+    return {x for x in v if x}
+
+
+def taches(dossiers: Iterable[Tuple[int, Dict[str, Any]]], genere_le: Optional[datetime] = None,
+           rejet: Optional[Rejet] = None) -> Iterator[Tache]:
+    """Deux tâches (résumé, check-list) par dossier actif ; un dossier invalide est passé à `rejet` avec son motif."""
+    genere_le = genere_le or datetime.now()
+    for num, d in dossiers:
+        d = _objet(d)
+        if "_invalide" in d:
+            if rejet is not None:
+                rejet(num, d["_invalide"], d)
+            continue
+        if not _actif(d):
+            continue
+        try:
+            res = evaluer_saisies(d)
+            statuts = [e.get("statut") or DEFAUTS["statut"] for e in emprunteurs(d)]
+        except (ArithmeticError, TypeError, ValueError) as e:  # comme score_portefeuille : la ligne, pas l'export
+            if rejet is not None:
+                rejet(num, f"Saisie invalide : {e}", d)
+            continue
+        nom = d.get("nom") or ""
+        prefixe = f"{num:06d}_{slug(nom)}"
+        yield (f"{prefixe}/{nom_fichier_resume(nom)}", "resume", {
+            "nom": nom,
+            "statut": res.statut,
+            "revenu_elig": res.revenu_eligible,
+            "revenu_total": res.revenu_total,
+            "notes": d.get("notes") or "",
+            "genere_le": genere_le,
+        })
+        recus = _docs_recus(d)
+        yield (f"{prefixe}/{nom_fichier_checklist(res.statut)}", "checklist", {
+            "statut": res.statut,
+            "checked": _checklist(statuts, recus),
+            "remarque": d.get("remarque") or "",
+            "genere_le": genere_le,
+        })
+
+
+def _checklist(statuts: List[str], recus: set) -> List[Tuple[str, bool]]:
+    if len(statuts) == 1:
+        return [(doc, doc in recus) for doc in DOCS_PAR_STATUT.get(statuts[0], [])]
+    # ménage : check-list fusionnée, comme sur la page Check-lists
+    return [(f"{doc} — " + ("les deux emprunteurs" if len(qui) == 2 else f"emprunteur {qui[0]}"), doc in recus)
+            for doc, qui in docs_menage(statuts)]
+
+
+_CONSTRUCTEURS = {"resume": pdf_resume, "checklist": pdf_checklist}
+
+
+def _rendre_paquet(paquet: List[Tache]) -> List[Tuple[str, bytes]]:
+    # exécuté dans un processus du pool : un paquet = plusieurs PDF pour amortir l'IPC
+    return [(chemin, _CONSTRUCTEURS[type_pdf](**args)) for chemin, type_pdf, args in paquet]
+
+
+# -----------------------------
+# Génération parallèle
+# -----------------------------
+def generer(taches_pdf: Iterable[Tache], workers: Optional[int] = None, taille_paquet: int = 8,
+            pool: Optional[Executor] = None) -> Iterator[Tuple[str, bytes]]:
+    """Produit (chemin, octets) dans l'ordre de fin de génération.
+
+    workers=1 sans `pool` : tout dans le processus courant. Sinon au plus
+    2 × workers paquets en vol, pour que la mémoire reste bornée. Avec `pool`
+    (celui de file_exports, partagé par les jobs), les paquets y sont soumis
+    et le pool n'est pas arrêté ; sans, un pool de `workers` processus est
+    créé pour l'appel.
+    """
+    workers = workers or os.cpu_count() or 1
+    paquets = par_paquets(taches_pdf, taille_paquet)
+    if pool is not None:
+        yield from _generer_pool(pool, paquets, 2 * workers)
+    elif workers == 1:
+        for paquet in paquets:
+            yield from _rendre_paquet(paquet)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            yield from _generer_pool(ex, paquets, 2 * workers)
+
+
+def _generer_pool(ex: Executor, paquets: Iterable[List[Tache]], en_vol_max: int) -> Iterator[Tuple[str, bytes]]:
+    en_vol = set()
+    for paquet in paquets:
+        en_vol.add(ex.submit(_rendre_paquet, paquet))
+        if len(en_vol) >= en_vol_max:
+            termines, en_vol = wait(en_vol, return_when=FIRST_COMPLETED)
+            for f in termines:
+                yield from f.result()
+    while en_vol:
+        termines, en_vol = wait(en_vol, return_when=FIRST_COMPLETED)
+        for f in termines:
+            yield from f.result()
+
+
+def fichier_rejets(rejets: List[Tuple[int, str, Dict[str, Any]]]) -> Tuple[str, bytes]:
+    """rejets.csv (colonnes de score_portefeuille : ligne, motif, dossier), à joindre à l'archive."""
+    tampon = io.StringIO()
+    w = csv.DictWriter(tampon, fieldnames=COLONNES_REJETS)
+    w.writeheader()
+    for num, motif, d in rejets:
+        w.writerow(_rejet(num, motif, d, "csv"))
+    return "rejets.csv", tampon.getvalue().encode("utf-8-sig")
+
+
+def ecrire_zip(fichiers: Iterable[Tuple[str, bytes]], destination: Union[str, IO[bytes]],
+               progression: Optional[Progression] = None) -> int:
+    """Écrit les PDF dans un ZIP (chemin ou flux binaire) au fur et à mesure ; renvoie le nombre de fichiers."""
+    nb = 0
+    # les flux de pages fpdf2 sont déjà compressés : ZIP_STORED évite de recompresser pour rien
+    with zipfile.ZipFile(destination, "w", compression=zipfile.ZIP_STORED) as z:
+        for chemin, data in fichiers:
+            z.writestr(chemin, data)
+            nb += 1
+            if progression:
+                progression(nb)
+    return nb
+
+
+def ecrire_repertoire(fichiers: Iterable[Tuple[str, bytes]], repertoire: str,
+                      progression: Optional[Progression] = None) -> int:
+    nb = 0
+    racine = os.path.realpath(repertoire)
+    for chemin, data in fichiers:
+        cible = os.path.realpath(os.path.join(racine, chemin))
+        if os.path.commonpath([racine, cible]) != racine:  # noms déjà nettoyés (slug) : garde-fou
+            raise ValueError(f"Chemin hors du répertoire de sortie : {chemin!r}")
+        os.makedirs(os.path.dirname(cible), exist_ok=True)
+        with open(cible, "wb") as f:
+            f.write(data)
+        nb += 1
+        if progression:
+            progression(nb)
+    return nb
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Export groupé des PDF (résumé + check-list) des dossiers actifs.")
+    p.add_argument("entree", help="Fichier de dossiers (.csv ou .jsonl)")
+    cible = p.add_mutually_exclusive_group(required=True)
+    cible.add_argument("--zip", help="Archive ZIP de sortie")
+    cible.add_argument("--repertoire", help="Répertoire de sortie")
+    p.add_argument("--workers", type=int, default=None, help="Processus de génération (défaut : nb de cœurs)")
+    p.add_argument("--paquet", type=int, default=8, help="PDF par tâche envoyée au pool (défaut : 8)")
+    p.add_argument("--rejets", help="Fichier des dossiers sans PDF (.csv ou .jsonl), avec le motif ; "
+                                    "défaut : sortie d'erreur")
+    args = p.parse_args(argv)
+
+    debut = time.perf_counter()
+
+    def progression(nb: int) -> None:
+        if nb % 50 == 0:
+            ecoule = time.perf_counter() - debut
+            print(f"\r{nb} PDF — {_milliers(nb / ecoule)} PDF/s", end="", file=sys.stderr, flush=True)
+
+    fmt_rejets = _format(args.rejets) if args.rejets else None
+    rej = _Ecrivain(args.rejets, fmt_rejets, COLONNES_REJETS) if args.rejets else None
+    nb_rejets = 0
+
+    def rejet(num: int, motif: str, d: Dict[str, Any]) -> None:
+        nonlocal nb_rejets
+        nb_rejets += 1
+        if rej is not None:
+            rej.ecrire(_rejet(num, motif, d, fmt_rejets))
+        else:
+            print(f"\rligne {num} : {motif}", file=sys.stderr)
+
+    try:
+        fichiers = generer(taches(lire_dossiers(args.entree), rejet=rejet), args.workers, args.paquet)
+        if args.zip:
+            nb = ecrire_zip(fichiers, args.zip, progression)
+        else:
+            nb = ecrire_repertoire(fichiers, args.repertoire, progression)
+    finally:
+        if rej is not None:
+            rej.fermer()
+    ecoule = time.perf_counter() - debut
+    print(f"\r{nb} PDF en {ecoule:.2f} s ({_milliers(nb / ecoule if ecoule else 0)} PDF/s), "
+          f"{nb_rejets} dossier(s) rejeté(s).", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
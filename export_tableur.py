@@ -0,0 +1,371 @@
+# -*- coding: utf-8 -*-
+# export_tableur.py — Tableur du portefeuille scoré (CSV / XLSX) écrit en flux
+#
+# Usage :
+#   python export_tableur.py portefeuille.xlsx                     # dossiers enregistrés (dépôt)
+#   python export_tableur.py portefeuille.csv --statut CDI
+#   python export_tableur.py portefeuille.xlsx --entree dossiers.jsonl
+#   python export_tableur.py - --format csv --entree dossiers.csv > portefeuille.csv
+#
+# Une ligne par dossier, évaluée comme sur la page Dossier client : statut,
+# revenu éligible, revenu total retenu, règle appliquée, alerte d'antériorité
+# (période d'essai, mois d'activité, saisons…) et motif de rejet d'une saisie
+# invalide ; un ménage a une ligne (statuts joints, revenus additionnés). Les
+# dossiers sont évalués par paquets (moteur_revenus.evaluer_lot)
+# et chaque paquet est écrit tout de suite dans la sortie (fichier ou flux
+# binaire non « seekable ») : la mémoire ne dépend que de la taille du paquet.
+#
+# Le XLSX est écrit à la main (zipfile + XML, chaînes en ligne, sans
+# openpyxl) : la feuille est compressée au fil de l'eau, jamais construite en
+# mémoire. Au-delà de 1 048 576 lignes, la suite passe sur une nouvelle feuille.
+
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import math
+import re
+import sys
+import time
+import zipfile
+from functools import lru_cache
+from operator import itemgetter
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from menage import statut_enregistre
+from score_portefeuille import _evaluer_paquet, _milliers, lire_dossiers, par_paquets
+
+COLONNES = ["ligne", "nom", "statut", "revenu_eligible", "revenu_total", "eligible", "message", "alerte", "rejet"]
+ENTETES = {
+    "ligne": "Réf.",
+    "nom": "Nom",
+    "statut": "Statut",
+    "revenu_eligible": "Revenu éligible (mensuel)",
+    "revenu_total": "Revenu total retenu",
+    "eligible": "Éligible",
+    "message": "Règle appliquée",
+    "alerte": "Alerte d'antériorité",
+    "rejet": "Saisie incomplète ou invalide",
+}
+LARGEURS = {"ligne": 9, "nom": 28, "statut": 16, "revenu_eligible": 14, "revenu_total": 14, "eligible": 9,
+            "message": 60, "alerte": 50, "rejet": 40}
+FORMATS = {"xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "csv": "text/csv"}
+
+LIGNES_MAX_FEUILLE = 1_048_576      # limite Excel, en-tête compris
+OCTETS_MAX_FEUILLE = 1_500_000_000  # reste sous 2 Gio non compressés (pas de ZIP64 pour Excel)
+
+Progression = Callable[[int], None]
+_VIDE = dict.fromkeys(COLONNES)
+
+
+# -----------------------------
+# Lignes du tableur
+# -----------------------------
+def lignes_scorees(dossiers: Iterable[Tuple[int, Dict[str, Any]]], paquet: int = 5000) -> Iterator[List[Dict[str, Any]]]:
+    """Paquets de lignes du tableur ; les saisies invalides restent dans l'export, avec leur motif."""
+    for lot in par_paquets(dossiers, paquet):
+        lignes = []
+        for num, d, res, motif in _evaluer_paquet(lot):
+            if res is None:
+                lignes.append({**_VIDE, "ligne": num, "nom": d.get("nom", ""), "statut": statut_enregistre(d) or "",
+                               "rejet": motif})
+            else:
+                lignes.append({
+                    "ligne": num,
+                    "nom": d.get("nom", ""),
+                    "statut": res.statut,
+                    "revenu_eligible": res.revenu_eligible,
+                    "revenu_total": res.revenu_total,
+                    "eligible": res.eligible,
+                    "message": res.message,
+                    "alerte": res.alerte,
+                    "rejet": None,
+                })
+        lignes.sort(key=itemgetter("ligne"))  # _evaluer_paquet sort les lignes illisibles en tête de paquet
+        yield lignes
+
+
+def format_sortie(chemin: str, forcer: Optional[str] = None) -> str:
+    if forcer:
+        return forcer
+    return "xlsx" if chemin.lower().endswith(".xlsx") else "csv"
+
+
+# -----------------------------
+# CSV
+# -----------------------------
+# début de cellule qu'un tableur évaluerait comme une formule (nom saisi "=HYPERLINK(…)", etc.)
+_FORMULE = ("=", "+", "-", "@", "\t", "\r")
+_TEXTES = ("nom", "statut", "message", "alerte", "rejet")
+
+
+def ecrire_csv(paquets: Iterable[List[Dict[str, Any]]], sortie: IO[bytes],
+               progression: Optional[Progression] = None) -> int:
+    """CSV UTF-8 avec BOM (accents lus correctement par Excel), un paquet écrit à la fois ; renvoie le nombre de lignes.
+
+    Les lignes portent toutes les COLONNES (cf. lignes_scorees). Un texte
+    commençant par =, +, -, @ est préfixé d'une apostrophe : le tableur
+    l'affiche sans l'exécuter (le XLSX, en chaînes en ligne, n'en a pas besoin).
+    """
+    valeurs = itemgetter(*COLONNES)
+    i_eligible = COLONNES.index("eligible")
+    i_textes = [COLONNES.index(c) for c in _TEXTES]
+    tampon = io.StringIO()
+    w = csv.writer(tampon)  # None -> cellule vide
+    w.writerow([ENTETES[c] for c in COLONNES])
+    sortie.write(tampon.getvalue().encode("utf-8-sig"))
+    nb = 0
+    for lignes in paquets:
+        tampon.seek(0)
+        tampon.truncate()
+        for ligne in lignes:
+            row = list(valeurs(ligne))
+            if row[i_eligible] is not None:
+                row[i_eligible] = "oui" if row[i_eligible] else "non"
+            for i in i_textes:
+                if isinstance(row[i], str) and row[i].startswith(_FORMULE):
+                    row[i] = "'" + row[i]
+            w.writerow(row)
+        sortie.write(tampon.getvalue().encode("utf-8"))
+        nb += len(lignes)
+        if progression is not None:
+            progression(nb)
+    return nb
+
+
+# -----------------------------
+# XLSX (SpreadsheetML minimal)
+# -----------------------------
+_XML = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+_NS = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+_NS_R = 'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"'
+_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_CT_FEUILLE = "application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"
+
+# styles : 0 = défaut, 1 = en-tête en gras, 2 = montant "# ##0,00"
+_STYLES = (_XML + f'<styleSheet {_NS}>'
+           '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+           '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+           '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+           '<fill><patternFill patternType="gray125"/></fill></fills>'
+           '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+           '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+           '<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+           '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+           '<xf numFmtId="4" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+           '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+           '</styleSheet>')
+
+# caractères interdits en XML 1.0 (une saisie collée peut en contenir)
+_INTERDITS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+
+def _lettre(i: int) -> str:
+    s = ""
+    i += 1
+    while i:
+        i, r = divmod(i - 1, 26)
+        s = chr(65 + r) + s
+    return s
+
+
+_LETTRES = [_lettre(i) for i in range(len(COLONNES))]
+
+
+def _texte(v: str) -> str:
+    v = _INTERDITS.sub("", v[:32767])  # longueur maximale d'une cellule Excel
+    return f'<is><t xml:space="preserve">{escape(v)}</t></is>'
+
+
+# statut, règle, alerte, motif : quelques dizaines de textes distincts sur tout le portefeuille
+_texte_frequent = lru_cache(maxsize=4096)(_texte)
+
+
+def _cellule(ref: str, v: Any, style: int = 0) -> str:
+    s = f' s="{style}"' if style else ""
+    if v is None or v == "":
+        return ""
+    if isinstance(v, bool):
+        return f'<c r="{ref}" t="b"{s}><v>{int(v)}</v></c>'
+    if isinstance(v, (int, float)):
+        if isinstance(v, float) and not math.isfinite(v):
+            return ""
+        return f'<c r="{ref}"{s}><v>{v}</v></c>'
+    return f'<c r="{ref}" t="inlineStr"{s}>{_texte(str(v))}</c>'
+
+
+def _montant(ref: str, v: Any) -> str:
+    if not isinstance(v, float) or not math.isfinite(v):
+        return _cellule(ref, v, 2)
+    return f'<c r="{ref}" s="2"><v>{v}</v></c>'
+
+
+def _booleen(ref: str, v: Any) -> str:
+    return "" if v is None else f'<c r="{ref}" t="b"><v>{1 if v else 0}</v></c>'
+
+
+def _chaine(ref: str, v: Any) -> str:
+    return f'<c r="{ref}" t="inlineStr">{_texte(v)}</c>' if v and isinstance(v, str) else _cellule(ref, v)
+
+
+def _chaine_frequente(ref: str, v: Any) -> str:
+    return f'<c r="{ref}" t="inlineStr">{_texte_frequent(v)}</c>' if v and isinstance(v, str) else _cellule(ref, v)
+
+
+# une fonction par colonne (pas de test de type générique par cellule : c'est le coût dominant)
+_ECRITURE = {"ligne": _cellule, "nom": _chaine, "revenu_eligible": _montant, "revenu_total": _montant,
+             "eligible": _booleen}
+_CELLULES = [(lettre, c, _ECRITURE.get(c, _chaine_frequente)) for lettre, c in zip(_LETTRES, COLONNES)]
+
+
+def _ligne_xml(num: int, ligne: Dict[str, Any]) -> str:
+    return f'<row r="{num}">' + "".join([f(f"{lettre}{num}", ligne[c]) for lettre, c, f in _CELLULES]) + "</row>"
+
+
+_ENTETE_XML = '<row r="1">' + "".join(_cellule(f"{lettre}1", ENTETES[c], 1) for lettre, c in zip(_LETTRES, COLONNES)) + "</row>"
+
+
+_DEBUT_FEUILLE = (_XML + f'<worksheet {_NS} {_NS_R}>'
+                  '<sheetViews><sheetView workbookViewId="0"><pane ySplit="1" topLeftCell="A2" activePane="bottomLeft"'
+                  ' state="frozen"/></sheetView></sheetViews>'
+                  '<cols>' + "".join(f'<col min="{i + 1}" max="{i + 1}" width="{LARGEURS[c]}" customWidth="1"/>'
+                                     for i, c in enumerate(COLONNES)) + '</cols>'
+                  '<sheetData>' + _ENTETE_XML)
+
+
+class _Feuille:
+    """Une feuille en cours d'écriture dans l'archive (flux compressé, jamais en mémoire)."""
+
+    def __init__(self, archive: zipfile.ZipFile, numero: int):
+        self.numero = numero
+        self.f = archive.open(f"xl/worksheets/sheet{numero}.xml", "w")
+        self.lignes = 1
+        self.octets = self._ecrire(_DEBUT_FEUILLE)
+
+    def _ecrire(self, xml: str) -> int:
+        data = xml.encode("utf-8")
+        self.f.write(data)
+        return len(data)
+
+    def pleine(self) -> bool:
+        return self.lignes >= LIGNES_MAX_FEUILLE or self.octets >= OCTETS_MAX_FEUILLE
+
+    def ecrire(self, lignes: List[Dict[str, Any]]) -> None:
+        debut = self.lignes + 1
+        self.octets += self._ecrire("".join([_ligne_xml(debut + i, ligne) for i, ligne in enumerate(lignes)]))
+        self.lignes += len(lignes)
+
+    def fermer(self) -> None:
+        fin = _LETTRES[-1] + str(self.lignes)
+        self._ecrire(f'</sheetData><autoFilter ref="A1:{fin}"/></worksheet>')
+        self.f.close()
+
+
+def ecrire_xlsx(paquets: Iterable[List[Dict[str, Any]]], sortie: IO[bytes],
+                progression: Optional[Progression] = None, titre: str = "Portefeuille") -> int:
+    """Classeur XLSX écrit en flux dans `sortie` (fichier ou flux binaire) ; renvoie le nombre de lignes.
+
+    Les lignes portent toutes les COLONNES (cf. lignes_scorees).
+    """
+    nb = 0
+    with zipfile.ZipFile(sortie, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+        feuille = _Feuille(archive, 1)
+        feuilles = 1
+        try:
+            for lignes in paquets:
+                while lignes:
+                    if feuille.pleine():
+                        feuille.fermer()
+                        feuilles += 1
+                        feuille = _Feuille(archive, feuilles)
+                    place = LIGNES_MAX_FEUILLE - feuille.lignes
+                    feuille.ecrire(lignes[:place])
+                    nb += len(lignes[:place])
+                    lignes = lignes[place:]
+                if progression is not None:
+                    progression(nb)
+        finally:
+            feuille.fermer()  # sinon l'archive refuse de se fermer et masque l'erreur d'origine
+        for nom, xml in _parties(feuilles, titre):
+            archive.writestr(nom, xml)
+    return nb
+
+
+def _parties(feuilles: int, titre: str) -> List[Tuple[str, str]]:
+    """Parties fixes du classeur, écrites après les feuilles (leur nombre n'est connu qu'à la fin)."""
+    noms = [titre[:31] if feuilles == 1 else f"{titre[:27]} {i}" for i in range(1, feuilles + 1)]
+    return [
+        ("[Content_Types].xml", _XML + '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+         '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+         '<Default Extension="xml" ContentType="application/xml"/>'
+         '<Override PartName="/xl/workbook.xml" '
+         'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+         '<Override PartName="/xl/styles.xml" '
+         'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+         + "".join(f'<Override PartName="/xl/worksheets/sheet{i}.xml" ContentType="{_CT_FEUILLE}"/>'
+                   for i in range(1, feuilles + 1)) + '</Types>'),
+        ("_rels/.rels", _XML + '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+         f'<Relationship Id="rId1" Type="{_REL}/officeDocument" Target="xl/workbook.xml"/></Relationships>'),
+        ("xl/workbook.xml", _XML + f'<workbook {_NS} {_NS_R}><sheets>'
+         + "".join(f'<sheet name="{escape(nom)}" sheetId="{i}" r:id="rId{i}"/>' for i, nom in enumerate(noms, start=1))
+         + '</sheets></workbook>'),
+        ("xl/_rels/workbook.xml.rels", _XML
+         + '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+         + "".join(f'<Relationship Id="rId{i}" Type="{_REL}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+                   for i in range(1, feuilles + 1))
+         + f'<Relationship Id="rId{feuilles + 1}" Type="{_REL}/styles" Target="styles.xml"/></Relationships>'),
+        ("xl/styles.xml", _STYLES),
+    ]
+
+
+# -----------------------------
+# Export
+# -----------------------------
+def exporter(dossiers: Iterable[Tuple[int, Dict[str, Any]]], sortie: IO[bytes], fmt: str = "xlsx",
+             paquet: int = 5000, progression: Optional[Progression] = None) -> int:
+    """Score et écrit tout le portefeuille dans `sortie` (flux binaire ouvert) ; renvoie le nombre de lignes."""
+    ecrire = ecrire_xlsx if fmt == "xlsx" else ecrire_csv
+    return ecrire(lignes_scorees(dossiers, paquet), sortie, progression)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Tableur CSV / XLSX du portefeuille scoré (règles de la page Dossier client).")
+    p.add_argument("sortie", help="Fichier .csv ou .xlsx ('-' pour la sortie standard)")
+    p.add_argument("--entree", help="Fichier de dossiers (.csv ou .jsonl) ; défaut : dossiers enregistrés")
+    p.add_argument("--statut", help="Dossiers enregistrés de ce statut seulement (Ménage : dossiers à co-emprunteur)")
+    p.add_argument("--format", choices=list(FORMATS), help="Forcer le format de sortie")
+    p.add_argument("--paquet", type=int, default=5000, help="Taille des paquets évalués et écrits (défaut : 5000)")
+    p.add_argument("-q", "--silencieux", action="store_true", help="Pas d'affichage de progression")
+    args = p.parse_args(argv)
+
+    if args.entree:
+        dossiers = lire_dossiers(args.entree)
+    else:
+        from depot_dossiers import depot
+        dossiers = depot().saisies(args.statut)
+    fmt = format_sortie(args.sortie, args.format)
+
+    debut = time.perf_counter()
+
+    def progression(nb: int) -> None:
+        if not args.silencieux:
+            ecoule = time.perf_counter() - debut
+            print(f"\r{nb} lignes — {_milliers(nb / ecoule)} lignes/s", end="", file=sys.stderr, flush=True)
+
+    if args.sortie == "-":
+        nb = exporter(dossiers, sys.stdout.buffer, fmt, args.paquet, progression)
+        sys.stdout.buffer.flush()
+    else:
+        with open(args.sortie, "wb") as f:
+            nb = exporter(dossiers, f, fmt, args.paquet, progression)
+    ecoule = time.perf_counter() - debut
+    if not args.silencieux:
+        print(file=sys.stderr)
+    print(f"{nb} lignes en {ecoule:.2f} s ({_milliers(nb / ecoule if ecoule else 0)} lignes/s).", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+# exports_pdf.py — Construction des PDF (résumé 1 page, check-list par statut)
+#
+# Sorti de render_exports pour être réutilisable hors Streamlit (export groupé,
+# process pool) : la classe PDF est définie une seule fois par processus.
+# Les PDF sont servis par un cache LRU partagé (cache_pdf.CACHE_PDF) dont la
+# clé est calculée sur les textes tels qu'écrits et l'horodatage par créneau.
+#
+# Police : DejaVu Sans embarquée (polices.py : noms accentués, "—", "€"…),
+# analysée et réduite une fois par processus. COACH_PDF_POLICE=helvetica (ou
+# aucune police trouvée) revient à la police core Helvetica, textes passés par safe().
+
+from __future__ import annotations
+
+import os
+import re
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from fpdf import FPDF, XPos, YPos
+
+import polices
+from cache_pdf import cle, creneau, depuis_env
+from metriques import chronometrer_fpdf
+
+TITRE_RESUME = "Coach Prêt Immo — Résumé dossier"
+TITRE_CHECKLIST = "Coach Prêt Immo — Check-list documents"
+
+CACHE_PDF = depuis_env()
+POLICE_UNICODE = os.environ.get("COACH_PDF_POLICE", "dejavu").lower() != "helvetica"
+
+
+# --- Helpers PDF ---
+def eur(x: float) -> str:
+    try:
+        return f"{float(x):,.2f} €".replace(",", " ")
+    except Exception:
+        return f"{x} €"
+
+
+def safe(txt: str) -> str:
+    """
+    Nettoie tout texte pour la police core Helvetica (Latin-1) :
+    - remplace les tirets longs par '-'
+    - supprime les caractères hors Latin-1 pour éviter FPDFUnicodeEncodingException
+    """
+    if txt is None:
+        txt = ""
+    txt = txt.replace("—", "-").replace("–", "-")
+    # supprime/ignore tout hors latin-1
+    return txt.encode("latin-1", "ignore").decode("latin-1")
+
+
+def police_unicode() -> bool:
+    return POLICE_UNICODE and polices.disponible()
+
+
+def texte(txt: str) -> str:
+    """Texte tel qu'il sera écrit dans le PDF : intact en police Unicode, passé par safe() en Helvetica."""
+    return (txt or "") if police_unicode() else safe(txt)
+
+
+class PDF(FPDF):
+    """Page A4 avec en-tête (titre + horodatage) et pied de page numéroté."""
+
+    def __init__(self, titre: str, genere_le: Optional[datetime] = None):
+        super().__init__()
+        self.titre = titre
+        self.genere_le = genere_le or datetime.now()
+        self.famille = polices.FAMILLE if police_unicode() and polices.ajouter_polices(self) else "Helvetica"
+
+    def t(self, txt: str) -> str:
+        return (txt or "") if self.famille != "Helvetica" else safe(txt)
+
+    def output(self, *args, **kwargs):
+        with polices.sortie_en_cache(self):
+            return super().output(*args, **kwargs)
+
+    def header(self):
+        self.set_font(self.famille, "B", 14)
+        self.cell(0, 10, self.t(self.titre), ln=1, align="C")
+        self.set_font(self.famille, "", 9)
+        self.cell(0, 6, self.t(self.genere_le.strftime("Généré le %d/%m/%Y à %H:%M")), ln=1, align="C")
+        self.ln(2)
+        self.set_draw_color(200, 200, 200)
+        y = self.get_y()
+        self.line(10, y, 200, y)
+        self.ln(5)
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font(self.famille, "I", 8)
+        self.cell(0, 10, self.t(f"Page {self.page_no()}"), align="C")
+
+
+def _nouveau_pdf(titre: str, genere_le: Optional[datetime]) -> PDF:
+    pdf = PDF(titre, genere_le)
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.add_page()
+    pdf.set_font(pdf.famille, "", 11)
+    return pdf
+
+
+def _bloc_notes(pdf: PDF, notes: str) -> None:
+    pdf.set_font(pdf.famille, "B", 12)
+    pdf.cell(0, 8, pdf.t("Notes"), ln=1)
+    pdf.set_font(pdf.famille, "", 11)
+    if (notes or "").strip():
+        pdf.multi_cell(0, 6, pdf.t(notes), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    else:
+        pdf.set_text_color(120, 120, 120)
+        pdf.cell(0, 6, pdf.t("(aucune)"), ln=1)
+        pdf.set_text_color(0, 0, 0)
+
+
+def cle_resume(nom: str, statut: str, revenu_elig: float, revenu_total: float, notes: str,
+               genere_le: datetime) -> str:
+    """Clé CACHE_PDF du résumé (calculable sans rendre, ex. avant d'envoyer le rendu à un processus)."""
+    return cle("resume", {
+        "nom": texte(nom or "-"),
+        "statut": texte(statut),
+        "revenu_elig": texte(eur(revenu_elig)),
+        "revenu_total": texte(eur(revenu_total)),
+        "notes": texte(notes) if (notes or "").strip() else "",
+        "police": police_unicode(),
+        "genere_le": creneau(genere_le, CACHE_PDF.granularite_s),
+    })
+
+
+def pdf_resume(nom: str, statut: str, revenu_elig: float, revenu_total: float, notes: str = "",
+               genere_le: Optional[datetime] = None) -> bytes:
+    """PDF « Résumé 1 page » d'un dossier (servi depuis CACHE_PDF si déjà rendu)."""
+    genere_le = genere_le or datetime.now()
+    return CACHE_PDF.obtenir(
+        cle_resume(nom, statut, revenu_elig, revenu_total, notes, genere_le),
+        lambda: _rendre_resume(nom, statut, revenu_elig, revenu_total, notes, genere_le),
+    )
+
+
+@chronometrer_fpdf
+def _rendre_resume(nom: str, statut: str, revenu_elig: float, revenu_total: float, notes: str,
+                   genere_le: datetime) -> bytes:
+    pdf = _nouveau_pdf(TITRE_RESUME, genere_le)
+
+    # Identité
+    pdf.set_font(pdf.famille, "B", 12)
+    pdf.cell(0, 8, pdf.t("Identité & statut"), ln=1)
+    pdf.set_font(pdf.famille, "", 11)
+    pdf.cell(60, 8, pdf.t("Nom et prénom :"), border=0)
+    pdf.cell(0, 8, pdf.t(nom or "-"), ln=1)
+    pdf.cell(60, 8, pdf.t("Statut professionnel :"), border=0)
+    pdf.cell(0, 8, pdf.t(statut), ln=1)
+    pdf.ln(4)
+
+    # Chiffres
+    pdf.set_font(pdf.famille, "B", 12)
+    pdf.cell(0, 8, pdf.t("Synthèse des revenus mensuels"), ln=1)
+    pdf.set_font(pdf.famille, "", 11)
+    pdf.cell(60, 8, pdf.t("Revenu éligible :"), border=0)
+    pdf.cell(0, 8, pdf.t(eur(revenu_elig)), ln=1)
+    pdf.cell(60, 8, pdf.t("Revenu total retenu :"), border=0)
+    pdf.cell(0, 8, pdf.t(eur(revenu_total)), ln=1)
+    pdf.ln(4)
+
+    _bloc_notes(pdf, notes)
+    return bytes(pdf.output())
+
+
+def pdf_checklist(statut: str, checked: Iterable[Tuple[str, bool]], remarque: str = "",
+                  genere_le: Optional[datetime] = None) -> bytes:
+    """PDF « Check-list par statut » ; `checked` = [(document, déjà récupéré ?), ...].
+
+    Même statut + mêmes cases cochées = même PDF pour tous les conseillers (CACHE_PDF).
+    """
+    genere_le = genere_le or datetime.now()
+    checked = [(doc, bool(ok)) for doc, ok in checked]
+    return CACHE_PDF.obtenir(cle_checklist(statut, checked, remarque, genere_le),
+                             lambda: _rendre_checklist(statut, checked, remarque, genere_le))
+
+
+def cle_checklist(statut: str, checked: Iterable[Tuple[str, bool]], remarque: str, genere_le: datetime) -> str:
+    """Clé CACHE_PDF de la check-list (cf. cle_resume)."""
+    return cle("checklist", {
+        "statut": texte(f"Statut : {statut}"),
+        "docs": [[texte(doc), bool(ok)] for doc, ok in checked],
+        "remarque": texte(remarque) if (remarque or "").strip() else "",
+        "police": police_unicode(),
+        "genere_le": creneau(genere_le, CACHE_PDF.granularite_s),
+    })
+
+
+@chronometrer_fpdf
+def _rendre_checklist(statut: str, checked: List[Tuple[str, bool]], remarque: str, genere_le: datetime) -> bytes:
+    pdf = _nouveau_pdf(TITRE_CHECKLIST, genere_le)
+
+    pdf.set_font(pdf.famille, "B", 12)
+    pdf.cell(0, 8, pdf.t(f"Statut : {statut}"), ln=1)
+    pdf.ln(2)
+    pdf.set_font(pdf.famille, "", 11)
+
+    for doc, ok in checked:
+        prefix = "[x] " if ok else "[ ] "
+        pdf.multi_cell(0, 6, pdf.t(prefix + doc), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+    pdf.ln(4)
+    _bloc_notes(pdf, remarque)
+    return bytes(pdf.output())
+
+
+def slug(txt: str, defaut: str = "client") -> str:
+    """Texte utilisable comme nom de fichier : ni séparateur de chemin, ni point (donc ni "..")."""
+    return re.sub(r"[^\w-]+", "_", txt or "").strip("_") or defaut
+
+
+def nom_fichier_resume(nom: str) -> str:
+    return f"resume_dossier_{slug(nom)}.pdf"
+
+
+def nom_fichier_checklist(statut: str) -> str:
+    return f"checklist_{slug(statut, 'statut')}.pdf"
@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+# extraction_pdf.py — Texte d'un PDF "texte" (bulletins, avis d'imposition), sans dépendance
+#
+# Usage :
+#   python extraction_pdf.py bulletin_mars.pdf            # affiche le texte, ligne par ligne
+#
+# Lecture minimale, bibliothèque standard seulement (zlib + re) : objets et
+# flux FlateDecode (y compris les flux d'objets PDF 1.5), polices de chaque
+# page avec leur CMap ToUnicode (polices CID des logiciels de paie, fpdf2 en
+# DejaVu) ou, à défaut, en WinAnsi ; opérateurs de texte Tj, TJ, ', ".
+# Les lignes sont reconstituées d'après la position verticale du texte et
+# produites au fil de la lecture (générateur). Un PDF scanné (images seules)
+# ne produit aucune ligne : il faut le saisir à la main.
+
+from __future__ import annotations
+
+import re
+import sys
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+_OBJET = re.compile(rb"(\d+)\s+(\d+)\s+obj\b")
+_REF = re.compile(rb"(\d+)\s+\d+\s+R")
+_FLUX = re.compile(rb"stream\r?\n")
+_LONGUEUR = re.compile(rb"/Length\s+(\d+)(?!\s+\d+\s+R)")
+_JETON = re.compile(rb"""
+    (?P<blanc>\s+|%[^\r\n]*)
+  | (?P<chaine>\()
+  | (?P<dict><<|>>)
+  | (?P<hex><[0-9A-Fa-f\s]*>)
+  | (?P<nom>/[^\s/\[\]()<>{}%]*)
+  | (?P<nombre>[+-]?(?:\d+\.?\d*|\.\d+))
+  | (?P<ouvre>\[)
+  | (?P<ferme>\])
+  | (?P<op>[A-Za-z'"*][A-Za-z0-9'"*]*)
+  | (?P<autre>.)
+""", re.X | re.S)
+_ORDINAIRES = re.compile(rb"[^\\()]*")
+_ECHAPPEMENTS = {ord("n"): b"\n", ord("r"): b"\r", ord("t"): b"\t", ord("b"): b"\b", ord("f"): b"\f"}
+
+
+# -----------------------------
+# Objets et flux
+# -----------------------------
+def decoder_flux(entete: bytes, brut: Optional[bytes]) -> Optional[bytes]:
+    """Données d'un flux : FlateDecode décompressé, non filtré tel quel, autre filtre (images DCT, CCITT…) : None."""
+    if brut is None:
+        return None
+    if b"/FlateDecode" in entete or b"/Fl " in entete or b"/Fl]" in entete:
+        try:
+            return zlib.decompressobj().decompress(brut)
+        except zlib.error:
+            return None
+    return None if b"/Filter" in entete else brut
+
+
+def lire_objets(pdf: bytes) -> Dict[int, Tuple[bytes, Optional[bytes]]]:
+    """numéro -> (dictionnaire, flux brut ou None), flux d'objets (/ObjStm) dépliés.
+
+    Lecture séquentielle : un flux de longueur connue est sauté sans être
+    parcouru (les polices embarquées font l'essentiel d'un PDF) et n'est
+    décompressé que s'il est lu (decoder_flux).
+    """
+    objets: Dict[int, Tuple[bytes, Optional[bytes]]] = {}
+    pos = 0
+    while True:
+        m = _OBJET.search(pdf, pos)
+        if m is None:
+            break
+        debut = m.end()
+        fin = pdf.find(b"endobj", debut)
+        fin = len(pdf) if fin < 0 else fin
+        flux = _FLUX.search(pdf, debut, fin)
+        if flux is None:
+            objets[int(m.group(1))] = (pdf[debut:fin], None)
+            pos = fin
+            continue
+        entete = pdf[debut:flux.start()]
+        longueur = _LONGUEUR.search(entete)
+        fin_flux = flux.end() + int(longueur.group(1)) if longueur else -1
+        if fin_flux < 0 or fin_flux > len(pdf):
+            fin_flux = pdf.find(b"endstream", flux.end())  # /Length indirect : on cherche la fin
+            fin_flux = len(pdf) if fin_flux < 0 else fin_flux
+        objets[int(m.group(1))] = (entete, pdf[flux.end():fin_flux])
+        pos = fin_flux
+    for entete, brut in list(objets.values()):
+        if brut is None or b"/ObjStm" not in entete:
+            continue
+        donnees = decoder_flux(entete, brut)
+        if donnees is None:
+            continue
+        n, premier = re.search(rb"/N\s+(\d+)", entete), re.search(rb"/First\s+(\d+)", entete)
+        if n is None or premier is None:
+            raise ValueError("PDF illisible : flux d'objets sans /N ou /First")
+        premier = int(premier.group(1))
+        table = [int(x) for x in donnees[:premier].split()[:2 * int(n.group(1))] if x.isdigit()]
+        if len(table) % 2:
+            raise ValueError("PDF illisible : table du flux d'objets incomplète")
+        for k in range(0, len(table), 2):
+            fin = table[k + 3] if k + 3 < len(table) else len(donnees) - premier
+            objets.setdefault(table[k], (donnees[premier + table[k + 1]:premier + fin], None))
+    return objets
+
+
+def _flux_objet(objets: Dict[int, Tuple[bytes, Optional[bytes]]], ref: Optional[bytes]) -> Optional[bytes]:
+    m = _REF.fullmatch(ref.strip()) if ref else None
+    return decoder_flux(*objets[int(m.group(1))]) if m and int(m.group(1)) in objets else None
+
+
+def _entree(dictionnaire: bytes, cle: bytes) -> Optional[bytes]:
+    """Valeur brute de /cle dans un dictionnaire : référence, nom, tableau ou dictionnaire imbriqué."""
+    m = re.search(rb"/" + cle + rb"(?![A-Za-z0-9])\s*", dictionnaire)
+    if m is None:
+        return None
+    reste = dictionnaire[m.end():]
+    ref = re.match(rb"\d+\s+\d+\s+R", reste)
+    if ref:
+        return ref.group(0)
+    for ouvre, ferme in ((b"<<", b">>"), (b"[", b"]")):
+        if reste.startswith(ouvre):
+            profondeur, i = 0, 0
+            while i < len(reste):
+                if reste.startswith(ouvre, i):
+                    profondeur += 1
+                    i += len(ouvre)
+                elif reste.startswith(ferme, i):
+                    profondeur -= 1
+                    i += len(ferme)
+                    if profondeur == 0:
+                        return reste[:i]
+                else:
+                    i += 1
+            return reste
+    return re.match(rb"[^\s/>\]]*(?:/[^\s/>\]]*)?", reste).group(0)
+
+
+def _resoudre(objets: Dict[int, Tuple[bytes, Optional[bytes]]], valeur: Optional[bytes]) -> Optional[bytes]:
+    # une référence "12 0 R" est remplacée par le dictionnaire de l'objet 12
+    ref = _REF.fullmatch(valeur.strip()) if valeur else None
+    if ref:
+        return objets.get(int(ref.group(1)), (b"", None))[0]
+    return valeur
+
+
+# -----------------------------
+# Polices
+# -----------------------------
+def lire_cmap(cmap: bytes) -> Tuple[Dict[int, str], int]:
+    """CMap ToUnicode -> (code -> texte, octets par code)."""
+    table: Dict[int, str] = {}
+    taille = 1
+    texte = lambda h: bytes.fromhex(h.decode()).decode("utf-16-be", "replace")  # noqa: E731
+    for bloc in re.findall(rb"beginbfchar(.*?)endbfchar", cmap, re.S):
+        for src, dst in re.findall(rb"<([0-9A-Fa-f]+)>\s*<([0-9A-Fa-f]*)>", bloc):
+            table[int(src, 16)] = texte(dst)
+            taille = max(taille, len(src) // 2)
+    for bloc in re.findall(rb"beginbfrange(.*?)endbfrange", cmap, re.S):
+        for lo, hi, dst in re.findall(rb"<([0-9A-Fa-f]+)>\s*<([0-9A-Fa-f]+)>\s*(<[0-9A-Fa-f]*>|\[[^\]]*\])", bloc):
+            taille = max(taille, len(lo) // 2)
+            a, b = int(lo, 16), int(hi, 16)
+            if dst.startswith(b"["):
+                for k, h in enumerate(re.findall(rb"<([0-9A-Fa-f]*)>", dst)):
+                    table[a + k] = texte(h)
+            else:
+                base = bytes.fromhex(dst[1:-1].decode())
+                for k in range(b - a + 1):
+                    fin = (int.from_bytes(base[-2:], "big") + k).to_bytes(2, "big")
+                    table[a + k] = (base[:-2] + fin).decode("utf-16-be", "replace")
+    return table, taille
+
+
+class _Police:
+    __slots__ = ("table", "taille")
+
+    def __init__(self, table: Optional[Dict[int, str]] = None, taille: int = 1):
+        self.table, self.taille = table, taille
+
+    def decoder(self, octets: bytes) -> str:
+        if self.table is None:
+            return octets.decode("cp1252", "replace")  # police simple sans CMap : WinAnsi
+        t = self.taille
+        return "".join(self.table.get(int.from_bytes(octets[i:i + t], "big"), "")
+                       for i in range(0, len(octets) - t + 1, t))
+
+
+def _polices(objets: Dict[int, Tuple[bytes, Optional[bytes]]], page: bytes) -> Dict[bytes, _Police]:
+    # ressources héritées des nœuds /Pages parents ; une chaîne de /Parent qui boucle s'arrête au premier retour
+    ressources, courant, vus = None, page, set()
+    while ressources is None and courant:
+        ressources = _resoudre(objets, _entree(courant, b"Resources"))
+        parent = _REF.fullmatch((_entree(courant, b"Parent") or b"").strip())
+        if parent is None or int(parent.group(1)) in vus:
+            break
+        vus.add(int(parent.group(1)))
+        courant = objets.get(int(parent.group(1)), (b"", None))[0]
+    dict_polices = _resoudre(objets, _entree(ressources or b"", b"Font")) or b""
+    polices: Dict[bytes, _Police] = {}
+    for nom, num in re.findall(rb"/([^\s/<>\[\]]+)\s+(\d+)\s+\d+\s+R", dict_polices):
+        police = objets.get(int(num), (b"", None))[0]
+        cmap = _flux_objet(objets, _entree(police, b"ToUnicode"))
+        polices[b"/" + nom] = _Police(*lire_cmap(cmap)) if cmap else _Police(
+            {} if b"/Type0" in police else None, 2 if b"/Type0" in police else 1)
+    return polices
+
+
+# -----------------------------
+# Flux de contenu
+# -----------------------------
+def _chaine(flux: bytes, i: int) -> Tuple[bytes, int]:
+    """Chaîne littérale commençant après la parenthèse ouvrante en `i` ; renvoie (octets, position de fin)."""
+    sortie = bytearray()
+    profondeur = 1
+    n = len(flux)
+    while i < n:
+        courant = _ORDINAIRES.match(flux, i)
+        if courant.end() > i:  # octets sans parenthèse ni échappement : copiés d'un bloc
+            sortie += courant.group(0)
+            i = courant.end()
+            continue
+        c = flux[i]
+        if c == 0x5C:  # barre oblique inverse
+            i += 1
+            if i >= n:
+                break
+            e = flux[i]
+            if e in _ECHAPPEMENTS:
+                sortie += _ECHAPPEMENTS[e]
+            elif 0x30 <= e <= 0x37:
+                octal = re.match(rb"[0-7]{1,3}", flux[i:i + 3]).group(0)
+                sortie.append(int(octal, 8) & 0xFF)
+                i += len(octal) - 1
+            elif e in (0x0A, 0x0D):
+                if e == 0x0D and i + 1 < n and flux[i + 1] == 0x0A:
+                    i += 1
+            else:
+                sortie.append(e)
+        elif c == 0x28:
+            profondeur += 1
+            sortie.append(c)
+        elif c == 0x29:
+            profondeur -= 1
+            if profondeur == 0:
+                return bytes(sortie), i + 1
+            sortie.append(c)
+        else:
+            sortie.append(c)
+        i += 1
+    return bytes(sortie), i
+
+
+def lignes_contenu(flux: bytes, polices: Dict[bytes, _Police]) -> Iterator[str]:
+    """Lignes de texte d'un flux de contenu, dans l'ordre d'écriture."""
+    police = _Police()
+    pile: List[Any] = []
+    tableau: Optional[List[Any]] = None
+    ligne: List[str] = []
+    y = 0.0
+    y_ligne: Optional[float] = None
+    i, n = 0, len(flux)
+    while i < n:
+        m = _JETON.match(flux, i)
+        i = m.end()
+        genre = m.lastgroup
+        if genre == "blanc" or genre == "dict" or genre == "autre":
+            continue
+        if genre == "chaine":
+            valeur, i = _chaine(flux, i)
+            (tableau if tableau is not None else pile).append(valeur)
+        elif genre == "hex":
+            chiffres = re.sub(rb"\s", b"", m.group(0)[1:-1])
+            valeur = bytes.fromhex((chiffres + b"0" * (len(chiffres) % 2)).decode())
+            (tableau if tableau is not None else pile).append(valeur)
+        elif genre == "nom":
+            (tableau if tableau is not None else pile).append(m.group(0))
+        elif genre == "nombre":
+            (tableau if tableau is not None else pile).append(float(m.group(0)))
+        elif genre == "ouvre":
+            tableau = []
+        elif genre == "ferme":
+            pile.append(tableau or [])
+            tableau = None
+        else:
+            op = m.group(0)
+            texte: Optional[str] = None
+            if op == b"BT":
+                y = 0.0
+            elif op == b"Tf" and len(pile) >= 2 and isinstance(pile[-2], bytes):
+                police = polices.get(pile[-2], _Police())
+            elif op in (b"Td", b"TD") and len(pile) >= 2 and isinstance(pile[-1], float):
+                y += pile[-1]
+            elif op == b"Tm" and len(pile) >= 6 and isinstance(pile[-1], float):
+                y = pile[-1]
+            elif op == b"T*":
+                y -= 1000.0  # nouvelle ligne, quel que soit l'interligne
+            elif op in (b"Tj", b"'", b'"') and pile and isinstance(pile[-1], bytes):
+                if op != b"Tj":
+                    y -= 1000.0
+                texte = police.decoder(pile[-1])
+            elif op == b"TJ" and pile and isinstance(pile[-1], list):
+                morceaux: List[str] = []
+                for el in pile[-1]:
+                    if isinstance(el, bytes):
+                        morceaux.append(police.decoder(el))
+                    elif isinstance(el, float) and el < -200:  # grand retrait : espace entre mots
+                        morceaux.append(" ")
+                texte = "".join(morceaux)
+            elif op == b"BI":
+                fin = flux.find(b"EI", flux.find(b"ID", i))
+                i = n if fin < 0 else fin + 2
+            pile.clear()
+            if texte is not None:
+                # même hauteur : même ligne (cellules successives) ; sinon la ligne est terminée
+                if ligne and y_ligne is not None and abs(y - y_ligne) > 1.0:
+                    yield "".join(ligne)
+                    ligne.clear()
+                elif ligne and not ligne[-1].endswith(" ") and not texte.startswith(" "):
+                    ligne.append(" ")
+                ligne.append(texte)
+                y_ligne = y
+    if ligne:
+        yield "".join(ligne)
+
+
+def _pages(objets: Dict[int, Tuple[bytes, Optional[bytes]]]) -> List[bytes]:
+    """Dictionnaires des pages dans l'ordre du document : arbre /Pages (/Kids) depuis le catalogue.
+
+    Sans catalogue lisible, ordre des numéros d'objet (un logiciel peut
+    numéroter la page 2 avant la page 1 : l'arbre seul fait foi).
+    """
+    racine = next((_entree(d, b"Pages") for d, _ in objets.values() if re.search(rb"/Type\s*/Catalog", d)), None)
+    trouvees: List[bytes] = []
+    vus = set()
+    pile = [racine] if racine else []
+    while pile:
+        ref = _REF.fullmatch(pile.pop().strip())
+        num = int(ref.group(1)) if ref else -1
+        if num in vus or num not in objets:
+            continue
+        vus.add(num)
+        noeud = objets[num][0]
+        if re.search(rb"/Type\s*/Pages", noeud):
+            kids = _resoudre(objets, _entree(noeud, b"Kids")) or b""
+            pile.extend(reversed([r.group(0) for r in _REF.finditer(kids)]))
+        elif re.search(rb"/Type\s*/Page(?!s)", noeud):
+            trouvees.append(noeud)
+    if trouvees:
+        return trouvees
+    return [d for _, (d, _) in sorted(objets.items()) if re.search(rb"/Type\s*/Page(?!s)", d)]
+
+
+def lignes_pdf(pdf: bytes) -> Iterator[str]:
+    """Lignes de texte de toutes les pages, page après page (générateur)."""
+    objets = lire_objets(pdf)
+    for page in _pages(objets):
+        polices = _polices(objets, page)
+        contenus = _entree(page, b"Contents") or b""
+        for ref in _REF.finditer(contenus):
+            donnees = _flux_objet(objets, ref.group(0))
+            if donnees:
+                yield from lignes_contenu(donnees, polices)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print("Usage : python extraction_pdf.py fichier.pdf", file=sys.stderr)
+        return 2
+    with open(argv[0], "rb") as f:
+        for ligne in lignes_pdf(f.read()):
+            print(ligne)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+# file_exports.py — File d'attente asynchrone des exports (PDF, archive, tableur)
+#
+# Le bouton de la page Exports ne rend plus le PDF lui-même : il soumet un job
+# et reçoit tout de suite son identifiant ; la page suit l'état du job et
+# propose le téléchargement quand les octets sont prêts. Ni la session, ni le
+# thread de script Streamlit ne sont bloqués par un rendu long.
+#
+#   - COACH_EXPORT_THREADS (2)   : jobs traités en parallèle (threads d'orchestration) ;
+#   - COACH_EXPORT_PROCESSUS (2) : pool de processus pour le rendu fpdf2 (pur
+#                                  Python, limité par le GIL en threads) ; 0 =
+#                                  rendu dans le thread du job. Les workers ont
+#                                  chacun leur CACHE_PDF : pour un PDF seul, le
+#                                  job consulte et alimente celui de la page
+#                                  avant d'envoyer le rendu au pool ;
+#   - COACH_EXPORT_RETENTION_S (900) : durée de conservation d'un job terminé.
+#
+# Profondeur de file, attente et durée des jobs sont exposées dans metriques.
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from metriques import REGISTRE, Registre
+
+EN_ATTENTE, EN_COURS, TERMINE, ERREUR = "en attente", "en cours", "terminé", "erreur"
+
+
+@dataclass
+class Job:
+    id: str
+    type: str
+    libelle: str
+    nom_fichier: str
+    mime: str
+    soumis_le: float = field(default_factory=time.time)
+    etat: str = EN_ATTENTE
+    debut: Optional[float] = None
+    fin: Optional[float] = None
+    donnees: Optional[bytes] = field(default=None, repr=False)
+    chemin: Optional[str] = None  # résultat écrit sur disque (tableur), à la place de `donnees`
+    erreur: Optional[str] = None
+    fait: int = 0
+    total: int = 0
+
+    @property
+    def termine(self) -> bool:
+        return self.etat in (TERMINE, ERREUR)
+
+    @property
+    def attente_s(self) -> float:
+        return (self.debut or time.time()) - self.soumis_le
+
+    @property
+    def duree_s(self) -> Optional[float]:
+        return None if self.debut is None else (self.fin or time.time()) - self.debut
+
+    def lire(self) -> bytes:
+        """Octets du résultat ; un résultat sur disque n'est lu qu'au téléchargement."""
+        if self.chemin is None:
+            return self.donnees or b""
+        with open(self.chemin, "rb") as f:
+            return f.read()
+
+    def progresser(self, fait: int, total: Optional[int] = None) -> None:
+        self.fait = fait
+        if total is not None:
+            self.total = total
+
+
+# Fonction d'un job : reçoit le Job (pour la progression) et le pool de rendu
+# (None = rendre sur place), renvoie les octets du fichier, ou le chemin d'un
+# fichier temporaire pour les exports volumineux (supprimé à la purge du job).
+Travail = Callable[[Job, Optional[Executor]], Union[bytes, str]]
+
+
+class FileExports:
+    """File de jobs d'export, commune à toutes les sessions du processus."""
+
+    def __init__(self, threads: int = 2, processus: int = 2, retention_s: float = 900.0,
+                 registre: Registre = REGISTRE):
+        self.threads = max(1, threads)
+        self.processus = max(0, processus)
+        self.retention_s = retention_s
+        self.registre = registre
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._verrou = threading.Lock()
+        self._executeur = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="coach-export")
+        self._pool: Optional[ProcessPoolExecutor] = None
+        registre.jauge("coach_exports_en_attente", "Jobs d'export en attente d'un thread.", lambda: self.compter(EN_ATTENTE))
+        registre.jauge("coach_exports_en_cours", "Jobs d'export en cours de rendu.", lambda: self.compter(EN_COURS))
+
+    def _pool_rendu(self) -> Optional[Executor]:
+        if not self.processus:
+            return None
+        with self._verrou:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.processus)
+            return self._pool
+
+    def soumettre(self, type_job: str, libelle: str, nom_fichier: str, mime: str, travail: Travail) -> str:
+        """Met le travail en file et renvoie aussitôt l'identifiant du job."""
+        job = Job(uuid.uuid4().hex[:12], type_job, libelle, nom_fichier, mime)
+        with self._verrou:
+            self._purger()
+            self._jobs[job.id] = job
+        self._executeur.submit(self._executer, job, travail)
+        return job.id
+
+    def _executer(self, job: Job, travail: Travail) -> None:
+        job.debut = time.time()
+        job.etat = EN_COURS
+        try:
+            resultat = travail(job, self._pool_rendu())
+            if isinstance(resultat, str):
+                job.chemin = resultat
+            else:
+                job.donnees = resultat
+            job.etat = TERMINE
+        except Exception as e:  # le job porte l'erreur, la page l'affiche
+            job.erreur = f"{type(e).__name__}: {e}"
+            job.etat = ERREUR
+        finally:
+            job.fin = time.time()
+            self.registre.observer_job(job.type, job.attente_s, job.duree_s or 0.0, job.etat == ERREUR)
+
+    def job(self, job_id: str) -> Optional[Job]:
+        with self._verrou:
+            return self._jobs.get(job_id)
+
+    def jobs(self, ids: Iterable[str]) -> List[Job]:
+        with self._verrou:
+            return [self._jobs[i] for i in ids if i in self._jobs]
+
+    def compter(self, etat: str) -> int:
+        with self._verrou:
+            return sum(1 for j in self._jobs.values() if j.etat == etat)
+
+    def _purger(self) -> None:
+        limite = time.time() - self.retention_s
+        for job_id in [i for i, j in self._jobs.items() if j.termine and (j.fin or 0) < limite]:
+            job = self._jobs.pop(job_id)
+            if job.chemin is not None:
+                try:
+                    os.remove(job.chemin)
+                except OSError:
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._verrou:
+            etats = [j.etat for j in self._jobs.values()]
+            return {
+                "threads": self.threads,
+                "processus": self.processus,
+                **{e: etats.count(e) for e in (EN_ATTENTE, EN_COURS, TERMINE, ERREUR)},
+                "octets_retenus": sum(len(j.donnees or b"") for j in self._jobs.values()),
+                "octets_disque": sum(_taille(j.chemin) for j in self._jobs.values() if j.chemin is not None),
+            }
+
+    def arreter(self) -> None:
+        self._executeur.shutdown(wait=False, cancel_futures=True)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _taille(chemin: str) -> int:
+    try:
+        return os.path.getsize(chemin)
+    except OSError:
+        return 0
+
+
+# -----------------------------
+# Travaux : un PDF, l'archive de l'export groupé ou le tableur du portefeuille
+# -----------------------------
+def _rendre(pool: Optional[Executor], fonction: Callable[..., bytes], *args: Any) -> bytes:
+    return fonction(*args) if pool is None else pool.submit(fonction, *args).result()
+
+
+def travail_pdf(fonction: Callable[..., bytes], *args: Any, cle: Optional[str] = None) -> Travail:
+    """Un PDF rendu par `fonction(*args)` (pdf_resume, pdf_checklist : fonctions de module, picklables).
+
+    `cle` (exports_pdf.cle_resume / cle_checklist, calculée avec le même
+    genere_le que `args`) : en mode processus, le PDF est cherché puis rangé
+    dans le CACHE_PDF de ce processus, celui que la page affiche.
+    """
+    def travail(job: Job, pool: Optional[Executor]) -> bytes:
+        job.progresser(0, 1)
+        if pool is not None and cle is not None:
+            from exports_pdf import CACHE_PDF
+            data = CACHE_PDF.obtenir(cle, lambda: _rendre(pool, fonction, *args))
+        else:
+            data = _rendre(pool, fonction, *args)  # sur place : fonction passe elle-même par CACHE_PDF
+        job.progresser(1)
+        return data
+    return travail
+
+
+def _vers_fichier(suffixe: str, ecrire: Callable[[IO[bytes]], Any]) -> str:
+    """Écrit un résultat volumineux dans un fichier temporaire (supprimé à la purge du job) ; renvoie son chemin."""
+    import tempfile
+    fd, chemin = tempfile.mkstemp(prefix="coach-export-", suffix=suffixe)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            ecrire(f)
+    except BaseException:
+        os.remove(chemin)
+        raise
+    return chemin
+
+
+def travail_zip(lignes: Iterable[Tuple[int, Dict[str, Any]]], total: Optional[int] = None) -> Travail:
+    """Export groupé : résumé + check-list par dossier actif, dans un ZIP écrit sur disque.
+
+    Les PDF sont rendus dans le pool de la file (COACH_EXPORT_PROCESSUS),
+    partagé par tous les jobs : deux exports simultanés ne doublent pas le
+    nombre de processus. Avec `total` (nombre de PDF attendu au plus), les
+    dossiers sont lus au fil de l'eau (ex. depuis le dépôt) et le total est
+    ramené aux tâches réellement produites (dossiers inactifs ou invalides
+    exclus) quand la lecture s'achève ; sinon la liste des tâches est
+    construite d'abord. Les dossiers sans PDF (saisie refusée, ligne
+    illisible) sont listés dans rejets.csv, en fin d'archive.
+    """
+    def travail(job: Job, pool: Optional[Executor]) -> str:
+        from export_masse import ecrire_zip, fichier_rejets, generer, taches
+
+        rejets: List[Tuple[int, str, Dict[str, Any]]] = []
+
+        def au_fil(liste: Iterable[Any]) -> Iterator[Any]:
+            n = 0
+            for tache in liste:
+                n += 1
+                yield tache
+            job.total = n
+
+        def avec_rejets(fichiers: Iterable[Tuple[str, bytes]]) -> Iterator[Tuple[str, bytes]]:
+            yield from fichiers
+            if rejets:
+                job.total += 1
+                yield fichier_rejets(rejets)
+
+        liste = taches(lignes, rejet=lambda *r: rejets.append(r))
+        liste = au_fil(liste) if total is not None else list(liste)
+        job.progresser(0, total if total is not None else len(liste))
+        fichiers = generer(liste, 1) if pool is None else generer(liste, pool=pool)
+        return _vers_fichier(".zip", lambda f: ecrire_zip(avec_rejets(fichiers), f, job.progresser))
+    return travail
+
+
+def travail_tableur(dossiers: Iterable[Tuple[int, Dict[str, Any]]], fmt: str, total: Optional[int] = None) -> Travail:
+    """Tableur CSV / XLSX du portefeuille scoré, écrit paquet par paquet dans un fichier temporaire.
+
+    Ni les lignes ni le classeur ne sont gardés en mémoire : le fichier n'est
+    lu qu'au téléchargement (Job.lire). Le scoring est vectorisé par paquet,
+    le pool de rendu ne sert pas.
+    """
+    def travail(job: Job, pool: Optional[Executor]) -> str:
+        from export_tableur import exporter
+
+        job.progresser(0, total or 0)
+        return _vers_fichier("." + fmt, lambda f: exporter(dossiers, f, fmt, progression=job.progresser))
+    return travail
+
+
+_file: Optional[FileExports] = None
+_verrou_file = threading.Lock()
+
+
+def file_exports() -> FileExports:
+    """File du processus, créée au premier export (configurée par l'environnement)."""
+    global _file
+    with _verrou_file:
+        if _file is None:
+            _file = FileExports(
+                threads=int(os.environ.get("COACH_EXPORT_THREADS", 2)),
+                processus=int(os.environ.get("COACH_EXPORT_PROCESSUS", 2)),
+                retention_s=float(os.environ.get("COACH_EXPORT_RETENTION_S", 900)),
+            )
+        return _file
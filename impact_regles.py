@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+# impact_regles.py — Impact d'un changement de règles sur les dossiers enregistrés ("what-if")
+#
+# Usage :
+#   python impact_regles.py --changer CDI.coef_non_cadre=0.75 ecarts.csv
+#   python impact_regles.py --changer CDI.coef_pnc=3/4 --changer Intérim.seuil=24 -
+#   python impact_regles.py --apres regles_banque_x.json ecarts.jsonl --workers 8
+#
+# Rejoue les dossiers du dépôt (COACH_DB) avec deux tables de règles :
+# --avant (défaut : la table en service) et --apres (défaut : --avant), à
+# laquelle s'appliquent les --changer Statut.paramètre=valeur. Seuls les
+# statuts dont la règle diffère entre les deux tables (formule, paramètres,
+# textes) sont relus : changer le coefficient CDI ne relit pas les intérimaires.
+# Un ménage est relu dès qu'un de ses emprunteurs a un statut touché ; chaque
+# emprunteur est réévalué et le résultat du ménage est la somme (cf. menage.py),
+# résumée sur la ligne "Ménage".
+#
+# Les dossiers touchés sont découpés en tranches d'ids ; chaque processus du
+# pool compile les deux tables une fois, lit ses tranches dans SQLite, les
+# évalue deux fois avec moteur_lot et ne renvoie que les dossiers dont le
+# résultat change (éligibilité, revenu retenu, revenu total ou erreur). La
+# sortie liste ces dossiers avec l'écart de revenu retenu ; le résumé par
+# statut est affiché sur la sortie d'erreur.
+
+from __future__ import annotations
+
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from menage import emprunteurs, evaluer_saisies, statut_enregistre
+from moteur_revenus import evaluer_dossier, evaluer_lot
+from regles import TableRegles, charger, compiler_table, table_courante
+from score_portefeuille import _Ecrivain, _format, _milliers
+
+COLONNES_ECART = [
+    "id", "nom", "statut", "eligible_avant", "eligible_apres", "revenu_eligible_avant", "revenu_eligible_apres",
+    "ecart", "revenu_total_avant", "revenu_total_apres", "message_apres", "erreur_apres",
+]
+
+# (éligible, revenu retenu, revenu total, erreur)
+Evaluation = Tuple[bool, float, float, Optional[str]]
+# (id, nom, statut, évaluation avant, évaluation après, message après)
+Ecart = Tuple[int, str, str, Evaluation, Evaluation, str]
+
+
+# -----------------------------
+# Tables à comparer
+# -----------------------------
+def changer(brut: Mapping[str, Any], changements: Sequence[str]) -> Dict[str, Any]:
+    """Copie de la table brute avec les paramètres "Statut.paramètre=valeur" remplacés.
+
+    La valeur est lue en JSON (0.78, 24, true) et sinon gardée telle quelle
+    ("2/3"). Lève ValueError si le statut ou le paramètre n'existe pas.
+    """
+    nouvelle = copy.deepcopy(dict(brut))
+    for changement in changements:
+        cible, sep, valeur = changement.partition("=")
+        statut, _, parametre = cible.rpartition(".")
+        if not sep or not statut:
+            raise ValueError(f"{changement!r} : attendu Statut.paramètre=valeur")
+        parametres = (nouvelle.get("statuts", {}).get(statut) or {}).get("parametres")
+        if parametres is None:
+            raise ValueError(f"{changement!r} : statut inconnu {statut!r}")
+        if parametre not in parametres:
+            raise ValueError(f"{changement!r} : paramètre inconnu pour {statut} ({', '.join(parametres)})")
+        try:
+            parametres[parametre] = json.loads(valeur)
+        except json.JSONDecodeError:
+            parametres[parametre] = valeur
+    if changements:
+        nouvelle["version"] = f"{nouvelle.get('version', '')}+what-if"
+    return nouvelle
+
+
+def statuts_touches(avant: TableRegles, apres: TableRegles) -> List[str]:
+    """Statuts dont la règle change entre les deux tables (les pièces à fournir n'influent pas sur le calcul)."""
+    def regle(table: TableRegles, statut: str) -> Optional[Dict[str, Any]]:
+        r = (table.brut.get("statuts") or {}).get(statut)
+        return None if r is None else {k: v for k, v in r.items() if k != "docs"}
+
+    statuts = list(avant.regles) + [s for s in apres.regles if s not in avant.regles]
+    return [s for s in statuts if regle(avant, s) != regle(apres, s)]
+
+
+# -----------------------------
+# Évaluation (processus du pool)
+# -----------------------------
+_tables: Tuple[Optional[TableRegles], Optional[TableRegles]] = (None, None)
+_depots: Dict[str, Any] = {}
+
+
+def _initialiser(brut_avant: Mapping[str, Any], brut_apres: Mapping[str, Any]) -> None:
+    global _tables
+    _tables = (compiler_table(brut_avant), compiler_table(brut_apres))
+
+
+def _resultats(dossiers: List[Dict[str, Any]], table: TableRegles) -> List[Evaluation]:
+    """Un résultat par dossier ; les emprunteurs d'un ménage sont évalués dans le même lot, puis additionnés."""
+    tailles: List[Any] = []  # par dossier : nombre d'emprunteurs, ou motif de rejet
+    a_plat: List[Mapping[str, Any]] = []
+    for d in dossiers:
+        try:
+            personnes = emprunteurs(d)
+        except ValueError as e:
+            tailles.append(f"Saisie invalide : {e}")
+            continue
+        tailles.append(len(personnes))
+        a_plat.extend(personnes)
+    individuels = iter(_resultats_emprunteurs(a_plat, table))
+    sortie: List[Evaluation] = []
+    for taille in tailles:
+        if isinstance(taille, str):
+            sortie.append((False, 0.0, 0.0, taille))
+        elif taille == 1:
+            sortie.append(next(individuels))
+        else:
+            sortie.append(_menage([next(individuels) for _ in range(taille)]))
+    return sortie
+
+
+def _menage(resultats: List[Evaluation]) -> Evaluation:
+    # mêmes règles que menage.ResultatMenage : revenus additionnés, éligible si tous le sont et sans erreur
+    erreur = " ".join(f"Emprunteur {i} : {r[3]}" for i, r in enumerate(resultats, start=1) if r[3]) or None
+    return (all(r[0] for r in resultats) and not erreur, round(sum(r[1] for r in resultats), 2),
+            round(sum(r[2] for r in resultats), 2), erreur)
+
+
+def _resultats_emprunteurs(dossiers: List[Mapping[str, Any]], table: TableRegles) -> List[Evaluation]:
+    try:
+        lot = evaluer_lot(dossiers, table)
+        return list(zip(lot.eligible.tolist(), lot.revenu_eligible.tolist(), lot.revenu_total.tolist(),
+                        lot.erreurs.tolist()))
+    except (TypeError, ValueError):
+        # une saisie non numérique : évaluation dossier par dossier pour isoler la fautive
+        sortie = []
+        for d in dossiers:
+            try:
+                r = evaluer_dossier(d, table)
+                sortie.append((r.eligible, r.revenu_eligible, r.revenu_total, r.erreur))
+            except (TypeError, ValueError) as e:
+                sortie.append((False, 0.0, 0.0, f"Saisie invalide : {e}"))
+        return sortie
+
+
+def comparer(dossiers: Sequence[Tuple[int, Dict[str, Any]]], avant: TableRegles, apres: TableRegles) -> List[Ecart]:
+    """Dossiers (id, saisies) dont le résultat diffère entre `avant` et `apres` (au centime près)."""
+    saisies = [d for _, d in dossiers]
+    ecarts: List[Ecart] = []
+    for (id_, d), a, b in zip(dossiers, _resultats(saisies, avant), _resultats(saisies, apres)):
+        if a[0] != b[0] or a[3] != b[3] or abs(a[1] - b[1]) >= 0.005 or abs(a[2] - b[2]) >= 0.005:
+            ecarts.append((id_, str(d.get("nom") or ""), str(statut_enregistre(d) or "CDI"), a, b, ""))
+    if ecarts:
+        # le message n'est construit que pour les dossiers qui changent
+        par_id = dict(dossiers)
+        ecarts = [(*e[:5], evaluer_saisies(par_id[e[0]], apres).message if e[4][3] is None else "")
+                  for e in ecarts]
+    return ecarts
+
+
+def _comparer_tranche(chemin: str, statuts: Sequence[str], premier: int, dernier: int) -> Tuple[Dict[str, int], List[Ecart]]:
+    from depot_dossiers import DepotDossiers
+    depot = _depots.get(chemin)
+    if depot is None:
+        depot = _depots[chemin] = DepotDossiers(chemin, 1)
+    dossiers = depot.saisies_tranche(statuts, premier, dernier)
+    evalues: Dict[str, int] = {}
+    for _, d in dossiers:
+        statut = str(statut_enregistre(d) or "CDI")
+        evalues[statut] = evalues.get(statut, 0) + 1
+    avant, apres = _tables
+    return evalues, comparer(dossiers, avant, apres)
+
+
+# -----------------------------
+# Rejeu du portefeuille
+# -----------------------------
+def rejouer(avant: TableRegles, apres: TableRegles, chemin_depot: Optional[str] = None,
+            workers: Optional[int] = None, tranche: int = 5000) -> Tuple[Dict[str, Dict[str, float]], List[Ecart]]:
+    """Rejoue les dossiers des statuts touchés ; renvoie (résumé par statut, écarts triés par id)."""
+    from depot_dossiers import DepotDossiers, depot
+    source = DepotDossiers(chemin_depot, 1) if chemin_depot else depot()
+    statuts = statuts_touches(avant, apres)
+    tranches = source.tranches(statuts, tranche)
+    chemin = source.chemin
+    if chemin_depot:
+        source.fermer()
+
+    workers = min(workers or os.cpu_count() or 1, max(1, len(tranches)))
+    if workers == 1:
+        global _tables
+        _tables = (avant, apres)
+        sorties = [_comparer_tranche(chemin, statuts, p, d) for p, d in tranches]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_initialiser,
+                                 initargs=(avant.brut, apres.brut)) as ex:
+            sorties = list(ex.map(_comparer_tranche, *zip(*((chemin, statuts, p, d) for p, d in tranches))))
+
+    resume: Dict[str, Dict[str, float]] = {
+        s: {"evalues": 0, "modifies": 0, "devenus_eligibles": 0, "devenus_non_eligibles": 0, "ecart_total": 0.0}
+        for s in statuts
+    }
+    ecarts: List[Ecart] = []
+    for evalues, morceau in sorties:
+        for statut, nb in evalues.items():
+            if statut not in resume:  # ménages (statut "Ménage") : une ligne à part
+                resume[statut] = {"evalues": 0, "modifies": 0, "devenus_eligibles": 0, "devenus_non_eligibles": 0,
+                                  "ecart_total": 0.0}
+            resume[statut]["evalues"] += nb
+        for e in morceau:
+            r = resume[e[2]]
+            r["modifies"] += 1
+            r["devenus_eligibles"] += int(e[4][0] and not e[3][0])
+            r["devenus_non_eligibles"] += int(e[3][0] and not e[4][0])
+            r["ecart_total"] = round(r["ecart_total"] + e[4][1] - e[3][1], 2)
+        ecarts.extend(morceau)
+    return resume, ecarts
+
+
+def ligne_ecart(e: Ecart) -> Dict[str, Any]:
+    id_, nom, statut, a, b, message = e
+    return {
+        "id": id_, "nom": nom, "statut": statut,
+        "eligible_avant": a[0], "eligible_apres": b[0],
+        "revenu_eligible_avant": a[1], "revenu_eligible_apres": b[1], "ecart": round(b[1] - a[1], 2),
+        "revenu_total_avant": a[2], "revenu_total_apres": b[2],
+        "message_apres": message, "erreur_apres": b[3],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Impact d'un changement de règles sur les dossiers enregistrés.")
+    p.add_argument("sortie", help="Fichier des dossiers modifiés (.csv ou .jsonl, '-' pour la sortie standard)")
+    p.add_argument("--avant", help="Table de règles de référence (défaut : la table en service)")
+    p.add_argument("--apres", help="Table de règles à évaluer (défaut : --avant)")
+    p.add_argument("--changer", action="append", default=[], metavar="STATUT.PARAM=VALEUR",
+                   help="Paramètre modifié dans la table --apres (répétable)")
+    p.add_argument("--depot", help="Base SQLite des dossiers (défaut : COACH_DB)")
+    p.add_argument("--workers", type=int, help="Processus (défaut : nombre de cœurs)")
+    p.add_argument("--tranche", type=int, default=5000, help="Dossiers par tranche (défaut : 5000)")
+    args = p.parse_args(argv)
+
+    avant = charger(args.avant) if args.avant else table_courante()
+    base = charger(args.apres) if args.apres else avant
+    try:
+        apres = compiler_table(changer(base.brut, args.changer)) if args.changer else base
+    except ValueError as e:
+        p.error(str(e))
+
+    debut = time.perf_counter()
+    resume, ecarts = rejouer(avant, apres, args.depot, args.workers, args.tranche)
+    ecoule = time.perf_counter() - debut
+
+    out = _Ecrivain(args.sortie, _format(args.sortie), COLONNES_ECART)
+    try:
+        for e in ecarts:
+            out.ecrire(ligne_ecart(e))
+    finally:
+        out.fermer()
+
+    print(f"Règles {avant.version} -> {apres.version}", file=sys.stderr)
+    if not resume:
+        print("Aucun statut touché : aucun dossier à rejouer.", file=sys.stderr)
+        return 0
+    print(f"{'statut':<24}{'évalués':>10}{'modifiés':>10}{'→ éligibles':>13}{'→ refusés':>11}{'écart €/mois':>15}",
+          file=sys.stderr)
+    for statut, r in resume.items():
+        print(f"{statut:<24}{r['evalues']:>10}{r['modifies']:>10}{r['devenus_eligibles']:>13}"
+              f"{r['devenus_non_eligibles']:>11}{r['ecart_total']:>15,.2f}".replace(",", " "), file=sys.stderr)
+    evalues = sum(r["evalues"] for r in resume.values())
+    print(f"{_milliers(evalues)} dossiers rejoués en {ecoule:.2f} s, {len(ecarts)} modifié(s).", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
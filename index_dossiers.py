@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+# index_dossiers.py — Recherche instantanée de dossiers (index en mémoire)
+#
+# Index inversé des noms et du statut de tous les dossiers du dépôt, construit
+# une fois par processus (au premier usage) puis tenu à jour à chaque
+# enregistrement (abonné de DepotDossiers) : la recherche ne touche pas SQLite.
+#
+#   - mots repliés (casse et accents, cf. depot_dossiers.cle_nom) : "Elu"
+#     trouve "Élu", "interim" trouve "Intérim" ;
+#   - chaque mot saisi filtre (ET) ; le dernier est un début de mot ;
+#   - faute de frappe : un mot de 4 lettres ou plus trouve aussi les mots à une
+#     lettre près (suppressions symétriques) ;
+#   - filtres statut et tranche de revenu : ensembles d'ids précalculés.
+# Classement : mot exact, puis début de mot, puis faute de frappe ; à qualité
+# égale, le dossier modifié le plus récemment d'abord.
+
+from __future__ import annotations
+
+import bisect
+import heapq
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from depot_dossiers import ApercuDossier, DepotDossiers, cle_nom, depot
+
+# Tranches de revenu mensuel total (€) : (borne basse incluse, libellé)
+TRANCHES_REVENU: List[Tuple[float, str]] = [
+    (float("-inf"), "< 1 500 €"),
+    (1500.0, "1 500 – 2 500 €"),
+    (2500.0, "2 500 – 4 000 €"),
+    (4000.0, "4 000 – 6 000 €"),
+    (6000.0, "≥ 6 000 €"),
+]
+NON_CALCULE = "non calculé"
+
+LONGUEUR_MIN_FLOU = 4
+_MOT = re.compile(r"\w+")
+_FIN = "\U0010ffff"
+_VIDE: Set[int] = frozenset()  # type: ignore[assignment]
+
+
+def tranche_revenu(revenu_total: Optional[float]) -> str:
+    if revenu_total is None:
+        return NON_CALCULE
+    bornes = [b for b, _ in TRANCHES_REVENU]
+    return TRANCHES_REVENU[bisect.bisect_right(bornes, revenu_total) - 1][1]
+
+
+def mots(texte: str) -> List[str]:
+    return _MOT.findall(cle_nom(texte))
+
+
+def _suppressions(mot: str) -> Set[str]:
+    return {mot[:i] + mot[i + 1:] for i in range(len(mot))}
+
+
+def _inter(ensembles: List[Set[int]]) -> Set[int]:
+    """Intersection, sans copie pour un seul ensemble (les ensembles de l'index ne sont pas modifiés ici)."""
+    if len(ensembles) == 1:
+        return ensembles[0]
+    plus_petit, *autres = sorted(ensembles, key=len)
+    return plus_petit.intersection(*autres)
+
+
+def _flou(mot: str) -> bool:
+    return len(mot) >= LONGUEUR_MIN_FLOU and mot.isalpha()
+
+
+class IndexDossiers:
+    """Index des dossiers ; sûr entre threads (les sessions partagent l'instance du processus)."""
+
+    def __init__(self, apercus: Iterable[ApercuDossier] = ()):
+        self._verrou = threading.Lock()
+        self._vider()
+        self.charger(apercus)
+
+    def _vider(self) -> None:
+        self._fiches: Dict[int, ApercuDossier] = {}
+        self._mots_fiche: Dict[int, Tuple[str, ...]] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        self._mots: List[str] = []  # mots distincts triés (recherche par début de mot)
+        self._voisins: Dict[str, Set[str]] = {}  # mot privé d'une lettre -> mots indexés
+        self._par_statut: Dict[str, Set[int]] = {}
+        self._par_tranche: Dict[str, Set[int]] = {}
+        self._recents: "OrderedDict[int, None]" = OrderedDict()  # du plus ancien au plus récent
+
+    def __len__(self) -> int:
+        return len(self._fiches)
+
+    # -----------------------------
+    # Mise à jour
+    # -----------------------------
+    def charger(self, apercus: Iterable[ApercuDossier]) -> None:
+        """(Re)construit l'index à partir de tous les dossiers."""
+        tries = sorted(apercus, key=lambda a: (a.maj_le, a.id))
+        with self._verrou:
+            self._vider()
+            for a in tries:
+                self._ajouter(a, trier=False)
+            self._mots = sorted(self._postings)
+
+    def mettre_a_jour(self, apercu: ApercuDossier) -> None:
+        with self._verrou:
+            self._retirer(apercu.id)
+            self._ajouter(apercu, trier=True)
+
+    def retirer(self, id_dossier: int) -> None:
+        with self._verrou:
+            self._retirer(id_dossier)
+
+    def _ajouter(self, a: ApercuDossier, trier: bool) -> None:
+        cles = tuple(dict.fromkeys(mots(a.nom) + mots(a.statut)))
+        self._fiches[a.id] = a
+        self._mots_fiche[a.id] = cles
+        for m in cles:
+            ids = self._postings.get(m)
+            if ids is None:
+                ids = self._postings[m] = set()
+                if trier:
+                    bisect.insort(self._mots, m)
+                if _flou(m):
+                    for v in _suppressions(m):
+                        self._voisins.setdefault(v, set()).add(m)
+            ids.add(a.id)
+        self._par_statut.setdefault(a.statut, set()).add(a.id)
+        self._par_tranche.setdefault(tranche_revenu(a.revenu_total), set()).add(a.id)
+        self._recents[a.id] = None
+
+    def _retirer(self, id_dossier: int) -> None:
+        a = self._fiches.pop(id_dossier, None)
+        if a is None:
+            return
+        for m in self._mots_fiche.pop(id_dossier):
+            ids = self._postings[m]
+            ids.discard(id_dossier)
+            if ids:
+                continue
+            del self._postings[m]
+            del self._mots[bisect.bisect_left(self._mots, m)]
+            if _flou(m):
+                for v in _suppressions(m):
+                    self._voisins[v].discard(m)
+                    if not self._voisins[v]:
+                        del self._voisins[v]
+        self._par_statut[a.statut].discard(id_dossier)
+        self._par_tranche[tranche_revenu(a.revenu_total)].discard(id_dossier)
+        del self._recents[id_dossier]
+
+    def sur_ecriture(self, id_dossier: Optional[int], apercu: Optional[ApercuDossier],
+                     source: Optional[DepotDossiers] = None) -> None:
+        """Abonné du dépôt (cf. DepotDossiers.abonner)."""
+        if id_dossier is None:
+            self.charger(source.apercus() if source is not None else ())
+        elif apercu is None:
+            self.retirer(id_dossier)
+        else:
+            self.mettre_a_jour(apercu)
+
+    # -----------------------------
+    # Recherche
+    # -----------------------------
+    def _debut(self, prefixe: str) -> Set[str]:
+        i = bisect.bisect_left(self._mots, prefixe)
+        j = bisect.bisect_left(self._mots, prefixe + _FIN, i)
+        return set(self._mots[i:j])
+
+    def _proches(self, mot: str, dernier: bool) -> Set[str]:
+        """Mots indexés à une lettre près (et, pour le mot en cours de frappe, leurs suites)."""
+        if not _flou(mot):
+            return set()
+        variantes = _suppressions(mot)
+        proches = set(self._voisins.get(mot, ()))  # une lettre manque dans la saisie
+        for v in variantes:
+            if v in self._postings:  # une lettre en trop
+                proches.add(v)
+            proches |= self._voisins.get(v, set())  # une lettre remplacée
+        if dernier:
+            for v in variantes:
+                proches |= self._debut(v)
+        return proches
+
+    def _ids(self, cles: Iterable[str]) -> Set[int]:
+        return set().union(*(self._postings[m] for m in cles))
+
+    def _niveaux(self, termes: List[str], filtres: List[Set[int]]) -> Iterator[Set[int]]:
+        """Ids par qualité de correspondance (exact, début de mot, faute de frappe), calculés à la demande."""
+        mots_debut = self._debut(termes[-1])
+        exacts = [self._postings.get(t, _VIDE) for t in termes]
+        n0 = _inter(exacts + filtres)
+        yield n0
+        debuts = exacts[:-1] + [self._ids(mots_debut)]
+        n1 = _inter(debuts + filtres)
+        yield n1 - n0 if n0 else n1
+        proches = [self._proches(t, False) - {t} for t in termes[:-1]]
+        proches.append(self._proches(termes[-1], True) - mots_debut)
+        if any(proches):
+            flous = [d | self._ids(p) if p else d for d, p in zip(debuts, proches)]
+            yield _inter(flous + filtres) - n1
+
+    def chercher(self, texte: str, statut: Optional[str] = None, tranche: Optional[str] = None,
+                 limite: int = 20) -> List[ApercuDossier]:
+        termes = mots(texte)
+        with self._verrou:
+            filtres = []
+            if statut:
+                filtres.append(self._par_statut.get(statut, _VIDE))
+            if tranche:
+                filtres.append(self._par_tranche.get(tranche, _VIDE))
+            if termes:
+                niveaux: Iterable[Optional[Set[int]]] = self._niveaux(termes, filtres)
+            else:
+                niveaux = [_inter(filtres) if filtres else None]
+            resultats: List[ApercuDossier] = []
+            for ids in niveaux:
+                resultats += self._plus_recents(ids, limite - len(resultats))
+                if len(resultats) >= limite:
+                    break
+            return resultats
+
+    def _plus_recents(self, ids: Optional[Set[int]], nombre: int) -> List[ApercuDossier]:
+        """Les `nombre` dossiers de `ids` (None = tous) modifiés le plus récemment."""
+        if nombre <= 0 or ids is not None and not ids:
+            return []
+        total = len(self._recents)
+        if ids is None or nombre * total < len(ids) ** 2:
+            # ensemble dense : parcourir l'ordre de modification (≈ nombre × N / len(ids)
+            # dossiers lus) coûte moins que trier l'ensemble ; borné si les ids sont tous anciens
+            lecture_max = total if ids is None else 4 * nombre * total // len(ids)
+            choisis = []
+            for lus, i in enumerate(reversed(self._recents)):
+                if lus > lecture_max:
+                    break
+                if ids is None or i in ids:
+                    choisis.append(self._fiches[i])
+                    if len(choisis) == nombre:
+                        return choisis
+            else:
+                return choisis
+        return heapq.nlargest(nombre, (self._fiches[i] for i in ids), key=lambda a: (a.maj_le, a.id))
+
+
+_index: Optional[IndexDossiers] = None
+_verrou_index = threading.Lock()
+
+
+def index_dossiers() -> IndexDossiers:
+    """Index du processus : construit depuis depot() au premier usage, puis tenu à jour par ses écritures."""
+    global _index
+    with _verrou_index:
+        if _index is None:
+            source = depot()
+            index = IndexDossiers()
+            source.abonner(lambda i, a: index.sur_ecriture(i, a, source))  # avant la lecture : rien de manqué
+            index.charger(source.apercus())
+            _index = index
+        return _index
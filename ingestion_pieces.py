@@ -0,0 +1,348 @@
+# -*- coding: utf-8 -*-
+# ingestion_pieces.py — Bulletins de paie et avis d'imposition -> saisies du dossier
+#
+# Usage :
+#   python ingestion_pieces.py pieces/*.pdf pieces/*.txt --statut CDI
+#   python ingestion_pieces.py lot_client/* --statut Intérim --workers 4 --json
+#
+# Lecture hors ligne de pièces "texte" (PDF produits par un logiciel de paie ou
+# par impots.gouv, ou texte brut) : extraction_pdf pour les PDF, puis lecture
+# ligne à ligne, arrêtée dès que la pièce a donné tout ce qu'on en attend.
+#   - bulletin : période (mois/année), net à payer, net imposable du mois,
+#     cumul net imposable ;
+#   - avis d'imposition : année des revenus, revenu (net) imposable.
+# Les pièces sont réparties par paquets sur un pool de processus (au plus
+# 2 × workers paquets en vol, comme export_masse) et produites dans l'ordre de
+# fin d'analyse. champs_dossier() range ensuite les montants dans les saisies
+# du statut : 3 derniers bulletins -> b_m1..b_m3, avis -> RNI N / N-1 / N-2,
+# 12 derniers bulletins -> RNI 12 mois (CDD / CDIC)… Un PDF scanné ne
+# contient pas de texte : il est signalé et reste à saisir à la main.
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import unicodedata
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from extraction_pdf import lignes_pdf
+from regles import TableRegles, table_courante
+from score_portefeuille import _milliers, par_paquets
+
+Document = Union[str, Tuple[str, bytes]]  # chemin, ou (nom du fichier, contenu) pour un envoi de l'app
+
+MOIS = {
+    "janvier": 1, "fevrier": 2, "mars": 3, "avril": 4, "mai": 5, "juin": 6, "juillet": 7,
+    "aout": 8, "septembre": 9, "octobre": 10, "novembre": 11, "decembre": 12,
+}
+CHAMPS_AVIS = ("rni", "rni_N", "rni_N1", "rni_N2")  # saisies remplies depuis les avis (paramètre "champs")
+LIBELLES_CHAMPS = {
+    "b_m1": "Bulletin M-1", "b_m2": "Bulletin M-2", "b_m3": "Bulletin M-3",
+    "cdi_cni": "Cumul net imposable (déc.)", "cdi_rni": "RNI (dernier avis)", "cdd_rni_12m": "RNI 12 mois",
+    "rni": "RNI annuel", "rni_N": "RNI N", "rni_N1": "RNI N-1", "rni_N2": "RNI N-2",
+}
+
+_DATE = re.compile(r"\d{1,2}/\d{1,2}/\d{2,4}")
+_MONTANT = re.compile(r"(?<![\d,.])(\d{1,3}(?:[ .]\d{3})+|\d+)(?:,(\d{1,2})|\.(\d{1,2}))?(?![\d,])")
+_PERIODE_DU_AU = re.compile(r"periode\D{0,12}?\d{1,2}/\d{1,2}/\d{4}\s*au\s*\d{1,2}/(\d{1,2})/(\d{4})")
+_PERIODE_MOIS = re.compile(r"\b(" + "|".join(MOIS) + r")\s+(\d{4})\b")
+_PERIODE_NUM = re.compile(r"periode\D{0,5}(\d{1,2})[/.-](\d{4})\b")
+_ANNEE_REVENUS = re.compile(r"revenus\s+(?:de\s+)?(?:l'annee\s+)?(\d{4})\b")
+_AVIS = re.compile(r"avis d.impo|revenu fiscal de reference")  # "d?impot" : apostrophe perdue à l'encodage
+_ANNEE_AVIS = re.compile(r"avis d.impo\w*\s+(\d{4})\b")
+
+
+@dataclass(frozen=True)
+class Piece:
+    """Ce qu'une pièce a donné : type ("bulletin", "avis" ou "" si non reconnue), période et montants."""
+    nom: str
+    type: str = ""
+    annee: int = 0   # bulletin : année de la période ; avis : année des revenus
+    mois: int = 0    # bulletin : mois de la période
+    montants: Dict[str, float] = field(default_factory=dict)
+    motif: str = ""  # pourquoi la pièce n'est pas (entièrement) exploitable
+
+    @property
+    def periode(self) -> str:
+        if self.type == "avis":
+            return f"revenus {self.annee}" if self.annee else ""
+        return f"{self.mois:02d}/{self.annee}" if self.mois else ""
+
+
+# -----------------------------
+# Lecture du texte
+# -----------------------------
+def _normaliser(ligne: str) -> str:
+    # ASCII minuscule (accents et "€" retirés, espaces insécables -> espaces, apostrophe droite) : motifs simples
+    return unicodedata.normalize("NFKD", ligne.replace("’", "'")).encode("ascii", "ignore").decode("ascii").lower()
+
+
+def montants(ligne: str) -> List[float]:
+    """Montants d'une ligne normalisée, au format français ("2 345,67", "2.345,67") ou "2345.67" ; dates ignorées."""
+    sortie = []
+    for entier, cents, cents_point in _MONTANT.findall(_DATE.sub(" ", ligne)):
+        decimales = cents or cents_point
+        sortie.append(float(re.sub(r"[ .]", "", entier) + ("." + decimales if decimales else "")))
+    return sortie
+
+
+def lignes_document(nom: str, contenu: bytes) -> Iterator[str]:
+    """Lignes de texte d'un PDF ou d'un fichier texte (UTF-8, sinon Latin-1) ; ValueError si le format n'est pas lu."""
+    if contenu.lstrip()[:5] == b"%PDF-":
+        return lignes_pdf(contenu)
+    if b"\x00" in contenu[:1024] or nom.lower().endswith(".pdf"):
+        raise ValueError("format non reconnu (ni PDF, ni texte)")
+    try:
+        texte = contenu.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        texte = contenu.decode("latin-1")
+    return iter(texte.splitlines())
+
+
+# -----------------------------
+# Analyse d'une pièce
+# -----------------------------
+class _Lecture:
+    """Relevés au fil des lignes ; `complete` dès que la pièce a donné tout ce qu'on en attend."""
+
+    def __init__(self) -> None:
+        self.type = ""
+        self.annee = self.mois = 0      # période d'un bulletin
+        self.annee_revenus = 0          # avis : année des revenus
+        self.montants: Dict[str, float] = {}
+        self._en_attente: Optional[str] = None  # libellé vu sans montant : montant sur la ligne suivante
+
+    def _relever(self, cle: str, ligne: str) -> None:
+        if cle in self.montants:
+            return
+        valeurs = montants(ligne)
+        if valeurs:
+            self.montants[cle] = valeurs[-1]  # dernière colonne : montant de la ligne (taux et bases avant)
+        else:
+            self._en_attente = cle
+
+    def lire(self, ligne: str) -> None:
+        t = _normaliser(ligne)
+        if self._en_attente:
+            cle, self._en_attente = self._en_attente, None
+            if montants(t):
+                self._relever(cle, t)
+                return
+        if not self.type:
+            if _AVIS.search(t):
+                self.type = "avis"
+            elif "net a payer" in t or re.search(r"bulletin de (paie|salaire)", t):
+                self.type = "bulletin"
+        if "net a payer" in t:
+            self._relever("net_a_payer", t)
+        elif "imposable" in t and "revenu" in t and "fiscal" not in t:
+            self._relever("rni", t)
+        elif "net imposable" in t or "net fiscal" in t:
+            self._relever("cumul_net_imposable" if "cumul" in t else "net_imposable", t)
+        if not self.annee_revenus:
+            m = _ANNEE_REVENUS.search(t) or _ANNEE_AVIS.search(t)
+            if m:
+                # "avis d'impôt 2025" porte sur les revenus 2024
+                self.annee_revenus = int(m.group(1)) - (1 if m.re is _ANNEE_AVIS else 0)
+        if not self.mois:
+            m = _PERIODE_DU_AU.search(t) or _PERIODE_NUM.search(t)
+            if m:
+                self.mois, self.annee = int(m.group(1)), int(m.group(2))
+            else:
+                m = _PERIODE_MOIS.search(t)
+                if m:
+                    self.mois, self.annee = MOIS[m.group(1)], int(m.group(2))
+
+    @property
+    def complete(self) -> bool:
+        if self.type == "avis":
+            return bool(self.annee_revenus) and "rni" in self.montants
+        if self.type == "bulletin":
+            return bool(self.mois) and {"net_a_payer", "net_imposable", "cumul_net_imposable"} <= set(self.montants)
+        return False
+
+
+def analyser(nom: str, contenu: bytes) -> Piece:
+    """Type, période et montants d'une pièce ; le motif explique ce qui manque."""
+    try:
+        lignes = lignes_document(nom, contenu)
+        lecture = _Lecture()
+        vide = True
+        for ligne in lignes:
+            vide = vide and not ligne.strip()
+            lecture.lire(ligne)
+            if lecture.complete:
+                break
+    except (ValueError, UnicodeDecodeError) as e:
+        return Piece(nom, motif=str(e))
+    except Exception as e:  # PDF malformé d'une façon imprévue : la pièce est rejetée, pas le lot
+        return Piece(nom, motif=f"illisible : {type(e).__name__}")
+    if vide:
+        return Piece(nom, motif="aucun texte (document scanné ?) : à saisir à la main")
+    if not lecture.type:
+        return Piece(nom, motif="ni bulletin de paie, ni avis d'imposition")
+    if lecture.type == "avis":
+        montants_piece = {k: v for k, v in lecture.montants.items() if k == "rni"}
+        manque = "revenu imposable" if not montants_piece else "année des revenus" if not lecture.annee_revenus else ""
+        annee, mois = lecture.annee_revenus, 0
+    else:
+        montants_piece = {k: v for k, v in lecture.montants.items() if k != "rni"}
+        manque = "net à payer" if "net_a_payer" not in montants_piece else "période" if not lecture.mois else ""
+        annee, mois = lecture.annee, lecture.mois
+    return Piece(nom, lecture.type, annee, mois, montants_piece, f"{manque} introuvable" if manque else "")
+
+
+def _analyser_paquet(paquet: List[Document]) -> List[Piece]:
+    # exécuté dans un processus du pool : les chemins sont lus par le processus lui-même
+    sortie = []
+    for doc in paquet:
+        if isinstance(doc, str):
+            try:
+                with open(doc, "rb") as f:
+                    contenu = f.read()
+            except OSError as e:
+                sortie.append(Piece(os.path.basename(doc), motif=f"illisible : {e.strerror}"))
+                continue
+            sortie.append(analyser(os.path.basename(doc), contenu))
+        else:
+            sortie.append(analyser(*doc))
+    return sortie
+
+
+def analyser_pieces(documents: Sequence[Document], workers: Optional[int] = None,
+                    taille_paquet: int = 16) -> Iterator[Piece]:
+    """Analyse les pièces, dans l'ordre de fin d'analyse.
+
+    workers=1 (ou un seul paquet) : dans le processus courant. Sinon au plus
+    2 × workers paquets en vol.
+    """
+    workers = min(workers or os.cpu_count() or 1, max(1, -(-len(documents) // taille_paquet)))
+    paquets = par_paquets(documents, taille_paquet)
+    if workers == 1:
+        for paquet in paquets:
+            yield from _analyser_paquet(paquet)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        en_vol = set()
+        for paquet in paquets:
+            en_vol.add(ex.submit(_analyser_paquet, paquet))
+            if len(en_vol) >= 2 * workers:
+                termines, en_vol = wait(en_vol, return_when=FIRST_COMPLETED)
+                for f in termines:
+                    yield from f.result()
+        while en_vol:
+            termines, en_vol = wait(en_vol, return_when=FIRST_COMPLETED)
+            for f in termines:
+                yield from f.result()
+
+
+# -----------------------------
+# Pièces -> saisies du dossier
+# -----------------------------
+def _par_periode(pieces: Iterable[Piece], type_piece: str) -> Dict[int, Piece]:
+    """Pièces d'un type indexées par période (mois pour un bulletin, année pour un avis) ; un doublon garde la première."""
+    index: Dict[int, Piece] = {}
+    for p in pieces:
+        if p.type != type_piece or not p.annee or (type_piece == "bulletin" and not p.mois):
+            continue
+        index.setdefault(p.annee * 12 + p.mois - 1 if type_piece == "bulletin" else p.annee, p)
+    return index
+
+
+def champs_cibles(statut: str, table: Optional[TableRegles] = None) -> Tuple[str, ...]:
+    """Saisies du statut que les pièces peuvent remplir (vide : rien à pré-remplir).
+
+    Statut sans règle : CDI, comme la page Dossier client.
+    """
+    if statut in ("CDD", "CDIC"):
+        return ("cdd_rni_12m",)
+    regle = (table or table_courante()).regles.get(statut)
+    if statut == "CDI" or regle is None:
+        return ("b_m1", "b_m2", "b_m3", "cdi_cni", "cdi_rni")
+    return tuple(c for c in regle.parametres.get("champs") or () if c in CHAMPS_AVIS)
+
+
+def champs_dossier(pieces: Iterable[Piece], statut: str, table: Optional[TableRegles] = None) -> Dict[str, float]:
+    """Saisies du statut déductibles des pièces : {champ: montant}.
+
+    Périodes consécutives à partir de la plus récente : M-1 est le dernier
+    bulletin, M-2 le mois d'avant ; RNI N est le dernier avis, N-1 l'année
+    d'avant. Une période manquante laisse son champ à la saisie.
+    """
+    pieces = list(pieces)
+    bulletins = _par_periode(pieces, "bulletin")
+    avis = _par_periode(pieces, "avis")
+    cibles = champs_cibles(statut, table)
+    champs: Dict[str, float] = {}
+
+    def ranger(index: Dict[int, Piece], cibles_rangees: Sequence[str], montant: str) -> None:
+        if not index:
+            return
+        dernier = max(index)
+        for decalage, champ in enumerate(cibles_rangees):
+            p = index.get(dernier - decalage)
+            if p is not None and montant in p.montants:
+                champs[champ] = p.montants[montant]
+
+    ranger(bulletins, [c for c in cibles if c.startswith("b_m")], "net_a_payer")
+    ranger(avis, [c for c in cibles if c in CHAMPS_AVIS or c == "cdi_rni"], "rni")
+    if "cdi_cni" in cibles:
+        # cumul net imposable de décembre : revenus de l'année entière
+        decembres = [p for p in bulletins.values() if p.mois == 12 and "cumul_net_imposable" in p.montants]
+        if decembres:
+            champs["cdi_cni"] = max(decembres, key=lambda p: p.annee).montants["cumul_net_imposable"]
+    if "cdd_rni_12m" in cibles and bulletins:
+        dernier = max(bulletins)
+        annee = [bulletins.get(dernier - k) for k in range(12)]
+        if all(p is not None and "net_imposable" in p.montants for p in annee):
+            champs["cdd_rni_12m"] = round(sum(p.montants["net_imposable"] for p in annee), 2)
+    return champs
+
+
+def ligne_piece(p: Piece) -> Dict[str, object]:
+    """Une ligne par pièce (tableau de l'app, sortie --json)."""
+    return {"fichier": p.nom, "type": p.type or "?", "période": p.periode,
+            **{k: p.montants.get(k) for k in ("net_a_payer", "net_imposable", "cumul_net_imposable", "rni")},
+            "motif": p.motif}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Montants des bulletins de paie et avis d'imposition (PDF texte ou .txt).")
+    p.add_argument("fichiers", nargs="+", help="Pièces à lire")
+    p.add_argument("--statut", default="CDI", help="Statut du dossier à pré-remplir (défaut : CDI)")
+    p.add_argument("--workers", type=int, help="Processus (défaut : nombre de cœurs)")
+    p.add_argument("--paquet", type=int, default=16, help="Pièces par tâche envoyée au pool (défaut : 16)")
+    p.add_argument("--json", action="store_true", help="Une ligne JSON par pièce, puis les saisies")
+    args = p.parse_args(argv)
+
+    debut = time.perf_counter()
+    pieces = []
+    for piece in analyser_pieces(args.fichiers, args.workers, args.paquet):
+        pieces.append(piece)
+        if args.json:
+            print(json.dumps(ligne_piece(piece), ensure_ascii=False))
+        else:
+            releves = ", ".join(f"{k} {v:,.2f}".replace(",", " ") for k, v in piece.montants.items())
+            print(f"{piece.nom:<40}{piece.type or '?':<10}{piece.periode:<15}{releves}"
+                  + (f"  [{piece.motif}]" if piece.motif else ""))
+    ecoule = time.perf_counter() - debut
+    champs = champs_dossier(pieces, args.statut)
+    if args.json:
+        print(json.dumps({"statut": args.statut, "saisies": champs}, ensure_ascii=False))
+    else:
+        print(f"\nSaisies {args.statut} : " + (", ".join(f"{k} = {v:,.2f}".replace(",", " ") for k, v in champs.items())
+                                               or "aucune"))
+    print(f"{len(pieces)} pièce(s) en {ecoule:.2f} s ({_milliers(len(pieces) / ecoule if ecoule else 0)} pièces/s).",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
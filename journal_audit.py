@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+# journal_audit.py — Trace d'audit des calculs d'éligibilité (append-only, rejouable)
+#
+# Usage :
+#   python journal_audit.py rejouer                      # tous les journaux de COACH_AUDIT_DIR
+#   python journal_audit.py rejouer audit/audit-20261018T093000-4242-001.jsonl
+#   python journal_audit.py montrer 3f9c0a7e51d24b0c     # un calcul : saisies, règle, résultat
+#
+# Chaque calcul de la page Dossier client est consigné en JSON Lines : saisies,
+# version et empreinte de la table de règles, Resultat complet (revenus,
+# message — ex. "min(CNI N-1 ; RNI IRPP) / 12" —, alerte, erreur). La table
+# de règles elle-même est recopiée une fois par fichier, à sa première
+# utilisation : un fichier se rejoue seul, même après modification de
+# regles_statuts.json.
+#
+# Écriture : consigner() sérialise la ligne et la pose dans un tampon ; un
+# thread écrit le tampon par lots (toutes les COACH_AUDIT_PERIODE_S secondes,
+# ou dès COACH_AUDIT_LOT lignes) avec un seul fsync par lot. Fichiers ouverts
+# en ajout seul, un par processus ; au-delà de COACH_AUDIT_TAILLE_MAX octets,
+# le fichier est fermé, passé en lecture seule, et un nouveau est ouvert ; le
+# dernier l'est à la sortie du processus (atexit : fermer).
+# COACH_AUDIT=0 désactive la trace.
+
+from __future__ import annotations
+
+import argparse
+import atexit
+import glob
+import hashlib
+import json
+import os
+import sys
+import threading
+import uuid
+from dataclasses import asdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from moteur_revenus import Resultat, compiler
+from regles import TableRegles, compiler_table, table_courante
+
+DOSSIER_DEFAUT = os.environ.get(
+    "COACH_AUDIT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "audit")
+)
+
+
+def _json(valeur: Any) -> str:
+    return json.dumps(valeur, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def empreinte_table(table: TableRegles) -> str:
+    """Empreinte du contenu de la table (deux fichiers de même version mais modifiés diffèrent)."""
+    brut = json.dumps(table.brut, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(brut.encode("utf-8")).hexdigest()[:16]
+
+
+class JournalAudit:
+    """Journal d'un processus ; consigner() est sûr entre threads et ne fait pas d'entrée-sortie."""
+
+    def __init__(self, dossier: str = DOSSIER_DEFAUT, taille_max: int = 64 * 1024 * 1024,
+                 periode_s: float = 1.0, lot_max: int = 512):
+        self.dossier = dossier
+        self.taille_max = taille_max
+        self.periode_s = periode_s
+        self.lot_max = lot_max
+        self._tampon: List[Tuple[str, TableRegles, str]] = []
+        self._condition = threading.Condition()
+        self._verrou_ecriture = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._derniere_table: Tuple[Optional[TableRegles], str] = (None, "")
+        self._fichier = None
+        self._chemin: Optional[str] = None
+        self._taille = 0
+        self._tables_du_fichier: set = set()
+        self._rotations = 0
+        self.lignes = 0
+        self.lots = 0
+
+    def empreinte(self, table: TableRegles) -> str:
+        derniere, empreinte = self._derniere_table
+        if table is not derniere:
+            empreinte = empreinte_table(table)
+            self._derniere_table = (table, empreinte)
+        return empreinte
+
+    # -----------------------------
+    # Chemin chaud (rerun)
+    # -----------------------------
+    def consigner(self, saisies: Mapping[str, Any], resultat: Resultat, table: Optional[TableRegles] = None,
+                  **contexte: Any) -> str:
+        """Pose le calcul dans le tampon ; renvoie son identifiant (cf. `montrer`)."""
+        table = table or table_courante()
+        empreinte = self.empreinte(table)
+        id_calcul = uuid.uuid4().hex[:16]
+        ligne = _json({
+            "type": "calcul", "id": id_calcul, "horodatage": datetime.now().isoformat(timespec="milliseconds"),
+            **contexte, "regles": empreinte, "version_regles": table.version,
+            "saisies": dict(saisies), "resultat": asdict(resultat),
+        })
+        with self._condition:
+            self._tampon.append((empreinte, table, ligne))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._boucle, name="coach-audit", daemon=True)
+                self._thread.start()
+            if len(self._tampon) >= self.lot_max:
+                self._condition.notify()
+        return id_calcul
+
+    # -----------------------------
+    # Écriture par lots
+    # -----------------------------
+    def _boucle(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: len(self._tampon) >= self.lot_max, timeout=self.periode_s)
+            self.vider()
+
+    def vider(self) -> None:
+        """Écrit le tampon maintenant (un write, un fsync) ; appelé par le thread, et par fermer()."""
+        with self._verrou_ecriture:
+            with self._condition:
+                lot, self._tampon = self._tampon, []
+            if not lot:
+                return
+            morceaux: List[bytes] = []
+            for empreinte, table, ligne in lot:
+                if self._fichier is None or self._taille >= self.taille_max:
+                    self._ecrire(morceaux)
+                    morceaux = []
+                    self._ouvrir()
+                if empreinte not in self._tables_du_fichier:
+                    morceaux.append(self._ligne({"type": "regles", "regles": empreinte, "version_regles": table.version,
+                                                 "table": table.brut}))
+                    self._tables_du_fichier.add(empreinte)
+                morceaux.append(self._ligne(None, ligne))
+            self._ecrire(morceaux)
+            self.lignes += len(lot)
+            self.lots += 1
+
+    def _ligne(self, enregistrement: Optional[Dict[str, Any]], texte: Optional[str] = None) -> bytes:
+        octets = ((texte if texte is not None else _json(enregistrement)) + "\n").encode("utf-8")
+        self._taille += len(octets)
+        return octets
+
+    def _ecrire(self, morceaux: List[bytes]) -> None:
+        if morceaux and self._fichier is not None:
+            self._fichier.write(b"".join(morceaux))
+            self._fichier.flush()
+            os.fsync(self._fichier.fileno())
+
+    def _ouvrir(self) -> None:
+        self._fermer_fichier()
+        os.makedirs(self.dossier, exist_ok=True)
+        self._rotations += 1
+        horodatage = datetime.now().strftime("%Y%m%dT%H%M%S")
+        self._chemin = os.path.join(self.dossier, f"audit-{horodatage}-{os.getpid()}-{self._rotations:03d}.jsonl")
+        self._fichier = open(self._chemin, "ab")
+        self._taille = self._fichier.tell()
+        self._tables_du_fichier = set()
+
+    def _fermer_fichier(self) -> None:
+        if self._fichier is not None:
+            self._fichier.close()
+            os.chmod(self._chemin, 0o444)  # fichier terminé : plus aucune écriture
+            self._fichier = None
+
+    def fermer(self) -> None:
+        """Écrit le tampon et ferme le fichier en cours (lecture seule, comme après une rotation)."""
+        self.vider()
+        with self._verrou_ecriture:
+            self._fermer_fichier()
+
+    @property
+    def chemin(self) -> Optional[str]:
+        return self._chemin
+
+
+_journal: Optional[JournalAudit] = None
+_verrou_journal = threading.Lock()
+
+
+def journal() -> Optional[JournalAudit]:
+    """Journal du processus (COACH_AUDIT_DIR, _TAILLE_MAX, _PERIODE_S, _LOT) ; None si COACH_AUDIT=0."""
+    global _journal
+    if os.environ.get("COACH_AUDIT", "1") == "0":
+        return None
+    with _verrou_journal:
+        if _journal is None:
+            _journal = JournalAudit(
+                DOSSIER_DEFAUT,
+                taille_max=int(os.environ.get("COACH_AUDIT_TAILLE_MAX", 64 * 1024 * 1024)),
+                periode_s=float(os.environ.get("COACH_AUDIT_PERIODE_S", 1.0)),
+                lot_max=int(os.environ.get("COACH_AUDIT_LOT", 512)),
+            )
+            atexit.register(_journal.fermer)
+        return _journal
+
+
+# -----------------------------
+# Relecture et rejeu
+# -----------------------------
+def fichiers_journal(dossier: str = DOSSIER_DEFAUT) -> List[str]:
+    return sorted(glob.glob(os.path.join(dossier, "audit-*.jsonl")))
+
+
+def lire_journal(chemins: Iterable[str]) -> Iterator[Tuple[str, int, Dict[str, Any]]]:
+    """(fichier, numéro de ligne, enregistrement) ; une dernière ligne tronquée (arrêt brutal) est ignorée."""
+    for chemin in chemins:
+        with open(chemin, encoding="utf-8") as f:
+            for num, ligne in enumerate(f, start=1):
+                try:
+                    yield chemin, num, json.loads(ligne)
+                except json.JSONDecodeError:
+                    if ligne.endswith("\n"):
+                        raise ValueError(f"{chemin}:{num} : ligne de journal illisible.")
+
+
+def _normaliser(resultat: Resultat) -> Dict[str, Any]:
+    return json.loads(_json(asdict(resultat)))
+
+
+def rejouer(chemins: Iterable[str], ids: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """Recalcule chaque calcul consigné avec la table de règles enregistrée et compare au résultat consigné.
+
+    Renvoie {"calculs", "identiques", "ecarts": [{id, fichier, ligne, champs: {champ: (consigné, rejoué)}}]}.
+    """
+    voulus = set(ids) if ids else None
+    tables: Dict[str, Any] = {}  # empreinte -> dict statut -> évaluateur, ou motif d'échec (str)
+    calculs = identiques = 0
+    ecarts: List[Dict[str, Any]] = []
+    for chemin, num, e in lire_journal(chemins):
+        if e.get("type") == "regles":
+            if e["regles"] not in tables:
+                try:
+                    tables[e["regles"]] = compiler(compiler_table(e["table"]))
+                except (ValueError, KeyError, TypeError, ZeroDivisionError) as err:
+                    tables[e["regles"]] = f"table de règles {e['version_regles']} non compilable : {err}"
+            continue
+        if e.get("type") != "calcul" or (voulus is not None and e["id"] not in voulus):
+            continue
+        calculs += 1
+        dispatch = tables.get(e["regles"], "table de règles absente du journal")
+        statut = e["saisies"].get("statut") or "CDI"
+        if isinstance(dispatch, str) or statut not in dispatch:
+            motif = dispatch if isinstance(dispatch, str) else f"statut inconnu {statut!r}"
+            ecarts.append({"id": e["id"], "fichier": chemin, "ligne": num, "motif": motif, "champs": {}})
+            continue
+        rejoue = _normaliser(dispatch[statut](e["saisies"]))
+        champs = {k: (v, rejoue.get(k)) for k, v in e["resultat"].items() if rejoue.get(k) != v}
+        if champs:
+            ecarts.append({"id": e["id"], "fichier": chemin, "ligne": num, "motif": "résultat différent",
+                           "champs": champs})
+        else:
+            identiques += 1
+    return {"calculs": calculs, "identiques": identiques, "ecarts": ecarts}
+
+
+def trouver(chemins: Iterable[str], id_calcul: str) -> Optional[Dict[str, Any]]:
+    for _, _, e in lire_journal(chemins):
+        if e.get("type") == "calcul" and e["id"] == id_calcul:
+            return e
+    return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Trace d'audit des calculs d'éligibilité.")
+    sous = p.add_subparsers(dest="commande", required=True)
+    r = sous.add_parser("rejouer", help="Recalculer les calculs consignés et vérifier les résultats")
+    r.add_argument("fichiers", nargs="*", help="Journaux (défaut : tous ceux de COACH_AUDIT_DIR)")
+    r.add_argument("--id", action="append", help="Seulement ce calcul (répétable)")
+    m = sous.add_parser("montrer", help="Afficher un calcul consigné")
+    m.add_argument("id")
+    m.add_argument("fichiers", nargs="*")
+    args = p.parse_args(argv)
+
+    chemins = args.fichiers or fichiers_journal()
+    if args.commande == "montrer":
+        e = trouver(chemins, args.id)
+        if e is None:
+            print(f"Calcul {args.id} introuvable.", file=sys.stderr)
+            return 1
+        print(json.dumps(e, ensure_ascii=False, indent=2))
+        return 0
+
+    bilan = rejouer(chemins, args.id)
+    for ecart in bilan["ecarts"]:
+        print(f"{ecart['fichier']}:{ecart['ligne']} [{ecart['id']}] {ecart['motif']}")
+        for champ, (consigne, rejoue) in ecart["champs"].items():
+            print(f"    {champ} : consigné {consigne!r}, rejoué {rejoue!r}")
+    print(f"{bilan['calculs']} calcul(s) rejoué(s), {bilan['identiques']} identique(s), "
+          f"{len(bilan['ecarts'])} écart(s).", file=sys.stderr)
+    return 1 if bilan["ecarts"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+# memoire_sessions.py — Mémoire par session Streamlit et capacité d'un nœud
+#
+# Usage :
+#   COACH_SESSION_BUDGET=1048576 streamlit run app.py    # alerte au-delà de 1 Mio par session
+#   python benchmarks/bench_sessions.py --sessions 20    # coût mémoire complet d'une session
+#
+# Après chaque rerun (_safe_render, app.py), l'état de la session est mesuré :
+# taille profonde de st.session_state, clé par clé, sans compter les objets
+# partagés par le processus (referentiel, table de règles, caches de module).
+# La mesure est faite au plus toutes les COACH_SESSION_MESURE_S secondes (30)
+# par session ; une session au-delà de COACH_SESSION_BUDGET octets (512 Kio)
+# est signalée dans le log avec ses clés les plus lourdes.
+#
+# Capacité d'un nœud (page d'admin, jauges Prometheus) :
+#   (COACH_MEMOIRE_NOEUD − RSS hors sessions) / (état moyen + COACH_SESSION_SURCOUT)
+# où le surcoût est la part de Streamlit par session (file de messages, arbre
+# des widgets…), mesurée par benchmarks/bench_sessions.py.
+
+from __future__ import annotations
+
+import logging
+import os
+import sys
+import threading
+import time
+import types
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Set, Tuple
+
+from metriques import REGISTRE, Registre
+
+log = logging.getLogger(__name__)
+
+BUDGET_DEFAUT = int(os.environ.get("COACH_SESSION_BUDGET", 512 * 1024))
+PERIODE_DEFAUT = float(os.environ.get("COACH_SESSION_MESURE_S", 30.0))
+SURCOUT_DEFAUT = int(os.environ.get("COACH_SESSION_SURCOUT", 480 * 1024))  # bench_sessions : ~480 Ko (majorant)
+INACTIVITE_S = 3600.0  # session sans rerun depuis une heure : considérée fermée
+
+_NON_MESURES = (types.ModuleType, type, types.FunctionType, types.BuiltinFunctionType, types.MethodType,
+                types.CodeType, threading.Thread)
+
+
+# -----------------------------
+# Taille profonde
+# -----------------------------
+def taille_profonde(objet: Any, exclus: Optional[Set[int]] = None) -> int:
+    """Octets de `objet` et de tout ce qu'il référence (conteneurs, attributs), chaque objet une fois.
+
+    Les objets dont l'id est dans `exclus` (données partagées du processus),
+    les modules, classes, fonctions et threads ne sont pas comptés.
+    """
+    vus: Set[int] = set(exclus or ())
+    total = 0
+    pile = [objet]
+    while pile:
+        o = pile.pop()
+        if id(o) in vus or isinstance(o, _NON_MESURES):
+            continue
+        vus.add(id(o))
+        total += sys.getsizeof(o, 0)
+        if isinstance(o, (str, bytes, bytearray, int, float, bool, type(None))):
+            continue
+        if isinstance(o, Mapping):
+            pile.extend(o.keys())
+            pile.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            pile.extend(o)
+        else:
+            if hasattr(o, "__dict__"):
+                pile.append(vars(o))
+            for nom in getattr(type(o), "__slots__", ()):
+                if hasattr(o, nom):
+                    pile.append(getattr(o, nom))
+    return total
+
+
+_partages: Tuple[Optional[object], Set[int]] = (None, set())
+
+
+def ids_partages() -> Set[int]:
+    """Ids des données de référence du processus (recalculés quand la table de règles change)."""
+    global _partages
+    from referentiel import AIDE_AUTRES_REVENUS, DOCS_PAR_STATUT, PAGES, STATUTS
+    from regles import table_courante
+    table = table_courante()
+    derniere, ids = _partages
+    if table is derniere:
+        return ids
+    ids = set()
+    pile: List[Any] = [STATUTS, PAGES, AIDE_AUTRES_REVENUS, table.brut, dict(DOCS_PAR_STATUT)]
+    while pile:
+        o = pile.pop()
+        if id(o) in ids:
+            continue
+        ids.add(id(o))
+        if isinstance(o, Mapping):
+            pile.extend(o.keys())
+            pile.extend(o.values())
+        elif isinstance(o, (list, tuple)):
+            pile.extend(o)
+    _partages = (table, ids)
+    return ids
+
+
+def rss_octets() -> int:
+    """Mémoire résidente du processus (Linux : /proc ; ailleurs : pic depuis le démarrage)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource  # absent sous Windows : n'est importé qu'ici
+        pic = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return pic if sys.platform == "darwin" else pic * 1024
+
+
+# -----------------------------
+# Suivi des sessions du processus
+# -----------------------------
+@dataclass
+class MesureSession:
+    octets: int
+    cles: List[Tuple[str, int]]  # clés les plus lourdes, décroissant
+    mesure_le: float
+    vue_le: float
+
+
+class SuiviSessions:
+    """Dernière mesure de chaque session ; sûr entre threads (un thread de script par session)."""
+
+    def __init__(self, budget: int = BUDGET_DEFAUT, periode_s: float = PERIODE_DEFAUT,
+                 surcout: int = SURCOUT_DEFAUT, registre: Optional[Registre] = REGISTRE):
+        self.budget = budget
+        self.periode_s = periode_s
+        self.surcout = surcout
+        self._sessions: Dict[str, MesureSession] = {}
+        self._signalees: Set[str] = set()
+        self._verrou = threading.Lock()
+        if registre is not None:
+            registre.jauge("coach_sessions_actives", "Sessions ayant fait un rerun dans l'heure.", lambda: len(self.actives()))
+            registre.jauge("coach_session_etat_octets_moyen", "État moyen d'une session (st.session_state).",
+                           lambda: self.resume()["moyenne_octets"])
+            registre.jauge("coach_session_etat_octets_max", "État de la session la plus lourde.",
+                           lambda: self.resume()["max_octets"])
+            registre.jauge("coach_processus_rss_octets", "Mémoire résidente du processus.", rss_octets)
+
+    def mesurer(self, id_session: str, etat: Mapping[str, Any], forcer: bool = False) -> Optional[MesureSession]:
+        """Mesure l'état d'une session (au plus une fois par période) ; renvoie la mesure si elle a été refaite."""
+        maintenant = time.monotonic()
+        with self._verrou:
+            precedente = self._sessions.get(id_session)
+            if precedente is not None:
+                precedente.vue_le = maintenant
+                if not forcer and maintenant - precedente.mesure_le < self.periode_s:
+                    return None
+        exclus = ids_partages()
+        cles = sorted(((str(k), taille_profonde(v, exclus)) for k, v in dict(etat).items()),
+                      key=lambda kv: kv[1], reverse=True)
+        mesure = MesureSession(sum(t for _, t in cles), cles[:5], maintenant, maintenant)
+        with self._verrou:
+            self._sessions[id_session] = mesure
+            signaler = mesure.octets > self.budget and id_session not in self._signalees
+            if signaler:
+                self._signalees.add(id_session)
+            elif mesure.octets <= self.budget:
+                self._signalees.discard(id_session)
+            self._purger(maintenant)
+        if signaler:
+            log.warning("Session %s : état de %.1f Ko au-delà du budget (%d Ko) ; clés les plus lourdes : %s",
+                        id_session[:8], mesure.octets / 1024, self.budget // 1024,
+                        ", ".join(f"{k} ({t / 1024:.1f} Ko)" for k, t in mesure.cles))
+        return mesure
+
+    def _purger(self, maintenant: float) -> None:
+        for id_session in [i for i, m in self._sessions.items() if maintenant - m.vue_le > INACTIVITE_S]:
+            del self._sessions[id_session]
+            self._signalees.discard(id_session)
+
+    def actives(self) -> Dict[str, MesureSession]:
+        maintenant = time.monotonic()
+        with self._verrou:
+            return {i: m for i, m in self._sessions.items() if maintenant - m.vue_le <= INACTIVITE_S}
+
+    def resume(self) -> Dict[str, Any]:
+        mesures = list(self.actives().values())
+        total = sum(m.octets for m in mesures)
+        return {
+            "sessions": len(mesures),
+            "moyenne_octets": total // len(mesures) if mesures else 0,
+            "max_octets": max((m.octets for m in mesures), default=0),
+            "total_octets": total,
+            "hors_budget": sum(1 for m in mesures if m.octets > self.budget),
+        }
+
+    def capacite(self, memoire_noeud: int, rss: Optional[int] = None) -> Optional[int]:
+        """Sessions simultanées que tient `memoire_noeud` octets, au coût moyen observé (None sans mesure)."""
+        r = self.resume()
+        if not r["sessions"]:
+            return None
+        base = (rss if rss is not None else rss_octets()) - r["total_octets"] - r["sessions"] * self.surcout
+        return max(0, int((memoire_noeud - base) // (r["moyenne_octets"] + self.surcout)))
+
+    def lignes(self) -> List[Dict[str, Any]]:
+        """Une ligne par session active (page d'admin), les plus lourdes d'abord."""
+        return [
+            {"session": i[:8], "état (Ko)": round(m.octets / 1024, 1),
+             "clés les plus lourdes": ", ".join(f"{k} ({t / 1024:.1f} Ko)" for k, t in m.cles[:3])}
+            for i, m in sorted(self.actives().items(), key=lambda im: im[1].octets, reverse=True)
+        ]
+
+
+SESSIONS = SuiviSessions()
+
+
+def memoire_noeud() -> Optional[int]:
+    """COACH_MEMOIRE_NOEUD (octets) : mémoire réservée à ce processus sur le nœud."""
+    valeur = os.environ.get("COACH_MEMOIRE_NOEUD")
+    return int(valeur) if valeur else None
+
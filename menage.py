@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+# menage.py — Dossier à plusieurs emprunteurs (ménage), sans interface
+#
+# Chaque emprunteur est évalué avec la règle de son propre statut
+# (moteur_revenus), puis les revenus retenus sont additionnés. Les résultats
+# individuels sont mémorisés par saisies : modifier le co-emprunteur ne
+# recalcule que lui, l'autre est relu dans le cache.
+#
+# Enregistré (dépôt, fichiers de dossiers), un ménage est un seul dossier :
+# les saisies de l'emprunteur 1 plus celles du co-emprunteur sous la clé
+# "co_emprunteur", avec le statut STATUT_MENAGE dans la colonne statut.
+# evaluer_saisies évalue indifféremment un dossier simple ou un ménage.
+
+from __future__ import annotations
+
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from moteur_revenus import Resultat, evaluer_dossier
+from referentiel import STATUT_MENAGE
+from regles import TableRegles, table_courante
+
+CO_EMPRUNTEUR = "co_emprunteur"
+
+
+@dataclass(frozen=True)
+class ResultatMenage:
+    emprunteurs: Tuple[Resultat, ...]
+
+    @property
+    def revenu_eligible(self) -> float:
+        return round(sum(r.revenu_eligible for r in self.emprunteurs), 2)
+
+    @property
+    def revenu_total(self) -> float:
+        return round(sum(r.revenu_total for r in self.emprunteurs), 2)
+
+    @property
+    def erreur(self) -> Optional[str]:
+        erreurs = [f"Emprunteur {i} : {r.erreur}" for i, r in enumerate(self.emprunteurs, start=1) if r.erreur]
+        return " ".join(erreurs) or None
+
+    @property
+    def eligible(self) -> bool:
+        return all(r.eligible for r in self.emprunteurs) and not self.erreur
+
+    def resultat(self) -> Resultat:
+        """Synthèse du ménage au format Resultat (dépôt, exports) : statuts joints, revenus additionnés."""
+        alertes = [f"Emprunteur {i} : {r.alerte}" for i, r in enumerate(self.emprunteurs, start=1) if r.alerte]
+        return Resultat(
+            statut=" + ".join(r.statut for r in self.emprunteurs),
+            revenu_eligible=self.revenu_eligible,
+            revenu_total=self.revenu_total,
+            message=f"Ménage : somme des revenus retenus de {len(self.emprunteurs)} emprunteurs.",
+            info=" ".join(r.info for r in self.emprunteurs if r.info),
+            eligible=self.eligible,
+            alerte=" ".join(alertes) or None,
+            niveau_alerte="error" if any(r.niveau_alerte == "error" for r in self.emprunteurs if r.alerte) else "warning",
+            erreur=self.erreur,
+        )
+
+
+def _cle(dossier: Mapping[str, Any]) -> str:
+    return json.dumps(dossier, sort_keys=True, ensure_ascii=False, default=str)
+
+
+class EvaluateurMenage:
+    """Évaluations individuelles mémorisées (LRU) ; le cache est vidé quand la table de règles change."""
+
+    def __init__(self, taille: int = 4096):
+        self.taille = taille
+        self._resultats: "OrderedDict[str, Resultat]" = OrderedDict()
+        self._table: Optional[TableRegles] = None
+        self._verrou = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def evaluer(self, dossier: Mapping[str, Any], table: Optional[TableRegles] = None) -> Resultat:
+        table = table or table_courante()
+        cle = _cle(dossier)
+        with self._verrou:
+            if table is not self._table:
+                self._resultats.clear()
+                self._table = table
+            res = self._resultats.get(cle)
+            if res is not None:
+                self._resultats.move_to_end(cle)
+                self.hits += 1
+                return res
+            self.misses += 1
+        res = evaluer_dossier(dossier, table)  # ValueError (statut inconnu) : rien n'est mémorisé
+        with self._verrou:
+            if table is self._table:
+                self._resultats[cle] = res
+                while len(self._resultats) > self.taille:
+                    self._resultats.popitem(last=False)
+        return res
+
+    def evaluer_menage(self, emprunteurs: Sequence[Mapping[str, Any]],
+                       table: Optional[TableRegles] = None) -> ResultatMenage:
+        table = table or table_courante()
+        return ResultatMenage(tuple(self.evaluer(d, table) for d in emprunteurs))
+
+
+EVALUATEUR = EvaluateurMenage()
+
+
+def evaluer_menage(emprunteurs: Sequence[Mapping[str, Any]], table: Optional[TableRegles] = None) -> ResultatMenage:
+    """Évalue chaque emprunteur (cache du processus) et additionne les revenus retenus."""
+    return EVALUATEUR.evaluer_menage(emprunteurs, table)
+
+
+# -----------------------------
+# Ménage enregistré (un seul dossier, co-emprunteur imbriqué)
+# -----------------------------
+def dossier_menage(emprunteurs: Sequence[Mapping[str, Any]]) -> Dict[str, Any]:
+    """Saisies à enregistrer pour un ménage de deux emprunteurs."""
+    premier, second = emprunteurs
+    return {**premier, CO_EMPRUNTEUR: dict(second)}
+
+
+def est_menage(saisies: Mapping[str, Any]) -> bool:
+    return bool(saisies.get(CO_EMPRUNTEUR))
+
+
+def emprunteurs(saisies: Mapping[str, Any]) -> List[Mapping[str, Any]]:
+    """Saisies de chaque emprunteur du dossier (une seule entrée hors ménage)."""
+    co = saisies.get(CO_EMPRUNTEUR)
+    if not co:
+        return [saisies]
+    if not isinstance(co, Mapping):
+        raise ValueError(f"Champ « {CO_EMPRUNTEUR} » : objet attendu ({co!r})")
+    return [{k: v for k, v in saisies.items() if k != CO_EMPRUNTEUR}, co]
+
+
+def statut_enregistre(saisies: Mapping[str, Any]) -> Optional[str]:
+    """Statut de la colonne statut du dépôt : STATUT_MENAGE pour un ménage, sinon celui saisi."""
+    return STATUT_MENAGE if est_menage(saisies) else saisies.get("statut")
+
+
+def evaluer_saisies(saisies: Mapping[str, Any], table: Optional[TableRegles] = None) -> Resultat:
+    """Dossier simple : evaluer_dossier ; ménage : synthèse ResultatMenage.resultat() (sans le cache de la page)."""
+    dossiers = emprunteurs(saisies)
+    if len(dossiers) == 1:
+        return evaluer_dossier(saisies, table)
+    table = table or table_courante()
+    return ResultatMenage(tuple(evaluer_dossier(d, table) for d in dossiers)).resultat()
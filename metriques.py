@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+# metriques.py — Instrumentation des reruns (histogrammes par page et statut)
+#
+# _safe_render (app.py) ouvre une mesure par rerun : durée totale du rendu de
+# la page, temps passé dans fpdf (exports_pdf), exception éventuelle. Les
+# valeurs vont dans des histogrammes à seaux fixes, communs au processus
+# (toutes sessions confondues), étiquetés par page et par statut.
+#
+# Exposition au format texte Prometheus, au choix :
+#   - COACH_METRIQUES_PORT=9464     : endpoint HTTP local http://127.0.0.1:9464/metrics ;
+#   - COACH_METRIQUES_FICHIER=/var/lib/node_exporter/coach_{pid}.prom
+#                                   : fichier réécrit au plus toutes les
+#                                     COACH_METRIQUES_PERIODE_S secondes (10).
+# La page d'admin (cachée, ?admin=<COACH_ADMIN_JETON>) affiche p50 / p95 / p99.
+
+from __future__ import annotations
+
+import bisect
+import contextvars
+import functools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+# Seaux (s) : du rerun de page simple (~50 ms) à l'export groupé (plusieurs secondes)
+SEAUX_S: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.15, 0.2, 0.3, 0.5, 0.75,
+                              1.0, 1.5, 2.5, 5.0, 10.0, 30.0)
+
+Etiquettes = Tuple[str, str]  # (page, statut)
+T = TypeVar("T")
+
+
+class Histogramme:
+    """Histogramme cumulatif façon Prometheus (seaux fixes, somme, compte)."""
+
+    __slots__ = ("seaux", "comptes", "somme", "nombre")
+
+    def __init__(self, seaux: Tuple[float, ...] = SEAUX_S):
+        self.seaux = seaux
+        self.comptes = [0] * (len(seaux) + 1)  # dernier = +Inf
+        self.somme = 0.0
+        self.nombre = 0
+
+    def observer(self, valeur: float) -> None:
+        self.comptes[bisect.bisect_left(self.seaux, valeur)] += 1
+        self.somme += valeur
+        self.nombre += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimation par interpolation linéaire dans le seau (comme histogram_quantile)."""
+        if not self.nombre:
+            return None
+        rang = q * self.nombre
+        cumul = 0
+        for i, c in enumerate(self.comptes):
+            if cumul + c >= rang and c:
+                if i == len(self.seaux):  # seau +Inf : on ne sait pas mieux que la dernière borne
+                    return self.seaux[-1]
+                bas = self.seaux[i - 1] if i else 0.0
+                return bas + (self.seaux[i] - bas) * (rang - cumul) / c
+            cumul += c
+        return self.seaux[-1]
+
+
+@dataclass
+class Registre:
+    """Métriques du processus ; toutes les écritures passent par le verrou."""
+    rerun: Dict[Etiquettes, Histogramme] = field(default_factory=dict)
+    fpdf: Dict[Etiquettes, Histogramme] = field(default_factory=dict)
+    exceptions: Dict[Etiquettes, int] = field(default_factory=dict)
+    # jobs d'export asynchrones (file_exports), par type de job
+    jobs_attente: Dict[str, Histogramme] = field(default_factory=dict)
+    jobs_duree: Dict[str, Histogramme] = field(default_factory=dict)
+    jobs_erreurs: Dict[str, int] = field(default_factory=dict)
+    jauges: Dict[str, Tuple[str, Callable[[], float]]] = field(default_factory=dict)
+    debut: float = field(default_factory=time.time)
+    verrou: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def enregistrer(self, etiquettes: Etiquettes, duree_s: float, fpdf_s: float, exception: bool) -> None:
+        with self.verrou:
+            self.rerun.setdefault(etiquettes, Histogramme()).observer(duree_s)
+            if fpdf_s:
+                self.fpdf.setdefault(etiquettes, Histogramme()).observer(fpdf_s)
+            if exception:
+                self.exceptions[etiquettes] = self.exceptions.get(etiquettes, 0) + 1
+
+    def observer_job(self, type_job: str, attente_s: float, duree_s: float, erreur: bool) -> None:
+        with self.verrou:
+            self.jobs_attente.setdefault(type_job, Histogramme()).observer(attente_s)
+            self.jobs_duree.setdefault(type_job, Histogramme()).observer(duree_s)
+            if erreur:
+                self.jobs_erreurs[type_job] = self.jobs_erreurs.get(type_job, 0) + 1
+
+    def jauge(self, nom: str, aide: str, lecture: Callable[[], float]) -> None:
+        """Valeur instantanée lue à chaque exposition (ex. profondeur de la file d'exports)."""
+        with self.verrou:
+            self.jauges[nom] = (aide, lecture)
+
+    def vider(self) -> None:
+        with self.verrou:
+            self.rerun.clear()
+            self.fpdf.clear()
+            self.exceptions.clear()
+            self.jobs_attente.clear()
+            self.jobs_duree.clear()
+            self.jobs_erreurs.clear()
+            self.debut = time.time()
+
+    def resume(self) -> List[Dict[str, object]]:
+        """Une ligne par (page, statut) : nombre de reruns, p50/p95/p99 (ms), fpdf, exceptions."""
+        with self.verrou:
+            lignes = []
+            for (page, statut) in sorted(set(self.rerun) | set(self.exceptions)):
+                h = self.rerun.get((page, statut)) or Histogramme()
+                f = self.fpdf.get((page, statut))
+                lignes.append({
+                    "page": page,
+                    "statut": statut,
+                    "reruns": h.nombre,
+                    **{f"p{int(q * 100)} (ms)": _ms(h.quantile(q)) for q in (0.5, 0.95, 0.99)},
+                    "moyenne (ms)": _ms(h.somme / h.nombre if h.nombre else None),
+                    "fpdf p95 (ms)": _ms(f.quantile(0.95) if f else None),
+                    "fpdf total (s)": round(f.somme, 3) if f else 0.0,
+                    "exceptions": self.exceptions.get((page, statut), 0),
+                })
+            return lignes
+
+    def resume_jobs(self) -> List[Dict[str, object]]:
+        """Une ligne par type de job : nombre, attente et durée p50/p95 (ms), erreurs."""
+        with self.verrou:
+            lignes = []
+            for type_job in sorted(self.jobs_duree):
+                a, d = self.jobs_attente[type_job], self.jobs_duree[type_job]
+                lignes.append({
+                    "job": type_job,
+                    "jobs": d.nombre,
+                    "attente p50 (ms)": _ms(a.quantile(0.5)),
+                    "attente p95 (ms)": _ms(a.quantile(0.95)),
+                    "durée p50 (ms)": _ms(d.quantile(0.5)),
+                    "durée p95 (ms)": _ms(d.quantile(0.95)),
+                    "erreurs": self.jobs_erreurs.get(type_job, 0),
+                })
+            return lignes
+
+    def jauges_courantes(self) -> Dict[str, float]:
+        with self.verrou:
+            jauges = dict(self.jauges)
+        return {nom: lecture() for nom, (_, lecture) in jauges.items()}
+
+    def prometheus(self) -> str:
+        """Exposition au format texte Prometheus 0.0.4."""
+        out: List[str] = []
+        with self.verrou:
+            for nom, aide, series in (
+                ("coach_rerun_secondes", "Durée du rendu d'une page (rerun complet).", self.rerun),
+                ("coach_fpdf_secondes", "Temps passé dans fpdf pendant un rerun.", self.fpdf),
+            ):
+                out += _histogrammes(nom, aide, {_etiquettes(e): h for e, h in series.items()})
+            out += ["# HELP coach_exceptions_total Exceptions attrapées par _safe_render.",
+                    "# TYPE coach_exceptions_total counter"]
+            for etiquettes, n in sorted(self.exceptions.items()):
+                out.append(f"coach_exceptions_total{{{_etiquettes(etiquettes)}}} {n}")
+            for nom, aide, series in (
+                ("coach_exports_attente_secondes", "Attente d'un job d'export avant son rendu.", self.jobs_attente),
+                ("coach_exports_duree_secondes", "Durée de rendu d'un job d'export.", self.jobs_duree),
+            ):
+                out += _histogrammes(nom, aide, {f'job="{t}"': h for t, h in series.items()})
+            out += ["# HELP coach_exports_erreurs_total Jobs d'export terminés en erreur.",
+                    "# TYPE coach_exports_erreurs_total counter"]
+            for type_job, n in sorted(self.jobs_erreurs.items()):
+                out.append(f'coach_exports_erreurs_total{{job="{type_job}"}} {n}')
+            out += ["# HELP coach_metriques_debut_secondes Début de la collecte (epoch).",
+                    "# TYPE coach_metriques_debut_secondes gauge",
+                    f"coach_metriques_debut_secondes {self.debut!r}"]
+            jauges = dict(self.jauges)
+        for nom, (aide, lecture) in sorted(jauges.items()):  # hors verrou : la lecture peut prendre le sien
+            out += [f"# HELP {nom} {aide}", f"# TYPE {nom} gauge", f"{nom} {lecture()}"]
+        return "\n".join(out) + "\n"
+
+
+def _histogrammes(nom: str, aide: str, series: Dict[str, Histogramme]) -> List[str]:
+    out = [f"# HELP {nom} {aide}", f"# TYPE {nom} histogram"]
+    for base, h in sorted(series.items()):
+        cumul = 0
+        for borne, c in zip(h.seaux + (float("inf"),), h.comptes):
+            cumul += c
+            le = "+Inf" if borne == float("inf") else repr(borne)
+            out.append(f'{nom}_bucket{{{base},le="{le}"}} {cumul}')
+        out.append(f"{nom}_sum{{{base}}} {h.somme!r}")
+        out.append(f"{nom}_count{{{base}}} {h.nombre}")
+    return out
+
+
+def _ms(secondes: Optional[float]) -> Optional[float]:
+    return None if secondes is None else round(secondes * 1000.0, 1)
+
+
+def _etiquettes(etiquettes: Etiquettes) -> str:
+    page, statut = (e.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for e in etiquettes)
+    return f'page="{page}",statut="{statut}"'
+
+
+REGISTRE = Registre()
+log = logging.getLogger(__name__)
+
+
+# -----------------------------
+# Mesure d'un rerun (une par thread de script Streamlit)
+# -----------------------------
+@dataclass
+class _Mesure:
+    page: str
+    statut: str = "-"
+    fpdf_s: float = 0.0
+    exception: bool = False
+
+
+_courante: contextvars.ContextVar[Optional[_Mesure]] = contextvars.ContextVar("mesure_rerun", default=None)
+
+
+@contextmanager
+def mesurer_rerun(page: str, registre: Registre = REGISTRE) -> Iterator[_Mesure]:
+    """Chronomètre le rendu d'une page ; l'appelant signale une exception attrapée via `mesure.exception`.
+
+    Les interruptions de Streamlit (st.stop, st.rerun) ne sont pas des erreurs :
+    la mesure est enregistrée telle quelle.
+    """
+    mesure = _Mesure(page)
+    jeton = _courante.set(mesure)
+    t0 = time.perf_counter()
+    try:
+        yield mesure
+    finally:
+        _courante.reset(jeton)
+        registre.enregistrer((mesure.page, mesure.statut), time.perf_counter() - t0, mesure.fpdf_s, mesure.exception)
+        _exporter_fichier(registre)
+
+
+def rerun_en_cours() -> bool:
+    """Vrai pendant un rerun mesuré (utile aux fragments : relancés seuls, ils ouvrent leur propre mesure)."""
+    return _courante.get() is not None
+
+
+def etiqueter_statut(statut: str) -> None:
+    """Rattache le rerun en cours au statut choisi sur la page (sans effet hors rerun)."""
+    mesure = _courante.get()
+    if mesure is not None:
+        mesure.statut = statut or "-"
+
+
+@contextmanager
+def temps_fpdf() -> Iterator[None]:
+    """Ajoute la durée du bloc au temps fpdf du rerun en cours (sans effet hors rerun)."""
+    mesure = _courante.get()
+    if mesure is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        mesure.fpdf_s += time.perf_counter() - t0
+
+
+def chronometrer_fpdf(fn: Callable[..., T]) -> Callable[..., T]:
+    """Décorateur : le temps passé dans `fn` compte comme temps fpdf du rerun en cours."""
+    @functools.wraps(fn)
+    def enveloppe(*args, **kwargs):
+        with temps_fpdf():
+            return fn(*args, **kwargs)
+    return enveloppe
+
+
+# -----------------------------
+# Exposition : fichier texte et endpoint HTTP local
+# -----------------------------
+_dernier_export = 0.0
+
+
+def _exporter_fichier(registre: Registre) -> None:
+    global _dernier_export
+    modele = os.environ.get("COACH_METRIQUES_FICHIER")
+    maintenant = time.monotonic()
+    if not modele or maintenant - _dernier_export < float(os.environ.get("COACH_METRIQUES_PERIODE_S", "10")):
+        return
+    _dernier_export = maintenant
+    ecrire_fichier(modele.format(pid=os.getpid()), registre)
+
+
+def ecrire_fichier(chemin: str, registre: Registre = REGISTRE) -> None:
+    """Écrit l'exposition Prometheus dans `chemin` (remplacement atomique, lisible par node_exporter)."""
+    tmp = f"{chemin}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(registre.prometheus())
+    os.replace(tmp, chemin)
+
+
+_serveur = None
+_verrou_serveur = threading.Lock()
+
+
+def demarrer_serveur(port: int, hote: str = "127.0.0.1", registre: Registre = REGISTRE):
+    """Sert /metrics sur hote:port dans un thread démon (une fois par processus)."""
+    global _serveur
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class _Gestionnaire(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            corps = registre.prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(corps)))
+            self.end_headers()
+            self.wfile.write(corps)
+
+        def log_message(self, *args):  # pas de log d'accès sur stderr
+            pass
+
+    with _verrou_serveur:
+        if _serveur is None:
+            _serveur = ThreadingHTTPServer((hote, port), _Gestionnaire)
+            threading.Thread(target=_serveur.serve_forever, name="coach-metriques", daemon=True).start()
+    return _serveur
+
+
+def demarrer_depuis_env() -> None:
+    """Démarre l'endpoint si COACH_METRIQUES_PORT est défini ; un port déjà pris n'arrête pas l'app."""
+    port = os.environ.get("COACH_METRIQUES_PORT")
+    if port and _serveur is None:
+        try:
+            demarrer_serveur(int(port))
+        except OSError as e:  # autre worker du nœud déjà sur ce port
+            log.warning("Endpoint métriques non démarré sur le port %s : %s", port, e)
@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+# moteur_lot.py — Mode lot du moteur de revenus (NumPy, groupé par statut)
+#
+# Mêmes règles que moteur_revenus.evaluer_dossier, appliquées colonne par
+# colonne : un calcul vectorisé par statut présent dans le lot. Les familles de
+# formules sont paramétrées par la même table (regles_statuts.json).
+
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from moteur_revenus import DEFAUTS, Resultat, _bool, _liste, _num
+from referentiel import STATUTS
+from regles import RegleStatut, TableRegles, table_courante
+
+
+@dataclass
+class ResultatsLot:
+    """Résultats alignés sur l'ordre des dossiers d'entrée (un tableau par colonne)."""
+    statuts: np.ndarray          # int16, index dans noms (-1 si inconnu)
+    revenu_eligible: np.ndarray  # float64
+    revenu_total: np.ndarray     # float64
+    eligible: np.ndarray         # bool
+    messages: np.ndarray         # object (str)
+    infos: np.ndarray            # object (str)
+    alertes: np.ndarray          # object (str ou None)
+    niveaux: np.ndarray          # object ("warning" / "error")
+    erreurs: np.ndarray          # object (str ou None)
+    noms: Sequence[str] = tuple(STATUTS)  # STATUTS, puis les statuts ajoutés par la table de règles
+
+    def __len__(self) -> int:
+        return len(self.revenu_eligible)
+
+    def resultat(self, i: int) -> Resultat:
+        code = int(self.statuts[i])
+        return Resultat(
+            statut=self.noms[code] if code >= 0 else "",
+            revenu_eligible=float(self.revenu_eligible[i]),
+            revenu_total=float(self.revenu_total[i]),
+            message=self.messages[i],
+            info=self.infos[i],
+            eligible=bool(self.eligible[i]),
+            alerte=self.alertes[i],
+            niveau_alerte=self.niveaux[i],
+            erreur=self.erreurs[i],
+        )
+
+
+class _Groupe:
+    """Colonnes NumPy d'un groupe de dossiers de même statut (extraites à la demande)."""
+
+    def __init__(self, dossiers: Sequence[Mapping[str, Any]]):
+        self.dossiers = dossiers
+        self.n = len(dossiers)
+        self._cache: Dict[str, np.ndarray] = {}
+
+    def num(self, champ: str) -> np.ndarray:
+        if champ not in self._cache:
+            valeurs = [d.get(champ) for d in self.dossiers]
+            try:
+                col = np.array(valeurs, dtype=np.float64)
+                vides = np.isnan(col)
+                if vides.any():
+                    if any(valeurs[i] is not None for i in np.flatnonzero(vides)):
+                        raise ValueError  # NaN saisi (pas un champ absent) : refusé par _num
+                    col[vides] = float(DEFAUTS[champ])
+                if not (np.isfinite(col).all() and (col >= 0).all()):
+                    raise ValueError  # négatif ou infini : _num lève l'erreur qui nomme le champ
+            except (TypeError, ValueError):  # chaînes vides, saisies CSV hétérogènes, montants refusés
+                col = np.fromiter((_num(d, champ) for d in self.dossiers), dtype=np.float64, count=self.n)
+            self._cache[champ] = col
+        return self._cache[champ]
+
+    def bool(self, champ: str) -> np.ndarray:
+        return np.fromiter((_bool(d, champ) for d in self.dossiers), dtype=bool, count=self.n)
+
+    def constante(self, valeur: Any) -> np.ndarray:
+        out = np.empty(self.n, dtype=object)
+        out[:] = [valeur] * self.n
+        return out
+
+    def selon(self, masque: np.ndarray, si_vrai: Any, si_faux: Any) -> np.ndarray:
+        out = self.constante(si_faux)
+        out[masque] = si_vrai
+        return out
+
+
+class _Sortie:
+    """Colonnes produites pour un groupe ; les valeurs par défaut sont celles d'un dossier éligible."""
+
+    def __init__(self, g: _Groupe, r: RegleStatut, revenu: np.ndarray):
+        self.revenu = revenu
+        self.eligible = np.ones(g.n, dtype=bool)
+        self.messages = g.constante(r.textes["message"] if "message" in r.textes else "")
+        self.infos = g.constante(r.textes["info"])
+        self.alertes = g.constante(None)
+        self.niveaux = g.constante("warning")
+        self.erreurs = g.constante(None)
+
+    def refuser(self, masque: np.ndarray, message: str, alerte: str, info: Optional[str] = None,
+                niveau: str = "warning") -> None:
+        self.revenu = np.where(masque, 0.0, self.revenu)
+        self.eligible &= ~masque
+        self.messages[masque] = message
+        self.alertes[masque] = alerte
+        self.niveaux[masque] = niveau
+        if info is not None:
+            self.infos[masque] = info
+
+    def en_erreur(self, masque: np.ndarray, texte: str) -> None:
+        self.revenu = np.where(masque, 0.0, self.revenu)
+        self.erreurs[masque] = texte
+
+
+FabriqueLot = Callable[[RegleStatut], Callable[[_Groupe], _Sortie]]
+
+
+def _arrondi(x: np.ndarray) -> np.ndarray:
+    """round(x, 2) de Python, élément par élément.
+
+    np.round(x, 2) arrondit x × 100, produit lui-même arrondi : près d'un
+    demi-centime le résultat peut différer d'un centime de round(). Loin d'un
+    demi-centime, rint(x × 100) / 100 est exact ; les cas douteux sont repris
+    un par un par round().
+    """
+    x = np.asarray(x, dtype=np.float64)
+    centimes = x * 100.0
+    out = np.rint(centimes) / 100.0
+    with np.errstate(invalid="ignore"):
+        douteux = np.abs(centimes - np.floor(centimes) - 0.5) <= 1e-9 * np.maximum(1.0, np.abs(centimes))
+    if douteux.any():
+        out[douteux] = [round(v, 2) for v in x[douteux].tolist()]
+    return out
+
+
+def _lot_rni_12m(r: RegleStatut):
+    mois_min = r.parametres["mois_restants_min"]
+
+    def lot(g: _Groupe) -> _Sortie:
+        rni, ded = g.num("cdd_rni_12m"), g.num("deductions")
+        s = _Sortie(g, r, _arrondi((rni - ded) / 12.0))
+        court = g.num("cdd_mois_restants") < mois_min
+        for i in np.flatnonzero((ded > 0) | court):
+            msg = r.textes["message"]
+            if ded[i] > 0:
+                msg += r.textes["message_deductions"].format(deductions=f"{ded[i]:.0f}")
+            if court[i]:
+                msg += r.textes["message_fin_contrat"]
+            s.messages[i] = msg
+        s.en_erreur(rni <= 0, r.textes["erreur"])
+        return s
+    return lot
+
+
+def _lot_moyenne_annuelle(r: RegleStatut):
+    champs, condition, seuil = r.parametres["champs"], r.parametres["condition_champ"], r.parametres["seuil"]
+
+    def lot(g: _Groupe) -> _Sortie:
+        rni = np.stack([g.num(c) for c in champs])
+        positifs = rni > 0
+        nb = positifs.sum(axis=0)
+        erreur = nb == 0
+        s = _Sortie(g, r, _arrondi(np.where(positifs, rni, 0.0).sum(axis=0) / np.maximum(nb, 1) / 12.0))
+        s.refuser((g.num(condition) < seuil) & ~erreur, r.textes["message_non_eligible"], r.textes["alerte"],
+                  r.texte("info_non_eligible", r.textes["info"]))
+        s.en_erreur(erreur, r.textes["erreur"])
+        return s
+    return lot
+
+
+def _lot_somme(r: RegleStatut, diviseur: Optional[float] = None):
+    champs = r.parametres["champs"]
+    condition = r.parametres.get("condition_champ")
+
+    def lot(g: _Groupe) -> _Sortie:
+        total = np.sum([g.num(c) for c in champs], axis=0)
+        if diviseur:
+            total = total / diviseur
+        s = _Sortie(g, r, _arrondi(total / 12.0))
+        if condition:
+            valeur, seuil = g.num(condition), r.parametres["seuil"]
+            refus = ~(valeur > seuil) if r.parametres.get("seuil_strict") else ~(valeur >= seuil)
+            s.refuser(refus, r.textes["message_non_eligible"], r.textes["alerte"])
+        return s
+    return lot
+
+
+def _lot_moyenne(r: RegleStatut):
+    return _lot_somme(r, float(len(r.parametres["champs"])))
+
+
+def _lot_somme_liste(r: RegleStatut):
+    champ = r.parametres["champ"]
+
+    def lot(g: _Groupe) -> _Sortie:
+        listes = [_liste(d, champ) for d in g.dossiers]
+        s = _Sortie(g, r, _arrondi(np.fromiter((sum(x) for x in listes), dtype=np.float64, count=g.n) / 12.0))
+        s.messages[:] = [r.textes["message"].format(nb=len(x)) for x in listes]
+        return s
+    return lot
+
+
+def _lot_cdi(r: RegleStatut):
+    p, t = r.parametres, r.textes
+    anciennete_min, anciennete_pnc, coef_pnc = p["anciennete_min_mois"], p["anciennete_pnc_mois"], r.coef("coef_pnc")
+
+    def lot(g: _Groupe) -> _Sortie:
+        anc = g.num("cdi_anciennete_mois")
+        bulletins = np.stack([g.num("b_m1"), g.num("b_m2"), g.num("b_m3")])
+        nb_bulletins = (bulletins > 0).sum(axis=0)
+        chgt = g.bool("cdi_chgt") & (bulletins != 0).any(axis=0)
+        moy3 = np.maximum(0.0, _arrondi(bulletins.sum(axis=0) / np.maximum(nb_bulletins, 1)))
+
+        pc_m = g.num("cdi_primes_contractuelles_annuelles") / 12.0
+        pnc_m = (g.num("pnc1") + g.num("pnc2") + g.num("pnc3")) / 3.0 / 12.0 * np.where(anc < anciennete_pnc, coef_pnc, 1.0)
+
+        recent = ~chgt & (anc < anciennete_min)
+        essai = recent & ~g.bool("cdi_periode_essai_terminee")
+        recent &= ~essai
+        coef = np.where(g.bool("cdi_statut_cadre"), p["coef_cadre"], p["coef_non_cadre"])
+        revenu_recent = np.maximum(0.0, _arrondi(g.num("cdi_salaire_brut_annuel_contrat") * coef / 12.0 + pc_m + pnc_m))
+
+        cni, rni = g.num("cdi_cni"), g.num("cdi_rni")
+        base_fiscale = np.fmin(np.where(cni > 0, cni, np.nan), np.where(rni > 0, rni, np.nan))
+        fiscal = ~chgt & ~recent & ~essai & ~np.isnan(base_fiscale)
+        revenu_fiscal = np.maximum(0.0, _arrondi(np.nan_to_num(base_fiscale) / 12.0))
+        revenu_fallback = np.maximum(0.0, _arrondi(g.num("salaire_fixe") + pc_m + pnc_m))
+
+        s = _Sortie(g, r, np.select([chgt, recent, fiscal], [moy3, revenu_recent, revenu_fiscal], revenu_fallback))
+        s.messages[:] = np.select([chgt, fiscal], [t["message_changement"], t["message_fiscal"]], t["message_fallback"])
+        for i in np.flatnonzero(recent):
+            s.messages[i] = t["message_recent"].format(
+                coef=float(coef[i]), coef_pnc_applique=p["coef_pnc"] if anc[i] < anciennete_pnc else "1")
+        s.refuser(essai, t["message_essai"], t["alerte_essai"], niveau="error")
+        return s
+    return lot
+
+
+FABRIQUES_LOT: Dict[str, FabriqueLot] = {
+    "cdi": _lot_cdi,
+    "rni_12m": _lot_rni_12m,
+    "moyenne_annuelle": _lot_moyenne_annuelle,
+    "moyenne": _lot_moyenne,
+    "somme": _lot_somme,
+    "somme_liste": _lot_somme_liste,
+}
+
+_compilee: Tuple[Optional[TableRegles], Dict[str, Callable[[_Groupe], _Sortie]]] = (None, {})
+
+
+def compiler_lot(table: TableRegles) -> Dict[str, Callable[[_Groupe], _Sortie]]:
+    return {statut: FABRIQUES_LOT[r.formule](r) for statut, r in table.regles.items()}
+
+
+def _dispatch(table: Optional[TableRegles]):
+    global _compilee
+    table = table or table_courante()
+    derniere, dispatch = _compilee
+    if table is not derniere:
+        dispatch = compiler_lot(table)
+        _compilee = (table, dispatch)
+    return dispatch
+
+
+def evaluer_lot(dossiers: Iterable[Mapping[str, Any]], table: Optional[TableRegles] = None) -> ResultatsLot:
+    """Évalue un lot de dossiers : un calcul vectorisé par statut présent.
+
+    Les dossiers au statut inconnu ne lèvent pas d'exception : ils ressortent
+    avec `erreurs[i]` renseigné. Arrondis au centime identiques à ceux de
+    evaluer_dossier (cf. _arrondi).
+    """
+    dispatch = _dispatch(table)
+    dossiers = list(dossiers)
+    n = len(dossiers)
+    # une table rechargée à chaud peut définir un statut absent du référentiel : il reçoit un code à la suite
+    noms = list(STATUTS) + [s for s in dispatch if s not in STATUTS]
+    codes = {s: i for i, s in enumerate(noms)}
+
+    groupes: Dict[str, List[int]] = defaultdict(list)
+    hors_texte: List[Tuple[int, Any]] = []  # statut JSON non chaîne (liste, nombre…) : inconnu, comme en scalaire
+    for i, d in enumerate(dossiers):
+        statut = d.get("statut") or DEFAUTS["statut"]
+        if isinstance(statut, str):
+            groupes[statut].append(i)
+        else:
+            hors_texte.append((i, statut))
+
+    res = ResultatsLot(
+        statuts=np.full(n, -1, dtype=np.int16),
+        revenu_eligible=np.zeros(n),
+        revenu_total=np.zeros(n),
+        eligible=np.zeros(n, dtype=bool),
+        messages=np.full(n, "", dtype=object),
+        infos=np.full(n, "", dtype=object),
+        alertes=np.full(n, None, dtype=object),
+        niveaux=np.full(n, "warning", dtype=object),
+        erreurs=np.full(n, None, dtype=object),
+        noms=tuple(noms),
+    )
+    for i, statut in hors_texte:
+        res.erreurs[i] = f"Statut inconnu : {statut!r}"
+    for statut, indices in groupes.items():
+        idx = np.asarray(indices, dtype=np.intp)
+        lot = dispatch.get(statut)
+        if lot is None:
+            res.erreurs[idx] = f"Statut inconnu : {statut!r}"
+            continue
+        g = _Groupe([dossiers[i] for i in indices])
+        s = lot(g)
+        en_erreur = np.not_equal(s.erreurs, None)
+        autres = g.num("autres_revenus")
+        res.statuts[idx] = codes[statut]
+        res.revenu_eligible[idx] = s.revenu
+        res.revenu_total[idx] = np.where(en_erreur, _arrondi(g.num("salaire_fixe") + autres),
+                                         _arrondi(s.revenu + autres))
+        res.eligible[idx] = s.eligible & ~en_erreur
+        res.messages[idx] = np.where(en_erreur, "", s.messages)
+        res.infos[idx] = np.where(en_erreur, "", s.infos)
+        res.alertes[idx] = np.where(en_erreur, None, s.alertes)
+        res.niveaux[idx] = s.niveaux
+        res.erreurs[idx] = s.erreurs
+    return res
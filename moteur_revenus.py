@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+# moteur_revenus.py — Règles d'éligibilité des revenus, sans interface
+#
+# Le calcul de la page "Dossier client", sans Streamlit : la page ne fait plus
+# que collecter les saisies et afficher le Resultat. Les seuils, coefficients
+# et textes viennent de la table regles_statuts.json (voir regles.py), compilée
+# en un dict statut -> évaluateur : un appel = un accès dict. Deux points d'entrée :
+#   - evaluer_dossier(dossier) : un dossier (dict), un Resultat ;
+#   - evaluer_lot(dossiers)    : N dossiers, calcul NumPy groupé par statut
+#                                (moteur_lot.py, importé à la demande : NumPy
+#                                n'est pas chargé au démarrage de l'app).
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from regles import RegleStatut, TableRegles, table_courante
+
+# -----------------------------
+# Saisies d'un dossier (valeurs par défaut = celles de la page)
+# -----------------------------
+DEFAUTS: Dict[str, Any] = {
+    "nom": "",
+    "statut": "CDI",
+    "salaire_fixe": 2500.0,
+    "autres_revenus": 0.0,
+    # CDD / CDIC
+    "cdd_rni_12m": 0.0,
+    "cdd_mois_restants": 3,
+    "deductions": 0.0,
+    # Intérim / Intermittent / Saisonnier / Militaire / Pompier volontaire
+    "rni_N": 0.0,
+    "rni_N1": 0.0,
+    "rni_N2": 0.0,
+    "mois_activite": 18,
+    "annees_activite": 3,
+    "saisons": 2,
+    # Stagiaire FP / Apprenti
+    "rni": 0.0,
+    "duree_restante_mois": 24,
+    # Assistante maternelle
+    "cumul_paje": 0.0,
+    # Élu
+    "revenus_mandat": 0.0,
+    "autres_annuels": 0.0,
+    # Multi-contrats
+    "rni_employeurs": [0.0, 0.0],
+    # Famille d'accueil
+    "revenus_annuels": 0.0,
+    # CDI
+    "cdi_anciennete_mois": 12,
+    "cdi_periode_essai_terminee": True,
+    "cdi_statut_cadre": False,
+    "cdi_salaire_brut_annuel_contrat": 30000.0,
+    "cdi_primes_contractuelles_annuelles": 0.0,
+    "pnc1": 0.0,
+    "pnc2": 0.0,
+    "pnc3": 0.0,
+    "cdi_cni": 0.0,
+    "cdi_rni": 0.0,
+    "cdi_chgt": False,
+    "b_m1": 0.0,
+    "b_m2": 0.0,
+    "b_m3": 0.0,
+}
+
+@dataclass(frozen=True)
+class Resultat:
+    """Résultat d'une évaluation.
+
+    En cas de saisie incomplète (`erreur` renseignée), `revenu_total` vaut le
+    revenu mensuel minimal (fixe + autres revenus), comme sur la page.
+    """
+    statut: str
+    revenu_eligible: float
+    revenu_total: float
+    message: str
+    info: str = ""
+    eligible: bool = True
+    alerte: Optional[str] = None
+    niveau_alerte: str = "warning"
+    erreur: Optional[str] = None
+
+
+# -----------------------------
+# Lecture des champs
+# -----------------------------
+def _montant(champ: str, v: Any) -> float:
+    # toutes les saisies numériques sont des montants, durées ou nombres ≥ 0 (min_value=0 sur la page) :
+    # CSV, JSONL et API passent par ici, un négatif ou un NaN est refusé plutôt que calculé
+    try:
+        x = float(v)
+    except (TypeError, ValueError):
+        raise ValueError(f"Champ « {champ} » non numérique : {v!r}") from None
+    if not math.isfinite(x) or x < 0:
+        raise ValueError(f"Champ « {champ} » négatif ou non fini : {v!r}")
+    return x
+
+
+def _num(dossier: Mapping[str, Any], champ: str) -> float:
+    v = dossier.get(champ)
+    if v is None or v == "":
+        v = DEFAUTS[champ]
+    return _montant(champ, v)
+
+
+def _bool(dossier: Mapping[str, Any], champ: str) -> bool:
+    v = dossier.get(champ)
+    if v is None or v == "":
+        return bool(DEFAUTS[champ])
+    if isinstance(v, str):
+        return v.strip().lower() in ("1", "true", "vrai", "oui", "o", "y", "yes", "x")
+    return bool(v)
+
+
+def _liste(dossier: Mapping[str, Any], champ: str) -> List[float]:
+    v = dossier.get(champ)
+    if v is None or v == "":
+        v = DEFAUTS[champ]
+    if isinstance(v, str):
+        v = [x for x in v.replace(",", ";").split(";") if x.strip()]
+    try:
+        return [_montant(champ, x) for x in v]
+    except TypeError:  # pas une liste
+        raise ValueError(f"Champ « {champ} » non numérique : {v!r}") from None
+
+
+# -----------------------------
+# Familles de formules (paramétrées par une RegleStatut de la table)
+# -----------------------------
+Evaluateur = Callable[[Mapping[str, Any]], Resultat]
+
+
+def _rni_12m(r: RegleStatut) -> Evaluateur:
+    mois_min = r.parametres["mois_restants_min"]
+
+    def evaluer(d: Mapping[str, Any]) -> Resultat:
+        cdd_rni_12m = _num(d, "cdd_rni_12m")
+        deductions = _num(d, "deductions")
+        if cdd_rni_12m <= 0:
+            return _erreur(d, r, r.textes["erreur"])
+
+        revenu = round((cdd_rni_12m - deductions) / 12.0, 2)
+        msg = r.textes["message"]
+        if deductions > 0:
+            msg += r.textes["message_deductions"].format(deductions=f"{deductions:.0f}")
+        if _num(d, "cdd_mois_restants") < mois_min:
+            msg += r.textes["message_fin_contrat"]
+        return _ok(d, r, revenu, msg)
+    return evaluer
+
+
+def _moyenne_annuelle(r: RegleStatut) -> Evaluateur:
+    champs, condition, seuil = r.parametres["champs"], r.parametres["condition_champ"], r.parametres["seuil"]
+
+    def evaluer(d: Mapping[str, Any]) -> Resultat:
+        valeurs = [v for v in (_num(d, c) for c in champs) if v > 0]
+        if not valeurs:
+            return _erreur(d, r, r.textes["erreur"])
+        if _num(d, condition) < seuil:
+            return _non_eligible(d, r, r.texte("info_non_eligible", r.textes["info"]))
+        return _ok(d, r, round(sum(valeurs) / len(valeurs) / 12.0, 2), r.textes["message"])
+    return evaluer
+
+
+def _condition_remplie(r: RegleStatut, valeur: float) -> bool:
+    seuil = r.parametres["seuil"]
+    return valeur > seuil if r.parametres.get("seuil_strict") else valeur >= seuil
+
+
+def _somme(r: RegleStatut, diviseur: Optional[float] = None) -> Evaluateur:
+    """Somme (ou moyenne si `diviseur`) de champs annuels / 12, avec condition d'éligibilité facultative."""
+    champs = r.parametres["champs"]
+    condition = r.parametres.get("condition_champ")
+
+    def evaluer(d: Mapping[str, Any]) -> Resultat:
+        if condition and not _condition_remplie(r, _num(d, condition)):
+            return _non_eligible(d, r, r.textes["info"])
+        total = sum(_num(d, c) for c in champs)
+        if diviseur:
+            total = total / diviseur
+        return _ok(d, r, round(total / 12.0, 2), r.textes["message"])
+    return evaluer
+
+
+def _moyenne(r: RegleStatut) -> Evaluateur:
+    return _somme(r, float(len(r.parametres["champs"])))
+
+
+def _somme_liste(r: RegleStatut) -> Evaluateur:
+    champ = r.parametres["champ"]
+
+    def evaluer(d: Mapping[str, Any]) -> Resultat:
+        valeurs = _liste(d, champ)
+        return _ok(d, r, round(sum(valeurs) / 12.0, 2), r.textes["message"].format(nb=len(valeurs)))
+    return evaluer
+
+
+def pnc_mensuelles(p1: float, p2: float, p3: float, anciennete_mois: float,
+                   anciennete_pnc_mois: float = 36, coef_pnc: float = 2.0 / 3.0) -> float:
+    """Primes non contractuelles : moyenne 3 ans / 12, ×coef_pnc (2/3) si ancienneté < anciennete_pnc_mois (36)."""
+    vals = [v for v in [p1, p2, p3] if v is not None]
+    if not vals:
+        return 0.0
+    moy_ann = sum(vals) / len(vals)
+    coef = coef_pnc if anciennete_mois < anciennete_pnc_mois else 1.0
+    return moy_ann / 12.0 * coef
+
+
+def _cdi(r: RegleStatut) -> Evaluateur:
+    p = r.parametres
+    anciennete_min, anciennete_pnc = p["anciennete_min_mois"], p["anciennete_pnc_mois"]
+    coef_cadre, coef_non_cadre, coef_pnc = p["coef_cadre"], p["coef_non_cadre"], r.coef("coef_pnc")
+    t = r.textes
+
+    def evaluer(d: Mapping[str, Any]) -> Resultat:
+        anciennete = _num(d, "cdi_anciennete_mois")
+        salaires_3_mois = [_num(d, "b_m1"), _num(d, "b_m2"), _num(d, "b_m3")]
+
+        if _bool(d, "cdi_chgt") and any(salaires_3_mois):
+            moy3 = sum(salaires_3_mois) / len([x for x in salaires_3_mois if x > 0])
+            return _ok(d, r, max(0.0, round(moy3, 2)), t["message_changement"])
+
+        primes = _num(d, "cdi_primes_contractuelles_annuelles")
+        pc_m = (primes / 12.0) if primes else 0.0
+        pnc_m = pnc_mensuelles(_num(d, "pnc1"), _num(d, "pnc2"), _num(d, "pnc3"), anciennete, anciennete_pnc, coef_pnc)
+
+        if anciennete < anciennete_min:
+            if not _bool(d, "cdi_periode_essai_terminee"):
+                return _non_eligible(d, r, t["info"], message=t["message_essai"], alerte=t["alerte_essai"],
+                                     niveau_alerte="error")
+            coef = coef_cadre if _bool(d, "cdi_statut_cadre") else coef_non_cadre
+            base_m = (_num(d, "cdi_salaire_brut_annuel_contrat") * coef) / 12.0
+            revenu = max(0.0, round(base_m + pc_m + pnc_m, 2))
+            message = t["message_recent"].format(
+                coef=coef, coef_pnc_applique=p["coef_pnc"] if anciennete < anciennete_pnc else "1")
+            return _ok(d, r, revenu, message)
+
+        candidats = [x for x in [_num(d, "cdi_cni"), _num(d, "cdi_rni")] if x > 0]
+        if candidats:
+            # les primes sont déjà incluses dans ces bases fiscales
+            return _ok(d, r, max(0.0, round(min(candidats) / 12.0, 2)), t["message_fiscal"])
+        revenu = max(0.0, round(_num(d, "salaire_fixe") + pc_m + pnc_m, 2))
+        return _ok(d, r, revenu, t["message_fallback"])
+    return evaluer
+
+
+def _ok(d: Mapping[str, Any], r: RegleStatut, revenu: float, message: str) -> Resultat:
+    return Resultat(
+        statut=r.statut,
+        revenu_eligible=revenu,
+        revenu_total=round(revenu + _num(d, "autres_revenus"), 2),
+        message=message,
+        info=r.textes["info"],
+    )
+
+
+def _non_eligible(d: Mapping[str, Any], r: RegleStatut, info: str, message: Optional[str] = None,
+                  alerte: Optional[str] = None, niveau_alerte: str = "warning") -> Resultat:
+    return Resultat(
+        statut=r.statut,
+        revenu_eligible=0.0,
+        revenu_total=round(_num(d, "autres_revenus"), 2),
+        message=message or r.textes["message_non_eligible"],
+        info=info,
+        eligible=False,
+        alerte=alerte or r.textes["alerte"],
+        niveau_alerte=niveau_alerte,
+    )
+
+
+def _erreur(d: Mapping[str, Any], r: RegleStatut, texte: str) -> Resultat:
+    return Resultat(
+        statut=r.statut,
+        revenu_eligible=0.0,
+        revenu_total=round(_num(d, "salaire_fixe") + _num(d, "autres_revenus"), 2),
+        message="",
+        eligible=False,
+        erreur=texte,
+    )
+
+
+FABRIQUES: Dict[str, Callable[[RegleStatut], Evaluateur]] = {
+    "cdi": _cdi,
+    "rni_12m": _rni_12m,
+    "moyenne_annuelle": _moyenne_annuelle,
+    "moyenne": _moyenne,
+    "somme": _somme,
+    "somme_liste": _somme_liste,
+}
+
+
+# -----------------------------
+# Dispatch statut -> évaluateur, compilé une fois par version de table
+# -----------------------------
+_compilee: Tuple[Optional[TableRegles], Dict[str, Evaluateur]] = (None, {})
+
+
+def compiler(table: TableRegles) -> Dict[str, Evaluateur]:
+    """Compile une table de règles en dict statut -> évaluateur (closures paramétrées)."""
+    return {statut: FABRIQUES[r.formule](r) for statut, r in table.regles.items()}
+
+
+def _dispatch(table: Optional[TableRegles]) -> Dict[str, Evaluateur]:
+    global _compilee
+    table = table or table_courante()
+    derniere, dispatch = _compilee
+    if table is not derniere:
+        dispatch = compiler(table)
+        _compilee = (table, dispatch)
+    return dispatch
+
+
+def evaluer_dossier(dossier: Mapping[str, Any], table: Optional[TableRegles] = None) -> Resultat:
+    """Évalue un dossier (dict de saisies, cf. DEFAUTS) avec la table en service (ou `table`).
+
+    Lève ValueError si le statut est inconnu.
+    """
+    statut = dossier.get("statut") or DEFAUTS["statut"]
+    evaluer = _dispatch(table).get(statut) if isinstance(statut, str) else None
+    if evaluer is None:
+        raise ValueError(f"Statut inconnu : {statut!r}")
+    return evaluer(dossier)
+
+
+def evaluer_lot(dossiers: Iterable[Mapping[str, Any]], table: Optional[TableRegles] = None):
+    """Évalue un lot de dossiers en NumPy ; voir moteur_lot.evaluer_lot."""
+    from moteur_lot import evaluer_lot as _evaluer_lot
+    return _evaluer_lot(dossiers, table)
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+# polices.py — Police Unicode embarquée dans les PDF (DejaVu Sans), en cache par processus
+#
+# Police cherchée dans COACH_POLICES (dossier), puis polices/ à côté de ce
+# fichier (DejaVu Sans livrée avec l'app, licence LICENSE_DEJAVU), puis les
+# polices DejaVu de matplotlib. Sans police, exports_pdf garde Helvetica
+# (Latin-1, textes passés par safe()).
+#
+# Avec fpdf2, une police TTF coûte à chaque PDF : l'analyse du fichier
+# (add_font, ~80 ms par style) et le calcul du sous-ensemble de glyphes
+# embarqué (output, ~40 ms par style). Ici, par processus :
+#   - chaque style est analysé une fois ; un PDF en reçoit une copie légère
+#     (index, sous-ensemble et glyphes manquants propres au document) ;
+#   - chaque PDF part du même sous-ensemble de base (ASCII, lettres accentuées
+#     du français, €, tirets, guillemets) : presque tous embarquent donc la
+#     même police réduite, calculée une fois puis relue dans un cache LRU
+#     (clé : jeu de glyphes).
+# Reste par PDF le coût fixe de fpdf2 pour une police TTF (table CIDToGIDMap
+# de 128 Kio construite et compressée, ~8 ms par style) : cf.
+# benchmarks/bench_polices.py.
+# Un PDF construit avec ajouter_polices() doit être sorti sous
+# sortie_en_cache() (cf. exports_pdf.PDF.output) : le Subsetter de fpdf2
+# modifierait sinon la police analysée, partagée entre les documents.
+#
+# Ces copies et sous-ensembles reposent sur des internes de fpdf2 (TTFFont,
+# subset, Subsetter) vérifiés avec les versions VERSIONS_FPDF. Avec une autre
+# version, ajouter_polices() revient à add_font (sans cache, ~120 ms par style
+# et par PDF) plutôt que de risquer un PDF corrompu.
+
+from __future__ import annotations
+
+import copy
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from io import BytesIO
+from typing import Dict, FrozenSet, Iterator, List, Optional, Tuple
+
+import fpdf
+from fontTools import ttLib
+from fpdf import FPDF
+from fpdf.fonts import TTFFont
+
+VERSIONS_FPDF = ("2.8.",)
+INTERNES_FPDF = fpdf.__version__.startswith(VERSIONS_FPDF)
+
+FAMILLE = "DejaVu"
+FICHIERS = {"": "DejaVuSans.ttf", "B": "DejaVuSans-Bold.ttf", "I": "DejaVuSans-Oblique.ttf"}
+
+# Caractères présents dans le sous-ensemble de base de chaque PDF
+BASE = "".join(map(chr, range(0x20, 0x7F))) + "àâäçéèêëîïôöùûüÿæœÀÂÄÇÉÈÊËÎÏÔÖÙÛÜŸÆŒ«»€–—’“”…°²≈≥≤\u00a0\u202f"
+
+
+def _dossiers_candidats() -> List[str]:
+    dossiers = []
+    if os.environ.get("COACH_POLICES"):
+        dossiers.append(os.environ["COACH_POLICES"])
+    dossiers.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "polices"))
+    try:
+        import matplotlib
+        dossiers.append(os.path.join(matplotlib.get_data_path(), "fonts", "ttf"))
+    except ImportError:  # pragma: no cover
+        pass
+    return dossiers
+
+
+def dossier_polices() -> Optional[str]:
+    """Premier dossier contenant les trois styles de DejaVu Sans, ou None."""
+    for dossier in _dossiers_candidats():
+        if all(os.path.isfile(os.path.join(dossier, f)) for f in FICHIERS.values()):
+            return dossier
+    return None
+
+
+# -----------------------------
+# Modèles : un TTFFont analysé par style, partagé
+# -----------------------------
+class _Modele:
+    def __init__(self, chemin: str, style: str):
+        self.style = style
+        with open(chemin, "rb") as f:
+            self.source = f.read()  # pour recalculer un sous-ensemble (ttfont partagé jamais modifié)
+        self.police = TTFFont(FPDF(), chemin, f"{FAMILLE.lower()}{style}", style)
+        self.base = [g for g in (self.police.subset.get_glyph(unicode=ord(c)) for c in BASE) if g is not None]
+
+    def copie(self, index: int) -> TTFFont:
+        police = copy.copy(self.police)
+        police.i = index
+        police.missing_glyphs = []
+        police.biggest_size_pt = 0
+        police.subset = type(self.police.subset)(police)
+        for glyphe in self.base:
+            police.subset.pick_glyph(glyphe)
+        return police
+
+
+_modeles: Optional[Dict[str, _Modele]] = None
+_verrou = threading.Lock()
+
+
+def _charger_modeles() -> Dict[str, _Modele]:
+    global _modeles
+    with _verrou:
+        if _modeles is None:
+            dossier = dossier_polices() if INTERNES_FPDF else None
+            _modeles = {} if dossier is None else {
+                style: _Modele(os.path.join(dossier, fichier), style) for style, fichier in FICHIERS.items()
+            }
+        return _modeles
+
+
+def disponible() -> bool:
+    return bool(_charger_modeles()) if INTERNES_FPDF else dossier_polices() is not None
+
+
+def ajouter_polices(pdf: FPDF) -> bool:
+    """Déclare FAMILLE (3 styles) dans `pdf` sans relire les fichiers ; False si aucune police n'est trouvée."""
+    if not INTERNES_FPDF:
+        return _ajouter_fichiers(pdf)
+    modeles = _charger_modeles()
+    for style, modele in modeles.items():
+        police = modele.copie(len(pdf.fonts) + 1)
+        pdf.fonts[police.fontkey] = police
+    return bool(modeles)
+
+
+def _ajouter_fichiers(pdf: FPDF) -> bool:
+    # version de fpdf2 non vérifiée : API publique seulement
+    dossier = dossier_polices()
+    if dossier is None:
+        return False
+    for style, fichier in FICHIERS.items():
+        pdf.add_font(FAMILLE, style, os.path.join(dossier, fichier))
+    return True
+
+
+# -----------------------------
+# Sous-ensembles embarqués : LRU par jeu de glyphes
+# -----------------------------
+class _PoliceFigee(ttLib.TTFont):
+    """Police réduite déjà calculée : sans table, le Subsetter de fpdf2 n'a rien à faire ; save() écrit les octets."""
+
+    def __init__(self, octets: bytes, ids: Dict[str, int]):
+        super().__init__(recalcTimestamp=False)
+        self.setGlyphOrder(sorted(ids, key=ids.__getitem__))
+        self._octets = octets
+        self._ids = ids
+
+    def getGlyphID(self, glyphName: str) -> int:
+        return self._ids[glyphName]
+
+    def save(self, file, reorderTables=True) -> None:
+        file.write(self._octets)
+
+
+class _PoliceACalculer(ttLib.TTFont):
+    """Copie fraîche de la police, réduite par fpdf2 ; le résultat est rangé dans le cache à save()."""
+
+    def __init__(self, source: bytes, cle: Tuple[str, FrozenSet[str]], cache: "CacheSousEnsembles"):
+        super().__init__(BytesIO(source), recalcTimestamp=False, lazy=True)
+        self._cle = cle
+        self._cache = cache
+
+    def save(self, file, reorderTables=True) -> None:
+        tampon = BytesIO()
+        super().save(tampon, reorderTables)
+        octets = tampon.getvalue()
+        self._cache.ranger(self._cle, octets, {nom: i for i, nom in enumerate(self.getGlyphOrder())})
+        file.write(octets)
+
+
+class CacheSousEnsembles:
+    def __init__(self, taille: int = 256):
+        self.taille = taille
+        self._entrees: "OrderedDict[Tuple[str, FrozenSet[str]], Tuple[bytes, Dict[str, int]]]" = OrderedDict()
+        self._verrou = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def police(self, modele: _Modele, glyphes: FrozenSet[str]) -> ttLib.TTFont:
+        cle = (modele.style, glyphes)
+        with self._verrou:
+            entree = self._entrees.get(cle)
+            if entree is not None:
+                self._entrees.move_to_end(cle)
+                self.hits += 1
+                return _PoliceFigee(*entree)
+            self.misses += 1
+        return _PoliceACalculer(modele.source, cle, self)
+
+    def ranger(self, cle: Tuple[str, FrozenSet[str]], octets: bytes, ids: Dict[str, int]) -> None:
+        with self._verrou:
+            self._entrees[cle] = (octets, ids)
+            while len(self._entrees) > self.taille:
+                self._entrees.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._verrou:
+            return {"entrees": len(self._entrees), "hits": self.hits, "misses": self.misses,
+                    "octets": sum(len(o) for o, _ in self._entrees.values())}
+
+
+SOUS_ENSEMBLES = CacheSousEnsembles()
+
+
+@contextmanager
+def sortie_en_cache(pdf: FPDF) -> Iterator[None]:
+    """À placer autour de pdf.output() : chaque police du modèle reçoit sa police réduite (cache ou calcul)."""
+    modeles = {m.police.fontkey: m for m in (_modeles or {}).values()}
+    for cle, police in pdf.fonts.items():
+        modele = modeles.get(cle)
+        # seules les copies du modèle partagent son ttfont (une police ajoutée par add_font a le sien)
+        if modele is not None and police is not modele.police and police.ttfont is modele.police.ttfont:
+            police.ttfont = SOUS_ENSEMBLES.police(modele, frozenset(police.subset.get_all_glyph_names()))
+    yield
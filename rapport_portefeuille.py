@@ -0,0 +1,342 @@
+# -*- coding: utf-8 -*-
+# rapport_portefeuille.py — Rapport de portefeuille : graphiques matplotlib et PDF multi-pages
+#
+# Usage :
+#   python rapport_portefeuille.py rapport.pdf                      # dossiers du dépôt (COACH_DB)
+#   python rapport_portefeuille.py rapport.pdf --entree portefeuille.csv
+#
+# Trois graphiques, sur les résultats des dossiers (colonnes NumPy) :
+#   - revenus   : distribution du revenu total retenu par statut ;
+#   - rejets    : part des dossiers refusés par une règle d'antériorité
+#                 (Intérim < 18 mois, Saisonnier < 2 saisons, période d'essai…),
+#                 reconnue à son alerte (un contrat d'apprenti expiré n'en est pas) ;
+#   - capacite  : histogrammes de la mensualité et du capital empruntables.
+# Rendu sans pyplot (Figure + canevas Agg : aucun affichage, aucun état
+# global, sûr entre sessions). Chaque PNG est mis en cache par processus sous
+# l'empreinte des données : rouvrir le rapport sur le même portefeuille ne
+# redessine rien, et le PDF (exports_pdf.CACHE_PDF) n'est pas reconstruit.
+#
+# --entree : lignes évaluées comme par score_portefeuille ; une ligne illisible
+# ou incomplète compte en erreur de saisie et est listée sur la sortie d'erreur.
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import io
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from cache_pdf import CachePDF, cle, creneau
+from capacite import TAUX_ENDETTEMENT, _facteur_annuite
+from referentiel import STATUT_MENAGE, STATUTS
+
+TAUX_RAPPORT = 3.5   # % annuel, capital de l'histogramme de capacité
+DUREE_RAPPORT = 20   # ans
+DPI = 110
+
+TITRE_RAPPORT = "Coach Prêt Immo — Rapport de portefeuille"
+GRAPHES = {
+    "revenus": "Revenu total retenu par statut",
+    "rejets": "Refus par antériorité",
+    "capacite": "Capacité d'emprunt",
+}
+
+# PNG des graphiques, adressés par (graphe, empreinte des données, dpi)
+CACHE_GRAPHES = CachePDF(budget_octets=16 * 1024 * 1024)
+
+# Champs de condition (regles_statuts.json : condition_champ) qui sont une antériorité
+CHAMPS_ANTERIORITE = ("mois_activite", "annees_activite", "saisons")
+
+# (statut, revenu éligible, revenu total, éligible, en erreur, alerte) : cf. DepotDossiers.resultats
+Ligne = Tuple[Optional[str], Optional[float], float, Any, Any, Optional[str]]
+
+
+def alertes_anteriorite(table: Any = None) -> FrozenSet[str]:
+    """Alertes des refus d'antériorité de la table : condition sur CHAMPS_ANTERIORITE, période d'essai CDI."""
+    if table is None:
+        from regles import table_courante
+        table = table_courante()
+    alertes = set()
+    for r in table.regles.values():
+        if r.parametres.get("condition_champ") in CHAMPS_ANTERIORITE:
+            alertes.add(r.textes["alerte"])
+        if r.texte("alerte_essai"):
+            alertes.add(r.textes["alerte_essai"])
+    return frozenset(alertes)
+
+
+def _anteriorite(alertes: Iterable[Optional[str]], n: int) -> np.ndarray:
+    # alerte d'un ménage : "Emprunteur 2 : <alerte>" ; peu d'alertes distinctes, classées une fois chacune
+    connues = alertes_anteriorite()
+    classees: Dict[Optional[str], bool] = {None: False}
+
+    def classer(alerte: Optional[str]) -> bool:
+        if alerte not in classees:
+            classees[alerte] = any(a in alerte for a in connues)
+        return classees[alerte]
+    return np.fromiter((classer(a) for a in alertes), dtype=bool, count=n)
+
+
+@dataclass(frozen=True)
+class Portefeuille:
+    """Résultats d'un portefeuille en colonnes (un élément par dossier)."""
+    statuts: np.ndarray          # int16, index dans noms (-1 si inconnu)
+    revenu_eligible: np.ndarray  # float64
+    revenu_total: np.ndarray     # float64
+    eligible: np.ndarray         # bool
+    erreur: np.ndarray           # bool : saisie incomplète
+    anteriorite: np.ndarray      # bool : alerte d'un refus d'antériorité (cf. alertes_anteriorite)
+    noms: Sequence[str] = tuple(STATUTS)
+
+    def __len__(self) -> int:
+        return len(self.statuts)
+
+    @classmethod
+    def depuis_depot(cls, source: Any = None) -> "Portefeuille":
+        """Derniers résultats enregistrés des dossiers du dépôt (sans relire les saisies)."""
+        if source is None:
+            from depot_dossiers import depot
+            source = depot()
+        return cls.depuis_lignes(source.resultats())
+
+    @classmethod
+    def depuis_lignes(cls, lignes: Sequence[Ligne]) -> "Portefeuille":
+        noms = list(STATUTS) + sorted({l[0] for l in lignes if l[0]} - set(STATUTS))
+        codes = {s: i for i, s in enumerate(noms)}
+        return cls(
+            statuts=np.fromiter((codes.get(l[0], -1) for l in lignes), dtype=np.int16, count=len(lignes)),
+            revenu_eligible=np.fromiter((l[1] or 0.0 for l in lignes), dtype=np.float64, count=len(lignes)),
+            revenu_total=np.fromiter((l[2] for l in lignes), dtype=np.float64, count=len(lignes)),
+            eligible=np.fromiter((bool(l[3]) for l in lignes), dtype=bool, count=len(lignes)),
+            erreur=np.fromiter((bool(l[4]) for l in lignes), dtype=bool, count=len(lignes)),
+            anteriorite=_anteriorite((l[5] for l in lignes), len(lignes)),
+            noms=tuple(noms),
+        )
+
+    @classmethod
+    def depuis_lot(cls, res: Any) -> "Portefeuille":
+        """Depuis un moteur_lot.ResultatsLot (portefeuille importé)."""
+        return cls(res.statuts, res.revenu_eligible, res.revenu_total, res.eligible,
+                   np.array([e is not None for e in res.erreurs], dtype=bool),
+                   _anteriorite(res.alertes, len(res.alertes)), res.noms)
+
+    @property
+    def rejet_anteriorite(self) -> np.ndarray:
+        """Non éligible sans erreur de saisie, avec l'alerte d'une condition d'antériorité non remplie."""
+        return ~self.eligible & ~self.erreur & self.anteriorite
+
+    def empreinte(self) -> str:
+        h = hashlib.blake2b(digest_size=16)
+        h.update("|".join(self.noms).encode("utf-8"))
+        for colonne in (self.statuts, self.revenu_eligible, self.revenu_total, self.eligible, self.erreur,
+                        self.anteriorite):
+            h.update(np.ascontiguousarray(colonne).tobytes())
+        return h.hexdigest()
+
+    def capacite(self) -> Dict[str, np.ndarray]:
+        """Mensualité et capital max (TAUX_RAPPORT, DUREE_RAPPORT) des dossiers éligibles."""
+        mensualites = np.maximum(0.0, np.round(self.revenu_total[self.eligible] * TAUX_ENDETTEMENT, 2))
+        capital = mensualites * _facteur_annuite(np.float64(TAUX_RAPPORT), np.float64(DUREE_RAPPORT * 12))
+        return {"mensualite": mensualites, "capital": capital}
+
+    def synthese(self) -> List[Dict[str, Any]]:
+        """Une ligne par statut présent : effectifs, refus par antériorité, quartiles du revenu retenu."""
+        lignes = []
+        rejets = self.rejet_anteriorite
+        for code in np.unique(self.statuts):
+            masque = self.statuts == code
+            retenus = self.revenu_total[masque & self.eligible]
+            q1, mediane, q3 = np.percentile(retenus, [25, 50, 75]) if len(retenus) else (np.nan,) * 3
+            n = int(masque.sum())
+            lignes.append({
+                "Statut": self.noms[code] if code >= 0 else "(inconnu)",
+                "Dossiers": n,
+                "Éligibles": int((masque & self.eligible).sum()),
+                "Refus antériorité": int((masque & rejets).sum()),
+                "Part refus (%)": round(100.0 * float((masque & rejets).sum()) / n, 1),
+                "Erreurs de saisie": int((masque & self.erreur).sum()),
+                "Revenu médian (€)": round(float(mediane), 2),
+                "Q1 (€)": round(float(q1), 2),
+                "Q3 (€)": round(float(q3), 2),
+            })
+        return lignes
+
+
+# -----------------------------
+# Graphiques (Figure + Agg, sans pyplot)
+# -----------------------------
+def _figure(largeur: float, hauteur: float):
+    from matplotlib.figure import Figure
+    return Figure(figsize=(largeur, hauteur), layout="constrained")
+
+
+def _presents(p: Portefeuille) -> List[int]:
+    return [int(c) for c in np.unique(p.statuts) if c >= 0]
+
+
+def _graphe_revenus(p: Portefeuille):
+    codes = [c for c in _presents(p) if (p.eligible & (p.statuts == c)).any()]
+    fig = _figure(8, 0.45 * max(len(codes), 4) + 1.2)
+    ax = fig.add_subplot()
+    if codes:
+        series = [p.revenu_total[p.eligible & (p.statuts == c)] for c in codes]
+        ax.boxplot(series, orientation="horizontal", showfliers=False, widths=0.6, medianprops={"color": "#c0392b"})
+        ax.set_yticks(range(1, len(codes) + 1), [p.noms[c] for c in codes])
+        ax.invert_yaxis()
+    ax.set_xlabel("Revenu total retenu (€ / mois, dossiers éligibles, hors valeurs extrêmes)")
+    ax.set_title(GRAPHES["revenus"])
+    ax.grid(axis="x", alpha=0.3)
+    return fig
+
+
+def _graphe_rejets(p: Portefeuille):
+    codes = _presents(p)
+    fig = _figure(8, 0.4 * max(len(codes), 4) + 1.2)
+    ax = fig.add_subplot()
+    rejets = p.rejet_anteriorite
+    parts = [100.0 * (rejets & (p.statuts == c)).sum() / max(1, (p.statuts == c).sum()) for c in codes]
+    barres = ax.barh([p.noms[c] for c in codes], parts, color="#e67e22")
+    ax.bar_label(barres, labels=[f"{v:.1f} % ({int((rejets & (p.statuts == c)).sum())})" for v, c in zip(parts, codes)],
+                 padding=3, fontsize=8)
+    ax.invert_yaxis()
+    ax.set_xlim(0, max(parts + [10.0]) * 1.25)
+    ax.set_xlabel("Part des dossiers du statut refusés (%)")
+    ax.set_title(GRAPHES["rejets"])
+    ax.grid(axis="x", alpha=0.3)
+    return fig
+
+
+def _graphe_capacite(p: Portefeuille):
+    cap = p.capacite()
+    fig = _figure(8, 3.6)
+    ax1, ax2 = fig.subplots(1, 2)
+    ax1.hist(cap["mensualite"], bins=40, color="#2e86c1")
+    ax1.set_xlabel(f"Mensualité max (€, endettement {TAUX_ENDETTEMENT:.0%})")
+    ax1.set_ylabel("Dossiers éligibles")
+    ax2.hist(cap["capital"] / 1000.0, bins=40, color="#27ae60")
+    ax2.set_xlabel(f"Capital max (k€, {TAUX_RAPPORT:g} % sur {DUREE_RAPPORT} ans)".replace(".", ","))
+    for ax in (ax1, ax2):
+        ax.grid(axis="y", alpha=0.3)
+    fig.suptitle(GRAPHES["capacite"])
+    return fig
+
+
+_DESSINS: Dict[str, Callable[[Portefeuille], Any]] = {
+    "revenus": _graphe_revenus,
+    "rejets": _graphe_rejets,
+    "capacite": _graphe_capacite,
+}
+
+
+def _png(fig, dpi: int) -> bytes:
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    tampon = io.BytesIO()
+    FigureCanvasAgg(fig)  # canevas Agg attaché à la figure : savefig n'utilise pas le backend global
+    fig.savefig(tampon, format="png", dpi=dpi)
+    return tampon.getvalue()
+
+
+def graphe(nom: str, p: Portefeuille, dpi: int = DPI, empreinte: Optional[str] = None) -> bytes:
+    """PNG du graphe `nom` (cf. GRAPHES), depuis CACHE_GRAPHES si ces données ont déjà été dessinées."""
+    empreinte = empreinte or p.empreinte()
+    return CACHE_GRAPHES.obtenir(cle(f"graphe/{nom}", {"donnees": empreinte, "dpi": dpi}),
+                                 lambda: _png(_DESSINS[nom](p), dpi))
+
+
+# -----------------------------
+# PDF multi-pages (une page de synthèse, une page par graphique)
+# -----------------------------
+def pdf_rapport(p: Portefeuille, genere_le: Optional[datetime] = None) -> bytes:
+    from exports_pdf import CACHE_PDF, police_unicode
+    genere_le = genere_le or datetime.now()
+    empreinte = p.empreinte()
+    champs = {"donnees": empreinte, "police": police_unicode(),
+              "genere_le": creneau(genere_le, CACHE_PDF.granularite_s)}
+    return CACHE_PDF.obtenir(cle("rapport", champs), lambda: _rendre_rapport(p, empreinte, genere_le))
+
+
+def _euros(x: float) -> str:
+    return "-" if np.isnan(x) else f"{x:,.0f}".replace(",", " ")
+
+
+def _rendre_rapport(p: Portefeuille, empreinte: str, genere_le: datetime) -> bytes:
+    from exports_pdf import PDF
+    pdf = PDF(TITRE_RAPPORT, genere_le)
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.add_page()
+
+    pdf.set_font(pdf.famille, "B", 12)
+    pdf.cell(0, 8, pdf.t("Synthèse"), ln=1)
+    pdf.set_font(pdf.famille, "", 10)
+    rejets = int(p.rejet_anteriorite.sum())
+    pdf.cell(0, 6, pdf.t(f"{len(p)} dossiers, {int(p.eligible.sum())} éligibles, {rejets} refusés par "
+                         f"antériorité, {int(p.erreur.sum())} en erreur de saisie."), ln=1)
+    pdf.ln(3)
+    colonnes = [("Statut", 46), ("Dossiers", 22), ("Refus", 20), ("Refus %", 20), ("Médian €", 27),
+                ("Q1 €", 27), ("Q3 €", 27)]
+    pdf.set_font(pdf.famille, "B", 9)
+    for titre, largeur in colonnes:
+        pdf.cell(largeur, 7, pdf.t(titre), border=1, align="C")
+    pdf.ln()
+    pdf.set_font(pdf.famille, "", 9)
+    for ligne in p.synthese():
+        valeurs = [ligne["Statut"], f"{ligne['Dossiers']}", f"{ligne['Refus antériorité']}",
+                   f"{ligne['Part refus (%)']:.1f}", _euros(ligne["Revenu médian (€)"]), _euros(ligne["Q1 (€)"]),
+                   _euros(ligne["Q3 (€)"])]
+        for (_, largeur), valeur in zip(colonnes, valeurs):
+            pdf.cell(largeur, 6, pdf.t(valeur), border=1, align="L" if largeur == 46 else "R")
+        pdf.ln()
+
+    for nom, titre in GRAPHES.items():
+        pdf.add_page()
+        pdf.set_font(pdf.famille, "B", 12)
+        pdf.cell(0, 8, pdf.t(titre), ln=1)
+        pdf.image(io.BytesIO(graphe(nom, p, empreinte=empreinte)), w=pdf.epw)
+    return bytes(pdf.output())
+
+
+# -----------------------------
+# CLI
+# -----------------------------
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Rapport de portefeuille (PDF multi-pages).")
+    ap.add_argument("sortie", help="Fichier PDF")
+    ap.add_argument("--entree", help="Portefeuille (.csv ou .jsonl) évalué avec les règles en service, "
+                                     "au lieu des résultats enregistrés dans le dépôt")
+    args = ap.parse_args(argv)
+
+    rejets: List[Tuple[int, str]] = []
+    if args.entree:
+        p = Portefeuille.depuis_lignes(list(_lignes_entree(args.entree, rejets)))
+    else:
+        p = Portefeuille.depuis_depot()
+    with open(args.sortie, "wb") as f:
+        f.write(pdf_rapport(p))
+    for num, motif in rejets:
+        print(f"ligne {num} : {motif}", file=sys.stderr)
+    print(f"Rapport de {len(p)} dossiers écrit dans {args.sortie}"
+          + (f" ({len(rejets)} en erreur de saisie, listés ci-dessus)." if rejets else "."), file=sys.stderr)
+    return 0
+
+
+def _lignes_entree(chemin: str, rejets: List[Tuple[int, str]]) -> Iterator[Ligne]:
+    from menage import est_menage
+    from score_portefeuille import _evaluer_paquet, lire_dossiers, par_paquets
+    for paquet in par_paquets(lire_dossiers(chemin), 5000):
+        for num, d, res, motif in _evaluer_paquet(paquet):
+            statut = STATUT_MENAGE if est_menage(d) else (res.statut if res is not None else d.get("statut"))
+            statut = statut if isinstance(statut, str) else None
+            if res is None:
+                rejets.append((num, motif))
+                yield statut, 0.0, 0.0, False, True, None
+            else:
+                yield statut, res.revenu_eligible, res.revenu_total, res.eligible, False, res.alerte
+
+
+if __name__ == "__main__":
+    sys.exit(main())
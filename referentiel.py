@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+# referentiel.py — Données de référence communes (statuts, pièces à fournir, mémos)
+#
+# Données immuables du processus, partagées par toutes les sessions Streamlit :
+# app.py les lit à chaque rerun sans jamais les reconstruire.
+
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Pages du routeur (barre latérale de app.py)
+PAGES = ["Dossier client", "Check-lists", "Autres revenus (aide)", "Exports", "Portefeuille", "Aide"]
+
+STATUTS = [
+    "CDI", "CDD", "CDIC", "Intérim", "Intermittent", "Saisonnier",
+    "Militaire", "Stagiaire FP", "Assistante maternelle", "Apprenti",
+    "Pompier volontaire", "Élu", "Multi-contrats", "Famille d'accueil",
+]
+STATUT_MENAGE = "Ménage"  # statut enregistré d'un dossier à co-emprunteur (menage.py)
+
+
+class _DocsParStatut(Mapping):
+    """Pièces à fournir par statut, lues dans la table de règles en service (regles.py).
+
+    Le dict est construit une fois par version de table et partagé par tout le
+    processus ; les listes de pièces sont des tuples (non modifiables).
+    """
+
+    def __init__(self) -> None:
+        self._cache: Tuple[Optional[object], Dict[str, Tuple[str, ...]]] = (None, {})
+
+    def _docs(self) -> Dict[str, Tuple[str, ...]]:
+        from regles import table_courante  # regles importe STATUTS : import différé
+        table = table_courante()
+        derniere, docs = self._cache
+        if table is not derniere:
+            docs = table.docs_par_statut()
+            self._cache = (table, docs)
+        return docs
+
+    def __getitem__(self, statut: str) -> Tuple[str, ...]:
+        return self._docs()[statut]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._docs())
+
+    def __len__(self) -> int:
+        return len(self._docs())
+
+
+DOCS_PAR_STATUT: Mapping[str, Tuple[str, ...]] = _DocsParStatut()
+
+# Page "Autres revenus (aide)" : (onglet, mémo markdown)
+AIDE_AUTRES_REVENUS: Tuple[Tuple[str, str], ...] = (
+    ("Retraites",
+     "**Principe :** régime général + complémentaire. Si proche retraite, demander estimation prévisionnelle (caisse / simulateur).  \n"
+     "**Justificatifs :** dernier avis IRPP ou relevé annuel de pension."),
+    ("Allocations familiales & aides sociales",
+     "**Allocations familiales / AAH / APA / Prime d’activité :** retenir si pérennes sur la durée du prêt.  \n"
+     "**Justificatifs :** décompte CAF, documents organismes sociaux."),
+    ("Aide au logement & IJ",
+     "**Aide au logement :** retenir uniquement si versée sur le compte du client.  \n"
+     "**Indemnités journalières :** prudence (temporaire)."),
+    ("Revenus fonciers / loc. saisonnière",
+     "**Revenus fonciers :** saisir 100% (pondération gérée côté banque). Revenus attendus OK si baux/estimations (≈3.5% neuf, 4% ancien, 4.5% meublé) "
+     "et DPE A–E ou travaux de performance budgétisés.  \n"
+     "**Justificatifs :** 2072/2042/2031/2044, baux récents, 3 relevés bancaires.  \n"
+     "**Location saisonnière :** moyenne pluriannuelle ou attestation gestionnaire si historique insuffisant."),
+    ("Autres revenus sous conditions",
+     "**Pensions alimentaires :** seulement si jugement + versement effectif (relevés).  \n"
+     "**Invalidité cat.2 / rente AT :** si durée compatible.  \n"
+     "**Obligations / coupons :** récurrents et réguliers.  \n"
+     "**Dividendes :** stables sur 3 ans et déclarés, vérifier capacité de distribution (bilan).  \n"
+     "**Photovoltaïque :** moyenne 2 ans (justif EDF / BIC)."),
+    ("Exclusions",
+     "**Exclus :** remboursements de frais professionnels (IK, repas), indemnités de déplacement chauffeurs.  \n"
+     "Toujours saisir des revenus pérennes, réguliers et traçables."),
+)
+ONGLETS_AUTRES_REVENUS: Tuple[str, ...] = tuple(titre for titre, _ in AIDE_AUTRES_REVENUS)
+
+
+def docs_menage(statuts: Sequence[str]) -> List[Tuple[str, List[int]]]:
+    """Check-list fusionnée d'un ménage : chaque pièce une seule fois, avec les emprunteurs concernés (1, 2, …).
+
+    Deux libellés ne différant que par la casse ou les espaces sont une même pièce.
+    """
+    fusion: Dict[str, Tuple[str, List[int]]] = {}
+    for i, statut in enumerate(statuts, start=1):
+        for doc in DOCS_PAR_STATUT.get(statut, []):
+            _, qui = fusion.setdefault(" ".join(doc.split()).casefold(), (doc, []))
+            if i not in qui:
+                qui.append(i)
+    return list(fusion.values())
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+# regles.py — Table versionnée des règles par statut (regles_statuts.json)
+#
+# Seuils, coefficients, messages, rappels st.info et pièces à fournir sont
+# décrits une seule fois dans le fichier JSON. Au chargement, les textes sont
+# formatés avec les paramètres du statut ; les moteurs (moteur_revenus,
+# moteur_lot) compilent ensuite la table en un dict statut -> évaluateur.
+# table_courante() relit le fichier à chaud quand sa date de modification
+# change ; une table invalide est refusée et la précédente reste en service.
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from fractions import Fraction
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from referentiel import STATUTS
+
+CHEMIN_DEFAUT = os.environ.get(
+    "COACH_REGLES", os.path.join(os.path.dirname(os.path.abspath(__file__)), "regles_statuts.json")
+)
+
+# formule -> (paramètres requis, textes requis)
+FORMULES: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {
+    "cdi": (
+        ("anciennete_min_mois", "coef_cadre", "coef_non_cadre", "anciennete_pnc_mois", "coef_pnc"),
+        ("message_changement", "message_essai", "alerte_essai", "message_recent", "message_fiscal",
+         "message_fallback", "info"),
+    ),
+    "rni_12m": (("mois_restants_min",), ("erreur", "message", "message_deductions", "message_fin_contrat", "info")),
+    "moyenne_annuelle": (
+        ("champs", "condition_champ", "seuil"),
+        ("erreur", "message", "message_non_eligible", "alerte", "info", "info_non_eligible"),
+    ),
+    "moyenne": (("champs",), ("message", "info")),
+    "somme": (("champs",), ("message", "info")),
+    "somme_liste": (("champ",), ("message", "info")),
+}
+
+log = logging.getLogger(__name__)
+
+
+class _Garde(dict):
+    # les repères inconnus ({coef}, {nb}...) sont laissés tels quels : ils sont
+    # remplis à l'évaluation, avec les valeurs propres au dossier
+    def __missing__(self, cle: str) -> str:
+        return "{" + cle + "}"
+
+
+def _formater(texte: str, valeurs: Mapping[str, Any]) -> str:
+    return texte.format_map(_Garde(valeurs))
+
+
+@dataclass(frozen=True)
+class RegleStatut:
+    statut: str
+    formule: str
+    parametres: Mapping[str, Any]
+    textes: Mapping[str, str]
+    docs: Tuple[str, ...]
+
+    def texte(self, cle: str, defaut: str = "") -> str:
+        return self.textes.get(cle, defaut)
+
+    def coef(self, cle: str) -> float:
+        """Paramètre numérique, fractions "2/3" acceptées."""
+        return float(Fraction(str(self.parametres[cle])))
+
+
+@dataclass(frozen=True)
+class TableRegles:
+    version: str
+    regles: Mapping[str, RegleStatut]
+    chemin: str = ""
+    mtime: float = 0.0
+    brut: Mapping[str, Any] = field(default_factory=dict, repr=False, compare=False)
+
+    def __getitem__(self, statut: str) -> RegleStatut:
+        return self.regles[statut]
+
+    def docs_par_statut(self) -> Dict[str, Tuple[str, ...]]:
+        return {s: r.docs for s, r in self.regles.items()}
+
+
+def compiler_table(brut: Mapping[str, Any], chemin: str = "", mtime: float = 0.0) -> TableRegles:
+    """Valide la table brute (dict JSON) et formate ses textes. Lève ValueError si elle est invalide."""
+    version = str(brut.get("version") or "")
+    if not version:
+        raise ValueError("Table de règles sans 'version'.")
+    statuts = brut.get("statuts") or {}
+    manquants = [s for s in STATUTS if s not in statuts]
+    if manquants:
+        raise ValueError(f"Statuts absents de la table de règles : {', '.join(manquants)}")
+
+    regles: Dict[str, RegleStatut] = {}
+    for statut, r in statuts.items():
+        formule = r.get("formule")
+        if formule not in FORMULES:
+            raise ValueError(f"{statut} : formule inconnue {formule!r}")
+        params = dict(r.get("parametres") or {})
+        requis_p, requis_t = FORMULES[formule]
+        if "condition_champ" in params:
+            requis_p += ("seuil",)
+            requis_t += ("message_non_eligible", "alerte")
+        absents = [p for p in requis_p if p not in params] + [t for t in requis_t if t not in (r.get("textes") or {})]
+        if absents:
+            raise ValueError(f"{statut} : clés manquantes dans la table de règles : {', '.join(absents)}")
+        valeurs = {**params, "statut": statut}
+        regles[statut] = RegleStatut(
+            statut=statut,
+            formule=formule,
+            parametres=params,
+            textes={k: _formater(v, valeurs) for k, v in r["textes"].items()},
+            docs=tuple(_formater(d, valeurs) for d in r.get("docs") or ()),
+        )
+        if formule == "cdi":
+            regles[statut].coef("coef_pnc")  # valide la fraction dès le chargement
+    return TableRegles(version=version, regles=regles, chemin=chemin, mtime=mtime, brut=brut)
+
+
+def charger(chemin: str = CHEMIN_DEFAUT) -> TableRegles:
+    mtime = os.stat(chemin).st_mtime
+    with open(chemin, encoding="utf-8") as f:
+        brut = json.load(f)
+    return compiler_table(brut, chemin, mtime)
+
+
+# -----------------------------
+# Table courante, relue à chaud
+# -----------------------------
+_verrou = threading.Lock()
+_courante: Optional[TableRegles] = None
+derniere_erreur: Optional[str] = None
+
+
+def table_courante(chemin: str = CHEMIN_DEFAUT) -> TableRegles:
+    """Table en service : un os.stat par appel, rechargement seulement si le mtime a changé."""
+    global _courante, derniere_erreur
+    table = _courante
+    try:
+        mtime = os.stat(chemin).st_mtime
+    except OSError:
+        mtime = None
+    if table is not None and (mtime is None or (table.chemin == chemin and table.mtime == mtime)):
+        return table
+
+    with _verrou:
+        table = _courante
+        if table is not None and table.chemin == chemin and table.mtime == mtime:
+            return table
+        try:
+            nouvelle = charger(chemin)
+        except (OSError, ValueError, KeyError, TypeError, ZeroDivisionError) as e:
+            if table is None:
+                raise
+            derniere_erreur = f"{chemin} : {e}"
+            log.error("Table de règles refusée, version %s conservée : %s", table.version, e)
+            # on mémorise le mtime fautif pour ne pas relire le fichier à chaque appel
+            _courante = TableRegles(table.version, table.regles, chemin, mtime or 0.0, table.brut)
+            return _courante
+        if table is not None and nouvelle.version != table.version:
+            log.info("Règles rechargées : %s -> %s", table.version, nouvelle.version)
+        derniere_erreur = None
+        _courante = nouvelle
+        return nouvelle
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+# score_portefeuille.py — Rescoring de nuit d'un portefeuille de dossiers (CSV / JSONL)
+#
+# Usage :
+#   python score_portefeuille.py dossiers.csv resultats.csv --rejets rejets.csv
+#   python score_portefeuille.py dossiers.jsonl resultats.jsonl --paquet 10000
+#
+# Les dossiers sont lus en flux (générateurs), évalués par paquets avec
+# moteur_revenus.evaluer_lot et écrits au fil de l'eau : la mémoire ne dépend
+# que de la taille du paquet, pas de celle du fichier. Une ligne JSONL avec un
+# objet "co_emprunteur" est un ménage (menage.evaluer_saisies : statuts joints,
+# revenus additionnés).
+#
+# Les lignes illisibles (JSON invalide ou non objet, saisie non numérique,
+# saisie incomplète) vont dans --rejets avec leur motif : en CSV, colonnes
+# fixes ligne, motif, dossier (saisies d'origine en JSON).
+#
+# Un dossier qui porte une offre (offre_montant, offre_taux, offre_duree_ans,
+# et au besoin offre_assurance_pct, offre_frais, offre_date, offre_categorie)
+# reçoit son TAEG et le taux d'usure en vigueur (taux_reference, recherche
+# vectorisée par paquet) ; usure_depassee signale les offres au-dessus.
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import sys
+import time
+from itertools import islice
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from menage import CO_EMPRUNTEUR, evaluer_saisies
+from moteur_revenus import evaluer_lot
+from taux_reference import controler_lot, grille_taux
+
+COLONNES_RESULTAT = ["ligne", "nom", "statut", "revenu_eligible", "revenu_total", "eligible", "message", "alerte",
+                     "taeg", "taux_usure", "usure_depassee"]
+# rejets CSV : en-tête fixe, les saisies d'origine en JSON (les champs varient d'une ligne JSONL à l'autre)
+COLONNES_REJETS = ["ligne", "motif", "dossier"]
+
+
+# -----------------------------
+# Lecture / écriture en flux
+# -----------------------------
+def _format(chemin: str, forcer: Optional[str] = None) -> str:
+    if forcer:
+        return forcer
+    return "jsonl" if chemin.lower().endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+
+def lire_dossiers(chemin: str, fmt: Optional[str] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Produit (numéro de ligne, dossier) sans jamais charger tout le fichier."""
+    with open(chemin, encoding="utf-8", newline="") as f:
+        yield from lire_flux(f, _format(chemin, fmt))
+
+
+def lire_flux(f: IO[str], fmt: str = "csv") -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Comme lire_dossiers, sur un flux texte déjà ouvert (ex. fichier téléversé)."""
+    if fmt == "jsonl":
+        for num, ligne in enumerate(f, start=1):
+            if not ligne.strip():
+                continue
+            try:
+                yield num, _objet(json.loads(ligne))
+            except json.JSONDecodeError as e:
+                yield num, {"_invalide": f"JSON invalide : {e}"}
+    else:
+        # ligne 1 = en-tête
+        for num, row in enumerate(csv.DictReader(f), start=2):
+            yield num, row
+
+
+def _objet(valeur: Any) -> Dict[str, Any]:
+    """Un enregistrement qui n'est pas un objet JSON (ex. `3`, une liste) devient une ligne rejetée."""
+    if isinstance(valeur, dict):
+        return valeur
+    return {"_invalide": f"Enregistrement JSON non objet : {json.dumps(valeur, ensure_ascii=False)[:80]}"}
+
+
+def _milliers(x: float) -> str:
+    return f"{x:,.0f}".replace(",", " ")
+
+
+def par_paquets(iterable: Iterable[Any], taille: int) -> Iterator[List[Any]]:
+    it = iter(iterable)
+    while True:
+        paquet = list(islice(it, taille))
+        if not paquet:
+            return
+        yield paquet
+
+
+class _Ecrivain:
+    """Écriture incrémentale CSV ou JSONL (colonnes fixées à la première ligne pour le CSV)."""
+
+    def __init__(self, chemin: str, fmt: str, colonnes: Optional[List[str]] = None):
+        self.f = sys.stdout if chemin == "-" else open(chemin, "w", encoding="utf-8", newline="")
+        self.fmt = fmt
+        self.colonnes = colonnes
+        self._csv: Optional[csv.DictWriter] = None
+
+    def ecrire(self, ligne: Dict[str, Any]) -> None:
+        if self.fmt == "jsonl":
+            self.f.write(json.dumps(ligne, ensure_ascii=False) + "\n")
+            return
+        if self._csv is None:
+            self._csv = csv.DictWriter(self.f, fieldnames=self.colonnes or list(ligne), extrasaction="ignore")
+            self._csv.writeheader()
+        self._csv.writerow({k: ("" if v is None else v) for k, v in ligne.items()})
+
+    def fermer(self) -> None:
+        self.f.flush()
+        if self.f is not sys.stdout:
+            self.f.close()
+
+
+# -----------------------------
+# Scoring
+# -----------------------------
+def _evaluer_paquet(paquet: List[Tuple[int, Dict[str, Any]]]):
+    """Produit (num, dossier, resultat ou None, motif de rejet ou None) pour chaque ligne du paquet."""
+    paquet = [(num, _objet(d)) for num, d in paquet]
+    valides = [(num, d) for num, d in paquet if "_invalide" not in d]
+    for num, d in paquet:
+        if "_invalide" in d:
+            yield num, d, None, d["_invalide"]
+    simples = [d for _, d in valides if not d.get(CO_EMPRUNTEUR)]  # les ménages sont évalués un à un
+    try:
+        lot = evaluer_lot(simples)
+        resultats = (lot.resultat(i) for i in range(len(lot)))
+    except (ArithmeticError, TypeError, ValueError):
+        # une saisie refusée quelque part (non numérique, négative…) : on isole la ou les lignes fautives
+        resultats = (_evaluer_un(d) for d in simples)
+    for num, d in valides:
+        res = _evaluer_un(d) if d.get(CO_EMPRUNTEUR) else next(resultats)
+        if isinstance(res, str):
+            yield num, d, None, res
+        elif res.erreur:
+            yield num, d, None, res.erreur
+        else:
+            yield num, d, res, None
+
+
+def _evaluer_un(dossier: Dict[str, Any]):
+    try:
+        return evaluer_saisies(dossier)
+    except (ArithmeticError, TypeError, ValueError) as e:  # erreur du moteur : rejet de la ligne, pas du fichier
+        return f"Saisie invalide : {e}"
+
+
+def _rejet(num: int, motif: str, d: Dict[str, Any], fmt: str) -> Dict[str, Any]:
+    saisies = {k: v for k, v in d.items() if k != "_invalide"}
+    if fmt == "jsonl":
+        return {"ligne": num, "motif": motif, **saisies}
+    return {"ligne": num, "motif": motif, "dossier": json.dumps(saisies, ensure_ascii=False) if saisies else ""}
+
+
+def scorer(entree: str, sortie: str, rejets: Optional[str] = None, paquet: int = 5000,
+           fmt_entree: Optional[str] = None, progression: bool = True) -> Dict[str, float]:
+    """Score tout le fichier `entree` ; renvoie les compteurs (lignes, rejets, offres hors usure, secondes, lignes/s)."""
+    fmt_sortie = _format(sortie)
+    out = _Ecrivain(sortie, fmt_sortie, COLONNES_RESULTAT)
+    fmt_rejets = _format(rejets) if rejets else None
+    rej = _Ecrivain(rejets, fmt_rejets, COLONNES_REJETS) if rejets else None
+
+    grille = grille_taux()
+    debut = time.perf_counter()
+    nb, nb_rejets, nb_usure = 0, 0, 0
+    try:
+        for lot in par_paquets(lire_dossiers(entree, fmt_entree), paquet):
+            evalues = list(_evaluer_paquet(lot))
+            offres = iter(controler_lot([d for _, d, _, motif in evalues if motif is None], grille))
+            for num, d, res, motif in evalues:
+                if motif is not None:
+                    nb_rejets += 1
+                    if rej is not None:
+                        rej.ecrire(_rejet(num, motif, d, fmt_rejets))
+                    continue
+                offre = next(offres) or (None, None, None)
+                nb_usure += bool(offre[2])
+                out.ecrire({
+                    "ligne": num,
+                    "nom": d.get("nom", ""),
+                    "statut": res.statut,
+                    "revenu_eligible": res.revenu_eligible,
+                    "revenu_total": res.revenu_total,
+                    "eligible": res.eligible,
+                    "message": res.message,
+                    "alerte": res.alerte,
+                    "taeg": offre[0],
+                    "taux_usure": offre[1],
+                    "usure_depassee": offre[2],
+                })
+            nb += len(lot)
+            if progression:
+                ecoule = time.perf_counter() - debut
+                print(f"\r{nb} lignes — {_milliers(nb / ecoule)} lignes/s — {nb_rejets} rejet(s)",
+                      end="", file=sys.stderr, flush=True)
+    finally:
+        out.fermer()
+        if rej is not None:
+            rej.fermer()
+
+    ecoule = time.perf_counter() - debut
+    if progression:
+        print(file=sys.stderr)
+    return {"lignes": nb, "rejets": nb_rejets, "usure_depassee": nb_usure, "secondes": ecoule,
+            "lignes_par_s": nb / ecoule if ecoule else 0.0}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Rescoring d'un portefeuille de dossiers (règles de la page Dossier client).")
+    p.add_argument("entree", help="Fichier de dossiers (.csv ou .jsonl)")
+    p.add_argument("sortie", help="Fichier de résultats (.csv ou .jsonl, '-' pour la sortie standard)")
+    p.add_argument("--rejets", help="Fichier des lignes rejetées, avec le motif affiché dans l'app")
+    p.add_argument("--paquet", type=int, default=5000, help="Taille des paquets évalués (défaut : 5000)")
+    p.add_argument("--format", choices=["csv", "jsonl"], help="Forcer le format d'entrée")
+    p.add_argument("-q", "--silencieux", action="store_true", help="Pas d'affichage de progression")
+    args = p.parse_args(argv)
+
+    stats = scorer(args.entree, args.sortie, args.rejets, args.paquet, args.format, not args.silencieux)
+    print(f"{stats['lignes']} lignes en {stats['secondes']:.2f} s "
+          f"({_milliers(stats['lignes_par_s'])} lignes/s), {stats['rejets']} rejet(s), "
+          f"{stats['usure_depassee']} offre(s) au-dessus du taux d'usure.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+# solveur_revenus.py — Revenus minimaux pour un prêt visé (moteur de revenus inversé)
+#
+# Usage :
+#   python solveur_revenus.py 250000 --duree 25 --taux 3.5
+#   python solveur_revenus.py 150000 200000 250000 --charges 250 --statut CDI --statut Intérim
+#   python solveur_revenus.py 250000 --saisie cdi_anciennete_mois=6 --saisie cdi_statut_cadre=true
+#
+# La question inverse de la page Dossier client : "quel RNI / brut / cumul
+# PAJE faut-il pour emprunter 250 000 € sur 25 ans ?". On remonte la chaîne :
+#   mensualité (capacite.mensualite_pour)
+#   → revenu total requis  = (mensualité + charges) / taux d'endettement
+#   → revenu retenu requis = revenu total − autres revenus
+#   → saisie du statut, par l'inverse de sa formule (regles.FORMULES).
+# Chaque famille de formules a son inverse exact, vectorisé sur la grille de
+# montants ; les autres saisies du dossier (ancienneté, primes, années déjà
+# connues…) viennent du contexte. Une famille sans inverse est résolue par
+# dichotomie vectorisée sur moteur_lot. Montants arrondis au centime
+# supérieur : la saisie trouvée, remise dans evaluer_dossier, permet
+# d'emprunter au moins le capital visé.
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from capacite import TAUX_ENDETTEMENT, mensualite_pour
+from moteur_revenus import DEFAUTS, _bool, _num, pnc_mensuelles
+from referentiel import STATUTS
+from regles import RegleStatut, TableRegles, table_courante
+
+
+@dataclass(frozen=True)
+class Inverse:
+    """Saisie à trouver pour un statut : les `champs` prennent tous la valeur calculée par `saisie`."""
+    champs: Tuple[str, ...]
+    libelle: str
+    unite: str                                      # "€/an" ou "€/mois"
+    saisie: Callable[[np.ndarray], np.ndarray]      # revenu retenu mensuel requis -> valeur de la saisie
+    motif: Optional[str] = None                     # statut inatteignable dans ce contexte (alerte de la page)
+
+
+def _centime_sup(a: np.ndarray) -> np.ndarray:
+    # l'arrondi intermédiaire évite qu'un 12.000000000001 ne passe au centime suivant
+    return np.ceil(np.round(np.asarray(a, dtype=np.float64) * 100.0, 6)) / 100.0
+
+
+def _positif(a: np.ndarray) -> np.ndarray:
+    return _centime_sup(np.maximum(a, 0.0))
+
+
+# -----------------------------
+# Inverses par famille de formules (cf. moteur_revenus)
+# -----------------------------
+def _inv_rni_12m(r: RegleStatut, c: Mapping[str, Any]) -> Inverse:
+    # revenu = (RNI 12 mois − déductions) / 12
+    deductions = _num(c, "deductions")
+    return Inverse(("cdd_rni_12m",), "RNI des 12 derniers mois", "€/an",
+                   lambda e: _positif(12.0 * e + deductions))
+
+
+def _inv_moyenne_annuelle(r: RegleStatut, c: Mapping[str, Any]) -> Inverse:
+    # revenu = moyenne des années renseignées / 12, sous condition d'antériorité
+    motif = None if _num(c, r.parametres["condition_champ"]) >= r.parametres["seuil"] else r.textes["alerte"]
+    return Inverse(tuple(r.parametres["champs"]), "RNI annuel (chaque année)", "€/an",
+                   lambda e: _positif(12.0 * e), motif)
+
+
+def _inv_moyenne(r: RegleStatut, c: Mapping[str, Any]) -> Inverse:
+    return Inverse(tuple(r.parametres["champs"]), "Revenu annuel (chaque année)", "€/an", lambda e: _positif(12.0 * e))
+
+
+def _inv_somme(r: RegleStatut, c: Mapping[str, Any]) -> Inverse:
+    # revenu = somme des champs / 12 : le premier champ complète les autres (contexte)
+    champ, *autres = r.parametres["champs"]
+    deja = sum(_num(c, a) for a in autres)
+    condition = r.parametres.get("condition_champ")
+    motif = None
+    if condition:
+        valeur, seuil = _num(c, condition), r.parametres["seuil"]
+        if not (valeur > seuil if r.parametres.get("seuil_strict") else valeur >= seuil):
+            motif = r.textes["alerte"]
+    return Inverse((champ,), _LIBELLES.get(champ, champ), "€/an", lambda e: _positif(12.0 * e - deja), motif)
+
+
+def _inv_somme_liste(r: RegleStatut, c: Mapping[str, Any]) -> Inverse:
+    return Inverse((r.parametres["champ"],), "Somme des RNI annuels des employeurs", "€/an",
+                   lambda e: _positif(12.0 * e))
+
+
+def _inv_cdi(r: RegleStatut, c: Mapping[str, Any]) -> Inverse:
+    p = r.parametres
+    anciennete = _num(c, "cdi_anciennete_mois")
+    if _bool(c, "cdi_chgt"):
+        # changement d'employeur : moyenne des 3 derniers bulletins
+        return Inverse(("b_m1", "b_m2", "b_m3"), "Salaire net des 3 derniers bulletins (chacun)", "€/mois",
+                       lambda e: _positif(e))
+    if anciennete >= p["anciennete_min_mois"]:
+        # contrat installé : min(CNI N-1 ; RNI) / 12, primes comprises
+        return Inverse(("cdi_cni", "cdi_rni"), "CNI N-1 et RNI (chacun au moins)", "€/an", lambda e: _positif(12.0 * e))
+    if not _bool(c, "cdi_periode_essai_terminee"):
+        return Inverse(("cdi_salaire_brut_annuel_contrat",), "Salaire brut annuel du contrat", "€/an",
+                       lambda e: np.full_like(e, np.nan), r.textes["message_essai"])
+    # contrat récent : brut × coefficient (cadre / non cadre) / 12 + primes
+    coef = p["coef_cadre"] if _bool(c, "cdi_statut_cadre") else p["coef_non_cadre"]
+    primes = _num(c, "cdi_primes_contractuelles_annuelles") / 12.0 + pnc_mensuelles(
+        _num(c, "pnc1"), _num(c, "pnc2"), _num(c, "pnc3"), anciennete, p["anciennete_pnc_mois"], r.coef("coef_pnc"))
+    return Inverse(("cdi_salaire_brut_annuel_contrat",), f"Salaire brut annuel du contrat (× {coef:g})", "€/an",
+                   lambda e: _positif(12.0 * (e - primes) / coef))
+
+
+INVERSES: Dict[str, Callable[[RegleStatut, Mapping[str, Any]], Inverse]] = {
+    "cdi": _inv_cdi,
+    "rni_12m": _inv_rni_12m,
+    "moyenne_annuelle": _inv_moyenne_annuelle,
+    "moyenne": _inv_moyenne,
+    "somme": _inv_somme,
+    "somme_liste": _inv_somme_liste,
+}
+
+_LIBELLES = {
+    "rni": "RNI annuel",
+    "cumul_paje": "Cumul annuel PAJE",
+    "revenus_mandat": "Indemnités annuelles de mandat",
+    "revenus_annuels": "Revenus annuels (famille d'accueil)",
+}
+
+
+# -----------------------------
+# Dichotomie (familles sans inverse)
+# -----------------------------
+def dossier_resolu(contexte: Mapping[str, Any], statut: str, champs: Sequence[str], valeur: float) -> Dict[str, Any]:
+    """Le dossier du contexte, au statut donné, avec les `champs` portés à `valeur`."""
+    d = {**contexte, "statut": statut}
+    for champ in champs:
+        d[champ] = [float(valeur)] if isinstance(DEFAUTS.get(champ), list) else float(valeur)
+    return d
+
+
+def _dichotomie(r: RegleStatut, contexte: Mapping[str, Any], table: TableRegles,
+                champs: Optional[Sequence[str]] = None) -> Inverse:
+    """Inverse numérique : plus petite valeur commune des `champs` (défaut : ceux de la règle) qui atteint la cible."""
+    from moteur_lot import evaluer_lot
+    champs = tuple(champs or r.parametres.get("champs") or (r.parametres["champ"],))
+
+    def revenus(valeurs: np.ndarray) -> np.ndarray:
+        lot = evaluer_lot([dossier_resolu(contexte, r.statut, champs, v) for v in valeurs], table)
+        return np.where(lot.eligible & np.equal(lot.erreurs, None), lot.revenu_eligible, -np.inf)
+
+    def saisie(cibles: np.ndarray) -> np.ndarray:
+        bas, haut = np.zeros_like(cibles), np.full_like(cibles, 1e4)
+        for _ in range(20):  # élargit jusqu'à 1e4 × 2^20 € : au-delà, inatteignable
+            court = revenus(haut) < cibles
+            if not court.any():
+                break
+            haut = np.where(court, haut * 2.0, haut)
+        atteint = revenus(haut) >= cibles
+        while (haut - bas).max(initial=0.0) > 0.01:
+            milieu = (bas + haut) / 2.0
+            ok = revenus(milieu) >= cibles
+            bas, haut = np.where(ok, bas, milieu), np.where(ok, milieu, haut)
+        return np.where(atteint, _centime_sup(haut), np.nan)
+
+    return Inverse(champs, f"{', '.join(champs)} (dichotomie)", "€/an", saisie)
+
+
+def inverse(statut: str, contexte: Optional[Mapping[str, Any]] = None, table: Optional[TableRegles] = None) -> Inverse:
+    """Inverse de la règle du statut dans ce contexte (exact si la famille en a un, sinon dichotomie)."""
+    table = table or table_courante()
+    r = table[statut]
+    contexte = {**DEFAUTS, **(contexte or {}), "statut": statut}
+    fabrique = INVERSES.get(r.formule)
+    return fabrique(r, contexte) if fabrique else _dichotomie(r, contexte, table)
+
+
+# -----------------------------
+# Grille statuts × montants
+# -----------------------------
+def revenu_total_requis(montants, taux_pct: float, duree_ans: int, taux_endettement: float = TAUX_ENDETTEMENT,
+                        charges: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+    """(mensualités, revenu total mensuel requis) pour chaque capital visé."""
+    m = _centime_sup(mensualite_pour(np.asarray(montants, dtype=np.float64), taux_pct, duree_ans))
+    return m, _centime_sup((m + charges) / taux_endettement)
+
+
+@dataclass(frozen=True)
+class TableBesoins:
+    """Saisie requise par statut (lignes) et par capital visé (colonnes)."""
+    montants: np.ndarray      # (G,) €
+    mensualites: np.ndarray   # (G,) €/mois
+    revenu_total: np.ndarray  # (G,) €/mois
+    statuts: Tuple[str, ...]
+    inverses: Tuple[Inverse, ...]
+    saisies: np.ndarray       # (S, G), NaN si inatteignable
+
+    def lignes(self) -> List[Dict[str, Any]]:
+        return [
+            {"statut": s, "saisie": inv.libelle, "unité": inv.unite,
+             **{f"{m:,.0f} €".replace(",", " "): (None if np.isnan(v) else float(v)) for m, v in zip(self.montants, ligne)},
+             "motif": inv.motif or ""}
+            for s, inv, ligne in zip(self.statuts, self.inverses, self.saisies)
+        ]
+
+
+def besoins(montants, taux_pct: float, duree_ans: int, statuts: Sequence[str] = STATUTS,
+            contexte: Optional[Mapping[str, Any]] = None, taux_endettement: float = TAUX_ENDETTEMENT,
+            charges: float = 0.0, table: Optional[TableRegles] = None) -> TableBesoins:
+    """Saisie minimale de chaque statut pour emprunter chacun des `montants` (taux en %, durée en années)."""
+    table = table or table_courante()
+    montants = np.atleast_1d(np.asarray(montants, dtype=np.float64))
+    m, total = revenu_total_requis(montants, taux_pct, duree_ans, taux_endettement, charges)
+    contexte = contexte or {}
+    inverses, saisies = [], np.full((len(statuts), len(montants)), np.nan)
+    for i, statut in enumerate(statuts):
+        inv = inverse(statut, contexte, table)
+        inverses.append(inv)
+        if inv.motif is None:
+            retenu = _centime_sup(np.maximum(total - _num({**DEFAUTS, **contexte}, "autres_revenus"), 0.0))
+            saisies[i] = inv.saisie(retenu)
+    return TableBesoins(montants, m, total, tuple(statuts), tuple(inverses), saisies)
+
+
+def besoin(dossier: Mapping[str, Any], montant: float, taux_pct: float, duree_ans: int,
+           charges: float = 0.0, taux_endettement: float = TAUX_ENDETTEMENT) -> Tuple[Inverse, Optional[float], float]:
+    """Pour un dossier : (inverse, saisie requise ou None, revenu total mensuel requis)."""
+    statut = dossier.get("statut") or DEFAUTS["statut"]
+    t = besoins([montant], taux_pct, duree_ans, [statut], dossier, taux_endettement, charges)
+    valeur = float(t.saisies[0, 0])
+    return t.inverses[0], (None if np.isnan(valeur) else valeur), float(t.revenu_total[0])
+
+
+def _saisie_cli(texte: str) -> Tuple[str, Any]:
+    champ, sep, valeur = texte.partition("=")
+    if not sep or champ not in DEFAUTS:
+        raise argparse.ArgumentTypeError(f"{texte!r} : attendu champ=valeur, champ parmi les saisies du dossier")
+    try:
+        return champ, json.loads(valeur)
+    except json.JSONDecodeError:
+        return champ, valeur
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Saisie minimale par statut pour emprunter un montant donné.")
+    p.add_argument("montants", type=float, nargs="+", help="Capitaux visés (€)")
+    p.add_argument("--taux", type=float, default=3.5, help="Taux nominal annuel en %% (défaut : 3.5)")
+    p.add_argument("--duree", type=int, default=20, help="Durée en années (défaut : 20)")
+    p.add_argument("--charges", type=float, default=0.0, help="Mensualités de crédits en cours (€)")
+    p.add_argument("--endettement", type=float, default=TAUX_ENDETTEMENT, help="Taux d'endettement (défaut : 0.35)")
+    p.add_argument("--statut", action="append", choices=STATUTS, help="Statut(s) à calculer (défaut : tous)")
+    p.add_argument("--saisie", action="append", type=_saisie_cli, default=[], metavar="CHAMP=VALEUR",
+                   help="Autre saisie du dossier (ancienneté, primes, autres revenus…), répétable")
+    args = p.parse_args(argv)
+
+    t = besoins(args.montants, args.taux, args.duree, args.statut or STATUTS, dict(args.saisie),
+                args.endettement, args.charges)
+    print(f"Taux {args.taux:g} %, {args.duree} ans, endettement {args.endettement:.0%}, charges {args.charges:g} €/mois")
+    largeur = max(len(inv.libelle) + len(inv.unite) for inv in t.inverses) + 3
+    print(f"{'':<24}{'':<{largeur}}" + "".join(f"{m:>14,.0f}".replace(",", " ") for m in t.montants))
+    print(f"{'mensualité':<24}{'':<{largeur}}" + "".join(f"{v:>14,.2f}".replace(",", " ") for v in t.mensualites))
+    print(f"{'revenu total requis':<24}{'€/mois':<{largeur}}" + "".join(f"{v:>14,.2f}".replace(",", " ")
+                                                                       for v in t.revenu_total))
+    for statut, inv, ligne in zip(t.statuts, t.inverses, t.saisies):
+        if inv.motif:
+            print(f"{statut:<24}{'inatteignable : ' + inv.motif}")
+            continue
+        print(f"{statut:<24}{inv.libelle + ' ' + inv.unite:<{largeur}}"
+              + "".join(f"{v:>14,.2f}".replace(",", " ") for v in ligne))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
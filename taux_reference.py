@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+# taux_reference.py — Taux d'usure et taux du marché par date et tranche de durée (fichier mappé en mémoire)
+#
+# Usage :
+#   python taux_reference.py compiler                          # taux_reference.csv -> COACH_TAUX
+#   python taux_reference.py taux usure_fixe 2025-03-15 25     # taux en vigueur à cette date, 25 ans
+#   python taux_reference.py series
+#
+# Source éditable : taux_reference.csv (une ligne par série, date d'effet et
+# tranche de durée). Elle est compilée en un fichier binaire compact
+# (COACH_TAUX, défaut : taux_reference.bin à côté de ce fichier), recompilé
+# au premier usage dans un processus quand le CSV est plus récent :
+#   en-tête  "COACHTX1", nombre de taux, JSON des séries ;
+#   trois colonnes contiguës triées par clé (12 octets par taux)
+#     clé (int64) = série << 40 | jours depuis 1970 << 12 | durée max (mois)
+#     durée min (mois, uint16), taux (centièmes de point, uint16).
+# Colonnes plutôt qu'enregistrements : la recherche se fait sur les clés en
+# place, sans copie (np.searchsorted exige un tableau contigu).
+# Le fichier est ouvert par np.memmap : les processus (workers Streamlit,
+# pools d'export et de scoring) partagent les mêmes pages du cache système.
+# Une recherche = deux recherches dichotomiques (np.searchsorted) sur la clé :
+# dernière date d'effet <= date du dossier, puis tranche de durée ; les deux
+# sont vectorisées pour le scoring par lots.
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import logging
+import os
+import struct
+import sys
+import tempfile
+import threading
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from capacite import taeg
+
+log = logging.getLogger(__name__)
+
+RACINE = os.path.dirname(os.path.abspath(__file__))
+CSV_DEFAUT = os.path.join(RACINE, "taux_reference.csv")
+CHEMIN_DEFAUT = os.environ.get("COACH_TAUX", os.path.join(RACINE, "taux_reference.bin"))
+
+MAGIQUE = b"COACHTX1"
+_ENTETE = struct.Struct("<8sQI")
+ENREGISTREMENT = np.dtype([("cle", "<i8"), ("duree_min", "<u2"), ("taux", "<u2")])
+SANS_BORNE = 4095  # durée max (mois) d'une dernière tranche ouverte
+_EPOQUE = date(1970, 1, 1)
+
+CATEGORIES = {"fixe": "Taux fixe", "variable": "Taux variable", "relais": "Prêt relais"}
+VALIDITE_JOURS = 100  # au-delà, la dernière date d'effet est plus ancienne qu'un trimestre : grille à mettre à jour
+
+
+def _cles(series: np.ndarray, jours: np.ndarray, duree_max: np.ndarray) -> np.ndarray:
+    return (series.astype(np.int64) << 40) | (jours.astype(np.int64) << 12) | duree_max.astype(np.int64)
+
+
+def _jours(d: date) -> int:
+    return (d - _EPOQUE).days
+
+
+# -----------------------------
+# Compilation CSV -> binaire
+# -----------------------------
+def compiler(source: str = CSV_DEFAUT, destination: str = CHEMIN_DEFAUT) -> int:
+    """Compile le CSV en fichier binaire trié (écriture atomique) ; renvoie le nombre d'enregistrements.
+
+    Lève ValueError sur une ligne invalide ou des tranches qui se chevauchent.
+    """
+    lignes: List[Tuple[str, int, int, int, int]] = []  # (série, jours, durée min, durée max, taux)
+    with open(source, encoding="utf-8", newline="") as f:
+        lecteur = csv.DictReader(ligne for ligne in f if not ligne.startswith("#"))
+        for num, row in enumerate(lecteur, start=2):
+            try:
+                jours = _jours(date.fromisoformat(row["date_effet"].strip()))
+                mini = round(float(row["duree_min_ans"] or 0) * 12)
+                maxi = round(float(row["duree_max_ans"]) * 12) if (row["duree_max_ans"] or "").strip() else SANS_BORNE
+                taux = round(float(row["taux"]) * 100)
+                serie = row["serie"].strip()
+            except (AttributeError, KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"{source}, ligne {num} : {e}") from None
+            if not 0 <= mini < maxi <= SANS_BORNE or not 0 <= taux < 65536:
+                raise ValueError(f"{source}, ligne {num} : tranche ou taux hors bornes")
+            lignes.append((serie, jours, mini, maxi, taux))
+
+    series = sorted({ligne[0] for ligne in lignes})
+    code = {s: i for i, s in enumerate(series)}
+    noms, jours, minis, maxis, taux = zip(*lignes) if lignes else ((), (), (), (), ())
+    enreg = np.zeros(len(lignes), dtype=ENREGISTREMENT)
+    enreg["cle"] = _cles(np.array([code[s] for s in noms], dtype=np.int64), np.array(jours, dtype=np.int64),
+                         np.array(maxis, dtype=np.int64))
+    enreg["duree_min"] = minis
+    enreg["taux"] = taux
+    enreg.sort(order="cle")
+    if len(np.unique(enreg["cle"])) != len(enreg):
+        raise ValueError(f"{source} : même série, date et durée max en double")
+    # tranches d'une même date d'effet contiguës : min d'une tranche = max de la précédente
+    meme_date = (enreg["cle"][1:] >> 12) == (enreg["cle"][:-1] >> 12)
+    if np.any(meme_date & (enreg["duree_min"][1:] != (enreg["cle"][:-1] & SANS_BORNE))):
+        raise ValueError(f"{source} : tranches de durée non contiguës pour une même série et date")
+
+    meta = json.dumps({"series": series, "source": os.path.basename(source)}).encode("utf-8")
+    entete = _ENTETE.pack(MAGIQUE, len(enreg), len(meta)) + meta
+    entete += b"\0" * (-len(entete) % 8)  # clés alignées sur 8 octets
+    dossier = os.path.dirname(os.path.abspath(destination))
+    fd, temporaire = tempfile.mkstemp(dir=dossier, prefix=".taux_", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(entete)
+            for colonne in ("cle", "duree_min", "taux"):
+                f.write(np.ascontiguousarray(enreg[colonne]).tobytes())
+        os.replace(temporaire, destination)
+    except BaseException:
+        os.unlink(temporaire)
+        raise
+    return len(enreg)
+
+
+# -----------------------------
+# Lecture
+# -----------------------------
+@dataclass(frozen=True)
+class Taux:
+    taux: float              # % annuel
+    date_effet: date
+    duree_min_ans: float
+    duree_max_ans: Optional[float]  # None : tranche sans borne
+
+    @property
+    def tranche(self) -> str:
+        if self.duree_max_ans is None:
+            return "toutes durées" if not self.duree_min_ans else f"{self.duree_min_ans:g} ans et plus"
+        if not self.duree_min_ans:
+            return f"moins de {self.duree_max_ans:g} ans"
+        return f"{self.duree_min_ans:g} à moins de {self.duree_max_ans:g} ans"
+
+
+class GrilleTaux:
+    """Fichier compilé, mappé en lecture seule ; les recherches ne copient rien."""
+
+    def __init__(self, chemin: str = CHEMIN_DEFAUT):
+        self.chemin = chemin
+        with open(chemin, "rb") as f:
+            magique, nombre, taille_meta = _ENTETE.unpack(f.read(_ENTETE.size))
+            if magique != MAGIQUE:
+                raise ValueError(f"{chemin} : pas un fichier de taux compilé")
+            meta = json.loads(f.read(taille_meta))
+        decalage = _ENTETE.size + taille_meta
+        decalage += -decalage % 8
+        self.series: List[str] = meta["series"]
+        self.source: str = meta.get("source", "")
+        self._codes = {s: i for i, s in enumerate(self.series)}
+        # vue ndarray du mappage : mêmes pages, sans le surcoût de la sous-classe np.memmap à chaque indexation
+        donnees = np.memmap(chemin, dtype=np.uint8, mode="r", offset=decalage, shape=(12 * nombre,)).view(
+            np.ndarray) if nombre else np.zeros(0, dtype=np.uint8)
+        self._cle = donnees[:8 * nombre].view("<i8")
+        self._duree_min = donnees[8 * nombre:10 * nombre].view("<u2")
+        self._taux = donnees[10 * nombre:].view("<u2")
+
+    def __len__(self) -> int:
+        return len(self._cle)
+
+    def indices(self, serie: str, jours: Sequence[int], duree_mois: Sequence[int]) -> np.ndarray:
+        """Enregistrement applicable à chaque (jour, durée), -1 si aucun (série inconnue, date antérieure…)."""
+        jours = np.asarray(jours, dtype=np.int64)
+        mois = np.minimum(np.asarray(duree_mois, dtype=np.int64), SANS_BORNE - 1)
+        code = self._codes.get(serie)
+        if code is None or not len(self._cle):
+            return np.full(np.broadcast(jours, mois).shape, -1, dtype=np.int64)
+        jours, mois = np.broadcast_arrays(jours, mois)
+        codes = np.full(jours.shape, code, dtype=np.int64)
+        # 1) dernier enregistrement dont la date d'effet <= jour : fixe la date d'effet applicable
+        i = np.searchsorted(self._cle, _cles(codes, jours, np.full(jours.shape, SANS_BORNE)), side="right") - 1
+        cle_i = self._cle[np.maximum(i, 0)]
+        trouve = (i >= 0) & ((cle_i >> 40) == code)
+        effet = (cle_i >> 12) & ((1 << 28) - 1)
+        # 2) première tranche de cette date dont la durée max dépasse la durée du prêt
+        j = np.searchsorted(self._cle, _cles(codes, effet, mois), side="right")
+        cle_j = self._cle[np.minimum(j, len(self._cle) - 1)]
+        trouve &= (j < len(self._cle)) & ((cle_j >> 12) == (cle_i >> 12))
+        trouve &= self._duree_min[np.minimum(j, len(self._cle) - 1)] <= mois
+        return np.where(trouve, j, -1)
+
+    def taux_lot(self, serie: str, jours: Sequence[int], duree_mois: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """(taux en %, NaN si absent ; jour d'effet, -1 si absent), vectorisés."""
+        idx = self.indices(serie, jours, duree_mois)
+        sure = np.maximum(idx, 0)
+        taux = np.where(idx >= 0, self._taux[sure] / 100.0, np.nan) if len(self) else np.full(idx.shape, np.nan)
+        effet = np.where(idx >= 0, (self._cle[sure] >> 12) & ((1 << 28) - 1), -1) if len(self) else idx
+        return taux, effet
+
+    def taux(self, serie: str, quand: date, duree_ans: float) -> Optional[Taux]:
+        """Taux applicable à un dossier : mêmes deux recherches que indices(), en scalaires."""
+        code = self._codes.get(serie)
+        if code is None or not len(self._cle):
+            return None
+        mois = min(round(duree_ans * 12), SANS_BORNE - 1)
+        i = int(self._cle.searchsorted(code << 40 | _jours(quand) << 12 | SANS_BORNE, side="right")) - 1
+        if i < 0 or int(self._cle[i]) >> 40 != code:
+            return None
+        prefixe = int(self._cle[i]) >> 12  # série et date d'effet applicables
+        j = int(self._cle.searchsorted(prefixe << 12 | mois, side="right"))
+        if j >= len(self._cle) or int(self._cle[j]) >> 12 != prefixe or int(self._duree_min[j]) > mois:
+            return None
+        maxi = int(self._cle[j]) & SANS_BORNE
+        return Taux(int(self._taux[j]) / 100.0, _EPOQUE + timedelta(days=prefixe & ((1 << 28) - 1)),
+                    int(self._duree_min[j]) / 12, None if maxi == SANS_BORNE else maxi / 12)
+
+
+_grille: Optional[GrilleTaux] = None
+_verrou_grille = threading.Lock()
+
+
+def _a_jour(source: str, chemin: str) -> bool:
+    try:
+        return os.path.getmtime(chemin) >= os.path.getmtime(source)
+    except OSError:
+        return not os.path.exists(source) and os.path.exists(chemin)
+
+
+def grille_taux() -> Optional[GrilleTaux]:
+    """Grille du processus, compilée si besoin au premier usage ; None si aucune grille n'est disponible.
+
+    Un CSV invalide (ValueError de compiler) ne fait pas tomber la page : pas
+    de grille, et la ligne fautive est journalisée.
+    """
+    global _grille
+    with _verrou_grille:
+        if _grille is None:
+            chemin = CHEMIN_DEFAUT
+            try:
+                if not _a_jour(CSV_DEFAUT, chemin):
+                    if not os.path.exists(CSV_DEFAUT):
+                        return None
+                    try:
+                        compiler(CSV_DEFAUT, chemin)
+                    except OSError:
+                        # répertoire de l'app en lecture seule : compilation dans le répertoire temporaire
+                        chemin = os.path.join(tempfile.gettempdir(), "coach_taux_reference.bin")
+                        if not _a_jour(CSV_DEFAUT, chemin):
+                            compiler(CSV_DEFAUT, chemin)
+                _grille = GrilleTaux(chemin)
+            except (OSError, ValueError) as e:
+                log.warning("grille des taux indisponible : %s", e)
+                return None
+        return _grille
+
+
+# -----------------------------
+# Contrôle d'une offre
+# -----------------------------
+@dataclass(frozen=True)
+class ControleUsure:
+    taeg: float
+    usure: Optional[Taux]        # None : pas de taux d'usure connu pour cette date / catégorie
+    marche: Optional[Taux]       # taux moyen du marché (nominal), pour information
+    perimee: bool                # dernière date d'effet plus ancienne que VALIDITE_JOURS
+
+    @property
+    def au_dessus(self) -> bool:
+        return self.usure is not None and self.taeg > self.usure.taux
+
+
+def controler(capital: float, taux_pct: float, duree_ans: int, assurance_pct: float = 0.0, frais: float = 0.0,
+              quand: Optional[date] = None, categorie: str = "fixe",
+              grille: Optional[GrilleTaux] = None) -> ControleUsure:
+    """TAEG de l'offre comparé au taux d'usure en vigueur à `quand` (défaut : aujourd'hui)."""
+    quand = quand or date.today()
+    grille = grille or grille_taux()
+    t = float(taeg(capital, taux_pct, duree_ans, assurance_pct, frais))
+    usure = grille.taux(f"usure_{categorie}", quand, duree_ans) if grille else None
+    marche = grille.taux(f"marche_{categorie}", quand, duree_ans) if grille else None
+    perimee = usure is not None and (quand - usure.date_effet).days > VALIDITE_JOURS
+    return ControleUsure(t, usure, marche, perimee)
+
+
+def _nombre(v: Any) -> Optional[float]:
+    if v is None or (isinstance(v, str) and not v.strip()):
+        return None
+    return float(str(v).replace(",", ".")) if isinstance(v, str) else float(v)
+
+
+def controler_lot(dossiers: Sequence[Dict[str, Any]], grille: Optional[GrilleTaux] = None,
+                  quand: Optional[date] = None) -> List[Optional[Tuple[float, Optional[float], bool]]]:
+    """(TAEG, taux d'usure, au-dessus) par dossier portant une offre (offre_montant, offre_taux, offre_duree_ans) ; None sinon.
+
+    Champs facultatifs : offre_assurance_pct, offre_frais, offre_date
+    (AAAA-MM-JJ, défaut `quand` ou aujourd'hui), offre_categorie (fixe,
+    variable, relais). Une offre illisible (montant ou durée nuls ou
+    négatifs compris) donne None.
+    """
+    grille = grille or grille_taux()
+    defaut = _jours(quand or date.today())
+    offres: Dict[str, List[Tuple[int, Tuple[float, ...], int]]] = {}
+    for n, d in enumerate(dossiers):
+        try:
+            valeurs = [_nombre(d.get(k)) for k in ("offre_montant", "offre_taux", "offre_duree_ans")]
+            if None in valeurs or not (valeurs[0] > 0 and valeurs[2] > 0):  # NaN compris
+                continue
+            extra = (_nombre(d.get("offre_assurance_pct")) or 0.0, _nombre(d.get("offre_frais")) or 0.0)
+            jour = _jours(date.fromisoformat(str(d["offre_date"]).strip())) if d.get("offre_date") else defaut
+        except (TypeError, ValueError):
+            continue
+        categorie = str(d.get("offre_categorie") or "fixe").strip().lower()
+        offres.setdefault(categorie, []).append((n, (*valeurs, *extra), jour))  # type: ignore[arg-type]
+
+    sortie: List[Optional[Tuple[float, Optional[float], bool]]] = [None] * len(dossiers)
+    for categorie, lot in offres.items():
+        rangs = [n for n, _, _ in lot]
+        capital, taux, duree, assurance, frais = np.array([v for _, v, _ in lot], dtype=np.float64).T
+        taegs = taeg(capital, taux, duree, assurance, frais)
+        if grille is not None:
+            usures, _ = grille.taux_lot(f"usure_{categorie}", [j for *_, j in lot], np.round(duree * 12))
+        else:
+            usures = np.full(len(lot), np.nan)
+        for n, t, u in zip(rangs, taegs.tolist(), usures.tolist()):
+            sortie[n] = (t, None if u != u else u, u == u and t > u)
+    return sortie
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Taux d'usure et taux du marché (grille compilée, mappée en mémoire).")
+    sous = p.add_subparsers(dest="commande", required=True)
+    c = sous.add_parser("compiler", help="Compile le CSV en fichier binaire")
+    c.add_argument("source", nargs="?", default=CSV_DEFAUT)
+    c.add_argument("destination", nargs="?", default=CHEMIN_DEFAUT)
+    t = sous.add_parser("taux", help="Taux en vigueur pour une série, une date et une durée")
+    t.add_argument("serie")
+    t.add_argument("date", type=date.fromisoformat)
+    t.add_argument("duree_ans", type=float)
+    sous.add_parser("series", help="Séries de la grille")
+    args = p.parse_args(argv)
+
+    if args.commande == "compiler":
+        try:
+            n = compiler(args.source, args.destination)
+        except ValueError as e:
+            p.error(str(e))
+        print(f"{n} taux compilés dans {args.destination} ({os.path.getsize(args.destination)} octets).", file=sys.stderr)
+        return 0
+    grille = grille_taux()
+    if grille is None:
+        print(f"Aucune grille : {CSV_DEFAUT} introuvable.", file=sys.stderr)
+        return 1
+    if args.commande == "series":
+        for s in grille.series:
+            print(s)
+        return 0
+    r = grille.taux(args.serie, args.date, args.duree_ans)
+    if r is None:
+        print(f"Aucun taux {args.serie} au {args.date:%d/%m/%Y} pour {args.duree_ans:g} ans.", file=sys.stderr)
+        return 1
+    print(f"{r.taux:.2f} % — en vigueur depuis le {r.date_effet:%d/%m/%Y} ({r.tranche})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
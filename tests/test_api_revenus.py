@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+# test_api_revenus.py — API /revenu et /revenus/lot : même résultat quel que soit le moteur, erreurs nommées
+#
+# Usage :
+#   python -m pytest -q tests
+
+from __future__ import annotations
+
+import os
+import sys
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+import pytest  # noqa: E402
+
+from api_revenus import SEUIL_LOT_NUMPY, ErreurRequete, evaluer_plusieurs, evaluer_un  # noqa: E402
+
+
+def test_meme_resultat_sous_et_au_dela_du_seuil():
+    d = {"statut": "Élu", "revenus_mandat": 0.18}
+    scalaire = evaluer_plusieurs([d] * (SEUIL_LOT_NUMPY - 1))[0]
+    lot = evaluer_plusieurs([d] * SEUIL_LOT_NUMPY)[0]
+    assert scalaire == lot == evaluer_un(d)
+
+
+def test_champ_non_numerique_nomme():
+    d = {"statut": "CDI", "salaire_fixe": "abc"}
+    with pytest.raises(ErreurRequete) as e:
+        evaluer_un(d)
+    assert e.value.statut_http == 422
+    assert "salaire_fixe" in str(e.value) and "could not convert" not in str(e.value)
+    for n in (1, SEUIL_LOT_NUMPY):
+        assert "salaire_fixe" in evaluer_plusieurs([d] * n)[0]["erreur"]
+
+
+@pytest.mark.parametrize("d, champ", [
+    ({"statut": "CDI", "cdi_chgt": True, "b_m1": -5}, "b_m1"),
+    ({"statut": "CDI", "salaire_fixe": float("nan")}, "salaire_fixe"),
+    ({"statut": ["CDI"]}, "Statut inconnu"),
+])
+def test_saisie_refusee_sur_sa_ligne(d, champ):
+    with pytest.raises(ErreurRequete) as e:
+        evaluer_un(d)
+    assert e.value.statut_http == 422 and champ in str(e.value)
+    valide = {"statut": "CDI", "salaire_fixe": 2000.0}
+    for n in (1, SEUIL_LOT_NUMPY):
+        resultats = evaluer_plusieurs([d] * n + [valide])
+        assert all(champ in r["erreur"] for r in resultats[:-1])
+        assert resultats[-1] == evaluer_un(valide)
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+# test_archive_dossiers.py — Encodage compact des saisies : aucune valeur perdue
+#
+# Usage :
+#   python -m pytest -q tests
+
+from __future__ import annotations
+
+import os
+import sys
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+import pytest  # noqa: E402
+
+from archive_dossiers import ArchiveDossiers, Dossier, ecrire_archive, entier  # noqa: E402
+from moteur_revenus import Resultat  # noqa: E402
+from referentiel import STATUT_MENAGE  # noqa: E402
+
+
+def test_entier_refuse_les_decimales():
+    assert entier(12.0) == 12 and entier("7") == 7 and entier(True) == 1
+    with pytest.raises(ValueError):
+        entier(12.5)
+
+
+def test_saisie_non_entiere_conservee():
+    saisies = {"nom": "Durand", "statut": "Intérim", "mois_activite": 12.5, "rni_N": 21000.0}
+    d = Dossier.depuis_saisies(saisies)
+    assert "mois_activite" not in d.valeurs
+    assert d.saisies() == saisies
+
+
+def test_menage_indexe_sous_menage(tmp_path):
+    saisies = {"nom": "Durand", "statut": "CDI", "salaire_fixe": 2000.0,
+               "co_emprunteur": {"statut": "CDD", "cdd_rni_12m": 24000.0}}
+    resultat = Resultat(STATUT_MENAGE, 4000.0, 4000.0, "")
+    d = Dossier.depuis_saisies(saisies, resultat)
+    assert d.libelle_statut == STATUT_MENAGE and d.saisies() == saisies
+    chemin = str(tmp_path / "menage.arc")
+    ecrire_archive(chemin, [d, Dossier.depuis_saisies({"nom": "Martin", "statut": "CDI"})])
+    with ArchiveDossiers(chemin) as archive:
+        assert archive.compter(STATUT_MENAGE) == 1 and archive.compter("CDI") == 1
+        relu = next(archive.filtrer(STATUT_MENAGE))
+        assert relu.saisies() == saisies and relu.resultat().statut == STATUT_MENAGE
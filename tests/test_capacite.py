@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+# test_capacite.py — Mensualités, TAEG et grille de capacité contre des valeurs connues
+#
+# Usage :
+#   python -m pytest -q tests
+
+from __future__ import annotations
+
+import os
+import sys
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+import numpy as np  # noqa: E402
+import pytest  # noqa: E402
+
+from capacite import (grille_capacite, mensualite_max, mensualite_pour, tableau_amortissement,  # noqa: E402
+                      taeg)
+
+
+def _taeg_scalaire(capital, taux_pct, duree_ans, assurance_pct, frais):
+    # taux actuariel recalculé échéance par échéance, sans NumPy
+    r, n = taux_pct / 1200.0, duree_ans * 12
+    echeance = capital * r / (1 - (1 + r) ** -n) + capital * assurance_pct / 1200.0
+    bas, haut = 0.0, 0.05
+    for _ in range(100):
+        i = (bas + haut) / 2
+        if sum(echeance / (1 + i) ** k for k in range(1, n + 1)) > capital - frais:
+            bas = i
+        else:
+            haut = i
+    return ((1 + bas) ** 12 - 1) * 100
+
+
+def test_mensualite_connue():
+    assert round(float(mensualite_pour(200_000, 3.5, 20)), 2) == 1159.92
+    assert round(float(mensualite_pour(100_000, 0.0, 10)), 2) == 833.33  # taux nul : capital / mois
+
+
+def test_tableau_amortissement():
+    t = tableau_amortissement(200_000, 3.5, 20)
+    assert len(t["mois"]) == 240 and t["interets"][0] == pytest.approx(583.33, abs=0.01)
+    assert t["amortissement"].sum() == pytest.approx(200_000, abs=1e-6)
+    assert t["capital_restant"][-1] == pytest.approx(0.0, abs=1e-6)
+    assert t["interets"].sum() == pytest.approx(240 * t["echeance"][0] - 200_000, abs=1e-6)
+
+
+def test_taeg():
+    # sans frais ni assurance : taux actuariel du nominal, (1 + 3,5 % / 12)^12 − 1
+    assert float(taeg(200_000, 3.5, 20)) == pytest.approx(3.5567, abs=1e-4)
+    assert float(taeg(100_000, 4.0, 15, 0.3, 1500)) == pytest.approx(
+        _taeg_scalaire(100_000, 4.0, 15, 0.3, 1500), abs=1e-3)
+    lot = taeg([100_000, 250_000], [4.0, 3.2], [15, 25], [0.3, 0.1], [1500, 0])
+    assert lot[1] == pytest.approx(_taeg_scalaire(250_000, 3.2, 25, 0.1, 0), abs=1e-3)
+
+
+def test_case_de_grille_egale_au_calcul_scalaire():
+    g = grille_capacite(4000.0, charges=200.0)
+    assert g.mensualite_max == mensualite_max(4000.0, charges=200.0) == 1200.0
+    i, j = g.indice(3.5, 20)
+    r, n = 3.5 / 1200.0, 240
+    assert g.capital(3.5, 20) == round(1200.0 * (1 - (1 + r) ** -n) / r, 2)
+    assert g.cout_interets[i, j] == pytest.approx(1200.0 * n - g.capital_max[i, j], abs=0.01)
+    assert np.all(np.diff(g.capital_max, axis=0) < 0) and np.all(np.diff(g.capital_max, axis=1) > 0)
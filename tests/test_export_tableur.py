@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+# test_export_tableur.py — Tableur du portefeuille : rejets dans l'export, pas de formule exécutée
+#
+# Usage :
+#   python -m pytest -q tests
+
+from __future__ import annotations
+
+import csv
+import os
+import sys
+import zipfile
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from export_tableur import main  # noqa: E402
+
+ENTREE = "\n".join([
+    '{"nom": "=HYPERLINK(\\"http://x\\")", "statut": "CDI", "salaire_net": 2500}',
+    "3",
+    "pas du json",
+    '{"nom": "@Durand", "statut": "CDI", "salaire_net": 2000}',
+]) + "\n"
+
+
+def test_csv_sans_formule(tmp_path):
+    (tmp_path / "d.jsonl").write_text(ENTREE, encoding="utf-8")
+    assert main([str(tmp_path / "p.csv"), "--entree", str(tmp_path / "d.jsonl")]) == 0
+    with open(tmp_path / "p.csv", encoding="utf-8-sig", newline="") as f:
+        lignes = list(csv.reader(f))
+    assert [ligne[1] for ligne in lignes[1:]] == ["'=HYPERLINK(\"http://x\")", "", "", "'@Durand"]
+    assert lignes[2][-1] and lignes[3][-1]
+
+
+def test_xlsx_complet_malgre_les_rejets(tmp_path):
+    (tmp_path / "d.jsonl").write_text(ENTREE, encoding="utf-8")
+    assert main([str(tmp_path / "p.xlsx"), "--entree", str(tmp_path / "d.jsonl")]) == 0
+    with zipfile.ZipFile(tmp_path / "p.xlsx") as z:
+        assert z.testzip() is None
+        feuille = z.read("xl/worksheets/sheet1.xml").decode("utf-8")
+    assert feuille.endswith("</worksheet>") and feuille.count("<row ") == 5
+    assert ">=HYPERLINK(" in feuille  # chaîne en ligne : jamais évaluée, pas de préfixe
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+# test_extraction_pdf.py — Lecture des PDF : ordre des pages, PDF malformés rejetés pièce par pièce
+#
+# Usage :
+#   python -m pytest -q tests
+
+from __future__ import annotations
+
+import os
+import sys
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+import pytest  # noqa: E402
+
+from extraction_pdf import lignes_pdf, lire_objets  # noqa: E402
+from ingestion_pieces import analyser  # noqa: E402
+
+
+def _pdf(objets):
+    corps = b"%PDF-1.4\n"
+    for num, contenu in objets:
+        corps += b"%d 0 obj\n%s\nendobj\n" % (num, contenu)
+    return corps + b"trailer\n<< /Root 1 0 R >>\n%%EOF\n"
+
+
+def _flux(texte):
+    donnees = b"BT /F1 12 Tf 72 700 Td (" + texte + b") Tj ET"
+    return b"<< /Length %d >>\nstream\n%s\nendstream" % (len(donnees), donnees)
+
+
+def test_pages_dans_l_ordre_de_l_arbre():
+    # la page 1 (objet 5) est numérotée après la page 2 (objet 4)
+    page = b"<< /Type /Page /Parent 2 0 R /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+    pdf = _pdf([
+        (1, b"<< /Type /Catalog /Pages 2 0 R >>"),
+        (2, b"<< /Type /Pages /Kids [5 0 R 4 0 R] /Count 2 >>"),
+        (3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"),
+        (4, page % 6),
+        (5, page % 7),
+        (6, _flux(b"Page deux")),
+        (7, _flux(b"Page un")),
+    ])
+    assert [ligne.strip() for ligne in lignes_pdf(pdf) if ligne.strip()] == ["Page un", "Page deux"]
+
+
+def test_flux_d_objets_malforme():
+    pdf = _pdf([(1, b"<< /Type /ObjStm /Length 3 >>\nstream\n1 0\nendstream")])
+    with pytest.raises(ValueError, match="flux d'objets"):
+        lire_objets(pdf)
+    piece = analyser("bulletin.pdf", pdf)
+    assert not piece.type and "flux d'objets" in piece.motif
+
+
+def test_parent_en_boucle():
+    # page sans /Resources dont le /Parent est elle-même : la recherche des polices s'arrête
+    pdf = _pdf([
+        (1, b"<< /Type /Catalog /Pages 2 0 R >>"),
+        (2, b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>"),
+        (3, b"<< /Type /Page /Parent 3 0 R /Contents 4 0 R >>"),
+        (4, _flux(b"Sans police")),
+    ])
+    assert [ligne.strip() for ligne in lignes_pdf(pdf) if ligne.strip()] == ["Sans police"]
+    assert analyser("x.pdf", pdf).motif
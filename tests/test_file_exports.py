@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+# test_file_exports.py — Export groupé en file : progression jusqu'au bout, dossiers rejetés listés
+#
+# Usage :
+#   python -m pytest -q tests
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+import zipfile
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from file_exports import TERMINE, FileExports, travail_zip  # noqa: E402
+
+LIGNES = [
+    (2, {"nom": "Actif", "statut": "CDI"}),
+    (3, {"nom": "Inactif", "statut": "CDI", "actif": "non"}),
+    (4, {"nom": "Invalide", "statut": "CDI", "b_m1": "abc"}),
+    (5, {"nom": "Autre", "statut": "CDD"}),
+]
+
+
+def test_total_au_fil_de_l_eau():
+    file = FileExports(threads=1, processus=0)
+    try:
+        job_id = file.soumettre("zip", "test", "z.zip", "application/zip",
+                                travail_zip(iter(LIGNES), total=2 * len(LIGNES)))
+        while not file.job(job_id).termine:
+            time.sleep(0.05)
+        job = file.job(job_id)
+        assert job.etat == TERMINE, job.erreur
+        assert job.fait == job.total == 5  # 2 PDF × 2 dossiers actifs valides + rejets.csv
+        with zipfile.ZipFile(job.chemin) as z:
+            assert len(z.namelist()) == 5
+            rejets = z.read("rejets.csv").decode("utf-8-sig").splitlines()
+        assert len(rejets) == 2 and rejets[1].startswith("4,") and "b_m1" in rejets[1]
+    finally:
+        os.remove(file.job(job_id).chemin)
+        file.arreter()
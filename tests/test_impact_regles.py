@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+# test_impact_regles.py — Rejeu what-if : un ménage est relu pour le statut de chacun de ses emprunteurs
+#
+# Usage :
+#   python -m pytest -q tests
+
+from __future__ import annotations
+
+import os
+import sys
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from depot_dossiers import DepotDossiers  # noqa: E402
+from impact_regles import changer, rejouer  # noqa: E402
+from menage import dossier_menage, evaluer_saisies  # noqa: E402
+from regles import compiler_table, table_courante  # noqa: E402
+
+CDI = {"nom": "Martin", "statut": "CDI", "salaire_fixe": 2000.0}
+INTERIM = {"statut": "Intérim", "mois_activite": 20, "rni_N": 20000.0}
+
+
+def test_menage_rejoue_pour_le_co_emprunteur(tmp_path):
+    chemin = str(tmp_path / "dossiers.sqlite3")
+    depot = DepotDossiers(chemin, 1)
+    for saisies in (dossier_menage([CDI, INTERIM]), CDI):
+        depot.enregistrer(saisies, evaluer_saisies(saisies))
+    depot.fermer()
+
+    avant = table_courante()
+    apres = compiler_table(changer(avant.brut, ["Intérim.seuil=24"]))
+    resume, ecarts = rejouer(avant, apres, chemin, workers=1)
+    assert resume["Ménage"]["evalues"] == 1 and resume["Ménage"]["modifies"] == 1
+    (id_, _, statut, a, b, _), = ecarts
+    assert (id_, statut) == (1, "Ménage")
+    assert a[2] == evaluer_saisies(dossier_menage([CDI, INTERIM])).revenu_total
+    assert b[2] == evaluer_saisies(CDI).revenu_total
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+# test_menage.py — Ménage enregistré : statut "Ménage", Resultat du ménage, relu par les exports
+#
+# Usage :
+#   python -m pytest -q tests
+
+from __future__ import annotations
+
+import io
+import os
+import sys
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from depot_dossiers import DepotDossiers  # noqa: E402
+from export_masse import taches  # noqa: E402
+from export_tableur import ecrire_csv, lignes_scorees  # noqa: E402
+from menage import dossier_menage, evaluer_menage, evaluer_saisies  # noqa: E402
+from moteur_revenus import evaluer_dossier  # noqa: E402
+from referentiel import STATUT_MENAGE  # noqa: E402
+
+CDI = {"nom": "Martin", "statut": "CDI", "salaire_fixe": 2500.0}
+INTERIM = {"nom": "Martin", "statut": "Intérim", "rni_N": 21000.0, "rni_N1": 19000.0, "rni_N2": 23000.0,
+           "mois_activite": 30}
+
+
+def test_evaluer_saisies_additionne_les_emprunteurs():
+    res = evaluer_saisies(dossier_menage([CDI, INTERIM]))
+    menage = evaluer_menage([CDI, INTERIM])
+    assert res == menage.resultat()
+    assert res.revenu_total == round(evaluer_dossier(CDI).revenu_total + evaluer_dossier(INTERIM).revenu_total, 2)
+
+
+def test_depot_enregistre_le_statut_menage(tmp_path):
+    depot = DepotDossiers(str(tmp_path / "dossiers.sqlite3"), 1)
+    saisies = dossier_menage([CDI, INTERIM])
+    id_dossier = depot.enregistrer(saisies, evaluer_saisies(saisies))
+    stocke = depot.charger(id_dossier)
+    assert stocke.statut == STATUT_MENAGE
+    assert stocke.resultat.revenu_total == evaluer_saisies(saisies).revenu_total
+    assert [i for i, _ in depot.saisies(STATUT_MENAGE)] == [id_dossier]
+
+
+def test_exports_evaluent_le_menage():
+    saisies = dossier_menage([CDI, INTERIM])
+    attendu = evaluer_saisies(saisies)
+    (ligne,), = list(lignes_scorees([(1, saisies)]))
+    assert (ligne["statut"], ligne["revenu_total"]) == (attendu.statut, attendu.revenu_total)
+    sortie = io.BytesIO()
+    assert ecrire_csv(lignes_scorees([(1, saisies), (2, CDI)]), sortie) == 2
+
+    resume, checklist = taches([(1, saisies)])
+    assert resume[2]["revenu_total"] == attendu.revenu_total
+    assert any(doc.endswith("emprunteur 2") for doc, _ in checklist[2]["checked"])
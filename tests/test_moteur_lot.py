@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+# test_moteur_lot.py — Parité du mode lot (moteur_lot) avec evaluer_dossier
+#
+# Usage :
+#   python -m pytest -q tests
+#
+# Dossiers aléatoires sur tous les statuts (montants à 0, 1 ou 2 décimales,
+# champs CDI croisés, demi-centimes) : chaque Resultat du lot doit être
+# identique, champ par champ, à celui de l'évaluation dossier par dossier.
+# Un montant négatif ou non fini est refusé par les deux moteurs, avec la
+# même erreur.
+
+from __future__ import annotations
+
+import math
+import os
+import random
+import sys
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+sys.path.insert(0, os.path.join(RACINE, "benchmarks"))
+
+import pytest  # noqa: E402
+
+from bench_suite import DOSSIERS_TYPE  # noqa: E402
+from moteur_revenus import evaluer_dossier, evaluer_lot  # noqa: E402
+from referentiel import STATUTS  # noqa: E402
+
+
+def _dossiers(nombre: int, graine: int):
+    alea = random.Random(graine)
+
+    def montant() -> float:
+        return round(alea.uniform(0, 60000), alea.choice([0, 1, 2]))
+
+    for _ in range(nombre):
+        statut = alea.choice(STATUTS)
+        d = {"statut": statut}
+        for k, v in DOSSIERS_TYPE[statut].items():
+            if isinstance(v, list):
+                d[k] = [montant() for _ in v]
+            else:
+                d[k] = montant() if isinstance(v, float) else alea.randint(0, 60)
+        for k in ("autres_revenus", "salaire_fixe", "b_m1", "b_m2", "b_m3", "cdi_salaire_brut_annuel_contrat",
+                  "cdi_primes_contractuelles_annuelles", "pnc3"):
+            if alea.random() < 0.3:
+                d[k] = montant() / alea.choice([1, 12, 100])
+        for k in ("cdi_chgt", "cdi_statut_cadre", "cdi_periode_essai_terminee"):
+            if alea.random() < 0.3:
+                d[k] = alea.random() < 0.5
+        if alea.random() < 0.2:
+            d["revenus_mandat"] = round(alea.uniform(0, 1), 2)
+        yield d
+
+
+def test_parite_lot_dossier():
+    dossiers = list(_dossiers(20_000, 0))
+    lot = evaluer_lot(dossiers)
+    ecarts = [(d, lot.resultat(i), evaluer_dossier(d)) for i, d in enumerate(dossiers)
+              if lot.resultat(i) != evaluer_dossier(d)]
+    assert not ecarts, f"{len(ecarts)} écart(s), ex. {ecarts[0]}"
+
+
+def test_demi_centime():
+    # 0,18 / 12 = 0,015 : np.round donnait 0,02, round() donne 0,01
+    d = {"statut": "Élu", "revenus_mandat": 0.18}
+    assert evaluer_lot([d]).resultat(0) == evaluer_dossier(d)
+
+
+REFUSES = [
+    {"statut": "CDI", "cdi_chgt": True, "b_m1": -5},
+    {"statut": "CDI", "cdi_chgt": True, "b_m1": math.nan, "b_m2": 2000.0},
+    {"statut": "CDI", "salaire_fixe": math.inf},
+    {"statut": "Intérim", "rni_N": "nan"},
+    {"statut": "CDD", "cdd_rni_12m": -1000.0},
+    {"statut": "Multi-contrats", "rni_employeurs": [12000.0, -1.0]},
+]
+
+
+@pytest.mark.parametrize("d", REFUSES)
+def test_montant_refuse_par_les_deux_moteurs(d):
+    with pytest.raises(ValueError, match="négatif ou non fini") as scalaire:
+        evaluer_dossier(d)
+    with pytest.raises(ValueError) as lot:
+        evaluer_lot([{"statut": d["statut"]}, d])
+    assert str(lot.value) == str(scalaire.value)
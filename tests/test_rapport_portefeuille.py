@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+# test_rapport_portefeuille.py — Refus par antériorité et lignes rejetées du rapport --entree
+#
+# Usage :
+#   python -m pytest -q tests
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from moteur_revenus import evaluer_lot  # noqa: E402
+from rapport_portefeuille import Portefeuille, _lignes_entree  # noqa: E402
+
+INTERIM_RECENT = {"statut": "Intérim", "mois_activite": 10, "rni_N": 20000.0}
+APPRENTI_EXPIRE = {"statut": "Apprenti", "duree_restante_mois": 0}
+
+
+def test_seul_un_refus_d_anteriorite_est_compte():
+    p = Portefeuille.depuis_lot(evaluer_lot([INTERIM_RECENT, APPRENTI_EXPIRE, {"statut": "CDI"}]))
+    assert not p.eligible[0] and not p.eligible[1]
+    assert p.rejet_anteriorite.tolist() == [True, False, False]
+
+
+def test_entree_lignes_illisibles_en_erreur(tmp_path):
+    chemin = tmp_path / "portefeuille.jsonl"
+    chemin.write_text("\n".join([json.dumps({"statut": "CDI", "salaire_fixe": 2500}), "pas du json", "3",
+                                 json.dumps({"statut": "CDI", "salaire_fixe": "abc"}),
+                                 json.dumps({**INTERIM_RECENT, "co_emprunteur": {"statut": "CDI"}})]), encoding="utf-8")
+    rejets = []
+    p = Portefeuille.depuis_lignes(list(_lignes_entree(str(chemin), rejets)))
+    assert [num for num, _ in rejets] == [2, 3, 4]
+    assert "salaire_fixe" in rejets[-1][1]
+    assert p.erreur.tolist() == [True, True, False, True, False]
+    assert int(p.eligible.sum()) == 1 and int(p.rejet_anteriorite.sum()) == 1
+    assert p.noms[p.statuts[-1]] == "Ménage"
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+# test_score_portefeuille.py — Scoring par paquets : un rejet ne dépend pas des lignes voisines
+#
+# Usage :
+#   python -m pytest -q tests
+
+from __future__ import annotations
+
+import os
+import sys
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from score_portefeuille import _evaluer_paquet  # noqa: E402
+
+NEGATIF = {"nom": "A", "statut": "CDI", "cdi_chgt": "true", "b_m1": "-5", "b_m2": "0", "b_m3": "0"}
+NON_NUMERIQUE = {"nom": "B", "statut": "CDI", "b_m1": "abc"}
+VALIDE = {"nom": "C", "statut": "CDI"}
+
+
+def _motifs(paquet):
+    return {num: motif for num, _, _, motif in _evaluer_paquet(list(enumerate(paquet, start=2)))}
+
+
+def test_rejet_independant_du_paquet():
+    seul = _motifs([NEGATIF, VALIDE])
+    melange = _motifs([NEGATIF, NON_NUMERIQUE, VALIDE])
+    assert seul[2] == melange[2] and "b_m1" in seul[2]
+    assert "b_m1" in melange[3]
+    assert seul[3] is None and melange[4] is None
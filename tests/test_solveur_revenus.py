@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+# test_solveur_revenus.py — Inverses exacts et dichotomie : la saisie trouvée permet d'emprunter
+#
+# Usage :
+#   python -m pytest -q tests
+#
+# Les familles de formules de la table en service ont toutes un inverse
+# exact ; la dichotomie (famille sans inverse, ex. ajoutée à FORMULES sans
+# l'être à INVERSES) est vérifiée contre eux, statut par statut.
+
+from __future__ import annotations
+
+import os
+import sys
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+import numpy as np  # noqa: E402
+import pytest  # noqa: E402
+
+import solveur_revenus  # noqa: E402
+from moteur_revenus import DEFAUTS, evaluer_dossier  # noqa: E402
+from referentiel import STATUTS  # noqa: E402
+from regles import table_courante  # noqa: E402
+from solveur_revenus import _dichotomie, dossier_resolu, inverse  # noqa: E402
+
+CIBLES = np.array([812.34, 1500.0, 3333.33])
+CONTEXTE = {**DEFAUTS, "salaire_fixe": 0.0}  # sans salaire fixe : pas de repli du CDI qui atteindrait la cible seul
+
+
+def _atteint(statut, champs, valeur, cible, contexte=CONTEXTE):
+    return evaluer_dossier(dossier_resolu(contexte, statut, champs, valeur)).revenu_eligible >= cible
+
+
+@pytest.mark.parametrize("statut", STATUTS)
+def test_dichotomie_rejoint_l_inverse_exact(statut):
+    table = table_courante()
+    exact = inverse(statut, CONTEXTE)
+    if exact.motif is not None:
+        pytest.skip(exact.motif)
+    attendu = exact.saisie(CIBLES)
+    trouve = _dichotomie(table[statut], {**CONTEXTE, "statut": statut}, table, exact.champs).saisie(CIBLES)
+    # l'inverse exact ignore l'arrondi au centime du moteur : la dichotomie peut trouver un peu moins
+    assert np.all(trouve <= attendu) and np.all(attendu - trouve <= 0.06)
+    for valeur, cible in zip(trouve, CIBLES):
+        assert _atteint(statut, exact.champs, valeur, cible)
+
+
+def test_famille_sans_inverse(monkeypatch):
+    monkeypatch.setattr(solveur_revenus, "INVERSES",
+                        {k: v for k, v in solveur_revenus.INVERSES.items() if k != "somme"})
+    inv = inverse("Stagiaire FP", CONTEXTE)
+    assert "dichotomie" in inv.libelle and inv.champs == ("rni",)
+    assert _atteint("Stagiaire FP", inv.champs, inv.saisie(np.array([1500.0]))[0], 1500.0)
+    # contrat trop court : aucun RNI ne rend l'apprenti éligible
+    contexte = {**CONTEXTE, "statut": "Apprenti", "duree_restante_mois": 0}
+    apprenti = inverse("Apprenti", contexte)
+    assert np.isnan(apprenti.saisie(np.array([1500.0]))[0])
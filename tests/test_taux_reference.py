@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+# test_taux_reference.py — Contrôle d'usure : offres illisibles et grille indisponible
+#
+# Usage :
+#   python -m pytest -q tests
+
+from __future__ import annotations
+
+import os
+import sys
+import warnings
+from datetime import date
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+import taux_reference  # noqa: E402
+from taux_reference import controler_lot  # noqa: E402
+
+
+def test_offre_sans_duree_ni_capital_illisible():
+    offres = [
+        {"offre_montant": 200000, "offre_taux": 3.5, "offre_duree_ans": 0},
+        {"offre_montant": 0, "offre_taux": 3.5, "offre_duree_ans": 20},
+        {"offre_montant": 200000, "offre_taux": 3.5, "offre_duree_ans": -5},
+        {"offre_montant": 200000, "offre_taux": 3.5, "offre_duree_ans": 20},
+    ]
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        controle = controler_lot(offres, quand=date(2025, 1, 15))
+    assert controle[:3] == [None, None, None]
+    assert controle[3] is not None and controle[3][0] > 3.5
+
+
+def test_csv_invalide_sans_grille(tmp_path, monkeypatch):
+    csv = tmp_path / "taux.csv"
+    csv.write_text("serie,date_effet,duree_min_ans,duree_max_ans,taux\nusure_fixe,pas une date,0,10,5.5\n",
+                   encoding="utf-8")
+    monkeypatch.setattr(taux_reference, "CSV_DEFAUT", str(csv))
+    monkeypatch.setattr(taux_reference, "CHEMIN_DEFAUT", str(tmp_path / "taux.bin"))
+    monkeypatch.setattr(taux_reference, "_grille", None)
+    assert taux_reference.grille_taux() is None